@@ -0,0 +1,75 @@
+"""
+Authentification des routes qui modifient des données (import catalogue,
+aperçus d'import, lots de commandes, webhooks Foxway)
+
+Deux façons de s'authentifier auprès de require_admin:
+- Authorization: Bearer <jeton d'accès Supabase> d'un utilisateur actif de
+  rôle 'admin' (table users, comme les routes Next.js)
+- X-API-Key: <DBC_API_SERVICE_TOKEN>, jeton partagé pour les appels de
+  serveur à serveur (routes Next.js, scripts)
+
+Le webhook Foxway est authentifié par X-Webhook-Token (FOXWAY_WEBHOOK_SECRET).
+Sans configuration, l'accès est refusé: aucune route protégée n'est ouverte
+par défaut.
+"""
+
+import asyncio
+import hmac
+import os
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from catalog_processor import init_supabase
+from pipeline_metrics import supabase_call
+
+
+def _token_matches(received: Optional[str], expected: Optional[str]) -> bool:
+    return bool(received and expected) and hmac.compare_digest(received.encode(), expected.encode())
+
+
+def _admin_user_id(access_token: str) -> Optional[str]:
+    """Identifiant de l'utilisateur si le jeton Supabase est valide et appartient à un admin actif"""
+    supabase = init_supabase()
+    try:
+        with supabase_call('auth', 'get_user'):
+            user = supabase.auth.get_user(access_token).user
+    except Exception:
+        return None
+    if user is None:
+        return None
+    with supabase_call('users', 'select'):
+        result = supabase.table('users').select('role, is_active').eq('id', user.id).limit(1).execute()
+    profile = (result.data or [None])[0]
+    if not profile or profile.get('role') != 'admin' or not profile.get('is_active'):
+        return None
+    return user.id
+
+
+async def require_admin(
+    authorization: Optional[str] = Header(default=None),
+    x_api_key: Optional[str] = Header(default=None),
+) -> str:
+    """Dépendance FastAPI: administrateur ou jeton de service, 401 / 403 sinon"""
+    if x_api_key is not None:
+        if _token_matches(x_api_key, os.getenv("DBC_API_SERVICE_TOKEN")):
+            return 'service'
+        raise HTTPException(status_code=401, detail="Jeton de service invalide")
+
+    scheme, _, access_token = (authorization or '').partition(' ')
+    if scheme.lower() != 'bearer' or not access_token:
+        raise HTTPException(status_code=401, detail="Authentification requise",
+                            headers={"WWW-Authenticate": "Bearer"})
+    try:
+        user_id = await asyncio.to_thread(_admin_user_id, access_token.strip())
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Vérification de l'utilisateur impossible: {e}")
+    if user_id is None:
+        raise HTTPException(status_code=403, detail="Accès réservé aux administrateurs")
+    return user_id
+
+
+async def require_webhook_token(x_webhook_token: Optional[str] = Header(default=None)):
+    """Dépendance FastAPI: jeton partagé des webhooks Foxway"""
+    if not _token_matches(x_webhook_token, os.getenv("FOXWAY_WEBHOOK_SECRET")):
+        raise HTTPException(status_code=401, detail="Jeton de webhook invalide")
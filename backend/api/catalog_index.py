@@ -0,0 +1,436 @@
+"""
+Index catalogue en mémoire pour la recherche et le filtrage à facettes
+
+Chaque valeur de facette (Appearance, Functionality, Color, Boxed,
+Additional Info, marque...) est représentée par un bitmap (entier Python
+dont le bit i correspond à la ligne i). Les noms de produits alimentent un
+index inversé par token, trié pour permettre la recherche par préfixe.
+Une requête filtrée + comptage des facettes se résume ainsi à quelques
+AND/OR sur des entiers et à des popcount, sans parcourir les produits.
+"""
+
+import asyncio
+import bisect
+import functools
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from pipeline_metrics import supabase_call
+from product_name_parser import parse_product_name
+
+# Colonnes de la table products utilisées comme facettes
+FACETS = (
+    'appearance',
+    'functionality',
+    'color',
+    'boxed',
+    'additional_info',
+    'brand',
+    'storage_gb',
+    'vat_type',
+)
+
+# Colonnes chargées depuis Supabase pour alimenter l'index
+PRODUCT_COLUMNS = (
+    'sku, product_name, appearance, functionality, color, boxed, '
+    'additional_info, vat_type, brand, model, storage_gb, quantity, price_dbc, is_active'
+)
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Les noms sont très répétés entre grades / couleurs: le parsing est mémorisé
+_parse_name = functools.lru_cache(maxsize=65536)(parse_product_name)
+
+# Au-delà de cette proportion de lignes modifiées, on reconstruit tout l'index
+FULL_REBUILD_RATIO = 0.2
+
+SORT_KEYS = {
+    'name': lambda row: (row['product_name'] or '').lower(),
+    'price_asc': lambda row: row['price_dbc'] or 0,
+    'price_desc': lambda row: -(row['price_dbc'] or 0),
+    'quantity_desc': lambda row: -(row['quantity'] or 0),
+}
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Découpe un texte en tokens alphanumériques minuscules"""
+    if not text:
+        return []
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def _clean_value(value) -> Optional[str]:
+    """Normalise une valeur de facette ('nan', '' et None sont ignorés)"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value or value.lower() in ('nan', 'none'):
+        return None
+    return value
+
+
+def _bitmap_from_ids(ids: Iterable[int], size: int) -> int:
+    """Construit un bitmap à partir d'identifiants de lignes en une seule passe"""
+    buffer = bytearray((size >> 3) + 1)
+    for row_id in ids:
+        buffer[row_id >> 3] |= 1 << (row_id & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+class CatalogIndex:
+    """Index bitmap des produits actifs, reconstruit incrémentalement après chaque import"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self.version = 0
+        self.last_import_date: Optional[str] = None
+        self.last_refresh: Optional[float] = None
+
+    def _reset(self):
+        self._rows: List[Optional[Dict]] = []
+        self._row_by_sku: Dict[str, int] = {}
+        self._free_rows: List[int] = []
+        self._facets: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+        self._tokens: Dict[str, int] = {}
+        self._sorted_tokens: Optional[List[str]] = None
+        self._active = 0
+        self._all = 0
+        self._orderings: Dict[str, List[int]] = {}
+
+    # ------------------------------------------------------------------
+    # Construction et mise à jour
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _make_row(product: Dict) -> Dict:
+        row = {
+            'sku': str(product['sku']),
+            'product_name': product.get('product_name'),
+            'quantity': product.get('quantity') or 0,
+            'price_dbc': product.get('price_dbc'),
+            'is_active': bool(product.get('is_active', (product.get('quantity') or 0) > 0)),
+            'model': _clean_value(product.get('model')),
+        }
+        for facet in FACETS:
+            row[facet] = _clean_value(product.get(facet))
+        # Produits importés avant l'extraction structurée: on parse le nom à la volée
+        if row['brand'] is None and row['model'] is None:
+            parsed = _parse_name(row['product_name'])
+            row['brand'] = parsed['brand']
+            row['model'] = parsed['model']
+            row['storage_gb'] = _clean_value(parsed['storage_gb'])
+        return row
+
+    def rebuild(self, products: Iterable[Dict]):
+        """Reconstruit entièrement l'index à partir d'une liste de produits"""
+        rows = [self._make_row(product) for product in products]
+
+        facet_ids: Dict[str, Dict[str, List[int]]] = {facet: {} for facet in FACETS}
+        token_ids: Dict[str, List[int]] = {}
+        active_ids = []
+
+        for row_id, row in enumerate(rows):
+            for facet in FACETS:
+                value = row[facet]
+                if value is not None:
+                    facet_ids[facet].setdefault(value, []).append(row_id)
+            for token in set(tokenize(row['product_name'])):
+                token_ids.setdefault(token, []).append(row_id)
+            if row['is_active']:
+                active_ids.append(row_id)
+
+        size = len(rows)
+        with self._lock:
+            self._reset()
+            self._rows = rows
+            self._row_by_sku = {row['sku']: row_id for row_id, row in enumerate(rows)}
+            self._facets = {
+                facet: {value: _bitmap_from_ids(ids, size) for value, ids in values.items()}
+                for facet, values in facet_ids.items()
+            }
+            self._tokens = {token: _bitmap_from_ids(ids, size) for token, ids in token_ids.items()}
+            self._active = _bitmap_from_ids(active_ids, size)
+            self._all = (1 << size) - 1
+            self.version += 1
+
+    def _index_row(self, row_id: int, row: Dict):
+        bit = 1 << row_id
+        for facet in FACETS:
+            value = row[facet]
+            if value is not None:
+                values = self._facets[facet]
+                values[value] = values.get(value, 0) | bit
+        for token in set(tokenize(row['product_name'])):
+            if token not in self._tokens:
+                self._sorted_tokens = None
+            self._tokens[token] = self._tokens.get(token, 0) | bit
+        if row['is_active']:
+            self._active |= bit
+        self._all |= bit
+
+    def _unindex_row(self, row_id: int, row: Dict):
+        mask = ~(1 << row_id)
+        for facet in FACETS:
+            value = row[facet]
+            if value is not None:
+                values = self._facets[facet]
+                remaining = values[value] & mask
+                if remaining:
+                    values[value] = remaining
+                else:
+                    del values[value]
+        for token in set(tokenize(row['product_name'])):
+            remaining = self._tokens[token] & mask
+            if remaining:
+                self._tokens[token] = remaining
+            else:
+                del self._tokens[token]
+                self._sorted_tokens = None
+        self._active &= mask
+        self._all &= mask
+
+    def apply_changes(self, upserted: Iterable[Dict] = (), removed_skus: Iterable[str] = ()) -> int:
+        """
+        Applique un delta d'import à l'index sans le reconstruire
+
+        Seules les lignes dont un champ indexé a changé sont retirées puis
+        réinsérées dans les bitmaps. Retourne le nombre de lignes modifiées.
+        """
+        changed = 0
+        with self._lock:
+            for product in upserted:
+                row = self._make_row(product)
+                row_id = self._row_by_sku.get(row['sku'])
+                if row_id is not None:
+                    previous = self._rows[row_id]
+                    if previous == row:
+                        continue
+                    self._unindex_row(row_id, previous)
+                elif self._free_rows:
+                    row_id = self._free_rows.pop()
+                else:
+                    row_id = len(self._rows)
+                    self._rows.append(None)
+                self._rows[row_id] = row
+                self._row_by_sku[row['sku']] = row_id
+                self._index_row(row_id, row)
+                changed += 1
+
+            for sku in removed_skus:
+                row_id = self._row_by_sku.pop(str(sku), None)
+                if row_id is None:
+                    continue
+                self._unindex_row(row_id, self._rows[row_id])
+                self._rows[row_id] = None
+                self._free_rows.append(row_id)
+                changed += 1
+
+            if changed:
+                self._orderings = {}
+                self.version += 1
+        return changed
+
+    def sync(self, products: List[Dict]) -> int:
+        """
+        Aligne l'index sur l'état complet de la table products
+
+        Calcule le delta par rapport au contenu courant et l'applique
+        incrémentalement, sauf si une grande partie du catalogue a changé.
+        """
+        incoming_skus = {str(product['sku']) for product in products}
+        with self._lock:
+            removed = [sku for sku in self._row_by_sku if sku not in incoming_skus]
+            upserted = [
+                product for product in products
+                if self._row_by_sku.get(str(product['sku'])) is None
+                or self._rows[self._row_by_sku[str(product['sku'])]] != self._make_row(product)
+            ]
+            if not self._row_by_sku or len(upserted) + len(removed) > len(products) * FULL_REBUILD_RATIO:
+                self.rebuild(products)
+                return len(products)
+            return self.apply_changes(upserted, removed)
+
+    # ------------------------------------------------------------------
+    # Requêtes
+    # ------------------------------------------------------------------
+
+    def get(self, sku: str) -> Optional[Dict]:
+        """Produit indexé par SKU (actif ou non), None si absent"""
+        with self._lock:
+            row_id = self._row_by_sku.get(str(sku))
+            row = self._rows[row_id] if row_id is not None else None
+            return dict(row) if row is not None else None
+
+    def __len__(self):
+        return len(self._row_by_sku)
+
+    def _prefix_bitmap(self, prefix: str) -> int:
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self._tokens)
+        tokens = self._sorted_tokens
+        bitmap = 0
+        position = bisect.bisect_left(tokens, prefix)
+        while position < len(tokens) and tokens[position].startswith(prefix):
+            bitmap |= self._tokens[tokens[position]]
+            position += 1
+        return bitmap
+
+    def _ordering(self, sort: str) -> List[int]:
+        ordering = self._orderings.get(sort)
+        if ordering is None:
+            key = SORT_KEYS[sort]
+            ordering = sorted(
+                (row_id for row_id, row in enumerate(self._rows) if row is not None),
+                key=lambda row_id: key(self._rows[row_id])
+            )
+            self._orderings[sort] = ordering
+        return ordering
+
+    def warm(self):
+        """Précalcule les ordres de tri pour que la première requête reste rapide"""
+        with self._lock:
+            for sort in SORT_KEYS:
+                self._ordering(sort)
+
+    def search(self, query: Optional[str] = None, filters: Optional[Dict[str, List[str]]] = None,
+               page: int = 1, page_size: int = 50, sort: str = 'name',
+               in_stock_only: bool = True) -> Dict:
+        """
+        Recherche filtrée, paginée et à facettes
+
+        Args:
+            query: texte libre, chaque token est recherché par préfixe
+            filters: valeurs retenues par facette (OU dans une facette, ET entre facettes)
+            page, page_size: pagination (page commence à 1)
+            sort: clé de tri ('name', 'price_asc', 'price_desc', 'quantity_desc')
+            in_stock_only: ne retourner que les produits actifs
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Tri inconnu: {sort}")
+        filters = {facet: values for facet, values in (filters or {}).items() if values}
+        unknown = [facet for facet in filters if facet not in FACETS]
+        if unknown:
+            raise ValueError(f"Facettes inconnues: {unknown}")
+
+        started = time.perf_counter()
+        with self._lock:
+            base = self._active if in_stock_only else self._all
+            for token in tokenize(query):
+                base &= self._prefix_bitmap(token)
+                if not base:
+                    break
+
+            facet_masks = {}
+            for facet, values in filters.items():
+                mask = 0
+                for value in values:
+                    mask |= self._facets[facet].get(value, 0)
+                facet_masks[facet] = mask
+
+            result = base
+            for mask in facet_masks.values():
+                result &= mask
+
+            # Comptage disjonctif: chaque facette ignore son propre filtre
+            facet_counts = {}
+            for facet in FACETS:
+                scope = base
+                for other, mask in facet_masks.items():
+                    if other != facet:
+                        scope &= mask
+                counts = {}
+                if scope:
+                    for value, bitmap in self._facets[facet].items():
+                        count = (bitmap & scope).bit_count()
+                        if count:
+                            counts[value] = count
+                facet_counts[facet] = dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+
+            total = result.bit_count()
+            offset = max(page - 1, 0) * page_size
+            items = []
+            if result and offset < total:
+                bits = result.to_bytes((len(self._rows) >> 3) + 1, 'little')
+                skipped = 0
+                for row_id in self._ordering(sort):
+                    if not (bits[row_id >> 3] >> (row_id & 7)) & 1:
+                        continue
+                    if skipped < offset:
+                        skipped += 1
+                        continue
+                    items.append(dict(self._rows[row_id]))
+                    if len(items) >= page_size:
+                        break
+
+        return {
+            'items': items,
+            'total': total,
+            'page': page,
+            'page_size': page_size,
+            'facets': facet_counts,
+            'took_ms': round((time.perf_counter() - started) * 1000, 3),
+            'index_version': self.version,
+        }
+
+
+def fetch_products(supabase, page_size: int = 1000) -> List[Dict]:
+    """Récupère tous les produits de la table products (pagination Supabase)"""
+    products = []
+    offset = 0
+    while True:
+        with supabase_call('products', 'select'):
+            result = supabase.table('products').select(PRODUCT_COLUMNS).range(offset, offset + page_size - 1).execute()
+        if not result.data:
+            break
+        products.extend(result.data)
+        if len(result.data) < page_size:
+            break
+        offset += page_size
+    return products
+
+
+def fetch_latest_import_date(supabase) -> Optional[str]:
+    """Date du dernier import catalogue enregistré dans catalog_imports"""
+    with supabase_call('catalog_imports', 'select'):
+        result = supabase.table('catalog_imports').select('import_date').order('import_date', desc=True).limit(1).execute()
+    return result.data[0]['import_date'] if result.data else None
+
+
+def refresh_index(index: CatalogIndex, supabase, force: bool = False) -> bool:
+    """
+    Synchronise l'index si un nouvel import a été enregistré depuis le dernier chargement
+
+    Retourne True si l'index a été (re)synchronisé.
+    """
+    latest_import = fetch_latest_import_date(supabase)
+    if not force and index.last_refresh is not None and latest_import == index.last_import_date:
+        return False
+
+    changed = index.sync(fetch_products(supabase))
+    index.warm()
+    index.last_import_date = latest_import
+    index.last_refresh = time.time()
+    print(f"🔎 Index catalogue synchronisé: {len(index)} produits ({changed} lignes modifiées)")
+    return True
+
+
+async def run_refresh_loop(index: CatalogIndex, supabase_factory, interval: float):
+    """Tâche de fond: surveille catalog_imports et resynchronise l'index après chaque import"""
+    supabase = None
+    while True:
+        try:
+            if supabase is None:
+                supabase = await asyncio.to_thread(supabase_factory)
+            await asyncio.to_thread(refresh_index, index, supabase)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Rafraîchissement de l'index catalogue impossible: {e}")
+        await asyncio.sleep(interval)
+
+
+# Instance singleton
+catalog_index = CatalogIndex()
@@ -0,0 +1,220 @@
+"""
+Health checks des dépendances avec résultats mis en cache
+
+Une tâche de fond sonde Supabase et l'API Foxway à intervalle régulier et
+conserve le résultat et les dernières latences de chaque sonde. /health sert
+le dernier résultat sans appel réseau (pas de charge supplémentaire sur la
+base quel que soit le rythme de scraping), /health/deep ajoute les
+percentiles de latence et l'âge du dernier import catalogue.
+"""
+
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional
+
+from prometheus_client import Gauge, Histogram
+
+from .catalog_index import fetch_latest_import_date
+
+HEALTH_STATUS = Gauge('dbc_health_status', "1 si toutes les dépendances critiques répondent, 0 sinon")
+HEALTH_CHECK_UP = Gauge('dbc_health_check_up', 'Résultat de la dernière sonde (1 = ok)', ['check'])
+HEALTH_CHECK_DURATION = Histogram(
+    'dbc_health_check_duration_seconds',
+    'Latence des sondes de health check',
+    ['check'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+
+# Nombre de latences conservées par sonde pour les percentiles
+LATENCY_WINDOW = 120
+
+
+def _percentile(sorted_values, percentile: float) -> Optional[float]:
+    """Percentile par rang le plus proche sur une liste triée"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(percentile / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+def _to_ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat() if timestamp else None
+
+
+class ProbeState:
+    """Dernier résultat et historique de latence d'une sonde"""
+
+    def __init__(self, name: str, critical: bool):
+        self.name = name
+        self.critical = critical
+        self.status = "unknown"
+        self.last_checked: Optional[float] = None
+        self.last_success: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.consecutive_failures = 0
+        self.details: Dict = {}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, ok: bool, latency: float, details: Optional[Dict] = None, error: Optional[str] = None):
+        self.last_checked = time.time()
+        self.latencies.append(latency)
+        if ok:
+            self.status = "ok"
+            self.last_success = self.last_checked
+            self.last_error = None
+            self.consecutive_failures = 0
+            self.details = details or {}
+        else:
+            self.status = "down"
+            self.last_error = error
+            self.consecutive_failures += 1
+        HEALTH_CHECK_UP.labels(check=self.name).set(1 if ok else 0)
+        HEALTH_CHECK_DURATION.labels(check=self.name).observe(latency)
+
+    def latency_summary(self) -> Dict:
+        values = sorted(self.latencies)
+        return {
+            'samples': len(values),
+            'last_ms': _to_ms(self.latencies[-1]) if self.latencies else None,
+            'p50_ms': _to_ms(_percentile(values, 50)),
+            'p95_ms': _to_ms(_percentile(values, 95)),
+            'p99_ms': _to_ms(_percentile(values, 99)),
+            'max_ms': _to_ms(values[-1]) if values else None,
+        }
+
+
+class HealthProber:
+    """Exécute les sondes enregistrées et garde leurs résultats en mémoire"""
+
+    def __init__(self, timeout: float = 5.0):
+        self.timeout = timeout
+        self._probes: Dict[str, Callable[[], Awaitable[Optional[Dict]]]] = {}
+        self._states: Dict[str, ProbeState] = {}
+        self.started_at = time.time()
+
+    def register(self, name: str, probe: Callable[[], Awaitable[Optional[Dict]]], critical: bool = True):
+        """Enregistre une sonde async; une exception ou un timeout la marque en échec"""
+        self._probes[name] = probe
+        self._states[name] = ProbeState(name, critical)
+
+    async def _run(self, name: str):
+        state = self._states[name]
+        started = time.perf_counter()
+        try:
+            details = await asyncio.wait_for(self._probes[name](), timeout=self.timeout)
+            state.record(True, time.perf_counter() - started, details)
+        except asyncio.TimeoutError:
+            state.record(False, time.perf_counter() - started, error=f"timeout après {self.timeout}s")
+        except Exception as e:
+            state.record(False, time.perf_counter() - started, error=str(e))
+
+    async def probe_all(self):
+        """Lance toutes les sondes en parallèle et met à jour le statut global"""
+        await asyncio.gather(*(self._run(name) for name in self._probes))
+        HEALTH_STATUS.set(1 if self.status in ("healthy", "degraded") else 0)
+
+    @property
+    def status(self) -> str:
+        """healthy, degraded (dépendance non critique en échec), unhealthy ou starting"""
+        states = self._states.values()
+        if any(state.status == "unknown" for state in states):
+            return "starting"
+        if any(state.critical and state.status != "ok" for state in states):
+            return "unhealthy"
+        if any(state.status != "ok" for state in states):
+            return "degraded"
+        return "healthy"
+
+    def snapshot(self) -> Dict:
+        """Résultat en cache pour /health (aucun appel réseau)"""
+        checked = [state.last_checked for state in self._states.values() if state.last_checked]
+        return {
+            'status': self.status,
+            'checked_at': _isoformat(min(checked)) if checked else None,
+            'services': {
+                'api': 'operational',
+                **{name: 'operational' if state.status == 'ok' else state.status for name, state in self._states.items()},
+            },
+        }
+
+    def deep(self) -> Dict:
+        """Détail par sonde: latences (percentiles), dernière erreur, échecs consécutifs"""
+        now = time.time()
+        checks = {}
+        for name, state in self._states.items():
+            checks[name] = {
+                'status': state.status,
+                'critical': state.critical,
+                'last_checked': _isoformat(state.last_checked),
+                'last_success': _isoformat(state.last_success),
+                'age_seconds': round(now - state.last_checked, 1) if state.last_checked else None,
+                'consecutive_failures': state.consecutive_failures,
+                'last_error': state.last_error,
+                'latency': state.latency_summary(),
+                'details': state.details,
+            }
+        return {
+            'status': self.status,
+            'uptime_seconds': round(now - self.started_at, 1),
+            'checks': checks,
+        }
+
+
+def _import_age_seconds(import_date: Optional[str]) -> Optional[float]:
+    if not import_date:
+        return None
+    imported_at = datetime.fromisoformat(import_date.replace('Z', '+00:00'))
+    # catalog_processor enregistre une date locale sans fuseau
+    now = datetime.now(imported_at.tzinfo) if imported_at.tzinfo else datetime.now()
+    return round((now - imported_at).total_seconds(), 1)
+
+
+def build_prober(supabase_factory, foxway_client, timeout: float = 5.0) -> HealthProber:
+    """
+    Sondes de l'API: base de données (critique) et Foxway (non critique)
+
+    La sonde base lit la date du dernier import catalogue: une requête
+    indexée qui vérifie la connexion et donne l'âge du dernier import.
+    """
+    prober = HealthProber(timeout=timeout)
+    clients = {}
+
+    async def probe_database():
+        def query():
+            if 'supabase' not in clients:
+                clients['supabase'] = supabase_factory()
+            return fetch_latest_import_date(clients['supabase'])
+
+        try:
+            last_import = await asyncio.to_thread(query)
+        except Exception:
+            # Client recréé au prochain passage (clé ou URL corrigée entre-temps)
+            clients.pop('supabase', None)
+            raise
+        return {
+            'last_import_date': last_import,
+            'last_import_age_seconds': _import_age_seconds(last_import),
+        }
+
+    async def probe_foxway():
+        return await foxway_client.ping(timeout=timeout)
+
+    prober.register('database', probe_database, critical=True)
+    prober.register('foxway_integration', probe_foxway, critical=False)
+    return prober
+
+
+async def run_health_loop(prober: HealthProber, interval: float):
+    """Boucle de fond lancée au démarrage de l'API"""
+    while True:
+        try:
+            await prober.probe_all()
+        except Exception as e:
+            print(f"⚠️ Health check: erreur inattendue: {e}")
+        await asyncio.sleep(interval)
@@ -1,18 +1,33 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import os
 import sys
-from dotenv import load_dotenv
 
-# Charger les variables d'environnement
-load_dotenv()
+# Ajouter le dossier scripts au path (une seule fois: main peut être rechargé par uvicorn --reload)
+SCRIPTS_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.append(SCRIPTS_DIR)
 
-# Ajouter le dossier scripts au path
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+# Charger les variables d'environnement avant les modules qui les lisent à l'import
+from env_loader import load_env
+load_env()
 
-# Import des routes
-from .routes import catalog, orders, auth, products, foxway
+# Import des routes (pandas, numpy et supabase sont importés au premier usage)
+from .routes import catalog, orders, products, foxway
+from .metrics import metrics_middleware, router as metrics_router
+from .catalog_index import catalog_index, run_refresh_loop
+from .health import build_prober, run_health_loop
+from .workers import shutdown_process_pool
+from catalog_processor import init_supabase
+from integrations.foxway.client import foxway_client
+
+# Sondes de dépendances (résultats en cache servis par /health)
+health_prober = build_prober(
+    init_supabase, foxway_client, timeout=float(os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", "5"))
+)
 
 # Lifespan pour gérer le démarrage/arrêt
 @asynccontextmanager
@@ -20,8 +35,16 @@ async def lifespan(app: FastAPI):
     # Démarrage
     print("🚀 Starting DBC B2B API...")
     # Initialiser les connexions (DB, Redis, etc.)
+    # Index catalogue: chargé au démarrage puis resynchronisé après chaque import
+    refresh_interval = float(os.getenv("CATALOG_INDEX_REFRESH_SECONDS", "60"))
+    index_task = asyncio.create_task(run_refresh_loop(catalog_index, init_supabase, refresh_interval))
+    health_interval = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "30"))
+    health_task = asyncio.create_task(run_health_loop(health_prober, health_interval))
     yield
     # Arrêt
+    index_task.cancel()
+    health_task.cancel()
+    shutdown_process_pool()
     print("👋 Shutting down DBC B2B API...")
 
 # Créer l'application FastAPI
@@ -42,12 +65,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métriques Prometheus (latence / statut par route)
+app.middleware("http")(metrics_middleware)
+
 # Routes principales
-app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(catalog.router, prefix="/api/catalog", tags=["Catalog"])
-app.include_router(products.router, prefix="/api/products", tags=["Products"])
 app.include_router(orders.router, prefix="/api/orders", tags=["Orders"])
-app.include_router(foxway.router, prefix="/api/foxway", tags=["Foxway Integration"])
+app.include_router(products.router, prefix="/api/products", tags=["Products"])
+app.include_router(foxway.router, prefix="/api/foxway", tags=["Foxway"])
+app.include_router(metrics_router)
 
 @app.get("/")
 async def root():
@@ -60,11 +86,20 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {
-        "status": "healthy",
-        "services": {
-            "api": "operational",
-            "database": "operational",  # TODO: Vérifier vraiment
-            "foxway_integration": "planned"  # Future
-        }
-    } 
\ No newline at end of file
+    # Résultat de la dernière sonde: aucun appel à la base ici
+    snapshot = health_prober.snapshot()
+    status_code = 503 if snapshot["status"] == "unhealthy" else 200
+    return JSONResponse(snapshot, status_code=status_code)
+
+@app.get("/health/deep")
+async def deep_health_check():
+    report = health_prober.deep()
+    database = report["checks"]["database"]
+    report["catalog"] = {
+        "last_import_date": database["details"].get("last_import_date"),
+        "last_import_age_seconds": database["details"].get("last_import_age_seconds"),
+        "index_version": catalog_index.version,
+        "index_last_refresh": catalog_index.last_refresh,
+    }
+    status_code = 503 if report["status"] == "unhealthy" else 200
+    return JSONResponse(report, status_code=status_code) 
\ No newline at end of file
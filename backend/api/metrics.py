@@ -0,0 +1,54 @@
+"""
+Métriques HTTP de l'API et endpoint /metrics (scrapé par le job dbc-backend)
+
+Les routes sont étiquetées par leur modèle (/api/catalog/search, pas l'URL
+complète) pour garder une cardinalité bornée. Les métriques du pipeline
+catalogue (pipeline_metrics) partagent le registre par défaut et sont
+exposées sur le même endpoint.
+"""
+
+import time
+from fastapi import APIRouter, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+HTTP_REQUEST_DURATION = Histogram(
+    'dbc_http_request_duration_seconds',
+    'Latence des requêtes HTTP par route',
+    ['method', 'route'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10)
+)
+HTTP_REQUESTS = Counter(
+    'dbc_http_requests_total',
+    'Requêtes HTTP par route et code de statut',
+    ['method', 'route', 'status']
+)
+
+# Routes non mesurées (scraping Prometheus lui-même)
+EXCLUDED_ROUTES = {'/metrics'}
+
+router = APIRouter()
+
+
+def _route_template(request: Request) -> str:
+    route = request.scope.get('route')
+    return getattr(route, 'path', None) or 'unmatched'
+
+
+async def metrics_middleware(request: Request, call_next):
+    """Middleware HTTP: durée et nombre de requêtes par route / statut"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = _route_template(request)
+        if route not in EXCLUDED_ROUTES:
+            HTTP_REQUEST_DURATION.labels(method=request.method, route=route).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method=request.method, route=route, status=str(status)).inc()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,3 @@
+"""
+Routes de l'API FastAPI DBC B2B
+"""
@@ -0,0 +1,507 @@
+"""
+Routes catalogue: recherche à facettes servie depuis l'index en mémoire,
+import d'un fichier fournisseur (tâche de fond dans le pool de process),
+aperçu d'import relu page par page puis appliqué
+"""
+
+import asyncio
+import contextlib
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
+from pydantic import BaseModel
+
+from catalog_processor import STAGE_CONFLICT_CODE, commit_staged_import, init_supabase, run_catalog_import
+from pipeline_metrics import call_with_metrics, replay_metrics, supabase_call
+
+from ..catalog_index import catalog_index, refresh_index
+from ..auth import require_admin
+from ..workers import run_in_process, save_upload
+
+router = APIRouter()
+
+CATALOG_UPLOAD_DIR = os.getenv("CATALOG_UPLOAD_DIR", "catalog_uploads")
+# Imports conservés en mémoire pour GET /import/{job_id}
+MAX_IMPORT_JOBS = 50
+STAGE_CHANGES = ('new', 'restocked', 'price_changed', 'deactivated', 'updated')
+STAGE_SORTS = ('sku', 'new_price_dbc', 'price_delta', 'price_delta_pct', 'abs_price_delta_pct')
+
+_import_jobs: Dict[str, Dict[str, Any]] = {}
+_background_tasks = set()
+
+
+class CatalogItem(BaseModel):
+    sku: str
+    product_name: Optional[str] = None
+    appearance: Optional[str] = None
+    functionality: Optional[str] = None
+    color: Optional[str] = None
+    boxed: Optional[str] = None
+    additional_info: Optional[str] = None
+    brand: Optional[str] = None
+    model: Optional[str] = None
+    storage_gb: Optional[str] = None
+    vat_type: Optional[str] = None
+    quantity: int = 0
+    price_dbc: Optional[float] = None
+    is_active: bool = True
+
+
+class ImportJob(BaseModel):
+    job_id: str
+    status: str
+    filename: str
+    force: bool
+    preview: bool = False
+    atomic: bool = False
+    created_at: str
+    finished_at: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+class ImportHistoryItem(BaseModel):
+    id: Any
+    import_date: str
+    total_imported: int = 0
+    total_updated: int = 0
+    new_skus_count: int = 0
+    restocked_skus_count: int = 0
+    missing_skus_count: int = 0
+
+
+class ImportHistoryPage(BaseModel):
+    items: List[ImportHistoryItem]
+    total: int
+    page: int
+    page_size: int
+
+
+class ImportSku(BaseModel):
+    sku_id: int
+    sku: str
+    kind: str
+
+
+class ImportSkusPage(BaseModel):
+    items: List[ImportSku]
+    next_after: Optional[int] = None
+
+
+class StagedImport(BaseModel):
+    id: str
+    status: str
+    created_at: str
+    base_import_id: Optional[str] = None
+    import_id: Optional[str] = None
+    committed_at: Optional[str] = None
+    change_counts: Optional[Dict[str, int]] = None
+    stats: Dict[str, Any] = {}
+
+
+class StagedImportItem(BaseModel):
+    sku: str
+    change: str
+    product_name: Optional[str] = None
+    old_quantity: Optional[int] = None
+    new_quantity: Optional[int] = None
+    old_price_dbc: Optional[float] = None
+    new_price_dbc: Optional[float] = None
+    price_delta: Optional[float] = None
+    price_delta_pct: Optional[float] = None
+
+
+class StagedImportItemsPage(BaseModel):
+    items: List[StagedImportItem]
+    total: int
+    page: int
+    page_size: int
+
+
+class CatalogSearchResponse(BaseModel):
+    items: List[CatalogItem]
+    total: int
+    page: int
+    page_size: int
+    facets: Dict[str, Dict[str, int]]
+    took_ms: float
+    index_version: int
+
+
+@router.get("/search", response_model=CatalogSearchResponse)
+async def search_catalog(
+    q: Optional[str] = None,
+    appearance: List[str] = Query(default=[]),
+    functionality: List[str] = Query(default=[]),
+    color: List[str] = Query(default=[]),
+    boxed: List[str] = Query(default=[]),
+    additional_info: List[str] = Query(default=[]),
+    brand: List[str] = Query(default=[]),
+    storage_gb: List[str] = Query(default=[]),
+    vat_type: List[str] = Query(default=[]),
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=50, ge=1, le=500),
+    sort: str = 'name',
+    in_stock_only: bool = True,
+):
+    """Recherche filtrée et paginée avec comptage des facettes"""
+    filters = {
+        'appearance': appearance,
+        'functionality': functionality,
+        'color': color,
+        'boxed': boxed,
+        'additional_info': additional_info,
+        'brand': brand,
+        'storage_gb': storage_gb,
+        'vat_type': vat_type,
+    }
+    try:
+        return catalog_index.search(q, filters, page=page, page_size=page_size,
+                                    sort=sort, in_stock_only=in_stock_only)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/facet-stats")
+async def get_facet_stats():
+    """Statistiques de facettes précalculées lors du dernier import"""
+    def fetch():
+        supabase = init_supabase()
+        with supabase_call('catalog_imports', 'select'):
+            return supabase.table('catalog_imports').select('import_date, facet_stats') \
+                .not_.is_('facet_stats', 'null').order('import_date', desc=True).limit(1).execute()
+
+    try:
+        result = await asyncio.to_thread(fetch)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Statistiques indisponibles: {e}")
+
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Aucun import avec statistiques")
+    return result.data[0]
+
+
+@router.post("/index/refresh", dependencies=[Depends(require_admin)])
+async def refresh_catalog_index():
+    """Force la resynchronisation de l'index après un import"""
+    try:
+        supabase = await asyncio.to_thread(init_supabase)
+        await asyncio.to_thread(refresh_index, catalog_index, supabase, True)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Rafraîchissement impossible: {e}")
+
+    return {
+        "products": len(catalog_index),
+        "version": catalog_index.version,
+        "last_import_date": catalog_index.last_import_date,
+    }
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+async def _run_import_job(job: Dict[str, Any], path: str):
+    job['status'] = 'running'
+    try:
+        outcome = await run_in_process(
+            call_with_metrics, run_catalog_import, path,
+            force=job['force'], preview=job['preview'], atomic=job['atomic']
+        )
+        # Métriques de l'import enregistrées dans le worker: rejouées pour /metrics
+        replay_metrics(outcome['metrics'])
+        if outcome['error'] is None:
+            job.update(status='succeeded', result=outcome['result'])
+        else:
+            job.update(status='failed', error=outcome['error'])
+    except Exception as e:
+        job.update(status='failed', error=str(e))
+    finally:
+        job['finished_at'] = _now()
+        with contextlib.suppress(OSError):
+            await asyncio.to_thread(os.remove, path)
+
+    # Index resynchronisé dès la fin de l'import, sans attendre la boucle de rafraîchissement
+    if job['status'] == 'succeeded' and not job['result'].get('duplicate_of') and not job['preview']:
+        await _refresh_index_after_import()
+
+
+async def _refresh_index_after_import():
+    try:
+        supabase = await asyncio.to_thread(init_supabase)
+        await asyncio.to_thread(refresh_index, catalog_index, supabase, True)
+    except Exception as e:
+        print(f"⚠️ Rafraîchissement de l'index après import impossible: {e}")
+
+
+def _import_running() -> bool:
+    return any(job['status'] in ('pending', 'running') for job in _import_jobs.values())
+
+
+@router.post("/import", response_model=ImportJob, status_code=202, dependencies=[Depends(require_admin)])
+async def import_catalog(
+    catalog: UploadFile = File(...),
+    force: bool = Form(default=False),
+    preview: bool = Form(default=False),
+    atomic: bool = Form(default=False),
+):
+    """
+    Importe un catalogue fournisseur (même traitement que catalog_processor.py)
+
+    Le fichier est écrit sur disque par blocs, puis l'import s'exécute en tâche
+    de fond dans le pool de process: la réponse est immédiate (202), l'état
+    se suit via GET /import/{job_id}. Un seul import à la fois.
+
+    preview: le diff est seulement stocké (result.stage_id), à relire via
+    GET /imports/staged/{stage_id}/items puis appliquer via POST .../commit.
+    atomic: products n'est modifié qu'en une transaction, après chargement
+    complet; relancé avec le même fichier, un chargement déjà fait est repris.
+    """
+    if _import_running():
+        raise HTTPException(status_code=409, detail="Un import catalogue est déjà en cours")
+
+    # Job réservé avant le premier await: un second envoi concurrent reçoit 409
+    # au lieu de lancer un import (et une reprise de checkpoint) en parallèle
+    job_id = str(uuid.uuid4())
+    job = {
+        'job_id': job_id,
+        'status': 'pending',
+        'filename': os.path.basename(catalog.filename or ''),
+        'force': force,
+        'preview': preview,
+        'atomic': atomic,
+        'created_at': _now(),
+    }
+    _import_jobs[job_id] = job
+    try:
+        path = await save_upload(catalog, os.path.join(CATALOG_UPLOAD_DIR, job_id))
+    except BaseException:
+        _import_jobs.pop(job_id, None)
+        raise
+    job['filename'] = os.path.basename(path)
+    while len(_import_jobs) > MAX_IMPORT_JOBS:
+        del _import_jobs[next(iter(_import_jobs))]
+
+    task = asyncio.create_task(_run_import_job(job, path))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return job
+
+
+@router.get("/import/{job_id}", response_model=ImportJob)
+async def get_import_job(job_id: str):
+    """État d'un import lancé par POST /import"""
+    job = _import_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import introuvable")
+    return job
+
+
+@router.get("/imports", response_model=ImportHistoryPage)
+async def list_imports(
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=20, ge=1, le=100),
+):
+    """Historique des imports (catalog_imports), du plus récent au plus ancien"""
+    offset = (page - 1) * page_size
+
+    def fetch():
+        supabase = init_supabase()
+        with supabase_call('catalog_imports', 'select'):
+            return supabase.table('catalog_imports').select(
+                'id, import_date, total_imported, total_updated, import_summary', count='exact'
+            ).order('import_date', desc=True).range(offset, offset + page_size - 1).execute()
+
+    try:
+        result = await asyncio.to_thread(fetch)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Historique indisponible: {e}")
+
+    items = []
+    for row in result.data:
+        summary = row.get('import_summary') or {}
+        items.append({
+            'id': row['id'],
+            'import_date': row['import_date'],
+            'total_imported': row.get('total_imported') or 0,
+            'total_updated': row.get('total_updated') or 0,
+            'new_skus_count': summary.get('new_skus_count', 0),
+            'restocked_skus_count': summary.get('restocked_skus_count', 0),
+            'missing_skus_count': summary.get('missing_skus_count', 0),
+        })
+    return {'items': items, 'total': result.count or 0, 'page': page, 'page_size': page_size}
+
+
+@router.get("/imports/{import_id}/skus", response_model=ImportSkusPage)
+async def list_import_skus(
+    import_id: str,
+    kind: List[str] = Query(default=[]),
+    after: int = Query(default=0, ge=0),
+    limit: int = Query(default=1000, ge=1, le=5000),
+):
+    """
+    SKU d'un import (catalog_import_items), pagination par clé
+
+    kind: new / restocked / missing (plusieurs possibles, tous par défaut).
+    Page suivante: after=next_after, absent à la dernière page.
+    """
+    try:
+        uuid.UUID(import_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Import introuvable")
+    invalid = sorted(set(kind) - {'new', 'restocked', 'missing'})
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Type de SKU invalide: {', '.join(invalid)}")
+
+    def fetch():
+        supabase = init_supabase()
+        with supabase_call('catalog_import_items', 'rpc'):
+            return supabase.rpc('get_catalog_import_skus', {
+                'p_import_id': import_id,
+                'p_kinds': kind or None,
+                'p_after_sku_id': after,
+                'p_limit': limit,
+            }).execute()
+
+    try:
+        result = await asyncio.to_thread(fetch)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"SKU de l'import indisponibles: {e}")
+
+    items = result.data or []
+    return {'items': items, 'next_after': items[-1]['sku_id'] if len(items) == limit else None}
+
+
+def _check_stage_id(stage_id: str):
+    try:
+        uuid.UUID(stage_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Aperçu d'import introuvable")
+
+
+@router.get("/imports/staged/{stage_id}", response_model=StagedImport)
+async def get_staged_import(stage_id: str):
+    """Aperçu d'import: statut et nombre de lignes par type de changement"""
+    _check_stage_id(stage_id)
+
+    def fetch():
+        supabase = init_supabase()
+        with supabase_call('catalog_import_stages', 'select'):
+            return supabase.table('catalog_import_stages').select(
+                'id, status, created_at, base_import_id, import_id, committed_at, change_counts, import_summary'
+            ).eq('id', stage_id).limit(1).execute()
+
+    try:
+        result = await asyncio.to_thread(fetch)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Aperçu indisponible: {e}")
+
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Aperçu d'import introuvable")
+    stage = result.data[0]
+    summary = stage.pop('import_summary') or {}
+    stage['stats'] = summary.get('stats') or {}
+    return stage
+
+
+@router.get("/imports/staged/{stage_id}/items", response_model=StagedImportItemsPage)
+async def list_staged_import_items(
+    stage_id: str,
+    change: List[str] = Query(default=[]),
+    sort: str = 'sku',
+    descending: bool = False,
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=100, ge=1, le=1000),
+):
+    """
+    Lignes d'un aperçu d'import, filtrées et triées, sans recalcul du diff
+
+    change: new / restocked / price_changed / deactivated / updated (plusieurs
+    possibles, tous par défaut). sort=abs_price_delta_pct&descending=true: plus
+    fortes variations de prix d'abord.
+    """
+    _check_stage_id(stage_id)
+    invalid = sorted(set(change) - set(STAGE_CHANGES))
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Type de changement invalide: {', '.join(invalid)}")
+    if sort not in STAGE_SORTS:
+        raise HTTPException(status_code=400, detail=f"Tri invalide: {sort} ({', '.join(STAGE_SORTS)})")
+
+    def fetch():
+        supabase = init_supabase()
+        with supabase_call('catalog_import_stages', 'select'):
+            stage = supabase.table('catalog_import_stages').select('change_counts') \
+                .eq('id', stage_id).limit(1).execute()
+        with supabase_call('catalog_import_stage_items', 'rpc'):
+            items = supabase.rpc('get_catalog_import_stage_items', {
+                'p_stage_id': stage_id,
+                'p_changes': change or None,
+                'p_sort': sort,
+                'p_descending': descending,
+                'p_offset': (page - 1) * page_size,
+                'p_limit': page_size,
+            }).execute()
+        return stage, items
+
+    try:
+        stage, items = await asyncio.to_thread(fetch)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Lignes de l'aperçu indisponibles: {e}")
+
+    if not stage.data:
+        raise HTTPException(status_code=404, detail="Aperçu d'import introuvable")
+    # Total lu dans les comptes calculés au chargement de l'aperçu
+    counts = stage.data[0].get('change_counts') or {}
+    total = sum(counts.get(name, 0) for name in (change or STAGE_CHANGES))
+    return {'items': items.data or [], 'total': total, 'page': page, 'page_size': page_size}
+
+
+@router.post("/imports/staged/{stage_id}/commit", dependencies=[Depends(require_admin)])
+async def commit_staged_catalog_import(stage_id: str):
+    """
+    Applique un aperçu d'import en une transaction (diff non recalculé)
+
+    409 si un import est en cours, si l'aperçu est périmé (autre import
+    appliqué depuis) ou déjà abandonné. Rejouable: un aperçu déjà appliqué
+    renvoie l'import créé.
+    """
+    _check_stage_id(stage_id)
+    if _import_running():
+        raise HTTPException(status_code=409, detail="Un import catalogue est déjà en cours")
+
+    try:
+        result = await asyncio.to_thread(commit_staged_import, stage_id)
+    except Exception as e:
+        if getattr(e, 'code', None) == STAGE_CONFLICT_CODE:
+            raise HTTPException(status_code=409, detail=getattr(e, 'message', None) or str(e))
+        raise HTTPException(status_code=503, detail=f"Application de l'aperçu impossible: {e}")
+
+    await _refresh_index_after_import()
+    return result
+
+
+@router.delete("/imports/staged/{stage_id}", status_code=204, dependencies=[Depends(require_admin)])
+async def discard_staged_import(stage_id: str):
+    """Abandonne un aperçu non appliqué (ses lignes sont supprimées)"""
+    _check_stage_id(stage_id)
+
+    def discard():
+        supabase = init_supabase()
+        with supabase_call('catalog_import_stages', 'update'):
+            result = supabase.table('catalog_import_stages').update({'status': 'discarded'}) \
+                .eq('id', stage_id).neq('status', 'committed').execute()
+        if result.data:
+            with supabase_call('catalog_import_stage_items', 'delete'):
+                supabase.table('catalog_import_stage_items').delete().eq('stage_id', stage_id).execute()
+        return result
+
+    try:
+        result = await asyncio.to_thread(discard)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Abandon de l'aperçu impossible: {e}")
+
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Aperçu d'import introuvable ou déjà appliqué")
@@ -0,0 +1,50 @@
+"""
+Routes Foxway: stock temps réel, suivi des commandes et webhooks
+"""
+
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+
+from integrations.foxway.client import foxway_client
+
+from ..auth import require_webhook_token
+
+router = APIRouter()
+
+
+class WebhookEvent(BaseModel):
+    event_type: str
+    payload: Dict[str, Any] = {}
+
+
+async def _call(coroutine):
+    try:
+        return await coroutine
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Erreur Foxway: {e}")
+
+
+@router.get("/catalog")
+async def get_foxway_catalog():
+    """Catalogue temps réel Foxway"""
+    return await _call(foxway_client.get_catalog())
+
+
+@router.get("/stock/{sku}")
+async def get_foxway_stock(sku: str):
+    """Stock Foxway d'un SKU"""
+    return await _call(foxway_client.check_stock(sku))
+
+
+@router.get("/orders/{order_id}")
+async def get_foxway_order(order_id: str):
+    """Statut d'une commande Foxway"""
+    return await _call(foxway_client.get_order_status(order_id))
+
+
+@router.post("/webhook", dependencies=[Depends(require_webhook_token)])
+async def foxway_webhook(event: WebhookEvent):
+    """Réception des webhooks Foxway (stock, statut de commande, prix)"""
+    return await _call(foxway_client.webhook_handler(event.event_type, event.payload))
@@ -0,0 +1,192 @@
+"""
+Routes commandes: tarification par lot des commandes fournisseur
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+
+from order_batch import process_order_batch, read_priced_lines
+
+from ..auth import require_admin
+from ..workers import run_in_process, save_upload
+
+router = APIRouter()
+
+# Chaque lot: <ORDER_BATCH_DIR>/<batch_id>/input (commandes reçues) et /output (fichiers tarifés)
+ORDER_BATCH_DIR = os.getenv("ORDER_BATCH_DIR", "order_batches")
+ORDER_BATCH_WORKERS = int(os.getenv("ORDER_BATCH_WORKERS", "0")) or None
+BATCH_RESULT_FILE = 'batch.json'
+
+
+class OrderResult(BaseModel):
+    order_file: str
+    kind: str
+    catalog_file: str
+    output_file: Optional[str] = None
+    mode: str
+    rows: int = 0
+    sku_exact: int = 0
+    characteristics: int = 0
+    not_found: int = 0
+    imei_duplicates: int = 0
+    total_supplier: float = 0.0
+    total_dbc: float = 0.0
+    cached: bool = False
+    success: bool
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+
+class OrderBatchResponse(BaseModel):
+    batch_id: str
+    totals: Dict[str, Any]
+    catalogs: Dict[str, Dict[str, int]]
+    summary_files: List[str]
+    orders: List[OrderResult]
+    total: int
+    page: int
+    page_size: int
+
+
+class PricedLinesPage(BaseModel):
+    columns: List[str]
+    items: List[Dict[str, Any]]
+    total: int
+    page: int
+    page_size: int
+
+
+def _batch_dir(batch_id: str, *parts: str) -> str:
+    # batch_id est un UUID généré ici: refuser tout autre format (chemins)
+    try:
+        uuid.UUID(batch_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Lot introuvable")
+    return os.path.join(ORDER_BATCH_DIR, batch_id, *parts)
+
+
+def _batch_page(batch_id: str, batch: Dict, page: int, page_size: int) -> Dict:
+    offset = (page - 1) * page_size
+    return {
+        'batch_id': batch_id,
+        'totals': batch['totals'],
+        'catalogs': {os.path.basename(catalog): counts for catalog, counts in batch['catalogs'].items()},
+        'summary_files': batch['summary_files'],
+        'orders': batch['orders'][offset:offset + page_size],
+        'total': len(batch['orders']),
+        'page': page,
+        'page_size': page_size,
+    }
+
+
+@router.post("/batch", response_model=OrderBatchResponse, dependencies=[Depends(require_admin)])
+async def price_order_batch(
+    files: List[UploadFile] = File(...),
+    mode: str = Form(...),
+    catalog_file: Optional[str] = Form(default=None),
+    page_size: int = Query(default=50, ge=1, le=500),
+):
+    """
+    Tarifie plusieurs commandes (groupées et IMEI) en une fois
+
+    Les commandes sont regroupées par catalogue DBC (date du nom de fichier),
+    chaque catalogue est chargé une fois et les commandes sont réparties sur
+    un pool de process. Retourne le récapitulatif consolidé et la première
+    page des commandes (suite via GET /batch/{batch_id}); les fichiers
+    tarifés se téléchargent via /batch/{batch_id}/files/{nom}.
+    """
+    if mode not in ('dbc', 'client'):
+        raise HTTPException(status_code=400, detail=f"Mode invalide '{mode}'. Utilisez 'dbc' ou 'client'.")
+    if not files:
+        raise HTTPException(status_code=400, detail="Aucun fichier de commande")
+
+    catalog_dir = os.getenv("DBC_CATALOG_DIR")
+    if catalog_file:
+        # Seuls les catalogues du dossier des catalogues sont acceptés
+        catalog_file = os.path.join(catalog_dir or '.', os.path.basename(catalog_file))
+        if not os.path.isfile(catalog_file):
+            raise HTTPException(status_code=404, detail=f"Catalogue introuvable: {os.path.basename(catalog_file)}")
+
+    batch_id = str(uuid.uuid4())
+    input_dir = os.path.join(ORDER_BATCH_DIR, batch_id, 'input')
+    output_dir = os.path.join(ORDER_BATCH_DIR, batch_id, 'output')
+    order_files = [await save_upload(upload, input_dir) for upload in files]
+
+    try:
+        # Planification, chargement des catalogues et tarification hors du process du serveur
+        # (le lot répartit ensuite ses commandes sur son propre pool)
+        batch = await run_in_process(
+            process_order_batch, order_files, mode, output_dir,
+            catalog_file=catalog_file, catalog_dir=catalog_dir,
+            workers=ORDER_BATCH_WORKERS, start_method='spawn'
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur traitement du lot: {e}")
+
+    for order in batch['orders']:
+        order['order_file'] = os.path.basename(order['order_file'])
+        order['catalog_file'] = os.path.basename(order['catalog_file'])
+        order['output_file'] = os.path.basename(order['output_file']) if order['output_file'] else None
+    batch['summary_files'] = [os.path.basename(path) for path in batch['summary_files']]
+    # Résultat conservé pour la pagination (GET /batch/{batch_id})
+    with open(os.path.join(ORDER_BATCH_DIR, batch_id, BATCH_RESULT_FILE), 'w', encoding='utf-8') as result_file:
+        json.dump(batch, result_file, ensure_ascii=False, default=str)
+    return _batch_page(batch_id, batch, 1, page_size)
+
+
+@router.get("/batch/{batch_id}", response_model=OrderBatchResponse)
+async def get_order_batch(
+    batch_id: str,
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=50, ge=1, le=500),
+):
+    """Récapitulatif d'un lot, commandes paginées"""
+    path = _batch_dir(batch_id, BATCH_RESULT_FILE)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Lot introuvable")
+    with open(path, encoding='utf-8') as result_file:
+        batch = json.load(result_file)
+    return _batch_page(batch_id, batch, page, page_size)
+
+
+@router.get("/batch/{batch_id}/files/{filename}/lines", response_model=PricedLinesPage)
+async def get_priced_lines(
+    batch_id: str,
+    filename: str,
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=100, ge=1, le=1000),
+):
+    """Lignes d'un fichier tarifé, paginées (lecture du fichier dans le pool de process)"""
+    path = _batch_dir(batch_id, 'output', os.path.basename(filename))
+    if not os.path.isfile(path) or not path.endswith(('.xlsx', '.csv')):
+        raise HTTPException(status_code=404, detail="Fichier introuvable")
+    return await run_in_process(read_priced_lines, path, page, page_size)
+
+
+@router.get("/batch/{batch_id}/files/{filename}")
+async def download_batch_file(batch_id: str, filename: str):
+    """Fichier tarifé ou récapitulatif d'un lot"""
+    path = _batch_dir(batch_id, 'output', os.path.basename(filename))
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Fichier introuvable")
+    return FileResponse(path, filename=os.path.basename(path))
+
+
+@router.delete("/batch/{batch_id}", dependencies=[Depends(require_admin)])
+async def delete_batch(batch_id: str):
+    """Supprime les fichiers d'un lot"""
+    path = _batch_dir(batch_id)
+    if not os.path.isdir(path):
+        raise HTTPException(status_code=404, detail="Lot introuvable")
+    await asyncio.to_thread(shutil.rmtree, path)
+    return {'batch_id': batch_id, 'deleted': True}
@@ -0,0 +1,47 @@
+"""
+Routes produits: liste paginée et fiche produit servies depuis l'index en mémoire
+"""
+
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+
+from ..catalog_index import catalog_index
+from .catalog import CatalogItem
+
+router = APIRouter()
+
+
+class ProductPage(BaseModel):
+    items: List[CatalogItem]
+    total: int
+    page: int
+    page_size: int
+
+
+@router.get("", response_model=ProductPage)
+async def list_products(
+    q: Optional[str] = None,
+    brand: List[str] = Query(default=[]),
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=50, ge=1, le=500),
+    sort: str = 'name',
+    in_stock_only: bool = True,
+):
+    """Produits paginés (sans comptage des facettes, voir /api/catalog/search)"""
+    try:
+        result = catalog_index.search(q, {'brand': brand}, page=page, page_size=page_size,
+                                      sort=sort, in_stock_only=in_stock_only)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {key: result[key] for key in ('items', 'total', 'page', 'page_size')}
+
+
+@router.get("/{sku}", response_model=CatalogItem)
+async def get_product(sku: str):
+    """Fiche d'un produit par SKU"""
+    product = catalog_index.get(sku)
+    if product is None:
+        raise HTTPException(status_code=404, detail=f"Produit introuvable: {sku}")
+    return product
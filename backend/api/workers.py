@@ -0,0 +1,67 @@
+"""
+Pool de process partagé pour le travail pandas des routes (parsing, tarification)
+
+Le parsing Excel et la tarification tiennent le GIL pendant des secondes: un
+thread (asyncio.to_thread) laisserait la boucle d'événements répondre, mais
+chaque requête concurrente serait ralentie d'autant. Le travail est donc
+exécuté dans des process séparés; la boucle ne fait qu'attendre le résultat.
+
+Les fonctions exécutées doivent être importables par les workers (modules de
+backend/scripts): le pool est en spawn, sys.path du serveur est transmis.
+"""
+
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile
+
+# 0: un worker par cœur
+API_PROCESS_WORKERS = int(os.getenv("API_PROCESS_WORKERS", "0")) or (os.cpu_count() or 1)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Pool créé au premier usage (spawn: pas de fork depuis le serveur multi-threadé)"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=API_PROCESS_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+async def run_in_process(func, *args, **kwargs):
+    """Exécute func(*args, **kwargs) dans le pool sans bloquer la boucle d'événements"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_process_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def save_upload(upload: UploadFile, directory: str, extensions=('.xlsx', '.xls')) -> str:
+    """
+    Écrit un fichier reçu sur disque par blocs (jamais entier en mémoire)
+
+    Le nom d'origine est conservé (il porte la date des commandes / catalogues).
+    """
+    name = os.path.basename(upload.filename or '')
+    if not name.lower().endswith(extensions):
+        raise HTTPException(status_code=400, detail=f"Fichier Excel attendu: {upload.filename}")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    if os.path.exists(path):
+        raise HTTPException(status_code=400, detail=f"Fichier en double: {name}")
+    with open(path, 'wb') as target:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            # Écriture disque hors de la boucle d'événements
+            await asyncio.to_thread(target.write, chunk)
+    return path
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Test de charge de l'API: latence des lectures pendant un traitement lourd
+
+Démarre l'API (uvicorn) dans un sous-process, puis mesure débit et latence
+(p50 / p95 / max) de requêtes concurrentes sur /health, /api/products et
+/api/foxway/stock:
+- baseline: API au repos
+- during_work: pendant un traitement pandas lancé via l'API
+    - orders (défaut): lot de commandes POST /api/orders/batch sur un
+      catalogue DBC synthétique (aucune dépendance externe)
+    - import: import catalogue POST /api/catalog/import (Supabase configuré
+      dans l'environnement requis)
+
+Le travail pandas s'exécute dans le pool de process de l'API: la latence des
+lectures doit rester du même ordre que la baseline.
+
+Usage:
+    python backend/benchmarks/api_load_test.py [--rows 50000] [--concurrency 20] [--workload orders|import]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCHMARKS_DIR, '..')
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from run_benchmarks import DATA_DIR, prepare_files  # noqa: E402
+
+READ_ENDPOINTS = ('/health', '/api/products?page_size=20', '/api/foxway/stock/BENCH-SKU')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_ready(client, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            # /health répond 503 sans Supabase: seule la réponse compte ici
+            await client.get('/health')
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("L'API n'a pas démarré")
+
+
+async def read_load(client, concurrency, stop):
+    """Requêtes de lecture en boucle jusqu'à stop; retourne les latences (s) et les erreurs"""
+    latencies, errors = [], 0
+
+    async def worker(index):
+        nonlocal errors
+        request = 0
+        while not stop.is_set():
+            path = READ_ENDPOINTS[(index + request) % len(READ_ENDPOINTS)]
+            request += 1
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code >= 500 and path != '/health':
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    return latencies, errors
+
+
+def summarize(latencies, errors, seconds):
+    ordered = sorted(latencies) or [0.0]
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': round(seconds, 2),
+        'rps': round(len(latencies) / seconds, 1) if seconds else 0.0,
+        'p50_ms': round(statistics.median(ordered) * 1000, 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2),
+    }
+
+
+async def measure(client, concurrency, seconds=None, work=None):
+    """Charge de lecture pendant `seconds` ou jusqu'à la fin de `work` (coroutine)"""
+    stop = asyncio.Event()
+    started = time.perf_counter()
+    load = asyncio.create_task(read_load(client, concurrency, stop))
+    work_result = None
+    if work is not None:
+        work_result = await work
+    else:
+        await asyncio.sleep(seconds)
+    stop.set()
+    latencies, errors = await load
+    return summarize(latencies, errors, time.perf_counter() - started), work_result
+
+
+async def order_batch_work(client, paths):
+    """Lot de commandes (groupée + IMEI) tarifé sur le catalogue DBC"""
+    started = time.perf_counter()
+    with open(paths['order'], 'rb') as order, open(paths['imei_order'], 'rb') as imei_order:
+        response = await client.post(
+            '/api/orders/batch',
+            files=[('files', (os.path.basename(paths['order']), order)),
+                   ('files', (os.path.basename(paths['imei_order']), imei_order))],
+            data={'mode': 'dbc', 'catalog_file': os.path.basename(paths['dbc_catalog'])},
+            timeout=None,
+        )
+    body = response.json()
+    if response.status_code == 200:
+        await client.delete(f"/api/orders/batch/{body['batch_id']}")
+    return {
+        'status_code': response.status_code,
+        'seconds': round(time.perf_counter() - started, 2),
+        'totals': body.get('totals', body),
+    }
+
+
+async def catalog_import_work(client, paths):
+    """Import de la liste de prix, suivi du job jusqu'à sa fin"""
+    started = time.perf_counter()
+    with open(paths['pricelist'], 'rb') as pricelist:
+        response = await client.post(
+            '/api/catalog/import',
+            files={'catalog': (os.path.basename(paths['pricelist']), pricelist)},
+            data={'force': 'true'},
+            timeout=None,
+        )
+    if response.status_code != 202:
+        return {'status_code': response.status_code, 'detail': response.json()}
+    job = response.json()
+    while job['status'] in ('pending', 'running'):
+        await asyncio.sleep(0.5)
+        job = (await client.get(f"/api/catalog/import/{job['job_id']}")).json()
+    return {
+        'status': job['status'],
+        'seconds': round(time.perf_counter() - started, 2),
+        'error': job.get('error'),
+        'stats': (job.get('result') or {}).get('stats'),
+    }
+
+
+async def run_load_test(base_url, paths, concurrency, baseline_seconds, workload):
+    limits = httpx.Limits(max_connections=concurrency + 4)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        await wait_until_ready(client)
+        baseline, _ = await measure(client, concurrency, seconds=baseline_seconds)
+        work = order_batch_work(client, paths) if workload == 'orders' else catalog_import_work(client, paths)
+        during, work_result = await measure(client, concurrency, work=work)
+    return {'baseline': baseline, 'during_work': during, 'work': work_result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de l'API pendant un traitement lourd")
+    parser.add_argument('--rows', type=int, default=50000, help="Taille du catalogue synthétique")
+    parser.add_argument('--order-rows', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--baseline-seconds', type=float, default=5.0)
+    parser.add_argument('--workload', choices=('orders', 'import'), default='orders')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    paths = prepare_files(args.rows, args.order_rows, args.seed)
+    port = free_port()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        env = dict(
+            os.environ,
+            DBC_CATALOG_DIR=DATA_DIR,
+            ORDER_BATCH_DIR=os.path.join(work_dir, 'batches'),
+            CATALOG_UPLOAD_DIR=os.path.join(work_dir, 'uploads'),
+            ORDER_CACHE_DIR='',
+            IMEI_REGISTRY_PATH='',
+            FOXWAY_MOCK='true',
+            DBC_LOG_FORMAT='json',
+        )
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'api.main:app', '--port', str(port), '--log-level', 'warning'],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            result = asyncio.run(run_load_test(
+                f"http://127.0.0.1:{port}", paths, args.concurrency, args.baseline_seconds, args.workload
+            ))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    result.update({
+        'workload': args.workload,
+        'rows': args.rows,
+        'order_rows': args.order_rows,
+        'concurrency': args.concurrency,
+        'cpu_count': os.cpu_count(),
+    })
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark de montée en charge du traitement par lot (catalog_batch)
+
+Génère N fichiers Foxway synthétiques qui se recouvrent partiellement
+(10% de SKU communs entre deux fichiers consécutifs), puis mesure
+process_catalog_batch (parsing + marges en parallèle + fusion) pour chaque
+nombre de workers. Le catalogue fusionné doit être identique quel que soit
+le nombre de workers.
+
+Usage: python backend/benchmarks/catalog_batch_scaling.py [fichiers] [lignes_par_fichier] [workers...]
+Exemple: python backend/benchmarks/catalog_batch_scaling.py 8 20000 1 2 4 8
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCHMARKS_DIR, '.data')
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..', 'scripts'))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import synthetic_data  # noqa: E402
+from catalog_batch import process_catalog_batch, resolve_catalog_files  # noqa: E402
+
+OVERLAP_RATIO = 0.1
+
+
+def prepare_files(file_count, rows, seed=42):
+    """Fichiers pricelist_batch_<n>_<rows>/part_XX.xlsx (réutilisés s'ils existent)"""
+    directory = os.path.join(DATA_DIR, f"pricelist_batch_{file_count}_{rows}")
+    os.makedirs(directory, exist_ok=True)
+    step = int(rows * (1 - OVERLAP_RATIO))
+    for index in range(file_count):
+        path = os.path.join(directory, f"part_{index:02d}.xlsx")
+        if not os.path.exists(path):
+            print(f"🛠️ Génération de {path}...", file=sys.stderr)
+            synthetic_data.generate_pricelist(rows, seed + index, sku_offset=index * step).to_excel(path, index=False)
+    return directory
+
+
+def catalog_digest(products):
+    """Empreinte du catalogue fusionné (ordre et contenu) pour vérifier le déterminisme"""
+    digest = hashlib.sha256()
+    for product in products:
+        digest.update(f"{product['sku']}|{product['quantity']}|{product['price_dbc']}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    worker_counts = [int(value) for value in sys.argv[3:]] or sorted({1, 2, 4, os.cpu_count() or 1})
+
+    files = resolve_catalog_files(prepare_files(file_count, rows))
+    runs = []
+    digests = set()
+    for workers in worker_counts:
+        # Les logs par fichier des workers ne sont pas mesurés
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            started = time.perf_counter()
+            products, stats = process_catalog_batch(files, workers=workers)
+            elapsed = time.perf_counter() - started
+        digests.add(catalog_digest(products))
+        runs.append({
+            'workers': workers,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(file_count * rows / elapsed, 1),
+            'products': len(products),
+            'sku_conflicts': stats['sku_conflicts'],
+        })
+        print(f"⏱️ {workers} workers: {elapsed:.2f}s", file=sys.stderr)
+
+    baseline = runs[0]['seconds']
+    for run in runs:
+        run['speedup'] = round(baseline / run['seconds'], 2)
+
+    if len(digests) != 1:
+        print(f"❌ Catalogue fusionné différent selon le nombre de workers: {sorted(digests)}")
+        sys.exit(1)
+
+    print(json.dumps({
+        'files': file_count,
+        'rows_per_file': rows,
+        'cpu_count': os.cpu_count(),
+        'catalog_digest': digests.pop(),
+        'runs': runs,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
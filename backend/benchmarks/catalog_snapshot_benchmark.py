@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Chargement du catalogue actif: instantané mmap (catalog_snapshot.py) contre
+pagination Supabase et JSON
+
+Contre le Supabase en mémoire (fake_supabase, latence --latency-ms), sur
+--rows lignes de liste de prix synthétique importées par run_catalog_import:
+1. export de l'instantané (pagination des produits actifs + écriture)
+2. chargement par un consommateur:
+   - pagination Supabase (fetch_active_products)
+   - json.load d'une copie JSON du catalogue
+   - instantané: ouverture, puis recherche vectorisée de 10k SKU, puis
+     décodage complet en dicts
+3. --workers process ouvrent l'instantané et lisent toutes les colonnes:
+   mémoire copiée par process (Private_Dirty de /proc/self/smaps_rollup,
+   Linux) contre la taille du fichier: les pages lues restent celles du
+   cache de pages (Private_Clean tant qu'un seul process les a mappées)
+4. vérification: instantané identique aux produits actifs de la table
+5. aller-retour écriture / relecture sur des catalogues de ROUND_TRIP_ROWS
+   lignes (petits catalogues et tailles où l'en-tête JSON s'allonge au-delà
+   de l'alignement): chaque SKU retrouvé par get(), colonnes identiques
+
+Usage:
+    python backend/benchmarks/catalog_snapshot_benchmark.py [--rows 50000] [--latency-ms 5] [--workers 4]
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..', 'scripts'))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import synthetic_data  # noqa: E402
+from fake_supabase import InMemorySupabase  # noqa: E402
+from import_checkpoint_recovery import pricelist_file  # noqa: E402
+
+# Tailles de l'aller-retour: 0 à 9 lignes et tailles où un en-tête mal dimensionné débordait
+ROUND_TRIP_ROWS = tuple(range(10)) + (46_910, 54_690, 70_860, 71_896, 72_957, 76_856)
+
+
+def private_kb():
+    """Mémoire privée modifiée du process (Ko), None hors Linux"""
+    try:
+        with open('/proc/self/smaps_rollup') as smaps:
+            return sum(int(line.split()[1]) for line in smaps if line.startswith('Private_Dirty'))
+    except OSError:
+        return None
+
+
+def worker(path, queue):
+    """Ouvre l'instantané et lit toutes les colonnes (un worker de l'API, par exemple)"""
+    import numpy as np
+    from catalog_snapshot import CatalogSnapshot
+    before = private_kb()
+    started = time.perf_counter()
+    snapshot = CatalogSnapshot(path)
+    checksum = sum(int(snapshot._arrays[name].view(np.uint8).sum(dtype=np.uint64)) for name in snapshot.header['columns'])
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    after = private_kb()
+    snapshot.close()
+    queue.put({
+        'ms': round(elapsed_ms, 2),
+        'private_dirty_kb_added': None if before is None else after - before,
+        'checksum': checksum,
+    })
+
+
+def round_trip(rows, work_dir):
+    """Écrit puis relit un instantané de `rows` produits: True si tout est relu à l'identique"""
+    from catalog_snapshot import CatalogSnapshot, SNAPSHOT_COLUMNS, write_snapshot
+    pricelist = synthetic_data.generate_pricelist(rows, seed=rows)
+    products = [
+        {'sku': sku, 'quantity': int(quantity), 'price': float(price), 'campaign_price': None,
+         'price_dbc': round(float(price) * 1.11, 2), 'storage_gb': None, 'product_name': name,
+         'appearance': appearance, 'color': color, 'vat_type': vat_type}
+        for sku, quantity, price, name, appearance, color, vat_type in zip(
+            pricelist['SKU'], pricelist['Quantity'], pricelist['Price'], pricelist['Product Name'],
+            pricelist['Appearance'], pricelist['Color'], pricelist['VAT Type'])
+    ]
+    path = os.path.join(work_dir, f"round_trip_{rows}.bin")
+    write_snapshot(products, path)
+    expected = sorted(({column: product.get(column) for column in SNAPSHOT_COLUMNS} for product in products),
+                      key=lambda product: product['sku'])
+    with CatalogSnapshot(path) as snapshot:
+        _, found = snapshot.lookup([product['sku'] for product in products])
+        identical = bool(found.all()) and snapshot.records() == expected
+    os.remove(path)
+    return identical
+
+
+def timed(function):
+    started = time.perf_counter()
+    value = function()
+    return round((time.perf_counter() - started) * 1000, 1), value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chargement du catalogue actif: instantané mmap")
+    parser.add_argument('--rows', type=int, default=50_000)
+    parser.add_argument('--latency-ms', type=float, default=5.0)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    from catalog_processor import run_catalog_import
+    from catalog_snapshot import (CatalogSnapshot, SNAPSHOT_COLUMNS, export_catalog_snapshot,
+                                  fetch_active_products)
+
+    # Table products réelle: import du catalogue synthétique (l'instantané est écrit après l'import)
+    work_dir = tempfile.mkdtemp(prefix='catalog_snapshot_')
+    path = os.path.join(work_dir, 'catalog_snapshot.bin')
+    json_path = os.path.join(work_dir, 'catalog.json')
+    try:
+        os.environ['CATALOG_CHECKPOINT_DIR'] = ''
+        os.environ['CATALOG_SNAPSHOT_PATH'] = path
+        supabase = InMemorySupabase(latency_ms=args.latency_ms)
+        supabase.seed('products', synthetic_data.existing_state(args.rows, args.seed))
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            run_catalog_import(pricelist_file(args.rows, args.seed), supabase=supabase)
+        active = {product['sku']: product for product in supabase.tables['products'] if product.get('is_active')}
+
+        export_ms, exported = timed(lambda: export_catalog_snapshot(supabase, path=path, import_id=1))
+        with open(json_path, 'w', encoding='utf-8') as json_file:
+            json.dump(list(active.values()), json_file)
+
+        paging_ms, _ = timed(lambda: fetch_active_products(supabase))
+
+        def load_json():
+            with open(json_path, encoding='utf-8') as json_file:
+                return json.load(json_file)
+        json_ms, _ = timed(load_json)
+
+        open_ms, snapshot = timed(lambda: CatalogSnapshot(path))
+        wanted = list(active)[::max(1, len(active) // 10_000)][:10_000]
+        lookup_ms, (positions, found) = timed(lambda: snapshot.lookup(wanted))
+        records_ms, records = timed(snapshot.records)
+        identical = bool(found.all()) and len(records) == len(active) and all(
+            record == {column: active[record['sku']].get(column) for column in SNAPSHOT_COLUMNS} for record in records
+        )
+        snapshot.close()
+
+        queue = multiprocessing.get_context('spawn').Queue()
+        processes = [multiprocessing.get_context('spawn').Process(target=worker, args=(path, queue))
+                     for _ in range(args.workers)]
+        for process in processes:
+            process.start()
+        workers = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        round_trips = {rows: round_trip(rows, work_dir) for rows in ROUND_TRIP_ROWS}
+
+        report = {
+            'rows': args.rows,
+            'active_rows': len(active),
+            'latency_ms': args.latency_ms,
+            'snapshot_kb': round(exported['bytes'] / 1024, 1),
+            'json_kb': round(os.path.getsize(json_path) / 1024, 1),
+            'export_ms': export_ms,
+            'load_ms': {
+                'supabase_paging': paging_ms,
+                'json': json_ms,
+                'snapshot_open': open_ms,
+                'snapshot_lookup_10k': lookup_ms,
+                'snapshot_records': records_ms,
+            },
+            'workers': workers,
+            'identical': identical,
+            'round_trip_failures': [rows for rows, ok in round_trips.items() if not ok],
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    ok = identical and not report['round_trip_failures'] and len({entry['checksum'] for entry in workers}) <= 1
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Colonnes catalogue à faible cardinalité: texte (une chaîne par cellule)
+contre catégories (catalog_schema.py)
+
+Sur une liste de prix synthétique de --rows lignes, pour le DataFrame tel
+que lu par pd.read_excel et pour le même DataFrame converti par categorize:
+1. mémoire des colonnes CATEGORICAL_COLUMNS (memory_usage(deep=True))
+2. conversion en valeurs des dicts produits: str() par ligne (ancien
+   process_catalog_file) contre column_values (str() par catégorie), durée
+   et mémoire allouée (tracemalloc)
+3. regroupements et filtres (meilleur de --repeat):
+   - value_counts de chaque colonne (data/catalogs/analyze_catalog_structure.py)
+   - filtre sur une valeur, filtre isin, groupby sur 3 colonnes
+   - compute_facet_stats (statistiques enregistrées avec chaque import)
+4. vérification: mêmes résultats pour les deux représentations
+
+Usage:
+    python backend/benchmarks/categorical_schema_benchmark.py [--rows 100000] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..', 'scripts'))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import pandas as pd  # noqa: E402
+
+import synthetic_data  # noqa: E402
+
+
+def best_ms(function, repeat):
+    """Meilleure durée (ms) et résultat du dernier appel"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return round(min(timings) * 1000, 2), result
+
+
+def allocated(function):
+    """(durée ms, Mo alloués et toujours référencés, résultat)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(elapsed * 1000, 1), round(current / 1024 / 1024, 2), result
+
+
+def row_strings(df, columns):
+    """Ancienne conversion: str() de chaque cellule, une chaîne par ligne"""
+    return {column: [str(value) for value in df[column]] for column in columns}
+
+
+def schema_strings(df, columns):
+    from catalog_schema import column_values
+    return {column: column_values(df, column, missing='nan') for column in columns}
+
+
+def operations(df):
+    """Regroupements et filtres courants (statistiques de structure, filtres du catalogue)"""
+    from catalog_schema import CATEGORICAL_COLUMNS
+    return {
+        'value_counts': lambda: {column: df[column].value_counts() for column in CATEGORICAL_COLUMNS},
+        'filter_equal': lambda: df[df['Appearance'] == 'Grade A'],
+        'filter_isin': lambda: df[df['Color'].isin(['Black', 'White', 'Blue']) & (df['Boxed'] == 'Yes')],
+        'groupby_3_columns': lambda: df.groupby(['Appearance', 'Functionality', 'VAT Type'], observed=True).size(),
+    }
+
+
+def comparable(name, result):
+    if name == 'value_counts':
+        return {column: {str(key): int(count) for key, count in counts.items() if count}
+                for column, counts in result.items()}
+    if name == 'groupby_3_columns':
+        return {tuple(str(part) for part in key): int(count) for key, count in result.items() if count}
+    return result['SKU'].tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Colonnes catalogue: texte contre catégories")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    from catalog_schema import CATEGORICAL_COLUMNS, categorize
+    from catalog_stats import compute_facet_stats
+    from product_name_parser import parse_product_names
+
+    text = synthetic_data.generate_pricelist(args.rows, args.seed)
+    parsed_names = parse_product_names(text['Product Name'])
+    categorize_ms, categorical = best_ms(lambda: categorize(text.copy()), 1)
+    columns = [column for column in CATEGORICAL_COLUMNS if column in text.columns]
+
+    text_bytes = text[columns].memory_usage(deep=True, index=False)
+    categorical_bytes = categorical[columns].memory_usage(deep=True, index=False)
+    report = {
+        'rows': args.rows,
+        'categorize_ms': categorize_ms,
+        'memory_mb': {
+            'text': round(text_bytes.sum() / 1024 / 1024, 2),
+            'categorical': round(categorical_bytes.sum() / 1024 / 1024, 2),
+            'per_column': {
+                column: {'distinct': int(text[column].nunique()), 'text_kb': round(text_bytes[column] / 1024, 1),
+                         'categorical_kb': round(categorical_bytes[column] / 1024, 1)}
+                for column in columns
+            },
+        },
+    }
+
+    row_ms, row_mb, row_values = allocated(lambda: row_strings(text, columns))
+    schema_ms, schema_mb, schema_values = allocated(lambda: schema_strings(categorical, columns))
+    del row_values
+    report['product_values'] = {
+        'per_row_str': {'ms': row_ms, 'allocated_mb': row_mb},
+        'column_values': {'ms': schema_ms, 'allocated_mb': schema_mb},
+        'identical': schema_strings(text, columns) == schema_values,
+    }
+
+    identical = report['product_values']['identical']
+    report['operations_ms'] = {}
+    text_operations, categorical_operations = operations(text), operations(categorical)
+    for name in text_operations:
+        text_ms, text_result = best_ms(text_operations[name], args.repeat)
+        categorical_ms, categorical_result = best_ms(categorical_operations[name], args.repeat)
+        same = comparable(name, text_result) == comparable(name, categorical_result)
+        identical = identical and same
+        report['operations_ms'][name] = {'text': text_ms, 'categorical': categorical_ms,
+                                         'speedup': round(text_ms / max(categorical_ms, 0.01), 1), 'identical': same}
+
+    text_ms, text_stats = best_ms(lambda: compute_facet_stats(text, parsed_names), args.repeat)
+    categorical_ms, categorical_stats = best_ms(lambda: compute_facet_stats(categorical, parsed_names), args.repeat)
+    same = json.dumps(text_stats) == json.dumps(categorical_stats)
+    identical = identical and same
+    report['operations_ms']['compute_facet_stats'] = {'text': text_ms, 'categorical': categorical_ms,
+                                                      'speedup': round(text_ms / max(categorical_ms, 0.01), 1),
+                                                      'identical': same}
+    report['identical'] = identical
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(0 if identical else 1)
+
+
+if __name__ == "__main__":
+    main()
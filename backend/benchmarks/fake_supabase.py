@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Remplaçant en mémoire du client Supabase (PostgREST) pour les benchmarks
+
+Implémente le sous-ensemble de l'API du query builder utilisé par
+catalog_processor et l'API (select / range / order / limit / eq / not_.is_,
+insert / upsert / update / delete, execute) et les fonctions SQL appelées
+via rpc() par l'import. Une latence fixe par requête
+(latency_ms) simule l'aller-retour réseau vers PostgREST, et chaque appel
+est compté par table / opération. fail_on injecte une erreur réseau sur le
+N-ième appel d'une opération (reprise après échec).
+
+Pour mesurer contre une vraie base, voir create_supabase('local') qui
+utilise init_supabase() avec une instance locale (`supabase start`).
+"""
+
+import os
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class _NotFilter:
+    def __init__(self, query):
+        self._query = query
+
+    def is_(self, column, value):
+        expected = None if value == 'null' else value
+        self._query._filters.append(lambda row: row.get(column) is not expected)
+        return self._query
+
+
+class _Query:
+    def __init__(self, client, table):
+        self._client = client
+        self._table = table
+        self._operation = None
+        self._payload = None
+        self._filters = []
+        self._equals = []
+        self._range = None
+        self._order = None
+        self._limit = None
+        self._on_conflict = None
+        self.not_ = _NotFilter(self)
+
+    # Lecture
+    def select(self, columns='*'):
+        self._operation = 'select'
+        self._columns = None if columns.strip() == '*' else [column.strip() for column in columns.split(',')]
+        return self
+
+    def range(self, start, end):
+        self._range = (start, end)
+        return self
+
+    def order(self, column, desc=False):
+        self._order = (column, desc)
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def eq(self, column, value):
+        self._equals.append((column, value))
+        self._filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def neq(self, column, value):
+        self._filters.append(lambda row: row.get(column) != value)
+        return self
+
+    # Écriture
+    def insert(self, data):
+        self._operation, self._payload = 'insert', data
+        return self
+
+    def upsert(self, data, on_conflict=None, ignore_duplicates=False):
+        self._operation, self._payload, self._on_conflict = 'upsert', data, on_conflict
+        return self
+
+    def update(self, values):
+        self._operation, self._payload = 'update', values
+        return self
+
+    def delete(self):
+        self._operation = 'delete'
+        return self
+
+    def execute(self):
+        return self._client._execute(self)
+
+
+class _Rpc:
+    def __init__(self, client, name, params):
+        self._client = client
+        self._name = name
+        self._params = params
+
+    def execute(self):
+        return self._client._rpc(self)
+
+
+class InMemorySupabase:
+    """
+    Tables en mémoire: listes de dicts, index par clé primaire si fournie
+
+    fail_on: {'table.operation': N}, le N-ième appel (compté depuis la
+    création) lève ConnectionError une fois, sans rien écrire
+    """
+
+    def __init__(self, latency_ms=0.0, primary_keys=None, fail_on=None):
+        self.latency = latency_ms / 1000
+        self.primary_keys = primary_keys or {'products': 'sku'}
+        self.fail_on = dict(fail_on or {})
+        self.tables = {}
+        self._indexes = {}
+        self._next_id = 1
+        self.calls = Counter()
+
+    def table(self, name):
+        self.tables.setdefault(name, [])
+        return _Query(self, name)
+
+    def rpc(self, name, params=None):
+        return _Rpc(self, name, params or {})
+
+    def seed(self, table, rows):
+        """Charge des lignes sans compter d'appel (état initial du benchmark)"""
+        self.tables[table] = [dict(row) for row in rows]
+        key = self.primary_keys.get(table)
+        if key:
+            self._indexes[table] = {row[key]: position for position, row in enumerate(self.tables[table])}
+
+    def _matching(self, query):
+        rows = self.tables[query._table]
+        key = self.primary_keys.get(query._table)
+        index = self._indexes.get(query._table)
+        # Filtre eq sur la clé primaire: accès direct, comme l'index PostgreSQL
+        if index is not None and len(query._equals) == 1 and len(query._filters) == 1 and query._equals[0][0] == key:
+            position = index.get(query._equals[0][1])
+            return [rows[position]] if position is not None else []
+        return [row for row in rows if all(check(row) for check in query._filters)] if query._filters else rows
+
+    def _execute(self, query):
+        if self.latency:
+            time.sleep(self.latency)
+        key = f"{query._table}.{query._operation}"
+        self.calls[key] += 1
+        if self.fail_on.get(key) == self.calls[key]:
+            del self.fail_on[key]
+            raise ConnectionError(f"Erreur réseau simulée ({key}, appel {self.calls[key]})")
+        handler = getattr(self, f"_{query._operation}")
+        return _Result(handler(query))
+
+    def _rpc(self, call):
+        if self.latency:
+            time.sleep(self.latency)
+        self.calls[f"rpc.{call._name}"] += 1
+        handler = getattr(self, f"_rpc_{call._name}", None)
+        if handler is None:
+            raise NotImplementedError(f"Fonction SQL non simulée: {call._name}")
+        return _Result(handler(call._params))
+
+    def _rpc_record_catalog_import_items(self, params):
+        # Le SKU tient lieu de products.sku_id
+        rows = [{'import_id': params['p_import_id'], 'sku': sku, 'kind': params['p_kind']} for sku in params['p_skus']]
+        self.tables.setdefault('catalog_import_items', []).extend(rows)
+        return len(rows)
+
+    def _rpc_stage_catalog_import_items(self, params):
+        # Même classement que la fonction SQL: 1 nouveau, 2 restocké, 3 prix modifié, 4 désactivé, 5 autre
+        products, index = self.tables.get('products', []), self._indexes.get('products', {})
+        items = self.tables.setdefault('catalog_import_stage_items', [])
+        staged = 0
+        for product in params.get('p_products') or []:
+            position = index.get(product['sku'])
+            current = products[position] if position is not None else None
+            quantity, old_quantity = product.get('quantity') or 0, (current or {}).get('quantity') or 0
+            if current is None:
+                change = 1 if quantity > 0 else 5
+            elif old_quantity == 0 and quantity > 0:
+                change = 2
+            elif old_quantity > 0 and quantity == 0:
+                change = 4
+            else:
+                change = 3 if current.get('price_dbc') != product.get('price_dbc') else 5
+            items.append({'stage_id': params['p_stage_id'], 'sku': product['sku'], 'change': change, 'product': product})
+            staged += 1
+        for sku in params.get('p_missing_skus') or []:
+            if sku in index:
+                items.append({'stage_id': params['p_stage_id'], 'sku': sku, 'change': 4, 'product': None})
+                staged += 1
+        return staged
+
+    def _rpc_seal_catalog_import_stage(self, params):
+        changes = Counter(item['change'] for item in self.tables['catalog_import_stage_items']
+                          if item['stage_id'] == params['p_stage_id'])
+        counts = {name: changes[code] for code, name in
+                  enumerate(('new', 'restocked', 'price_changed', 'deactivated', 'updated'), start=1)}
+        counts['total'] = sum(changes.values())
+        for stage in self.tables['catalog_import_stages']:
+            if stage['id'] == params['p_stage_id']:
+                stage.update(status='staged', change_counts=counts)
+        return counts
+
+    def _rpc_commit_catalog_import_stage(self, params):
+        # Une seule "transaction": produits écrits, absents désactivés, import enregistré
+        stage = next(stage for stage in self.tables['catalog_import_stages'] if stage['id'] == params['p_stage_id'])
+        items = [item for item in self.tables['catalog_import_stage_items'] if item['stage_id'] == stage['id']]
+        products = self.tables.setdefault('products', [])
+        index = self._indexes.setdefault('products', {})
+        upserted = deactivated = 0
+        for item in items:
+            position = index.get(item['sku'])
+            if item['product'] is not None:
+                if position is None:
+                    index[item['sku']] = len(products)
+                    products.append(dict(item['product']))
+                else:
+                    products[position].update(item['product'])
+                upserted += 1
+            elif position is not None:
+                products[position].update(quantity=0, is_active=False, row_hash=None)
+                deactivated += 1
+        import_id = self._next_id
+        self._next_id += 1
+        summary = stage.get('import_summary') or {}
+        self.tables.setdefault('catalog_imports', []).append({
+            'id': import_id, 'total_imported': upserted, 'import_summary': summary,
+            'total_updated': summary.get('new_skus_count', 0) + summary.get('restocked_skus_count', 0),
+            'facet_stats': stage.get('facet_stats'), 'content_hash': stage.get('content_hash'),
+        })
+        self.tables.setdefault('catalog_import_items', []).extend(
+            {'import_id': import_id, 'sku': item['sku'], 'kind': item['change'] if item['change'] in (1, 2) else 3}
+            for item in items if item['change'] in (1, 2) or item['product'] is None
+        )
+        stage.update(status='committed', import_id=import_id, upserted_count=upserted, deactivated_count=deactivated)
+        return [{'import_id': import_id, 'upserted': upserted, 'deactivated': deactivated}]
+
+    def _select(self, query):
+        rows = self._matching(query)
+        if query._order:
+            column, desc = query._order
+            rows = sorted(rows, key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        if query._range:
+            start, end = query._range
+            rows = rows[start:end + 1]
+        if query._limit is not None:
+            rows = rows[:query._limit]
+        if query._columns:
+            return [{column: row.get(column) for column in query._columns} for row in rows]
+        return [dict(row) for row in rows]
+
+    def _insert(self, query):
+        payload = query._payload if isinstance(query._payload, list) else [query._payload]
+        inserted = []
+        for row in payload:
+            row = dict(row)
+            row.setdefault('id', self._next_id)
+            self._next_id += 1
+            self.tables[query._table].append(row)
+            inserted.append(row)
+        return inserted
+
+    def _upsert(self, query):
+        table = query._table
+        key = query._on_conflict or self.primary_keys.get(table)
+        index = self._indexes.setdefault(table, {})
+        rows = self.tables[table]
+        for row in query._payload:
+            position = index.get(row[key])
+            if position is None:
+                index[row[key]] = len(rows)
+                rows.append(dict(row))
+            else:
+                rows[position].update(row)
+        return []
+
+    def _update(self, query):
+        updated = []
+        for row in self._matching(query):
+            row.update(query._payload)
+            updated.append(row)
+        return updated
+
+    def _delete(self, query):
+        removed = self._matching(query)
+        removed_ids = {id(row) for row in removed}
+        self.tables[query._table] = [row for row in self.tables[query._table] if id(row) not in removed_ids]
+        key = self.primary_keys.get(query._table)
+        if key:
+            self._indexes[query._table] = {row[key]: position for position, row in enumerate(self.tables[query._table])}
+        return removed
+
+
+def create_supabase(backend='memory', latency_ms=0.0):
+    """
+    Client utilisé par les benchmarks
+
+    - memory: InMemorySupabase (aucune dépendance réseau)
+    - local: vrai client Supabase via init_supabase(); refusé si l'URL ne
+      pointe pas sur localhost, le benchmark réécrivant la table products
+    """
+    if backend == 'memory':
+        return InMemorySupabase(latency_ms=latency_ms)
+    if backend == 'local':
+        from catalog_processor import init_supabase
+        from env_loader import load_env
+        load_env()
+        host = urlparse(os.getenv('NEXT_PUBLIC_SUPABASE_URL', '')).hostname
+        if host not in ('localhost', '127.0.0.1'):
+            raise Exception(f"Benchmark 'local' refusé: NEXT_PUBLIC_SUPABASE_URL doit pointer sur localhost (actuel: {host})")
+        return init_supabase()
+    raise ValueError(f"Backend Supabase inconnu: {backend}")
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la persistance groupée d'une commande IMEI (5k appareils)
+
+Sur un PostgreSQL local (schéma dédié imei_persistence_bench, supprimé à la fin):
+1. tables de sales_rollup_benchmark.py, historique de commandes
+   (--history-rows appareils), application de docs/supabase-functions.sql
+2. commande IMEI tarifée synthétique (--devices appareils, ~10% de SKU absents
+   des articles de la commande)
+3. ancienne écriture: un INSERT order_item_imei par appareil
+4. persist_imei_order (paramètres construits par imei_order_persistence.py):
+   premier passage, rejeu à l'identique, rejeu avec 10% de prix modifiés
+5. vérification: un IMEI par appareil, aucun doublon après rejeu,
+   check_sales_rollups() sans écart (commande completed)
+
+Nécessite psycopg2 (hors dépendances du backend) et une base locale
+jetable; un hôte distant est refusé.
+
+Usage:
+    python backend/benchmarks/imei_order_persistence_benchmark.py --dsn postgresql://postgres@localhost/postgres
+        [--devices 5000] [--history-rows 100000] [--keep]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..', 'scripts'))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import synthetic_data  # noqa: E402
+from imei_order_persistence import device_arrays  # noqa: E402
+from sales_rollup_benchmark import BASE_TABLES, SEED, SQL_FILE, connect, timed  # noqa: E402
+
+SCHEMA = 'imei_persistence_bench'
+
+PARAM_TYPES = {
+    'p_supplier_prices': 'numeric[]',
+    'p_dbc_prices': 'numeric[]',
+}
+
+
+def priced_order(devices):
+    """Commande IMEI comme en sortie de la tarification (prix fournisseur + prix DBC)"""
+    catalog = synthetic_data.to_dbc_catalog(synthetic_data.generate_pricelist(2000))
+    df = synthetic_data.generate_imei_order(catalog, devices)
+    df['Prix Fournisseur'] = df['Price']
+    df['Price'] = (df['Price'] * 1.08).round(2)
+    return df
+
+
+def persist_sql(params):
+    arguments = ', '.join(
+        f"{name} => %({name})s::{PARAM_TYPES.get(name, 'text[]')}" for name in params if name != 'p_order_id'
+    )
+    return f"SELECT * FROM persist_imei_order(p_order_id => %(p_order_id)s::uuid, {arguments})"
+
+
+def create_order(cursor, df, skip_ratio):
+    """Commande pending_payment, articles pour les SKU sauf ~skip_ratio d'entre eux"""
+    cursor.execute("""
+        INSERT INTO orders (name, status, user_id)
+        SELECT 'Commande IMEI bench', 'pending_payment', id FROM users ORDER BY email LIMIT 1
+        RETURNING id
+    """)
+    order_id = cursor.fetchone()[0]
+    per_sku = df.groupby('SKU').agg(name=('Product Name', 'first'), quantity=('SKU', 'size'), price=('Price', 'mean'))
+    kept = per_sku.iloc[int(len(per_sku) * skip_ratio):]
+    cursor.execute("""
+        INSERT INTO order_items (order_id, sku, product_name, quantity, unit_price, total_price)
+        SELECT %s, u.sku, u.name, u.quantity, u.price, u.price * u.quantity
+        FROM unnest(%s::text[], %s::text[], %s::int[], %s::numeric[]) AS u(sku, name, quantity, price)
+    """, (order_id, list(kept.index), list(kept['name']), [int(q) for q in kept['quantity']],
+          [round(float(p), 2) for p in kept['price']]))
+    return order_id
+
+
+def row_by_row(cursor, order_id, params):
+    """Ancienne écriture: un INSERT (et un aller-retour) par appareil"""
+    cursor.execute("SELECT sku, id FROM order_items WHERE order_id = %s", (order_id,))
+    items = dict(cursor.fetchall())
+    started = time.perf_counter()
+    written = 0
+    for sku, imei, name, supplier, dbc in zip(params['p_skus'], params['p_imeis'], params['p_product_names'],
+                                               params['p_supplier_prices'], params['p_dbc_prices']):
+        if sku in items:
+            cursor.execute("""
+                INSERT INTO order_item_imei (order_item_id, sku, imei, product_name, supplier_price, dbc_price)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, (items[sku], sku, imei, name, supplier, dbc))
+            written += 1
+    return round((time.perf_counter() - started) * 1000, 1), written
+
+
+def persist(cursor, order_id, params):
+    elapsed, rows = timed(cursor, persist_sql(params), {'p_order_id': order_id, **params})
+    counts = dict(zip(('created_items', 'inserted_devices', 'updated_devices', 'skipped_devices',
+                       'quantity_mismatches'), rows[0]))
+    counts['ms'] = round(elapsed, 1)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la persistance groupée d'une commande IMEI")
+    parser.add_argument('--dsn', default=os.getenv('BENCH_DATABASE_URL'),
+                        help="PostgreSQL local (défaut: BENCH_DATABASE_URL)")
+    parser.add_argument('--devices', type=int, default=5000)
+    parser.add_argument('--history-rows', type=int, default=100_000, help="Appareils déjà en base")
+    parser.add_argument('--keep', action='store_true', help=f"Conserver le schéma {SCHEMA}")
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("--dsn ou BENCH_DATABASE_URL requis")
+
+    df = priced_order(args.devices)
+    started = time.perf_counter()
+    params = device_arrays(df)
+    result = {
+        'devices': args.devices,
+        'history_rows': args.history_rows,
+        'build_params_ms': round((time.perf_counter() - started) * 1000, 1),
+        'payload_kb': round(len(json.dumps(params)) / 1024, 1),
+    }
+
+    connection = connect(args.dsn)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}; SET search_path TO {SCHEMA}")
+        cursor.execute(BASE_TABLES)
+        cursor.execute(SEED, {'orders': max(1, args.history_rows // 50)})
+        with open(SQL_FILE, encoding='utf-8') as sql_file:
+            cursor.execute(sql_file.read())
+        cursor.execute("ANALYZE")
+
+        legacy_order = create_order(cursor, df, skip_ratio=0)
+        result['row_by_row_ms'], result['row_by_row_devices'] = row_by_row(cursor, legacy_order, params)
+
+        order_id = create_order(cursor, df, skip_ratio=0.1)
+        result['first_run'] = persist(cursor, order_id, params)
+        result['rerun'] = persist(cursor, order_id, params)
+
+        cursor.execute("UPDATE orders SET status = 'completed' WHERE id = %s", (order_id,))
+        repriced = dict(params, p_dbc_prices=[
+            None if price is None else (round(price + 5, 2) if index % 10 == 0 else price)
+            for index, price in enumerate(params['p_dbc_prices'])
+        ])
+        result['repriced_rerun'] = persist(cursor, order_id, repriced)
+
+        cursor.execute("""
+            SELECT COUNT(*), COUNT(DISTINCT (oimei.order_item_id, oimei.imei))
+            FROM order_item_imei oimei INNER JOIN order_items oi ON oimei.order_item_id = oi.id
+            WHERE oi.order_id = %s
+        """, (order_id,))
+        stored, distinct = cursor.fetchone()
+        expected = len({(sku, imei) for sku, imei in zip(params['p_skus'], params['p_imeis'])})
+        result['stored_devices'] = stored
+        cursor.execute("SELECT COUNT(*) FROM check_sales_rollups()")
+        result['rollup_mismatches'] = cursor.fetchone()[0]
+        ok = (stored == distinct == expected and result['rerun']['inserted_devices'] == 0
+              and result['rerun']['updated_devices'] == 0 and result['rollup_mismatches'] == 0)
+    finally:
+        if not args.keep:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        connection.close()
+
+    result['speedup'] = round(result['row_by_row_ms'] / max(result['first_run']['ms'], 0.01), 1)
+    print(json.dumps(result, indent=2, ensure_ascii=False, default=str))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark du registre IMEI: inscription en masse et vérification d'une commande
+
+Remplit un registre SQLite temporaire (1M d'identifiants par défaut, répartis
+en commandes de 10k appareils), puis mesure la vérification d'une commande
+de 10k appareils dont la moitié est déjà connue (une seule requête), et son
+inscription.
+
+Usage: python backend/benchmarks/imei_registry_lookup.py [taille_registre] [appareils_par_commande]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from imei_registry import ImeiRegistry  # noqa: E402
+
+
+def imei(rng):
+    return str(rng.randrange(10**14, 10**15))
+
+
+def main():
+    registry_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    order_size = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    rng = random.Random(42)
+
+    with tempfile.TemporaryDirectory() as directory, ImeiRegistry(os.path.join(directory, 'registry.sqlite3')) as registry:
+        known = []
+        started = time.perf_counter()
+        for index in range(0, registry_size, order_size):
+            identifiers = [imei(rng) for _ in range(min(order_size, registry_size - index))]
+            registry.check_and_register(f"order-{index // order_size}.xlsx", identifiers)
+            known.extend(rng.sample(identifiers, min(len(identifiers), 50)))
+        fill_seconds = time.perf_counter() - started
+        print(f"⏱️ Registre rempli: {registry_size} identifiants en {fill_seconds:.1f}s", file=sys.stderr)
+
+        # Commande à vérifier: moitié d'IMEI connus, moitié nouveaux
+        order = rng.sample(known, min(len(known), order_size // 2))
+        order += [imei(rng) for _ in range(order_size - len(order))]
+        rng.shuffle(order)
+
+        plan = registry.connection.execute(
+            "EXPLAIN QUERY PLAN SELECT r.identifier FROM json_each(?) AS j "
+            "JOIN imei_registry AS r ON r.identifier = j.value", (json.dumps(order[:1]),)
+        ).fetchall()
+
+        started = time.perf_counter()
+        previous = registry.find_previous(order, exclude_order='new-order.xlsx')
+        check_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        registry.check_and_register('new-order.xlsx', order)
+        register_seconds = time.perf_counter() - started
+
+    print(json.dumps({
+        'registry_size': registry_size,
+        'order_size': order_size,
+        'fill_seconds': round(fill_seconds, 2),
+        'check_ms': round(check_seconds * 1000, 1),
+        'check_and_register_ms': round(register_seconds * 1000, 1),
+        'duplicates_found': len(previous),
+        'query_plan': [row[-1] for row in plan],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
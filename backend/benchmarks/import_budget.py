@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Budget de temps d'import des points d'entrée (CLI et API)
+
+Chaque module est importé dans un process neuf avec `python -X importtime`:
+- temps d'import cumulé du module (médiane sur --repeat exécutions)
+- démarrage à froid: durée totale du process `python -c "import <module>"`
+- modules lourds chargés à l'import (pandas, numpy, supabase): interdits,
+  ils ne doivent être importés que par les fonctions qui s'en servent
+
+Code de sortie 1 si un budget est dépassé ou si un module lourd est chargé.
+
+Usage:
+    python backend/benchmarks/import_budget.py [--repeat 5] [--scale 1.0] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SCRIPTS_DIR = os.path.join(BACKEND_DIR, 'scripts')
+
+# Module -> budget d'import cumulé (ms). L'API est bornée par FastAPI lui-même.
+ENTRY_POINTS = {
+    'catalog_processor': 250,
+    'order_batch': 250,
+    'process_imei_order': 200,
+    'apply_dbc_prices_to_order': 200,
+    'transform_catalog': 200,
+    'imei_registry': 100,
+    'analyze_catalog': 50,
+    'sales_rollups': 250,
+    'api.main': 1200,
+}
+HEAVY_MODULES = ('pandas', 'numpy', 'supabase')
+
+
+def parse_importtime(stderr, module):
+    """(temps cumulé du module en ms, modules de premier niveau importés)"""
+    cumulative, imported = None, set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # "import time:  self [us] | cumulative | imported package"
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        imported.add(name.split('.')[0])
+        if name == module:
+            cumulative = int(cumulative_us) / 1000
+    return cumulative, imported
+
+
+def measure(module):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [SCRIPTS_DIR, os.environ.get('PYTHONPATH')])))
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(f"Import de {module} impossible:\n{completed.stderr[-2000:]}")
+    cumulative, imported = parse_importtime(completed.stderr, module)
+    return cumulative, wall_ms, imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Budget de temps d'import des points d'entrée")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="Multiplie les budgets (machine plus lente que la référence)")
+    parser.add_argument('--json', action='store_true', help="Résultat JSON plutôt qu'un tableau")
+    args = parser.parse_args()
+
+    results, failed = {}, False
+    for module, budget in ENTRY_POINTS.items():
+        runs = [measure(module) for _ in range(args.repeat)]
+        import_ms = statistics.median(run[0] for run in runs)
+        cold_start_ms = statistics.median(run[1] for run in runs)
+        heavy = sorted(name for name in HEAVY_MODULES if name in runs[0][2])
+        ok = import_ms <= budget * args.scale and not heavy
+        failed = failed or not ok
+        results[module] = {
+            'import_ms': round(import_ms, 1),
+            'cold_start_ms': round(cold_start_ms, 1),
+            'budget_ms': round(budget * args.scale, 1),
+            'heavy_modules': heavy,
+            'ok': ok,
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print("point d'entrée".ljust(28) + f"{'import (ms)':>12}{'à froid (ms)':>14}{'budget':>9}  modules lourds")
+        for module, result in results.items():
+            status = '✅' if result['ok'] else '❌'
+            print(f"{status} {module:<26}{result['import_ms']:>12.1f}{result['cold_start_ms']:>14.1f}"
+                  f"{result['budget_ms']:>9.0f}  {', '.join(result['heavy_modules']) or '-'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Reprise d'un import catalogue interrompu (points de reprise, import_checkpoint.py)
+
+Contre le Supabase en mémoire (fake_supabase, latence --latency-ms), sur une
+liste de prix synthétique de --rows lignes, via run_catalog_import:
+1. référence: import complet sans incident
+2. pour chaque point d'échec (--fail-at, en % des appels d'upsert): erreur
+   réseau injectée, puis relance
+   - avec point de reprise: diff relu, seules les tranches restantes sont envoyées
+   - sans (CATALOG_CHECKPOINT_DIR vide): tout est refait, diff recalculé sur
+     une base à moitié écrite
+3. vérification: table products identique à la référence, comptes de
+   l'import (nouveaux, restockés) identiques
+
+Usage:
+    python backend/benchmarks/import_checkpoint_recovery.py [--rows 20000] [--latency-ms 5] [--fail-at 30 70]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCHMARKS_DIR, '.data')
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..', 'scripts'))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import synthetic_data  # noqa: E402
+from fake_supabase import InMemorySupabase  # noqa: E402
+
+
+def pricelist_file(rows, seed):
+    """Liste de prix Excel (même cache que run_benchmarks.py)"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"pricelist_{rows}_{seed}.xlsx")
+    if not os.path.exists(path):
+        synthetic_data.generate_pricelist(rows, seed).to_excel(path, index=False)
+    return path
+
+
+def snapshot(supabase):
+    return {row['sku']: (row['quantity'], row.get('is_active'), row.get('price_dbc')) for row in supabase.tables['products']}
+
+
+def timed_import(path, supabase):
+    """(secondes, résultat ou None si l'import a échoué)"""
+    from catalog_processor import run_catalog_import
+    started = time.perf_counter()
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            result = run_catalog_import(path, supabase=supabase)
+    except Exception:
+        result = None
+    return round(time.perf_counter() - started, 2), result
+
+
+def scenario(path, state, latency_ms, fail_on, checkpoint_dir):
+    os.environ['CATALOG_CHECKPOINT_DIR'] = checkpoint_dir
+    supabase = InMemorySupabase(latency_ms=latency_ms, fail_on=fail_on)
+    supabase.seed('products', state)
+    failed_seconds, failed = timed_import(path, supabase)
+    calls_before = sum(supabase.calls.values())
+    retry_seconds, result = timed_import(path, supabase)
+    return {
+        'failed_run_seconds': failed_seconds,
+        'failed_run_raised': failed is None,
+        'retry_seconds': retry_seconds,
+        'retry_supabase_calls': sum(supabase.calls.values()) - calls_before,
+        'result': result,
+        'products': snapshot(supabase),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reprise d'un import catalogue interrompu")
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--latency-ms', type=float, default=5.0)
+    parser.add_argument('--fail-at', type=float, nargs='+', default=[30.0, 70.0],
+                        help="Échec injecté à ce pourcentage des appels d'upsert")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    path = pricelist_file(args.rows, args.seed)
+    state = synthetic_data.existing_state(args.rows, args.seed)
+    work_dir = tempfile.mkdtemp(prefix='catalog_checkpoints_')
+    os.environ['CATALOG_CHECKPOINT_DIR'] = work_dir
+    os.environ['CATALOG_SNAPSHOT_PATH'] = ''
+
+    reference = InMemorySupabase(latency_ms=args.latency_ms)
+    reference.seed('products', state)
+    reference_seconds, reference_result = timed_import(path, reference)
+    expected = snapshot(reference)
+    upsert_calls = reference.calls['products.upsert']
+    counts = ('imported_count', 'new_skus_count', 'restocked_skus_count')
+
+    report = {
+        'rows': args.rows,
+        'latency_ms': args.latency_ms,
+        'reference_seconds': reference_seconds,
+        'reference_supabase_calls': sum(reference.calls.values()),
+        'reference_counts': {key: reference_result[key] for key in counts},
+        'failures': [],
+    }
+    ok = True
+    for percent in args.fail_at:
+        fail_on = {'products.upsert': max(1, int(upsert_calls * percent / 100))}
+        entry = {'fail_at_percent': percent}
+        for label, checkpoint_dir in (('checkpoint', work_dir), ('no_checkpoint', '')):
+            outcome = scenario(path, state, args.latency_ms, fail_on, checkpoint_dir)
+            result = outcome.pop('result')
+            outcome['products_match_reference'] = outcome.pop('products') == expected
+            outcome['counts'] = {key: result[key] for key in counts} if result else None
+            outcome['counts_match_reference'] = outcome['counts'] is not None and all(
+                outcome['counts'][key] == reference_result[key] for key in counts[1:]
+            )
+            entry[label] = outcome
+        checkpointed = entry['checkpoint']
+        ok = ok and checkpointed['failed_run_raised'] and checkpointed['products_match_reference'] \
+            and checkpointed['counts_match_reference']
+        entry['retry_speedup'] = round(entry['no_checkpoint']['retry_seconds'] / max(checkpointed['retry_seconds'], 0.01), 1)
+        report['failures'].append(entry)
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
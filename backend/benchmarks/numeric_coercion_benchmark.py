@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Conversion des colonnes numériques du fournisseur: ancienne conversion par
+cellule (isdigit) contre numeric_coercion.py
+
+Liste de prix synthétique de --rows lignes dont --text-ratio des cellules
+Price / Campaign Price / Quantity sont saisies en texte, dans des formats
+variés (voir FORMATS): point ou virgule décimale, milliers, devise,
+notation scientifique, négatifs, texte invalide.
+
+Pour chaque méthode: durée, débit (cellules/s) et, par rapport à la valeur
+attendue de chaque cellule:
+- correctes
+- mises à 0 / absentes à tort (prix réel perdu)
+- acceptées à tort (valeur invalide conservée)
+
+--excel lit la feuille depuis un fichier .xlsx (comme à l'import) au lieu
+du DataFrame en mémoire; la lecture n'est pas comptée dans les durées.
+
+Usage:
+    python backend/benchmarks/numeric_coercion_benchmark.py [--rows 100000] [--text-ratio 0.2] [--excel]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCHMARKS_DIR, '.data')
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..', 'scripts'))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import synthetic_data  # noqa: E402
+
+# Mise en forme texte d'une valeur -> (texte, valeur attendue; None: cellule à rejeter)
+FORMATS = {
+    'dot': lambda value: (f"{value:.2f}", value),
+    'comma_decimal': lambda value: (f"{value:.2f}".replace('.', ','), value),
+    'eu_thousands': lambda value: (f"{value * 10:,.2f}".replace(',', ' ').replace('.', ',').replace(' ', '.'), round(value * 10, 2)),
+    'us_thousands': lambda value: (f"{value * 10:,.2f}", round(value * 10, 2)),
+    'currency': lambda value: (f"{value:.2f} €".replace('.', ','), value),
+    'scientific': lambda value: (f"{value:.4e}", float(f"{value:.4e}")),
+    'negative': lambda value: (f"-{value:.2f}", None),
+    'invalid': lambda value: ('N/A', None),
+}
+QUANTITY_FORMATS = {
+    'integer': lambda value: (str(value), value),
+    'float_text': lambda value: (f"{value}.0", value),
+    'negative': lambda value: (f"-{value}", None),
+    'fraction': lambda value: (f"{value}.5", None),
+}
+
+
+def text_sheet(rows, text_ratio, seed):
+    """Liste de prix + valeurs attendues par colonne (NaN: absente ou rejetée)"""
+    rng = np.random.default_rng(seed)
+    df = synthetic_data.generate_pricelist(rows, seed)
+    df['Campaign Price'] = np.where(rng.random(rows) < 0.3, (df['Price'] * 0.95).round(2), np.nan)
+    expected = {}
+    for column, formats in (('Price', FORMATS), ('Campaign Price', FORMATS), ('Quantity', QUANTITY_FORMATS)):
+        values = df[column].astype(object).to_numpy(copy=True)
+        wanted = df[column].to_numpy(dtype=np.float64, copy=True)
+        names = list(formats)
+        for position in np.flatnonzero((rng.random(rows) < text_ratio) & ~pd.isna(values)):
+            text, value = formats[names[rng.integers(len(names))]](values[position])
+            values[position] = text
+            wanted[position] = np.nan if value is None else value
+        df[column] = values
+        expected[column] = wanted
+    return df, expected
+
+
+def legacy_coercion(df):
+    """Conversion d'origine de process_catalog_file / parse_quantity, cellule par cellule"""
+    def price(value):
+        return float(value) if pd.notna(value) and str(value).replace('.', '').isdigit() else 0
+
+    def campaign(value):
+        return float(value) if pd.notna(value) and str(value).replace('.', '').isdigit() else None
+
+    def quantity(value):
+        return int(value) if pd.notna(value) and str(value).isdigit() else 0
+
+    return {
+        'Price': np.array([price(value) for value in df['Price']], dtype=np.float64),
+        'Campaign Price': np.array([np.nan if campaign(value) is None else campaign(value)
+                                    for value in df['Campaign Price']], dtype=np.float64),
+        'Quantity': np.array([quantity(value) for value in df['Quantity']], dtype=np.float64),
+    }
+
+
+def vectorized_coercion(df):
+    from numeric_coercion import coerce_supplier_columns
+    columns, _ = coerce_supplier_columns(df)
+    return columns
+
+
+def score(result, expected):
+    """Comparaison cellule par cellule: 0 / absent équivaut à une valeur rejetée"""
+    got = np.nan_to_num(result, nan=0.0)
+    wanted = np.nan_to_num(expected, nan=0.0)
+    correct = np.isclose(got, wanted, rtol=1e-9, atol=1e-6)
+    return {
+        'correct': int(correct.sum()),
+        'lost': int((~correct & (wanted > 0) & (got == 0)).sum()),
+        'wrongly_kept': int((~correct & (got != 0)).sum()),
+    }
+
+
+def run(method, df, expected):
+    started = time.perf_counter()
+    columns = method(df)
+    elapsed = time.perf_counter() - started
+    cells = len(df) * len(columns)
+    return {
+        'ms': round(elapsed * 1000, 1),
+        'cells_per_second': round(cells / elapsed) if elapsed > 0 else None,
+        'columns': {column: score(columns[column], expected[column]) for column in expected},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversion des colonnes numériques du fournisseur")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--text-ratio', type=float, default=0.2)
+    parser.add_argument('--excel', action='store_true', help="Lire la feuille depuis un .xlsx")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    df, expected = text_sheet(args.rows, args.text_ratio, args.seed)
+    if args.excel:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        path = os.path.join(DATA_DIR, f"pricelist_text_{args.rows}_{args.text_ratio}_{args.seed}.xlsx")
+        if not os.path.exists(path):
+            df.to_excel(path, index=False)
+        df = pd.read_excel(path, dtype={'SKU': str})
+
+    legacy = run(legacy_coercion, df, expected)
+    vectorized = run(vectorized_coercion, df, expected)
+    report = {
+        'rows': args.rows,
+        'text_ratio': args.text_ratio,
+        'source': 'excel' if args.excel else 'dataframe',
+        'legacy': legacy,
+        'vectorized': vectorized,
+        'speedup': round(legacy['ms'] / max(vectorized['ms'], 0.01), 1),
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    ok = all(
+        column['lost'] == 0 and column['wrongly_kept'] == 0 for column in vectorized['columns'].values()
+    )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
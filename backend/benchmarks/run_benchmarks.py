@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Benchmarks de bout en bout: import catalogue et tarification des commandes
+
+Scénarios (chacun dans un sous-process dédié pour un pic RSS fiable):
+- catalog_import: fetch_existing_products + process_catalog_file + import_to_supabase
+  sur une liste de prix Foxway synthétique, contre un Supabase en mémoire
+  (ou une instance locale avec --supabase=local)
+- catalog_import_atomic: même import, chargé en table d'étape puis appliqué
+  en une transaction (stage_catalog_import + commit_catalog_import_stage)
+- product_lookup: build_product_lookup sur le catalogue DBC
+- order_pricing: apply_dbc_prices sur une commande groupée
+- imei_order_pricing: process_imei_order sur une commande détaillée IMEI
+
+Le résultat est un JSON (durées par phase, lignes/s, pic RSS) comparable
+entre deux exécutions:
+
+    python backend/benchmarks/run_benchmarks.py run --sizes 10000 50000 200000 --output avant.json
+    python backend/benchmarks/run_benchmarks.py run --output apres.json
+    python backend/benchmarks/run_benchmarks.py compare avant.json apres.json
+
+Les fichiers Excel générés sont mis en cache dans backend/benchmarks/.data/.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(BENCHMARKS_DIR, '..', 'scripts')
+DATA_DIR = os.path.join(BENCHMARKS_DIR, '.data')
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+SCENARIOS = ('catalog_import', 'catalog_import_atomic', 'product_lookup', 'order_pricing', 'imei_order_pricing')
+DEFAULT_SIZES = (10000, 50000, 200000)
+DEFAULT_ORDER_ROWS = 1000
+DEFAULT_THRESHOLD = 10.0
+
+
+# ----------------------------------------------------------------------
+# Données
+# ----------------------------------------------------------------------
+
+def prepare_files(rows, order_rows, seed):
+    """Génère (ou réutilise) liste de prix, catalogue DBC et commandes pour une taille"""
+    import synthetic_data
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    paths = {
+        'pricelist': os.path.join(DATA_DIR, f"pricelist_{rows}_{seed}.xlsx"),
+        'dbc_catalog': os.path.join(DATA_DIR, f"catalogue_dbc_{rows}_{seed}.xlsx"),
+        'order': os.path.join(DATA_DIR, f"order_{rows}_{order_rows}_{seed}.xlsx"),
+        'imei_order': os.path.join(DATA_DIR, f"order_imei_{rows}_{order_rows}_{seed}.xlsx"),
+    }
+    if all(os.path.exists(path) for path in paths.values()):
+        return paths
+
+    print(f"🛠️ Génération des données synthétiques ({rows} lignes)...", file=sys.stderr)
+    pricelist = synthetic_data.generate_pricelist(rows, seed)
+    catalog = synthetic_data.to_dbc_catalog(pricelist)
+    pricelist.to_excel(paths['pricelist'], index=False)
+    catalog.to_excel(paths['dbc_catalog'], index=False)
+    synthetic_data.generate_order(catalog, order_rows, seed).to_excel(paths['order'], index=False)
+    synthetic_data.generate_imei_order(catalog, order_rows, seed).to_excel(paths['imei_order'], index=False)
+    return paths
+
+
+# ----------------------------------------------------------------------
+# Scénarios (exécutés dans le sous-process)
+# ----------------------------------------------------------------------
+
+def _peak_rss_mb():
+    """
+    Pic de mémoire résidente du process courant
+
+    Linux: VmHWM (remis à zéro à l'exec); ru_maxrss hérite du pic du parent
+    au fork, ce qui fausserait la mesure du sous-process.
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS: octets, autres: Ko
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _seed_supabase(supabase, rows, seed):
+    import synthetic_data
+
+    state = synthetic_data.existing_state(rows, seed)
+    if hasattr(supabase, 'seed'):
+        supabase.seed('products', state)
+        return
+    # Instance locale: la table products est réécrite
+    supabase.table('products').delete().neq('sku', '').execute()
+    for start in range(0, len(state), 1000):
+        batch = [
+            {**item, 'product_name': 'Benchmark', 'price': 0, 'price_dbc': 0, 'is_active': item['quantity'] > 0}
+            for item in state[start:start + 1000]
+        ]
+        supabase.table('products').upsert(batch, on_conflict='sku').execute()
+
+
+def scenario_catalog_import(rows, paths, options, atomic=False):
+    from fake_supabase import create_supabase
+    from import_guardrails import ImportGuardrail
+    from pipeline_metrics import catalog_phase_summary
+    import catalog_processor
+
+    supabase = create_supabase(options['supabase'], options['latency_ms'])
+    _seed_supabase(supabase, rows, options['seed'])
+    baseline_rss = _peak_rss_mb()
+
+    started = time.perf_counter()
+    # Même enchaînement que catalog_processor.run_catalog_import()
+    guardrail = ImportGuardrail()
+    existing_products = catalog_processor.fetch_existing_products(supabase, guardrail)
+    products, stats = catalog_processor.process_catalog_file(paths['pricelist'], existing_products, guardrail)
+    facet_stats = stats.pop('facet_stats', None)
+    if atomic:
+        stage_id, change_counts = catalog_processor.stage_catalog_import(
+            products, facet_stats, supabase=supabase, existing_products=existing_products, guardrail=guardrail
+        )
+        committed = catalog_processor.commit_catalog_import_stage(stage_id, supabase)
+        counts = {
+            'imported': committed['upserted'],
+            'new_skus': change_counts['new'],
+            'restocked_skus': change_counts['restocked'],
+            'deactivated': committed['deactivated'],
+        }
+    else:
+        imported_count, new_skus, restocked_skus, out_of_stock, _ = catalog_processor.import_to_supabase(
+            products, facet_stats, supabase=supabase, existing_products=existing_products, guardrail=guardrail
+        )
+        counts = {
+            'imported': imported_count,
+            'new_skus': len(new_skus),
+            'restocked_skus': len(restocked_skus),
+            'out_of_stock': out_of_stock,
+        }
+    elapsed = time.perf_counter() - started
+
+    return {
+        'seconds': elapsed,
+        'rows_processed': rows,
+        'baseline_rss_mb': baseline_rss,
+        'phases': catalog_phase_summary(),
+        'counts': counts,
+        'supabase_calls': dict(getattr(supabase, 'calls', {})),
+    }
+
+
+def scenario_catalog_import_atomic(rows, paths, options):
+    return scenario_catalog_import(rows, paths, options, atomic=True)
+
+
+def scenario_product_lookup(rows, paths, options):
+    import pandas as pd
+    from apply_dbc_prices_to_order import build_product_lookup
+
+    read_started = time.perf_counter()
+    df_catalog = pd.read_excel(paths['dbc_catalog'])
+    read_seconds = time.perf_counter() - read_started
+    baseline_rss = _peak_rss_mb()
+
+    started = time.perf_counter()
+    sku_lookup, characteristics_lookup = build_product_lookup(df_catalog)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'seconds': elapsed,
+        'rows_processed': len(df_catalog),
+        'baseline_rss_mb': baseline_rss,
+        'phases': {
+            'read_catalog': {'seconds': round(read_seconds, 4), 'rows': len(df_catalog)},
+            'build_lookup': {'seconds': round(elapsed, 4), 'rows': len(df_catalog)},
+        },
+        'counts': {'skus': len(sku_lookup), 'characteristics_keys': len(characteristics_lookup)},
+    }
+
+
+def _order_scenario(process, paths, order_key, suffix, options):
+    from pipeline_metrics import ORDER_PRICING_DURATION
+
+    baseline_rss = _peak_rss_mb()
+    with tempfile.TemporaryDirectory() as work_dir:
+        output_file = os.path.join(work_dir, f"result{suffix}")
+        # Registre IMEI vide propre à la mesure (le registre réel n'est pas touché)
+        previous_registry = os.environ.get('IMEI_REGISTRY_PATH')
+        os.environ['IMEI_REGISTRY_PATH'] = os.path.join(work_dir, 'imei_registry.sqlite3')
+        try:
+            started = time.perf_counter()
+            result = process(paths[order_key], paths['dbc_catalog'], output_file, mode='dbc')
+            elapsed = time.perf_counter() - started
+        finally:
+            if previous_registry is None:
+                os.environ.pop('IMEI_REGISTRY_PATH')
+            else:
+                os.environ['IMEI_REGISTRY_PATH'] = previous_registry
+    if result is None:
+        raise Exception(f"Échec du traitement de {paths[order_key]}")
+
+    pricing_seconds = sum(
+        sample.value for metric in ORDER_PRICING_DURATION.collect()
+        for sample in metric.samples if sample.name.endswith('_sum')
+    )
+    statuses = result['Statut'].astype(str)
+    return {
+        'seconds': elapsed,
+        'rows_processed': len(result),
+        'baseline_rss_mb': baseline_rss,
+        'phases': {
+            # Lecture du catalogue + lookup + boucle de tarification (hors lecture commande et export)
+            'pricing': {'seconds': round(pricing_seconds, 4), 'rows': len(result)},
+            'read_order_and_export': {'seconds': round(elapsed - pricing_seconds, 4)},
+        },
+        'counts': {
+            'found': int(statuses.str.startswith('OK').sum()),
+            'not_found': int(statuses.str.contains('non trouvé').sum()),
+        },
+    }
+
+
+def scenario_order_pricing(rows, paths, options):
+    from apply_dbc_prices_to_order import apply_dbc_prices
+    return _order_scenario(apply_dbc_prices, paths, 'order', '.xlsx', options)
+
+
+def scenario_imei_order_pricing(rows, paths, options):
+    from process_imei_order import process_imei_order
+    return _order_scenario(process_imei_order, paths, 'imei_order', '.csv', options)
+
+
+def run_scenario(name, rows, paths, options):
+    """Point d'entrée du sous-process: la sortie des scripts est ignorée"""
+    scenario = globals()[f"scenario_{name}"]
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        result = scenario(rows, paths, options)
+
+    result['seconds'] = round(result['seconds'], 4)
+    result['rows_per_second'] = round(result['rows_processed'] / result['seconds'], 1) if result['seconds'] else None
+    result['peak_rss_mb'] = _peak_rss_mb()
+    for phase in result['phases'].values():
+        if phase.get('rows') and phase.get('seconds') and 'rows_per_second' not in phase:
+            phase['rows_per_second'] = round(phase['rows'] / phase['seconds'], 1)
+    return {'scenario': name, 'rows': rows, **result}
+
+
+# ----------------------------------------------------------------------
+# Exécution / comparaison
+# ----------------------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCHMARKS_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(sizes, scenarios, options):
+    results = []
+    for rows in sizes:
+        paths = prepare_files(rows, options['order_rows'], options['seed'])
+        for name in scenarios:
+            print(f"⏱️ {name} ({rows} lignes)...", file=sys.stderr)
+            # Nouveau process à chaque scénario: pic RSS et métriques indépendants
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+                result = executor.submit(run_scenario, name, rows, paths, options).result()
+            print(f"   {result['seconds']}s, {result['rows_per_second']} lignes/s, pic RSS {result['peak_rss_mb']} Mo",
+                  file=sys.stderr)
+            results.append(result)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            **options,
+        },
+        'results': results,
+    }
+
+
+def compare(before, after, threshold):
+    """
+    Compare deux rapports: durée totale et par phase
+
+    Returns:
+        Liste des régressions (durée en hausse de plus de `threshold` %)
+    """
+    baseline = {(result['scenario'], result['rows']): result for result in before['results']}
+    regressions = []
+    print(f"{'scénario':<22}{'lignes':>8}  {'phase':<24}{'avant (s)':>11}{'après (s)':>11}{'écart':>9}")
+    for result in after['results']:
+        key = (result['scenario'], result['rows'])
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        rows = [('total', previous['seconds'], result['seconds'])]
+        rows += [
+            (phase, previous['phases'][phase].get('seconds'), values.get('seconds'))
+            for phase, values in result['phases'].items() if phase in previous['phases']
+        ]
+        rows.append(('peak_rss_mb', previous['peak_rss_mb'], result['peak_rss_mb']))
+        for phase, old, new in rows:
+            if not old or new is None:
+                continue
+            delta = (new - old) / old * 100
+            flag = ''
+            if delta > threshold and phase != 'peak_rss_mb':
+                flag = ' ⚠️'
+                regressions.append({'scenario': key[0], 'rows': key[1], 'phase': phase, 'delta_percent': round(delta, 1)})
+            print(f"{key[0]:<22}{key[1]:>8}  {phase:<24}{old:>11.3f}{new:>11.3f}{delta:>8.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks import catalogue / tarification des commandes")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="Exécuter les benchmarks")
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    run_parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    run_parser.add_argument('--order-rows', type=int, default=DEFAULT_ORDER_ROWS)
+    run_parser.add_argument('--supabase', choices=('memory', 'local'), default='memory')
+    run_parser.add_argument('--latency-ms', type=float, default=0.0,
+                            help="Latence simulée par requête Supabase (backend memory)")
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--output', help="Fichier JSON de sortie (sinon stdout)")
+
+    compare_parser = commands.add_parser('compare', help="Comparer deux rapports JSON")
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help="Hausse de durée (en %%) signalée comme régression")
+
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        with open(args.before) as before_file, open(args.after) as after_file:
+            regressions = compare(json.load(before_file), json.load(after_file), args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} régression(s) au-delà de {args.threshold}%")
+            sys.exit(1)
+        print(f"\n✅ Aucune régression au-delà de {args.threshold}%")
+        return
+
+    options = {
+        'order_rows': args.order_rows,
+        'supabase': args.supabase,
+        'latency_ms': args.latency_ms,
+        'seed': args.seed,
+    }
+    report = run(args.sizes, args.scenarios, options)
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output)
+        print(f"✅ Rapport écrit dans {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Benchmark des agrégats de ventes du dashboard admin (1M lignes order_item_imei)
+
+Sur un PostgreSQL local (schéma dédié sales_rollup_bench, supprimé à la fin):
+1. tables users / products / orders / order_items / order_item_imei
+   minimales, remplies par generate_series (--imei-rows appareils)
+2. anciennes requêtes du dashboard (jointure complète à chaque appel)
+3. application de docs/supabase-functions.sql, reconstruction des agrégats
+4. lectures du dashboard sur les agrégats
+5. écritures incrémentales: import IMEI d'une commande, passage en
+   completed, nouveau prix des IMEI, retour en arrière, suppression
+6. vérification: check_sales_rollups() sans écart et mêmes résultats que
+   les anciennes requêtes
+
+Nécessite psycopg2 (hors dépendances du backend) et une base locale
+jetable; un hôte distant est refusé.
+
+Usage:
+    python backend/benchmarks/sales_rollup_benchmark.py --dsn postgresql://postgres@localhost/postgres
+        [--imei-rows 1000000] [--repeat 5] [--keep]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+SQL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'docs', 'supabase-functions.sql')
+SCHEMA = 'sales_rollup_bench'
+LOCAL_HOSTS = ('', 'localhost', '127.0.0.1', '::1')
+
+BASE_TABLES = """
+CREATE TABLE users (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  email VARCHAR UNIQUE NOT NULL,
+  company_name VARCHAR
+);
+CREATE TABLE products (
+  sku VARCHAR PRIMARY KEY,
+  product_name VARCHAR NOT NULL,
+  price DECIMAL(10,2) NOT NULL,
+  price_dbc DECIMAL(10,2) NOT NULL,
+  quantity INTEGER DEFAULT 0,
+  is_active BOOLEAN DEFAULT true
+);
+CREATE TABLE orders (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  name VARCHAR NOT NULL,
+  status VARCHAR NOT NULL DEFAULT 'draft',
+  status_label VARCHAR NOT NULL DEFAULT 'Brouillon',
+  user_id UUID REFERENCES users(id),
+  total_amount DECIMAL(10,2) DEFAULT 0,
+  created_at TIMESTAMP DEFAULT NOW(),
+  updated_at TIMESTAMP DEFAULT NOW()
+);
+CREATE TABLE order_items (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  order_id UUID REFERENCES orders(id) ON DELETE CASCADE,
+  sku VARCHAR,
+  product_name VARCHAR NOT NULL,
+  quantity INTEGER NOT NULL,
+  unit_price DECIMAL(10,2) NOT NULL,
+  total_price DECIMAL(10,2) NOT NULL
+);
+CREATE INDEX idx_order_items_order_id ON order_items(order_id);
+CREATE TABLE order_item_imei (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  order_item_id UUID REFERENCES order_items(id) ON DELETE CASCADE,
+  sku VARCHAR NOT NULL,
+  imei VARCHAR NOT NULL,
+  product_name VARCHAR NOT NULL,
+  appearance VARCHAR,
+  functionality VARCHAR,
+  boxed VARCHAR,
+  color VARCHAR,
+  cloud_lock VARCHAR,
+  additional_info TEXT,
+  supplier_price DECIMAL(10,2),
+  dbc_price DECIMAL(10,2),
+  created_at TIMESTAMP DEFAULT NOW()
+);
+CREATE INDEX idx_order_item_imei_order_item_id ON order_item_imei(order_item_id);
+"""
+
+# Commandes de 50 appareils (5 articles x 10 IMEI), 70% completed, 300 modèles,
+# 200 clients, ~3% des appareils sans prix DBC
+SEED = """
+INSERT INTO users (email, company_name)
+SELECT 'client' || n || '@bench.local', 'Client ' || n FROM generate_series(1, 200) n;
+
+INSERT INTO orders (name, status, user_id, created_at, updated_at)
+SELECT 'Commande ' || n,
+       CASE WHEN n %% 10 < 7 THEN 'completed' WHEN n %% 10 < 9 THEN 'shipping' ELSE 'pending_payment' END,
+       (SELECT id FROM users ORDER BY email OFFSET (n %% 200) LIMIT 1),
+       TIMESTAMP '2025-01-01' + (n %% 365) * INTERVAL '1 day',
+       TIMESTAMP '2025-01-01' + (n %% 365 + 2) * INTERVAL '1 day'
+FROM generate_series(1, %(orders)s) n;
+
+INSERT INTO order_items (order_id, sku, product_name, quantity, unit_price, total_price)
+SELECT o.id, 'SKU-' || ((o.rn * 5 + i) %% 300), 'Modèle ' || ((o.rn * 5 + i) %% 300), 10, 100, 1000
+FROM (SELECT id, row_number() OVER (ORDER BY name) AS rn FROM orders) o, generate_series(1, 5) i;
+
+INSERT INTO order_item_imei (order_item_id, sku, imei, product_name, supplier_price, dbc_price)
+SELECT oi.id, oi.sku, md5(oi.id::text || d), oi.product_name,
+       100 + (hashtext(oi.id::text || d) & 255),
+       CASE WHEN hashtext(oi.id::text || d || 'p') & 31 = 0 THEN NULL
+            ELSE 110 + (hashtext(oi.id::text || d) & 255) + (hashtext(oi.id::text || d || 'm') & 15) END
+FROM order_items oi, generate_series(1, 10) d;
+"""
+
+# Requêtes du dashboard avant les agrégats (jointure complète à chaque appel)
+LEGACY_TOTAL_MARGIN = """
+SELECT COALESCE(SUM(CASE WHEN oimei.dbc_price IS NOT NULL AND oimei.supplier_price IS NOT NULL
+                         THEN oimei.dbc_price - oimei.supplier_price ELSE 0 END), 0)
+FROM order_item_imei oimei
+INNER JOIN order_items oi ON oimei.order_item_id = oi.id
+INNER JOIN orders o ON oi.order_id = o.id
+WHERE o.status = 'completed' AND oimei.dbc_price IS NOT NULL AND oimei.supplier_price IS NOT NULL
+"""
+LEGACY_TOP_MODELS = """
+SELECT oimei.product_name, COUNT(*), SUM(COALESCE(oimei.dbc_price, 0)),
+       SUM(CASE WHEN oimei.dbc_price IS NOT NULL AND oimei.supplier_price IS NOT NULL
+                THEN oimei.dbc_price - oimei.supplier_price ELSE 0 END)
+FROM order_item_imei oimei
+INNER JOIN order_items oi ON oimei.order_item_id = oi.id
+INNER JOIN orders o ON oi.order_id = o.id
+WHERE o.status = 'completed' AND oimei.product_name IS NOT NULL
+GROUP BY oimei.product_name
+ORDER BY COUNT(*) DESC, oimei.product_name
+LIMIT 20
+"""
+
+ROLLUP_READS = {
+    'total_margin': "SELECT get_total_margin_completed_orders()",
+    'top_models': "SELECT * FROM get_top_selling_models_completed_orders(20)",
+    'sales_by_day': "SELECT * FROM get_sales_by_day_completed_orders('2025-03-01', '2025-05-31')",
+    'top_clients': "SELECT * FROM get_top_clients_completed_orders(10)",
+}
+
+
+def connect(dsn):
+    try:
+        import psycopg2
+        from psycopg2.extensions import parse_dsn
+    except ImportError:
+        sys.exit("❌ psycopg2 requis pour ce benchmark: pip install psycopg2-binary")
+
+    host = parse_dsn(dsn).get('host') or ''
+    if host not in LOCAL_HOSTS and not host.startswith('/'):
+        sys.exit(f"❌ Hôte '{host}' refusé: benchmark réservé à une base PostgreSQL locale")
+    connection = psycopg2.connect(dsn)
+    connection.autocommit = True
+    return connection
+
+
+def timed(cursor, sql, params=None):
+    started = time.perf_counter()
+    cursor.execute(sql, params)
+    rows = cursor.fetchall() if cursor.description else None
+    return (time.perf_counter() - started) * 1000, rows
+
+
+def median_ms(cursor, sql, repeat):
+    runs = [timed(cursor, sql) for _ in range(repeat)]
+    return round(statistics.median(run[0] for run in runs), 2), runs[-1][1]
+
+
+def incremental_writes(cursor, devices):
+    """Cycle de vie d'une commande de `devices` appareils, chaque étape chronométrée (ms)"""
+    results = {}
+    cursor.execute("""
+        INSERT INTO orders (name, status, user_id)
+        SELECT 'Commande bench', 'pending_payment', id FROM users ORDER BY email LIMIT 1
+        RETURNING id
+    """)
+    order_id = cursor.fetchone()[0]
+    cursor.execute("""
+        INSERT INTO order_items (order_id, sku, product_name, quantity, unit_price, total_price)
+        SELECT %s, 'SKU-' || i, 'Modèle ' || i, %s / 10, 120, 1200 FROM generate_series(1, 10) i
+    """, (order_id, devices))
+
+    # Import IMEI (route /api/orders/[id]/imei): insertion groupée puis passage en shipping
+    results['imei_import_ms'] = round(timed(cursor, """
+        INSERT INTO order_item_imei (order_item_id, sku, imei, product_name, supplier_price, dbc_price)
+        SELECT oi.id, oi.sku, md5(oi.id::text || d), oi.product_name, 100, 120
+        FROM order_items oi, generate_series(1, %s / 10) d WHERE oi.order_id = %s
+    """, (devices, order_id))[0], 2)
+    cursor.execute("UPDATE orders SET status = 'shipping' WHERE id = %s", (order_id,))
+    results['complete_order_ms'] = round(timed(
+        cursor, "UPDATE orders SET status = 'completed' WHERE id = %s", (order_id,))[0], 2)
+    results['reprice_imei_ms'] = round(timed(cursor, """
+        UPDATE order_item_imei SET dbc_price = dbc_price + 5
+        WHERE order_item_id IN (SELECT id FROM order_items WHERE order_id = %s)
+    """, (order_id,))[0], 2)
+    results['revert_completion_ms'] = round(timed(
+        cursor, "UPDATE orders SET status = 'shipping' WHERE id = %s", (order_id,))[0], 2)
+    cursor.execute("UPDATE orders SET status = 'completed' WHERE id = %s", (order_id,))
+    results['delete_order_ms'] = round(timed(cursor, "DELETE FROM orders WHERE id = %s", (order_id,))[0], 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des agrégats de ventes du dashboard")
+    parser.add_argument('--dsn', default=os.getenv('BENCH_DATABASE_URL'),
+                        help="PostgreSQL local (défaut: BENCH_DATABASE_URL)")
+    parser.add_argument('--imei-rows', type=int, default=1_000_000)
+    parser.add_argument('--order-devices', type=int, default=500, help="Taille de la commande des écritures incrémentales")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--keep', action='store_true', help=f"Conserver le schéma {SCHEMA}")
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("--dsn ou BENCH_DATABASE_URL requis")
+
+    connection = connect(args.dsn)
+    cursor = connection.cursor()
+    result = {'imei_rows': args.imei_rows, 'repeat': args.repeat}
+    try:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}; SET search_path TO {SCHEMA}")
+        cursor.execute(BASE_TABLES)
+        started = time.perf_counter()
+        cursor.execute(SEED, {'orders': max(1, args.imei_rows // 50)})
+        cursor.execute("ANALYZE")
+        result['seed_seconds'] = round(time.perf_counter() - started, 1)
+
+        legacy_margin_ms, legacy_margin = median_ms(cursor, LEGACY_TOTAL_MARGIN, args.repeat)
+        legacy_top_ms, legacy_top = median_ms(cursor, LEGACY_TOP_MODELS, args.repeat)
+        result['legacy_ms'] = {'total_margin': legacy_margin_ms, 'top_models': legacy_top_ms}
+
+        with open(SQL_FILE, encoding='utf-8') as sql_file:
+            cursor.execute(sql_file.read())
+        rebuild_ms, counts = timed(cursor, "SELECT * FROM rebuild_sales_rollups()")
+        result['rebuild_ms'] = round(rebuild_ms, 2)
+        result['rollup_rows'] = dict(zip(('days', 'models', 'clients'), counts[0]))
+
+        result['rollup_ms'], reads = {}, {}
+        for name, sql in ROLLUP_READS.items():
+            result['rollup_ms'][name], reads[name] = median_ms(cursor, sql, args.repeat)
+
+        result['incremental_ms'] = incremental_writes(cursor, args.order_devices)
+
+        mismatch_ms, mismatches = timed(cursor, "SELECT * FROM check_sales_rollups()")
+        result['check_ms'] = round(mismatch_ms, 2)
+        result['mismatches'] = len(mismatches)
+        result['matches_legacy'] = (
+            reads['total_margin'][0][0] == legacy_margin[0][0]
+            and [tuple(row) for row in reads['top_models']] == [tuple(row) for row in legacy_top]
+        )
+    finally:
+        if not args.keep:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        connection.close()
+
+    result['speedup'] = {
+        name: round(result['legacy_ms'][name] / max(result['rollup_ms'][name], 0.01), 1)
+        for name in result['legacy_ms']
+    }
+    print(json.dumps(result, indent=2, ensure_ascii=False, default=str))
+    sys.exit(0 if result['mismatches'] == 0 and result['matches_legacy'] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark mémoire du diff d'import: dict/sets/listes Python vs SkuStateTable
+
+Génère un état en base et un catalogue synthétiques (200k SKU par défaut),
+puis mesure le pic mémoire (tracemalloc) et la durée du diff
+nouveaux / restockés / en rupture / manquants avec les deux approches.
+
+Usage: python backend/benchmarks/sku_state_memory.py [nombre_sku]
+"""
+
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from sku_state import SkuStateTable, compute_stock_diff  # noqa: E402
+
+
+def existing_pages(count, seed=42, page_size=1000):
+    """
+    Pages de produits en base, générées à la demande comme des réponses Supabase
+
+    Chaque page crée ses propres objets str / dict (décodage JSON), de sorte
+    que le coût de conserver ou non les SKU soit bien mesuré.
+    """
+    rng = random.Random(seed)
+    for start in range(0, count, page_size):
+        yield [
+            {'sku': f"{i:010d}", 'quantity': 0 if rng.random() < 0.1 else rng.randint(1, 50)}
+            for i in range(start, min(start + page_size, count))
+        ]
+
+
+def generate_catalog(count, seed=42):
+    """Catalogue: ~5% de SKU retirés, 5% de nouveaux, ~8% passés à 0"""
+    rng = random.Random(seed + 1)
+    catalog_skus, catalog_quantities = [], []
+    for i in range(count):
+        if rng.random() < 0.05:
+            continue  # absent du nouveau catalogue
+        catalog_skus.append(f"{i:010d}")
+        catalog_quantities.append(0 if rng.random() < 0.08 else rng.randint(1, 50))
+    for i in range(count, count + count // 20):
+        catalog_skus.append(f"{i:010d}")
+        catalog_quantities.append(rng.randint(1, 50))
+    return catalog_skus, catalog_quantities
+
+
+def legacy_diff(count, catalog_skus, catalog_quantities):
+    """Reproduction de l'ancienne logique de import_to_supabase"""
+    existing_products = {}
+    for page in existing_pages(count):
+        for item in page:
+            existing_products[item['sku']] = item['quantity']
+
+    new_skus, restocked_skus, out_of_stock_skus = [], [], []
+    for sku, new_quantity in zip(catalog_skus, catalog_quantities):
+        if sku in existing_products:
+            old_quantity = existing_products[sku]
+            if new_quantity == 0 and old_quantity > 0:
+                out_of_stock_skus.append(sku)
+            elif new_quantity > 0 and old_quantity == 0:
+                restocked_skus.append(sku)
+        elif new_quantity > 0:
+            new_skus.append(sku)
+
+    catalog_set = set(catalog_skus)
+    missing_skus = [sku for sku, quantity in existing_products.items() if sku not in catalog_set and quantity > 0]
+    return {'new': len(new_skus), 'restocked': len(restocked_skus),
+            'out_of_stock': len(out_of_stock_skus), 'missing': len(missing_skus)}
+
+
+def compact_diff(count, catalog_skus, catalog_quantities):
+    """Nouvelle logique: tableaux triés construits page par page"""
+    existing = SkuStateTable.from_pages(
+        ([item['sku'] for item in page], [item['quantity'] for item in page]) for page in existing_pages(count)
+    )
+    diff = compute_stock_diff(existing, catalog_skus, catalog_quantities)
+    return {key: len(diff[key]) for key in ('new', 'restocked', 'out_of_stock', 'missing')}
+
+
+def measure(func, *args):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {'peak_mb': round(peak / 1024 / 1024, 2), 'seconds': round(elapsed, 3)}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    # Le catalogue (liste de produits issue du parsing) existe dans les deux cas
+    catalog_skus, catalog_quantities = generate_catalog(count)
+
+    legacy_result, legacy = measure(legacy_diff, count, catalog_skus, catalog_quantities)
+    compact_result, compact = measure(compact_diff, count, catalog_skus, catalog_quantities)
+
+    if legacy_result != compact_result:
+        print(f"❌ Résultats différents: {legacy_result} != {compact_result}")
+        sys.exit(1)
+
+    print(json.dumps({
+        'skus': count,
+        'diff': compact_result,
+        'legacy': legacy,
+        'compact': compact,
+        'memory_ratio': round(legacy['peak_mb'] / compact['peak_mb'], 1) if compact['peak_mb'] else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Données synthétiques au format Foxway pour les benchmarks
+
+- generate_pricelist: liste de prix fournisseur (colonnes du fichier Foxway)
+- to_dbc_catalog: catalogue DBC (sortie de transform_catalog.py)
+- generate_order / generate_imei_order: commandes groupée et détaillée IMEI
+- existing_state: état de la table products avant import (SKU / quantité / prix)
+
+Tout est déterministe pour une graine donnée: le même fichier peut être
+régénéré dans un sous-process sans relire l'Excel.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Modèles (marque, nom, prix de base en €) et capacités disponibles
+MODELS = [
+    ('Apple', 'iPhone 11', 220, [64, 128, 256]),
+    ('Apple', 'iPhone 12', 290, [64, 128, 256]),
+    ('Apple', 'iPhone 12 Pro', 380, [128, 256, 512]),
+    ('Apple', 'iPhone 13', 390, [128, 256, 512]),
+    ('Apple', 'iPhone 13 Pro Max', 620, [128, 256, 512, 1024]),
+    ('Apple', 'iPhone 14', 480, [128, 256, 512]),
+    ('Apple', 'iPhone 14 Pro', 690, [128, 256, 512, 1024]),
+    ('Apple', 'iPhone 15 Pro Max', 980, [256, 512, 1024]),
+    ('Apple', 'iPhone SE (2022)', 190, [64, 128, 256]),
+    ('Samsung', 'Galaxy S21', 240, [128, 256]),
+    ('Samsung', 'Galaxy S22 Ultra', 520, [128, 256, 512]),
+    ('Samsung', 'Galaxy S23', 450, [128, 256]),
+    ('Samsung', 'Galaxy A54', 210, [128, 256]),
+    ('Samsung', 'Galaxy Z Flip5', 560, [256, 512]),
+    ('Google', 'Pixel 7', 260, [128, 256]),
+    ('Google', 'Pixel 8 Pro', 610, [128, 256, 512]),
+    ('Xiaomi', 'Redmi Note 12', 120, [64, 128, 256]),
+    ('Xiaomi', '13T Pro', 430, [256, 512]),
+    ('OnePlus', '11', 390, [128, 256]),
+    ('Huawei', 'P30 Pro', 150, [128, 256]),
+]
+COLORS = ['Black', 'White', 'Blue', 'Midnight', 'Starlight', 'Red', 'Green', 'Purple',
+          'Graphite', 'Gold', 'Silver', 'Pink', 'Phantom Black', 'Natural Titanium']
+
+# Distributions observées sur les catalogues Foxway (ordre de grandeur)
+APPEARANCES = ['Grade A+', 'Grade A', 'Grade AB', 'Grade B', 'Grade BC', 'Grade C', 'Grade C+', 'Brand New']
+APPEARANCE_WEIGHTS = [0.08, 0.27, 0.12, 0.22, 0.08, 0.12, 0.06, 0.05]
+APPEARANCE_PRICE_FACTOR = [1.05, 1.0, 0.94, 0.88, 0.82, 0.75, 0.78, 1.25]
+FUNCTIONALITIES = ['Working', 'Minor Fault']
+FUNCTIONALITY_WEIGHTS = [0.85, 0.15]
+VAT_TYPES = ['Marginal', 'Reverse']
+VAT_WEIGHTS = [0.65, 0.35]
+ADDITIONAL_INFOS = [None, 'Brand New Battery', 'Reduced Battery Performance', 'Engraving',
+                    'Engraving Removed', 'Discoloration', 'Heavy cosmetic wear']
+ADDITIONAL_INFO_WEIGHTS = [0.7, 0.08, 0.08, 0.04, 0.03, 0.04, 0.03]
+
+PRICELIST_COLUMNS = ['SKU', 'Item Group', 'Product Name', 'Appearance', 'Functionality', 'Boxed',
+                     'Color', 'Cloud Lock', 'Additional Info', 'Quantity', 'Price', 'Campaign Price',
+                     'VAT Type']
+
+# Part des SKU du catalogue absents de la base (nouveaux) et de SKU en base retirés du catalogue
+NEW_SKU_RATIO = 0.03
+REMOVED_SKU_RATIO = 0.02
+
+
+def make_skus(indices):
+    """
+    SKU numériques à 8 chiffres (zéros de tête conservés), uniques et non triés
+
+    7919 est premier avec 10^8: i -> (i * 7919 + 13) mod 10^8 est injectif.
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    return pd.Series((indices * 7919 + 13) % 10**8).map('{:08d}'.format).to_numpy()
+
+
+def _quantities(rng, size):
+    # ~30% en rupture, le reste en loi géométrique (beaucoup de petites quantités)
+    quantities = rng.geometric(0.15, size=size).clip(max=200)
+    quantities[rng.random(size) < 0.3] = 0
+    return quantities
+
+
+def generate_pricelist(rows, seed=42, sku_offset=0):
+    """
+    Liste de prix fournisseur de `rows` lignes au format Foxway
+
+    sku_offset décale les SKU générés (fichiers multiples qui se recouvrent
+    partiellement, voir catalog_batch_scaling.py)
+    """
+    rng = np.random.default_rng(seed)
+
+    model_ids = rng.integers(0, len(MODELS), size=rows)
+    storage_choice = rng.random(rows)
+    appearance_ids = rng.choice(len(APPEARANCES), size=rows, p=APPEARANCE_WEIGHTS)
+
+    names = np.empty(rows, dtype=object)
+    base_prices = np.empty(rows)
+    for model_id, (brand, model, base_price, storages) in enumerate(MODELS):
+        mask = model_ids == model_id
+        storage_index = (storage_choice[mask] * len(storages)).astype(int)
+        storage_gb = np.array(storages)[storage_index]
+        labels = np.where(storage_gb >= 1024, (storage_gb // 1024).astype(str) + 'TB', storage_gb.astype(str) + 'GB')
+        names[mask] = [f"{brand} {model} {label}" for label in labels]
+        base_prices[mask] = base_price * (1 + storage_index * 0.12)
+
+    colors = rng.choice(COLORS, size=rows)
+    functionality = rng.choice(FUNCTIONALITIES, size=rows, p=FUNCTIONALITY_WEIGHTS)
+    prices = base_prices * np.array(APPEARANCE_PRICE_FACTOR)[appearance_ids]
+    prices = prices * np.where(functionality == 'Minor Fault', 0.7, 1.0) * rng.normal(1.0, 0.04, size=rows)
+    prices = prices.round(2)
+    campaign = np.where(rng.random(rows) < 0.05, (prices * 0.95).round(2), np.nan)
+
+    return pd.DataFrame({
+        'SKU': make_skus(sku_offset + np.arange(rows)),
+        'Item Group': 'Mobile Devices',
+        'Product Name': names,
+        'Appearance': np.array(APPEARANCES)[appearance_ids],
+        'Functionality': functionality,
+        'Boxed': rng.choice(['No', 'Yes'], size=rows, p=[0.9, 0.1]),
+        'Color': colors,
+        'Cloud Lock': np.where(rng.random(rows) < 0.02, 'On', None),
+        'Additional Info': rng.choice(np.array(ADDITIONAL_INFOS, dtype=object), size=rows, p=ADDITIONAL_INFO_WEIGHTS),
+        'Quantity': _quantities(rng, rows),
+        'Price': prices,
+        'Campaign Price': campaign,
+        'VAT Type': rng.choice(VAT_TYPES, size=rows, p=VAT_WEIGHTS),
+    }, columns=PRICELIST_COLUMNS)
+
+
+def to_dbc_catalog(pricelist):
+    """Catalogue DBC équivalent à la sortie de transform_catalog.py (marges 1% / 11%)"""
+    catalog = pricelist.copy()
+    marginal = catalog['VAT Type'] == 'Marginal'
+    catalog['Prix original'] = catalog['Price']
+    catalog['Prix DBC'] = np.where(marginal, catalog['Price'] * 1.01, catalog['Price'] * 1.11).round(2)
+    catalog['Marge appliquée'] = np.where(marginal, '1% (marginal)', '11% (non marginal)')
+    return catalog
+
+
+def existing_state(rows, seed=42):
+    """
+    Table products avant import: SKU du catalogue hors nouveaux + SKU retirés
+
+    Prix précédents: ceux de generate_pricelist(rows, seed), dont ~10%
+    différents (±5%) et ~0,5% de sauts (-30% à +60%)
+
+    Returns:
+        Liste de dicts {'sku', 'quantity', 'price'} (ordre de la table)
+    """
+    rng = np.random.default_rng(seed + 1)
+    known = np.arange(int(rows * (1 - NEW_SKU_RATIO)))
+    removed = np.arange(rows, rows + int(rows * REMOVED_SKU_RATIO))
+    indices = np.concatenate([known, removed])
+    skus = make_skus(indices)
+    quantities = _quantities(rng, len(indices))
+
+    factors = np.ones(len(indices))
+    drift = rng.random(len(indices))
+    factors[drift < 0.10] = rng.normal(1.0, 0.05, size=int((drift < 0.10).sum()))
+    factors[drift < 0.005] = rng.uniform(1 / 1.6, 1 / 0.7, size=int((drift < 0.005).sum()))
+    prices = np.concatenate([
+        generate_pricelist(rows, seed)['Price'].to_numpy()[:len(known)],
+        rng.uniform(100, 900, size=len(removed)),
+    ])
+    prices = (prices * factors).round(2)
+    return [
+        {'sku': sku, 'quantity': int(quantity), 'price': float(price)}
+        for sku, quantity, price in zip(skus, quantities, prices)
+    ]
+
+
+def _order_lines(catalog, rows, seed):
+    """Lignes de commande: 80% SKU connus, 15% SKU inconnus mais caractéristiques connues, 5% introuvables"""
+    rng = np.random.default_rng(seed)
+    picked = catalog.iloc[rng.integers(0, len(catalog), size=rows)].reset_index(drop=True)
+    kind = rng.random(rows)
+    by_characteristics = (kind >= 0.80) & (kind < 0.95)
+    not_found = kind >= 0.95
+
+    skus = picked['SKU'].to_numpy(dtype=object)
+    skus[by_characteristics | not_found] = make_skus(10**7 + np.arange(rows))[by_characteristics | not_found]
+    names = picked['Product Name'].to_numpy(dtype=object)
+    names[not_found] = 'Nokia 3310 (2000) 16MB'
+    supplier_prices = (picked['Price'].to_numpy() * rng.uniform(0.9, 1.0, size=rows)).round(2)
+    return picked, skus, names, supplier_prices
+
+
+def generate_order(catalog, rows, seed=7):
+    """Commande groupée (format apply_dbc_prices_to_order.py)"""
+    picked, skus, names, supplier_prices = _order_lines(catalog, rows, seed)
+    rng = np.random.default_rng(seed + 1)
+    return pd.DataFrame({
+        'SKU': skus,
+        'Product Name': names,
+        'Appearance': picked['Appearance'],
+        'Functionality': picked['Functionality'],
+        'Color': picked['Color'],
+        'VAT Type': picked['VAT Type'],
+        'Quantity': rng.integers(1, 20, size=rows),
+        'Price': supplier_prices,
+    })
+
+
+def generate_imei_order(catalog, rows, seed=11):
+    """Commande détaillée avec un IMEI par ligne (format process_imei_order.py)"""
+    picked, skus, names, supplier_prices = _order_lines(catalog, rows, seed)
+    rng = np.random.default_rng(seed + 1)
+    imeis = pd.Series(rng.integers(10**14, 10**15, size=rows)).astype(str).to_numpy()
+    return pd.DataFrame({
+        'Id': np.arange(1, rows + 1),
+        'SKU': skus,
+        'Product Name': names,
+        'Item Identifier': imeis,
+        'Appearance': picked['Appearance'],
+        'Functionality': picked['Functionality'],
+        'Color': picked['Color'],
+        'VAT Type': picked['VAT Type'],
+        'Price': supplier_prices,
+    })
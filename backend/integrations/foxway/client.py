@@ -3,13 +3,9 @@ Client pour l'intégration avec l'API Foxway
 Structure préparée pour l'intégration future
 """
 
-import httpx
 from typing import Optional, Dict, List
 from datetime import datetime
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
 
 class FoxwayAPIClient:
     """Client pour interagir avec l'API Foxway"""
@@ -17,12 +13,33 @@ class FoxwayAPIClient:
     def __init__(self):
         self.base_url = os.getenv("FOXWAY_API_URL", "https://api.foxway.com/v1")
         self.api_key = os.getenv("FOXWAY_API_KEY", "")
+        # Tant que l'API n'est pas disponible, les appels sont simulés localement
+        self.mock = os.getenv("FOXWAY_MOCK", "true").lower() in ("1", "true", "yes")
         self.timeout = 30.0
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
     
+    async def ping(self, timeout: Optional[float] = None) -> Dict:
+        """
+        Vérifie que l'API Foxway répond (utilisé par les health checks)
+        
+        Toute réponse HTTP hors 5xx est considérée comme joignable.
+        
+        Returns:
+            Dict avec le statut et le code HTTP
+        """
+        if self.mock:
+            return {"status": "ok", "mock": True}
+        
+        import httpx
+        async with httpx.AsyncClient(timeout=timeout or self.timeout) as client:
+            response = await client.get(self.base_url, headers=self.headers)
+        if response.status_code >= 500:
+            raise Exception(f"Foxway a répondu {response.status_code}")
+        return {"status": "ok", "http_status": response.status_code}
+    
     async def get_catalog(self) -> Dict:
         """
         Récupère le catalogue en temps réel depuis Foxway
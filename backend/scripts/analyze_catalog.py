@@ -3,11 +3,11 @@
 Script pour analyser la structure du fichier catalogue
 """
 
-import pandas as pd
 import sys
 
 def analyze_file(filename):
     """Analyse la structure du fichier Excel"""
+    import pandas as pd
     try:
         # Lire le fichier
         df = pd.read_excel(filename)
@@ -5,12 +5,15 @@ Prend en compte que les catalogues changent quotidiennement
 Modes: DBC (interne avec toutes les infos) ou Client (sans infos sensibles)
 """
 
-import pandas as pd
 import sys
 from datetime import datetime, timedelta
 import os
 import glob
 import re
+import time
+from env_loader import load_env
+from pipeline_metrics import push_metrics, record_order_pricing
+from pipeline_trace import log, profile_run, span
 
 def extract_date_from_filename(filename):
     """
@@ -22,15 +25,31 @@ def extract_date_from_filename(filename):
         return datetime.strptime(date_str, '%Y%m%d').date()
     return None
 
-def find_matching_catalog(order_date=None, tolerance_days=1):
+def extract_order_date(order_file):
+    """
+    Extrait la date d'un nom de fichier de commande order-...-Tuesday, May 27, 2025.xlsx
+    """
+    if 'order-' not in order_file.lower():
+        return None
+    date_match = re.search(r'(\w+, \w+ \d+, \d{4})', order_file)
+    if date_match:
+        try:
+            return datetime.strptime(date_match.group(1), '%A, %B %d, %Y').date()
+        except ValueError:
+            return None
+    return None
+
+def find_matching_catalog(order_date=None, tolerance_days=1, catalog_dir=None):
     """
     Trouve le catalogue DBC correspondant à la date de la commande
     
     Args:
         order_date: Date de la commande (datetime.date)
         tolerance_days: Nombre de jours de tolérance pour chercher un catalogue
+        catalog_dir: Dossier des catalogues DBC (dossier courant par défaut)
     """
-    catalog_files = glob.glob("catalogue_dbc_*.xlsx")
+    pattern = "catalogue_dbc_*.xlsx"
+    catalog_files = glob.glob(os.path.join(catalog_dir, pattern) if catalog_dir else pattern)
     
     if not catalog_files:
         raise FileNotFoundError("Aucun catalogue DBC trouvé")
@@ -50,11 +69,14 @@ def find_matching_catalog(order_date=None, tolerance_days=1):
         for catalog, cat_date in catalogs_with_dates:
             diff_days = abs((cat_date - order_date).days)
             if diff_days <= tolerance_days:
-                print(f"Catalogue trouvé pour la date {order_date}: {catalog} (différence: {diff_days} jours)")
+                log.info('order.catalog_match', f"Catalogue trouvé pour la date {order_date}: {catalog} (différence: {diff_days} jours)",
+                         order_date=order_date, catalog=catalog, diff_days=diff_days)
                 return catalog
         
-        print(f"Aucun catalogue trouvé pour la date {order_date} (tolérance: {tolerance_days} jours)")
-        print(f"Utilisation du catalogue le plus récent: {catalogs_with_dates[0][0]}")
+        log.warning('order.catalog_fallback', (
+            f"Aucun catalogue trouvé pour la date {order_date} (tolérance: {tolerance_days} jours)\n"
+            f"Utilisation du catalogue le plus récent: {catalogs_with_dates[0][0]}"
+        ), order_date=order_date, tolerance_days=tolerance_days, catalog=catalogs_with_dates[0][0])
         return catalogs_with_dates[0][0]
     
     # Si pas de date fournie, retourner le plus récent
@@ -65,6 +87,7 @@ def build_product_lookup(df_catalog):
     Construit des dictionnaires de recherche pour les produits
     Recherche par SKU exact et par Product Name + Appearance + Functionality
     """
+    import pandas as pd
     # Dictionnaire par SKU exact
     sku_lookup = {}
     
@@ -111,11 +134,20 @@ def build_product_lookup(df_catalog):
     
     return sku_lookup, characteristics_lookup
 
+def load_catalog_lookups(catalog_file):
+    """Lit un catalogue DBC et construit ses dictionnaires de recherche"""
+    import pandas as pd
+    with span('order.load_catalog', file=catalog_file):
+        df_catalog = pd.read_excel(catalog_file)
+    with span('order.build_lookup', catalog_rows=len(df_catalog)):
+        return build_product_lookup(df_catalog)
+
 def find_product_price(sku, product_name, appearance, functionality, vat_type_order, 
                       sku_lookup, characteristics_lookup):
     """
     Trouve le prix d'un produit en utilisant différentes méthodes de recherche
     """
+    import pandas as pd
     # 1. Recherche par SKU exact
     if sku in sku_lookup:
         return sku_lookup[sku], 'SKU exact'
@@ -157,7 +189,7 @@ def ask_mode_if_needed(mode):
                 print("Choix invalide. Veuillez entrer 1 ou 2.")
     return mode
 
-def apply_dbc_prices(order_file, catalog_file=None, output_file=None, order_date=None, mode=None):
+def apply_dbc_prices(order_file, catalog_file=None, output_file=None, order_date=None, mode=None, lookups=None):
     """
     Applique les prix DBC à une commande fournisseur
     
@@ -167,49 +199,53 @@ def apply_dbc_prices(order_file, catalog_file=None, output_file=None, order_date
         output_file: Fichier de sortie (optionnel)
         order_date: Date de la commande pour trouver le bon catalogue (optionnel)
         mode: 'dbc' pour usage interne, 'client' pour version client sans infos sensibles
+        lookups: (sku_lookup, characteristics_lookup) déjà construits pour
+            catalog_file (traitement par lot: catalogue chargé une seule fois)
+    
+    Returns:
+        DataFrame de la commande tarifée (résumé dans df.attrs['summary']), None en cas d'erreur
     """
+    import pandas as pd
     try:
         # Lire la commande
-        print(f"\nLecture de la commande: {order_file}")
+        log.info('order.read', f"\nLecture de la commande: {order_file}", file=order_file)
         
         try:
             df_order = pd.read_excel(order_file)
         except Exception as e:
-            print(f"\nERREUR: Impossible de lire le fichier Excel.")
-            print(f"Détails: {str(e)}")
+            log.error('order.read_failed', f"\nERREUR: Impossible de lire le fichier Excel.\nDétails: {e}",
+                      file=order_file, error=str(e))
             return None
         
         # Vérifier si c'est un fichier avec IMEI
         if 'Item Identifier' in df_order.columns and 'Id' in df_order.columns:
-            print("\nERREUR: Ce fichier contient des numéros de série/IMEI.")
-            print("Utilisez process_imei_order.py pour traiter ce type de fichier.")
+            log.error('order.imei_file', (
+                "\nERREUR: Ce fichier contient des numéros de série/IMEI.\n"
+                "Utilisez process_imei_order.py pour traiter ce type de fichier."
+            ), file=order_file)
             return None
         
         # Demander le mode si nécessaire
         mode = ask_mode_if_needed(mode)
-        print(f"Mode sélectionné: {mode.upper()}")
+        log.info('order.mode', f"Mode sélectionné: {mode.upper()}", mode=mode)
         
         # Essayer d'extraire la date du nom du fichier de commande si pas fournie
-        if order_date is None and 'order-' in order_file.lower():
-            # Chercher une date dans le nom du fichier (format: Tuesday, May 27, 2025)
-            date_match = re.search(r'(\w+, \w+ \d+, \d{4})', order_file)
-            if date_match:
-                try:
-                    order_date = datetime.strptime(date_match.group(1), '%A, %B %d, %Y').date()
-                    print(f"Date extraite du nom de fichier: {order_date}")
-                except:
-                    pass
+        # (format: Tuesday, May 27, 2025)
+        if order_date is None:
+            order_date = extract_order_date(order_file)
+            if order_date:
+                log.info('order.date', f"Date extraite du nom de fichier: {order_date}", order_date=order_date)
         
         # Trouver ou utiliser le catalogue DBC
         if catalog_file is None:
             catalog_file = find_matching_catalog(order_date)
-            print(f"Utilisation du catalogue DBC: {catalog_file}")
+            log.info('order.catalog', f"Utilisation du catalogue DBC: {catalog_file}", catalog=catalog_file)
         
-        # Lire le catalogue DBC
-        df_catalog = pd.read_excel(catalog_file)
+        # Débit mesuré à partir du chargement du catalogue (hors saisie du mode)
+        started = time.perf_counter()
         
-        # Construire les dictionnaires de recherche
-        sku_lookup, characteristics_lookup = build_product_lookup(df_catalog)
+        # Lire le catalogue DBC et construire les dictionnaires de recherche
+        sku_lookup, characteristics_lookup = lookups or load_catalog_lookups(catalog_file)
         
         # Créer une copie de la commande pour modification
         df_result = df_order.copy()
@@ -236,56 +272,63 @@ def apply_dbc_prices(order_file, catalog_file=None, output_file=None, order_date
         total_discount = 0.0
         
         # Appliquer les prix DBC
-        for index, row in df_result.iterrows():
-            sku = row['SKU']
-            prix_fournisseur = row['Prix Fournisseur']
-            
-            # Extraire les caractéristiques de la commande
-            product_name = row.get('Product Name', '')
-            appearance = row.get('Appearance', '')
-            functionality = row.get('Functionality', '')
-            vat_type_order = row.get('VAT Type', '')
-            
-            # Rechercher le produit
-            product_info, search_method = find_product_price(
-                sku, product_name, appearance, functionality, vat_type_order,
-                sku_lookup, characteristics_lookup
-            )
-            
-            if product_info:
-                prix_dbc = product_info['Prix DBC']
-                prix_catalogue = product_info['Prix original']
-                vat_type = product_info['VAT Type']
+        with span('order.price_rows', rows=len(df_result)):
+            for index, row in df_result.iterrows():
+                sku = row['SKU']
+                prix_fournisseur = row['Prix Fournisseur']
                 
-                if mode == 'dbc':
-                    df_result.at[index, 'Prix Catalogue'] = prix_catalogue
-                    df_result.at[index, 'Prix DBC'] = prix_dbc
-                    df_result.at[index, 'VAT Type'] = vat_type if pd.notna(vat_type) else 'Non marginal'
-                    df_result.at[index, 'Méthode recherche'] = search_method
-                    
-                    # Calculer le discount du fournisseur
-                    if pd.notna(prix_catalogue) and prix_catalogue > 0:
-                        discount = round(((prix_catalogue - prix_fournisseur) / prix_catalogue) * 100, 2)
-                        df_result.at[index, 'Discount Fournisseur'] = f"{discount}%"
-                        total_discount += (prix_catalogue - prix_fournisseur)
-                    
-                    df_result.at[index, 'Statut'] = f'OK - {search_method}'
+                # Extraire les caractéristiques de la commande
+                product_name = row.get('Product Name', '')
+                appearance = row.get('Appearance', '')
+                functionality = row.get('Functionality', '')
+                vat_type_order = row.get('VAT Type', '')
                 
-                df_result.at[index, 'Price'] = prix_dbc  # Remplacer le prix par le prix DBC
+                # Rechercher le produit
+                product_info, search_method = find_product_price(
+                    sku, product_name, appearance, functionality, vat_type_order,
+                    sku_lookup, characteristics_lookup
+                )
                 
-                if search_method == 'SKU exact':
-                    count_sku_exact += 1
+                if product_info:
+                    prix_dbc = product_info['Prix DBC']
+                    prix_catalogue = product_info['Prix original']
+                    vat_type = product_info['VAT Type']
+                    
+                    if mode == 'dbc':
+                        df_result.at[index, 'Prix Catalogue'] = prix_catalogue
+                        df_result.at[index, 'Prix DBC'] = prix_dbc
+                        df_result.at[index, 'VAT Type'] = vat_type if pd.notna(vat_type) else 'Non marginal'
+                        df_result.at[index, 'Méthode recherche'] = search_method
+                        
+                        # Calculer le discount du fournisseur
+                        if pd.notna(prix_catalogue) and prix_catalogue > 0:
+                            discount = round(((prix_catalogue - prix_fournisseur) / prix_catalogue) * 100, 2)
+                            df_result.at[index, 'Discount Fournisseur'] = f"{discount}%"
+                            total_discount += (prix_catalogue - prix_fournisseur)
+                        
+                        df_result.at[index, 'Statut'] = f'OK - {search_method}'
+                    
+                    df_result.at[index, 'Price'] = prix_dbc  # Remplacer le prix par le prix DBC
+                    
+                    if search_method == 'SKU exact':
+                        count_sku_exact += 1
+                    else:
+                        count_characteristics += 1
                 else:
-                    count_characteristics += 1
-            else:
-                # Produit non trouvé
-                if mode == 'dbc':
-                    df_result.at[index, 'Statut'] = 'ATTENTION - Produit non trouvé'
-                    df_result.at[index, 'Prix DBC'] = prix_fournisseur
-                    df_result.at[index, 'Méthode recherche'] = 'Non trouvé'
-                
-                df_result.at[index, 'Price'] = float(prix_fournisseur)
-                count_not_found += 1
+                    # Produit non trouvé
+                    if mode == 'dbc':
+                        df_result.at[index, 'Statut'] = 'ATTENTION - Produit non trouvé'
+                        df_result.at[index, 'Prix DBC'] = prix_fournisseur
+                        df_result.at[index, 'Méthode recherche'] = 'Non trouvé'
+                    
+                    df_result.at[index, 'Price'] = float(prix_fournisseur)
+                    count_not_found += 1
+        
+        record_order_pricing('apply_dbc_prices', mode, time.perf_counter() - started, {
+            'sku_exact': count_sku_exact,
+            'characteristics': count_characteristics,
+            'not_found': count_not_found
+        })
         
         # Calculer les totaux
         total_fournisseur = df_result['Prix Fournisseur'].sum()
@@ -320,46 +363,70 @@ def apply_dbc_prices(order_file, catalog_file=None, output_file=None, order_date
             output_file = f"{base_name}{suffix}_{timestamp}.xlsx"
         
         # Sauvegarder le résultat
-        df_result.to_excel(output_file, index=False)
-        print(f"\nFichier sauvegardé: {output_file}")
+        with span('order.write_output', file=output_file):
+            df_result.to_excel(output_file, index=False)
+        log.info('order.output', f"\nFichier sauvegardé: {output_file}", file=output_file)
         
         # Afficher le résumé
-        print("\n=== RÉSUMÉ DE LA TRANSFORMATION ===")
-        print(f"Catalogue DBC utilisé: {catalog_file}")
-        print(f"Nombre total de lignes: {len(df_result)}")
-        print(f"Produits trouvés par SKU exact: {count_sku_exact}")
-        print(f"Produits trouvés par caractéristiques: {count_characteristics}")
-        print(f"Produits non trouvés: {count_not_found}")
-        print(f"\nTotal prix fournisseur: {total_fournisseur:.2f}€")
-        print(f"Total prix DBC: {total_dbc:.2f}€")
-        print(f"Différence: {total_dbc - total_fournisseur:.2f}€")
+        log.info('order.summary', (
+            "\n=== RÉSUMÉ DE LA TRANSFORMATION ===\n"
+            f"Catalogue DBC utilisé: {catalog_file}\n"
+            f"Nombre total de lignes: {len(df_result)}\n"
+            f"Produits trouvés par SKU exact: {count_sku_exact}\n"
+            f"Produits trouvés par caractéristiques: {count_characteristics}\n"
+            f"Produits non trouvés: {count_not_found}\n"
+            f"\nTotal prix fournisseur: {total_fournisseur:.2f}€\n"
+            f"Total prix DBC: {total_dbc:.2f}€\n"
+            f"Différence: {total_dbc - total_fournisseur:.2f}€"
+        ), catalog=catalog_file, rows=len(df_result), sku_exact=count_sku_exact,
+            characteristics=count_characteristics, not_found=count_not_found,
+            total_supplier=round(float(total_fournisseur), 2), total_dbc=round(float(total_dbc), 2))
         
         if mode == 'dbc':
-            print(f"Discount total du fournisseur: {total_discount:.2f}€")
+            log.info('order.supplier_discount', f"Discount total du fournisseur: {total_discount:.2f}€",
+                     total_discount=round(float(total_discount), 2))
             
-            # Afficher les produits non trouvés s'il y en a
+            # Produits non trouvés, échantillonnés (le détail complet est dans le fichier)
             if count_not_found > 0:
-                print("\n=== PRODUITS NON TROUVÉS ===")
+                log.warning('order.not_found_header', "\n=== PRODUITS NON TROUVÉS ===", not_found=count_not_found)
                 missing_products = df_result[df_result['Statut'].str.contains('non trouvé', na=False)]
-                print(missing_products[['SKU', 'Product Name', 'Appearance', 'Functionality', 
-                                      'Quantity', 'Prix Fournisseur']].to_string())
+                for product in missing_products[['SKU', 'Product Name', 'Appearance', 'Functionality',
+                                                 'Quantity', 'Prix Fournisseur']].to_dict('records'):
+                    log.sample('order.product_not_found', (
+                        f"- SKU: {product['SKU']} | {product['Product Name']} | {product['Appearance']} / "
+                        f"{product['Functionality']} | quantité {product['Quantity']} | prix fournisseur {product['Prix Fournisseur']}"
+                    ), level='warning', sku=product['SKU'], product=product['Product Name'],
+                        appearance=product['Appearance'], functionality=product['Functionality'],
+                        quantity=product['Quantity'], supplier_price=product['Prix Fournisseur'])
             
             # Afficher quelques exemples
-            print("\n=== EXEMPLES DE TRANSFORMATION ===")
-            examples = df_result.head(5)
-            print(examples[['SKU', 'Product Name', 'Prix Fournisseur', 'Prix DBC', 
-                          'Méthode recherche']].to_string())
+            examples = df_result.head(5)[['SKU', 'Product Name', 'Prix Fournisseur', 'Prix DBC', 'Méthode recherche']]
+            log.info('order.examples', "\n=== EXEMPLES DE TRANSFORMATION ===\n" + examples.to_string(),
+                      examples=examples.to_dict('records'))
         
+        df_result.attrs['summary'] = {
+            'order_file': order_file,
+            'catalog_file': catalog_file,
+            'output_file': output_file,
+            'mode': mode,
+            'rows': len(df_result),
+            'sku_exact': count_sku_exact,
+            'characteristics': count_characteristics,
+            'not_found': count_not_found,
+            'total_supplier': round(float(total_fournisseur), 2),
+            'total_dbc': round(float(total_dbc), 2),
+        }
         return df_result
         
     except Exception as e:
-        print(f"Erreur: {str(e)}")
         import traceback
-        traceback.print_exc()
+        log.error('order.unexpected_error', f"Erreur: {e}\n{traceback.format_exc()}", error=str(e))
         raise
 
 def main():
     """Fonction principale"""
+    # .env.local / .env avant le premier message (DBC_LOG_*, Pushgateway)
+    load_env()
     if len(sys.argv) < 2:
         print("Usage: python apply_dbc_prices_to_order.py <fichier_commande.xlsx> [--mode=dbc|client] [catalogue_dbc.xlsx] [fichier_sortie.xlsx]")
         print("\nExemples:")
@@ -386,7 +453,7 @@ def main():
         if arg.startswith('--mode='):
             mode = arg.split('=')[1].lower()
             if mode not in ['dbc', 'client']:
-                print(f"Erreur: Mode invalide '{mode}'. Utilisez 'dbc' ou 'client'.")
+                log.error('order.invalid_mode', f"Erreur: Mode invalide '{mode}'. Utilisez 'dbc' ou 'client'.", mode=mode)
                 sys.exit(1)
         else:
             args_remaining.append(arg)
@@ -398,21 +465,23 @@ def main():
         output_file = args_remaining[1]
     
     if not os.path.exists(order_file):
-        print(f"Erreur: Le fichier '{order_file}' n'existe pas.")
+        log.error('order.file_missing', f"Erreur: Le fichier '{order_file}' n'existe pas.", file=order_file)
         sys.exit(1)
     
     if catalog_file and not os.path.exists(catalog_file):
-        print(f"Erreur: Le fichier catalogue '{catalog_file}' n'existe pas.")
+        log.error('order.catalog_missing', f"Erreur: Le fichier catalogue '{catalog_file}' n'existe pas.", catalog=catalog_file)
         sys.exit(1)
     
     # Traiter la commande
-    result = apply_dbc_prices(order_file, catalog_file, output_file, mode=mode)
+    with profile_run('order_pricing'):
+        result = apply_dbc_prices(order_file, catalog_file, output_file, mode=mode)
+    push_metrics('dbc-order-pricing')
     
     if result is None:
-        print("\n❌ Le traitement a échoué. Veuillez corriger les erreurs ci-dessus.")
+        log.error('order.failed', "\n❌ Le traitement a échoué. Veuillez corriger les erreurs ci-dessus.")
         sys.exit(1)
     else:
-        print("\n✅ Traitement terminé avec succès!")
+        log.info('order.succeeded', "\n✅ Traitement terminé avec succès!", **result.attrs['summary'])
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
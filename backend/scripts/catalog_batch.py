@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Traitement par lot de plusieurs fichiers catalogue (un fichier par cœur)
+
+- resolve_catalog_files: dossier ou motif glob -> liste triée de fichiers
+- process_catalog_batch: parsing + marges de chaque fichier dans un pool de
+  process, puis fusion déterministe (ordre des fichiers, résolution des
+  conflits de SKU) pour un diff / upsert unique dans catalog_processor
+- transform_catalog_batch: transform_catalog.py sur chaque fichier en parallèle
+
+Les fichiers sont toujours traités puis fusionnés dans l'ordre trié de leur
+chemin, quel que soit l'ordre de fin des workers: deux exécutions sur les
+mêmes fichiers produisent le même catalogue.
+"""
+
+import contextlib
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from pipeline_metrics import catalog_phase
+from pipeline_trace import log, span
+
+CATALOG_EXTENSIONS = ('.xlsx', '.xls')
+
+# Résolution des conflits quand un SKU apparaît dans plusieurs fichiers (ou lignes)
+#   last: la dernière occurrence dans l'ordre trié des fichiers l'emporte
+#         (listes de prix historiques nommées par date: la plus récente fait foi)
+#   first: la première occurrence l'emporte
+CONFLICT_POLICIES = ('last', 'first')
+
+
+def resolve_catalog_files(source):
+    """
+    Fichiers Excel (catalogues, commandes) désignés par un dossier, un motif glob ou un fichier
+
+    Les fichiers temporaires d'Excel (~$...) sont ignorés.
+    """
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    elif glob.has_magic(source):
+        paths = glob.glob(source)
+    else:
+        paths = [source]
+    paths = [
+        path for path in paths
+        if os.path.isfile(path)
+        and path.lower().endswith(CATALOG_EXTENSIONS)
+        and not os.path.basename(path).startswith('~$')
+    ]
+    if not paths:
+        raise Exception(f"Aucun fichier Excel trouvé pour: {source}")
+    return sorted(paths)
+
+
+def is_batch_source(source):
+    """Vrai si l'argument désigne plusieurs fichiers (dossier ou motif glob)"""
+    return os.path.isdir(source) or glob.has_magic(source)
+
+
+def default_workers(file_count):
+    return max(1, min(file_count, os.cpu_count() or 1))
+
+
+def _map_files(worker, items, workers):
+    """executor.map conserve l'ordre des entrées: la fusion reste déterministe"""
+    if workers <= 1 or len(items) <= 1:
+        return [worker(item) for item in items]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(worker, items))
+
+
+# ----------------------------------------------------------------------
+# Import catalogue
+# ----------------------------------------------------------------------
+
+def _process_file(path):
+    """Worker: parsing + marges d'un fichier (sans garde-fous, évalués après fusion)"""
+    from catalog_processor import process_catalog_file
+
+    products, stats = process_catalog_file(path)
+    # Recalculées sur le catalogue fusionné
+    stats.pop('facet_stats', None)
+    return path, products, stats
+
+
+def merge_products(results, on_conflict='last', max_examples=20):
+    """
+    Fusionne les produits de plusieurs fichiers, dans l'ordre des fichiers
+
+    Args:
+        results: liste de (chemin, produits, stats) dans l'ordre trié des fichiers
+        on_conflict: 'last' ou 'first' (voir CONFLICT_POLICIES)
+
+    Returns:
+        (produits fusionnés, nombre de conflits, exemples) où les exemples
+        sont des {'sku', 'kept', 'dropped'} (chemins des fichiers concernés)
+    """
+    if on_conflict not in CONFLICT_POLICIES:
+        raise ValueError(f"Politique de conflit inconnue: {on_conflict} (attendu: {', '.join(CONFLICT_POLICIES)})")
+
+    merged = {}
+    sources = {}
+    conflicts = 0
+    examples = []
+    for path, products, _ in results:
+        for product in products:
+            sku = product['sku']
+            previous = sources.get(sku)
+            if previous is None:
+                merged[sku] = product
+                sources[sku] = path
+                continue
+            conflicts += 1
+            if on_conflict == 'last':
+                # Le SKU garde sa position de première apparition, la valeur est remplacée
+                merged[sku] = product
+                sources[sku] = path
+                kept, dropped = path, previous
+            else:
+                kept, dropped = previous, path
+            if len(examples) < max_examples:
+                examples.append({'sku': sku, 'kept': kept, 'dropped': dropped})
+    return list(merged.values()), conflicts, examples
+
+
+def summarize_products(products):
+    """Statistiques de process_catalog_file recalculées sur une liste de produits"""
+    import pandas as pd
+    stats = {
+        'total': len(products),
+        'marginal': 0,
+        'non_marginal': 0,
+        'invalid_price': 0,
+        'active_products': 0,
+        'out_of_stock': 0
+    }
+    for product in products:
+        price_dbc = product['price_dbc']
+        if not price_dbc or pd.isna(price_dbc):
+            stats['invalid_price'] += 1
+        elif product['vat_type'] == 'Marginal':
+            stats['marginal'] += 1
+        else:
+            stats['non_marginal'] += 1
+        if product['is_active']:
+            stats['active_products'] += 1
+        else:
+            stats['out_of_stock'] += 1
+    return stats
+
+
+def products_facet_stats(products):
+    """compute_facet_stats sur les produits fusionnés (colonnes Foxway reconstituées)"""
+    import pandas as pd
+    from catalog_stats import compute_facet_stats
+
+    def column(key):
+        return [product[key] for product in products]
+
+    df = pd.DataFrame({
+        'Appearance': column('appearance'),
+        'Functionality': column('functionality'),
+        'Color': column('color'),
+        'Boxed': column('boxed'),
+        'Additional Info': column('additional_info'),
+        'VAT Type': column('vat_type'),
+        'Item Group': column('item_group'),
+        'Price': column('price'),
+        'Quantity': column('quantity'),
+    })
+    parsed_names = pd.DataFrame({
+        'brand': column('brand'),
+        'storage_gb': pd.array(column('storage_gb'), dtype='Int64'),
+    })
+    return compute_facet_stats(df, parsed_names)
+
+
+def process_catalog_batch(paths, workers=None, on_conflict='last'):
+    """
+    Parse et applique les marges de plusieurs fichiers en parallèle, puis fusionne
+
+    Returns:
+        (produits, stats) comme process_catalog_file; stats contient en plus
+        'files' (lignes par fichier) et 'sku_conflicts'
+    """
+    workers = workers or default_workers(len(paths))
+    log.info('catalog.batch', f"📚 Traitement de {len(paths)} fichiers ({workers} workers)",
+             files=len(paths), workers=workers)
+
+    with span('catalog.batch_pool', files=len(paths), workers=workers):
+        results = _map_files(_process_file, paths, workers)
+
+    with catalog_phase('merge', rows=sum(len(file_products) for _, file_products, _ in results)):
+        products, conflicts, examples = merge_products(results, on_conflict)
+
+        for conflict in examples[:log.sample_limit]:
+            log.debug('catalog.sku_conflict',
+                      f"🔀 {conflict['sku']}: conservé depuis {os.path.basename(conflict['kept'])}, "
+                      f"ignoré dans {os.path.basename(conflict['dropped'])}", **conflict)
+        if conflicts:
+            log.warning('catalog.sku_conflicts', f"⚠️ {conflicts} SKU en double entre les fichiers (politique: {on_conflict})",
+                        conflicts=conflicts, policy=on_conflict)
+
+        stats = summarize_products(products)
+        stats['files'] = [
+            {'file': os.path.basename(path), 'rows': file_stats['total'], 'products': len(file_products),
+             'rejected_cells': file_stats.get('rejected_cells', 0)}
+            for path, file_products, file_stats in results
+        ]
+        stats['rejected_cells'] = sum(entry['rejected_cells'] for entry in stats['files'])
+        stats['sku_conflicts'] = conflicts
+        stats['facet_stats'] = products_facet_stats(products)
+    return products, stats
+
+
+# ----------------------------------------------------------------------
+# Transformation en catalogue DBC
+# ----------------------------------------------------------------------
+
+def _transform_file(job):
+    """Worker: transform_catalog sur un fichier, sortie console du fichier masquée"""
+    from transform_catalog import transform_catalog
+
+    input_file, output_file = job
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        df_dbc = transform_catalog(input_file, output_file)
+    if df_dbc is None:
+        raise Exception(f"Transformation impossible (colonnes manquantes): {input_file}")
+    margins = df_dbc['Marge appliquée'].astype(str)
+    return {
+        'input': input_file,
+        'output': output_file,
+        'rows': len(df_dbc),
+        'marginal': int(margins.str.startswith('1%').sum()),
+        'non_marginal': int(margins.str.startswith('11%').sum()),
+        'invalid_price': int((margins == 'Prix invalide').sum()),
+    }
+
+
+def transform_catalog_batch(paths, output_dir=None, workers=None):
+    """
+    Transforme chaque fichier en catalogue DBC (un fichier de sortie par entrée)
+
+    Les sorties sont nommées catalogue_dbc_<nom du fichier>.xlsx dans output_dir
+    (dossier courant par défaut).
+    """
+    output_dir = output_dir or '.'
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or default_workers(len(paths))
+    jobs = [
+        (path, os.path.join(output_dir, f"catalogue_dbc_{os.path.splitext(os.path.basename(path))[0]}.xlsx"))
+        for path in paths
+    ]
+    return _map_files(_transform_file, jobs, workers)
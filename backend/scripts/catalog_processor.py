@@ -1,24 +1,32 @@
 #!/usr/bin/env python3
 """
 Script pour traiter les catalogues depuis l'API Next.js
+
+Lancé une fois par upload: pandas, numpy et supabase ne sont importés que
+sur les chemins qui les utilisent (un fichier identique au dernier import
+est reconnu sans charger pandas).
 """
 
-import pandas as pd
 import sys
 import os
 import json
+import time
 from datetime import datetime
-from dotenv import load_dotenv
-from supabase import create_client, Client
-
-# Charger les variables d'environnement
-# En local : depuis .env.local
-# En production : depuis l'environnement système
-load_dotenv('.env.local')  # Ignore l'erreur si le fichier n'existe pas
-load_dotenv()  # Charger depuis l'environnement système aussi
+from env_loader import load_env
+from import_guardrails import ImportGuardrail, ImportAborted
+from content_hash import combined_digest, file_digest, row_hash
+from pipeline_metrics import (
+    CATALOG_IMPORT_DURATION, CATALOG_IMPORT_FAILURES, CATALOG_IMPORT_LAST_SUCCESS, CATALOG_IMPORTS,
+    CATALOG_UNCHANGED_ROWS, CONTENT_DEDUP_HITS, DATABASE_CONNECTION_ERRORS, catalog_phase, push_metrics,
+    supabase_call
+)
+from pipeline_trace import log, profile_run, span
+from catalog_batch import CONFLICT_POLICIES, is_batch_source, process_catalog_batch, resolve_catalog_files
 
-def init_supabase() -> Client:
+def init_supabase():
     """Initialise le client Supabase"""
+    # En local : depuis .env.local / .env ; en production : environnement système
+    load_env()
     SUPABASE_URL = os.getenv('NEXT_PUBLIC_SUPABASE_URL')
     SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
     
@@ -29,24 +37,22 @@ def init_supabase() -> Client:
         raise Exception("Variable d'environnement SUPABASE_SERVICE_ROLE_KEY manquante")
     
     try:
+        from supabase import create_client
         return create_client(SUPABASE_URL, SUPABASE_KEY)
     except Exception as e:
+        DATABASE_CONNECTION_ERRORS.inc()
         raise Exception(f"Erreur connexion Supabase: {str(e)}")
 
-def apply_dbc_margins(row):
-    """Applique les marges DBC selon les règles"""
-    price = row.get('Price', 0)
-    vat_type = row.get('VAT Type', '')
+def apply_dbc_margins(price, vat_type):
+    """
+    Applique les marges DBC selon les règles
     
-    # Convertir le prix en nombre si c'est une chaîne
-    try:
-        price = float(price) if price else 0
-    except (ValueError, TypeError):
+    price: prix fournisseur déjà converti (NaN si absent ou rejeté, voir numeric_coercion.py)
+    """
+    import pandas as pd
+    if not price > 0:
         return 0, 'Prix invalide'
     
-    if pd.isna(price) or price == 0:
-        return price, 'Prix invalide'
-    
     if pd.notna(vat_type) and str(vat_type) == 'Marginal':
         # Produit marginal: multiplier par 1.01
         return round(price * 1.01, 2), '1% (marginal)'
@@ -54,32 +60,81 @@ def apply_dbc_margins(row):
         # Produit non marginal: multiplier par 1.11
         return round(price * 1.11, 2), '11% (non marginal)'
 
-def process_catalog_file(file_path):
+def preflight_catalog_file(file_path, existing_products, guardrail):
+    """
+    Contrôle les premières lignes du fichier avant le parsing complet
+    
+    Seules guardrail.min_rows lignes sont lues: un fichier dont les SKU ne
+    correspondent pas à la base est rejeté sans lire le reste du fichier.
+    """
+    import pandas as pd
+    from numeric_coercion import supplier_quantities
+    head = pd.read_excel(file_path, dtype={'SKU': str}, nrows=guardrail.min_rows)
+    if 'SKU' not in head.columns or 'Quantity' not in head.columns:
+        return
+    
+    probe = ImportGuardrail(min_rows=min(guardrail.min_rows, len(head)), abort_ratio=guardrail.abort_ratio)
+    probe.existing_total = guardrail.existing_total
+    probe.existing_lengths = guardrail.existing_lengths
+    probe.existing_examples = guardrail.existing_examples
+    
+    for sku, quantity in zip(head['SKU'], supplier_quantities(head['Quantity']).tolist()):
+        sku = str(sku).strip()
+        if sku and sku != 'nan':
+            probe.observe_catalog(sku, quantity, existing_products)
+    probe.check()
+
+def process_catalog_file(file_path, existing_products=None, guardrail=None):
     """
     Traite un fichier catalogue et retourne les statistiques
+    
+    Si existing_products et guardrail sont fournis, les garde-fous d'import
+    sont évalués pendant le parsing et le traitement s'arrête dès qu'ils
+    échouent.
     """
+    from catalog_schema import column_values, read_catalog
+    from catalog_stats import compute_facet_stats
+    from numeric_coercion import coerce_supplier_columns, report_rejected_cells, supplier_quantities
+    from product_name_parser import parse_product_names
     try:
         # Lire le fichier Excel en forçant la colonne SKU comme texte
-        print(f"📁 Lecture du fichier: {file_path}")
+        log.info('catalog.read', f"📁 Lecture du fichier: {file_path}", file=file_path)
         
-        # Spécifier les types de colonnes pour préserver les zéros de tête des SKU
-        dtype_dict = {'SKU': str}  # Forcer la colonne SKU en texte
+        if guardrail is not None and existing_products is not None:
+            preflight_catalog_file(file_path, existing_products, guardrail)
         
-        df = pd.read_excel(file_path, dtype=dtype_dict)
-        
-        print(f"📊 Fichier lu: {len(df)} lignes")
-        print(f"🔍 Colonnes détectées: {list(df.columns)}")
-        
-        # Vérifier les colonnes requises
-        required_columns = ['SKU', 'Product Name', 'Price', 'Quantity']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            raise Exception(f"Colonnes manquantes: {missing_columns}")
+        # SKU en texte (zéros de tête préservés), colonnes à faible cardinalité en
+        # catégories (voir catalog_schema.py)
+        with catalog_phase('parse') as timer:
+            df = read_catalog(file_path)
+            timer.rows = len(df)
+            
+            log.info('catalog.read', f"📊 Fichier lu: {len(df)} lignes", rows=len(df))
+            log.debug('catalog.columns', f"🔍 Colonnes détectées: {list(df.columns)}", columns=list(df.columns))
+            
+            # Vérifier les colonnes requises
+            required_columns = ['SKU', 'Product Name', 'Price', 'Quantity']
+            missing_columns = [col for col in required_columns if col not in df.columns]
+            
+            if missing_columns:
+                raise Exception(f"Colonnes manquantes: {missing_columns}")
+            
+            # Vérifier quelques SKU pour le debug
+            sample_skus = df['SKU'].head(5).tolist()
+            log.debug('catalog.sku_sample', f"📋 Échantillon de SKU: {sample_skus}", skus=sample_skus)
+            
+            # Marque / modèle / capacité / couleur extraits de Product Name en une passe
+            parsed_names = parse_product_names(df['Product Name'])
+            parsed_records = parsed_names.astype(object).where(parsed_names.notna(), None).to_dict('records')
         
-        # Vérifier quelques SKU pour le debug
-        sample_skus = df['SKU'].head(5).tolist()
-        print(f"📋 Échantillon de SKU: {sample_skus}")
+        # Price / Campaign Price / Quantity convertis colonne par colonne (formats régionaux
+        # acceptés); les cellules rejetées sont signalées en bloc au lieu de devenir 0
+        with catalog_phase('coerce', rows=len(df)):
+            numeric, rejects = coerce_supplier_columns(df)
+            report_rejected_cells(rejects, file=file_path)
+            prices = numeric['Price'].tolist()
+            campaign_prices = numeric['Campaign Price'].tolist() if 'Campaign Price' in numeric else [float('nan')] * len(df)
+            quantities = supplier_quantities(df['Quantity']).tolist()
         
         # Appliquer les marges DBC
         processed_products = []
@@ -89,378 +144,907 @@ def process_catalog_file(file_path):
             'non_marginal': 0,
             'invalid_price': 0,
             'active_products': 0,
-            'out_of_stock': 0
+            'out_of_stock': 0,
+            'rejected_cells': sum(column['rejected'] for column in rejects.values())
         }
+        if rejects:
+            stats['numeric_rejects'] = rejects
         
-        for _, row in df.iterrows():
-            price_dbc, margin_info = apply_dbc_margins(row)
+        with catalog_phase('margin', rows=len(df)):
+            # Colonnes décodées une fois (catégories: str() par valeur distincte et non par ligne).
+            # Cellule vide: 'nan' comme l'ancien str() par ligne (empreintes row_hash inchangées)
+            skus = column_values(df, 'SKU', missing='nan')
+            text_columns = {
+                key: column_values(df, column, missing='nan', absent='')
+                for key, column in (('item_group', 'Item Group'), ('product_name', 'Product Name'),
+                                    ('appearance', 'Appearance'), ('functionality', 'Functionality'), ('boxed', 'Boxed'))
+            }
+            colors = column_values(df, 'Color')
+            cloud_locks = column_values(df, 'Cloud Lock')
+            additional_infos = column_values(df, 'Additional Info')
+            vat_types = column_values(df, 'VAT Type')
             
-            # Convertir et valider les données
-            try:
-                # SKU déjà en format texte grâce au dtype
-                sku = str(row.get('SKU', '')).strip()
-                quantity = int(row.get('Quantity', 0)) if pd.notna(row.get('Quantity')) and str(row.get('Quantity')).isdigit() else 0
-                price = float(row.get('Price', 0)) if pd.notna(row.get('Price')) and str(row.get('Price')).replace('.', '').isdigit() else 0
-                
-                # Ignorer les lignes sans SKU ou avec des données invalides
+            for position in range(len(df)):
+                sku = skus[position].strip()
+                # Ignorer les lignes sans SKU
                 if not sku or sku == 'nan':
                     continue
                 
+                price = prices[position]
+                price_dbc, margin_info = apply_dbc_margins(price, vat_types[position])
+                parsed = parsed_records[position]
+                quantity = quantities[position]
+                campaign_price = campaign_prices[position]
+                
                 # Vérifier que le SKU a bien été préservé (pour debug)
                 if len(processed_products) < 3:  # Log seulement pour les premiers
-                    print(f"🔍 SKU traité: '{sku}' (longueur: {len(sku)})")
-                    
-            except (ValueError, TypeError) as e:
-                print(f"Ligne ignorée - erreur de conversion: {e}")
-                continue
-            
-            product = {
-                'sku': sku,
-                'item_group': str(row.get('Item Group', '')),
-                'product_name': str(row.get('Product Name', '')),
-                'appearance': str(row.get('Appearance', '')),
-                'functionality': str(row.get('Functionality', '')),
-                'boxed': str(row.get('Boxed', '')),
-                'color': str(row.get('Color', '')) if pd.notna(row.get('Color')) else None,
-                'cloud_lock': str(row.get('Cloud Lock', '')) if pd.notna(row.get('Cloud Lock')) else None,
-                'additional_info': str(row.get('Additional Info', '')) if pd.notna(row.get('Additional Info')) else None,
-                'quantity': quantity,
-                'price': price,
-                'campaign_price': float(row.get('Campaign Price')) if pd.notna(row.get('Campaign Price')) and str(row.get('Campaign Price')).replace('.', '').isdigit() else None,
-                'vat_type': str(row.get('VAT Type', '')) if pd.notna(row.get('VAT Type')) else None,
-                'price_dbc': price_dbc,
-                'is_active': quantity > 0
-            }
-            
-            processed_products.append(product)
-            
-            # Mise à jour des statistiques
-            if '1% (marginal)' in margin_info:
-                stats['marginal'] += 1
-            elif '11% (non marginal)' in margin_info:
-                stats['non_marginal'] += 1
-            else:
-                stats['invalid_price'] += 1
-            
-            if product['is_active']:
-                stats['active_products'] += 1
-            else:
-                stats['out_of_stock'] += 1
+                    log.debug('catalog.sku_processed', f"🔍 SKU traité: '{sku}' (longueur: {len(sku)})", sku=sku)
+                
+                product = {
+                    'sku': sku,
+                    'item_group': text_columns['item_group'][position],
+                    'product_name': text_columns['product_name'][position],
+                    'appearance': text_columns['appearance'][position],
+                    'functionality': text_columns['functionality'][position],
+                    'boxed': text_columns['boxed'][position],
+                    'color': colors[position] if colors[position] is not None else parsed['name_color'],
+                    'cloud_lock': cloud_locks[position],
+                    'additional_info': additional_infos[position],
+                    'quantity': quantity,
+                    'price': price if price > 0 else 0,
+                    'campaign_price': None if campaign_price != campaign_price else campaign_price,
+                    'vat_type': vat_types[position],
+                    'price_dbc': price_dbc,
+                    'brand': parsed['brand'],
+                    'model': parsed['model'],
+                    'storage_gb': parsed['storage_gb'],
+                    'is_active': quantity > 0
+                }
+                
+                processed_products.append(product)
+                
+                if guardrail is not None and existing_products is not None:
+                    guardrail.observe_catalog(sku, quantity, existing_products)
+                    if len(processed_products) % 500 == 0:
+                        guardrail.check()
+                
+                # Mise à jour des statistiques
+                if '1% (marginal)' in margin_info:
+                    stats['marginal'] += 1
+                elif '11% (non marginal)' in margin_info:
+                    stats['non_marginal'] += 1
+                else:
+                    stats['invalid_price'] += 1
+                
+                if product['is_active']:
+                    stats['active_products'] += 1
+                else:
+                    stats['out_of_stock'] += 1
+        
+        # Statistiques de facettes calculées en une passe groupée (sauvegardées avec l'import)
+        stats['facet_stats'] = compute_facet_stats(df, parsed_names, numeric)
         
         return processed_products, stats
         
+    except ImportAborted:
+        raise
     except Exception as e:
         raise Exception(f"Erreur traitement catalogue: {str(e)}")
 
-def save_import_to_database(supabase, new_skus, restocked_skus, missing_skus, total_imported, stats):
-    """Sauvegarde les données d'import dans la table catalog_imports"""
+# SKU envoyés par appel à record_catalog_import_items (taille de requête bornée)
+IMPORT_ITEMS_CHUNK = 5000
+# SKU conservés dans import_summary pour l'aperçu (résultat JSON, imports en double)
+IMPORT_PREVIEW_SIZE = 50
+
+def record_import_items(supabase, import_id, kind, skus):
+    """Enregistre les SKU d'un import dans catalog_import_items (identifiants entiers, par tranches)"""
+    recorded = 0
+    for start in range(0, len(skus), IMPORT_ITEMS_CHUNK):
+        with supabase_call('catalog_import_items', 'rpc'):
+            result = supabase.rpc('record_catalog_import_items', {
+                'p_import_id': import_id,
+                'p_kind': kind,
+                'p_skus': skus[start:start + IMPORT_ITEMS_CHUNK]
+            }).execute()
+        recorded += result.data or 0
+    return recorded
+
+def build_import_summary(new_skus, restocked_skus, missing_skus, stats, file_stats=None):
+    """import_summary de catalog_imports: comptes et aperçu, listes complètes dans catalog_import_items"""
+    return {
+        'stats': stats,
+        'new_skus_count': len(new_skus),
+        'restocked_skus_count': len(restocked_skus),
+        'missing_skus_count': len(missing_skus),
+        'total_new_products': len(new_skus) + len(restocked_skus),
+        'preview': {
+            'new': new_skus[:IMPORT_PREVIEW_SIZE],
+            'restocked': restocked_skus[:IMPORT_PREVIEW_SIZE],
+            'missing': missing_skus[:IMPORT_PREVIEW_SIZE]
+        },
+        # Statistiques du fichier, renvoyées si le même fichier est reçu à nouveau
+        'file_stats': file_stats
+    }
+
+def save_import_to_database(supabase, new_skus, restocked_skus, missing_skus, total_imported, stats, facet_stats=None,
+                            content_hash=None, file_stats=None):
+    """
+    Sauvegarde l'import dans catalog_imports et ses SKU dans catalog_import_items
+    
+    catalog_imports ne garde que les comptes et un aperçu; les listes complètes
+    se lisent page par page (get_catalog_import_skus).
+    """
     try:
-        # Identifier les SKU qui sont passés de 0 à en stock
-        # Cette logique est déjà gérée dans import_to_supabase mais on peut l'améliorer
-        
         import_data = {
             'import_date': datetime.now().isoformat(),
             'total_imported': total_imported,
             'total_updated': len(new_skus) + len(restocked_skus),
-            'new_skus': new_skus,
-            'restocked_skus': restocked_skus,
-            'missing_skus': missing_skus,
-            'import_summary': {
-                'stats': stats,
-                'new_skus_count': len(new_skus),
-                'restocked_skus_count': len(restocked_skus),
-                'missing_skus_count': len(missing_skus),
-                'total_new_products': len(new_skus) + len(restocked_skus)
-            }
+            'import_summary': build_import_summary(new_skus, restocked_skus, missing_skus, stats, file_stats),
+            # Agrégats précalculés lus par le dashboard et l'UI catalogue
+            'facet_stats': facet_stats,
+            # Empreinte du fichier importé (voir find_duplicate_import)
+            'content_hash': content_hash
         }
         
         # Insérer dans la table catalog_imports
-        result = supabase.table('catalog_imports').insert(import_data).execute()
+        with supabase_call('catalog_imports', 'insert'):
+            result = supabase.table('catalog_imports').insert(import_data).execute()
         
-        if result.data:
-            print(f"✅ Données d'import sauvegardées en base (ID: {result.data[0]['id']})")
-            return result.data[0]['id']
-        else:
-            print("⚠️ Aucune donnée retournée lors de la sauvegarde d'import")
+        if not result.data:
+            log.warning('catalog.import_saved', "⚠️ Aucune donnée retournée lors de la sauvegarde d'import")
             return None
+        import_id = result.data[0]['id']
+        log.info('catalog.import_saved', f"✅ Données d'import sauvegardées en base (ID: {import_id})", import_id=import_id)
             
     except Exception as e:
-        print(f"⚠️ Erreur sauvegarde import en base: {e}")
+        log.error('catalog.import_save_failed', f"⚠️ Erreur sauvegarde import en base: {e}", error=str(e))
         return None
+    
+    try:
+        recorded = sum(
+            record_import_items(supabase, import_id, kind, skus)
+            for kind, skus in (('new', new_skus), ('restocked', restocked_skus), ('missing', missing_skus))
+        )
+        log.info('catalog.import_items_saved', f"✅ {recorded} SKU enregistrés pour l'import", import_id=import_id, items=recorded)
+    except Exception as e:
+        log.error('catalog.import_items_failed', f"⚠️ Erreur sauvegarde des SKU de l'import: {e}", import_id=import_id, error=str(e))
+    return import_id
 
-def import_to_supabase(products):
-    """Importe les produits dans Supabase selon les règles métier DBC"""
+def find_duplicate_import(supabase, content_hash):
+    """
+    Dernier import si son empreinte est identique à celle du fichier reçu
+    
+    Seul le dernier import compte: réimporter un catalogue plus ancien après
+    un autre est un vrai changement d'état et doit être traité.
+    """
     try:
-        supabase = init_supabase()
-        
-        # Récupérer les produits existants avec leurs stocks actuels
-        existing_products = {}
+        with supabase_call('catalog_imports', 'select'):
+            result = supabase.table('catalog_imports').select(
+                'id, import_date, content_hash, total_imported, import_summary'
+            ).order('import_date', desc=True).limit(1).execute()
+    except Exception as e:
+        log.warning('catalog.duplicate_check_failed', f"⚠️ Vérification des doublons impossible: {e}", error=str(e))
+        return None
+    if result.data and result.data[0].get('content_hash') == content_hash:
+        return result.data[0]
+    return None
+
+def fetch_existing_products(supabase, guardrail=None):
+    """
+    Récupère les SKU existants, leur stock et leur prix fournisseur actuels (pagination Supabase)
+    
+    Chaque produit alimente les garde-fous au fil de la récupération.
+    Retourne une SkuStateTable (tableaux triés) plutôt qu'un dict Python.
+    """
+    import numpy as np
+    from sku_state import SkuStateTable, encode_skus
+    pages = []
+    with catalog_phase('fetch_existing') as timer:
         try:
             # Récupérer TOUS les produits (pas de limite)
             page_size = 1000
             offset = 0
             
             while True:
-                result = supabase.table('products').select('sku, quantity').range(offset, offset + page_size - 1).execute()
+                with supabase_call('products', 'select'):
+                    result = supabase.table('products').select('sku, quantity, row_hash, price').range(offset, offset + page_size - 1).execute()
                 
                 if not result.data:
                     break
-                    
-                for item in result.data:
-                    existing_products[item['sku']] = item['quantity']
+                
+                skus = [item['sku'] for item in result.data]
+                quantities = [item['quantity'] or 0 for item in result.data]
+                row_hashes = [item.get('row_hash') or 0 for item in result.data]
+                prices = [item.get('price') for item in result.data]
+                if guardrail is not None:
+                    for sku, quantity in zip(skus, quantities):
+                        guardrail.observe_existing(sku, quantity)
+                # Chaque page est convertie en tableaux compacts dès sa réception
+                pages.append((encode_skus(skus), np.asarray(quantities, dtype=np.int32), np.asarray(row_hashes, dtype=np.int64),
+                              np.asarray(prices, dtype=np.float64)))
                 
                 if len(result.data) < page_size:
                     break
                     
                 offset += page_size
-            
-            print(f"📊 Produits existants en base: {len(existing_products)}")
-            
-            # DEBUG: Afficher quelques SKU existants pour vérifier le format
-            if existing_products:
-                sample_existing = list(existing_products.keys())[:5]
-                print(f"🔍 Échantillon SKU existants: {sample_existing}")
-            else:
-                print("⚠️ ATTENTION: Aucun produit existant trouvé en base ! Tous seront considérés comme nouveaux.")
                 
         except Exception as e:
-            print(f"⚠️ Impossible de récupérer les stocks existants: {e}")
-            print("⚠️ TOUS les produits seront considérés comme nouveaux !")
+            log.error('catalog.fetch_existing_failed', f"⚠️ Impossible de récupérer les stocks existants: {e}", error=str(e))
+            log.warning('catalog.fetch_existing_failed', "⚠️ TOUS les produits seront considérés comme nouveaux !")
             # Continuer sans préservation de stock si erreur
+            pages = []
         
-        # DEBUG: Afficher quelques SKU du catalogue pour comparaison
-        if products:
-            sample_catalog = [p['sku'] for p in products[:5]]
-            print(f"🔍 Échantillon SKU catalogue: {sample_catalog}")
-        
-        # Identifier les nouveaux SKU et gérer les stocks selon les règles métier
-        new_skus = []
-        restocked_skus = []  # SKU qui passent de 0 à en stock
-        out_of_stock_skus = []  # SKU qui passent à 0 (retirés du catalogue)
+        existing_products = SkuStateTable.from_pages(pages)
+        timer.rows = len(existing_products)
+    log.info('catalog.existing', f"📊 Produits existants en base: {len(existing_products)} ({existing_products.nbytes / 1024:.0f} Ko)",
+             existing=len(existing_products), bytes=existing_products.nbytes)
+    
+    if not len(existing_products):
+        log.warning('catalog.existing', "⚠️ ATTENTION: Aucun produit existant trouvé en base ! Tous seront considérés comme nouveaux.")
+    
+    return existing_products
+
+def compute_import_delta(products, supabase, existing_products=None, guardrail=None):
+    """
+    Diff du catalogue avec la base, sans rien écrire (import direct et aperçu)
+    
+    existing_products / guardrail sont ceux alimentés pendant la récupération
+    et le parsing (voir main); à défaut ils sont calculés ici. Les produits
+    reçoivent is_active et, s'ils ont changé, leur empreinte row_hash.
+    
+    Returns:
+        dict updated_products (lignes à écrire), new_skus, restocked_skus,
+        out_of_stock_skus, missing_skus, unchanged_count, exact_matches,
+        existing_count, guardrail_report, price_changes
+    """
+    import numpy as np
+    from price_changes import compute_price_changes, report_price_changes
+    from sku_state import SkuStateTable, compute_changed_rows, compute_stock_diff, decode_skus
+    if existing_products is None:
+        guardrail = ImportGuardrail()
+        existing_products = fetch_existing_products(supabase, guardrail)
+    elif isinstance(existing_products, dict):
+        existing_products = SkuStateTable.from_columns(list(existing_products.keys()), list(existing_products.values()))
+    
+    if guardrail is None:
+        guardrail = ImportGuardrail()
+        for sku, quantity in existing_products.items():
+            guardrail.observe_existing(sku, quantity)
+    
+    # Usage direct (sans main): le catalogue n'a pas été observé pendant le parsing
+    if guardrail.catalog_rows == 0:
+        for product in products:
+            guardrail.observe_catalog(product['sku'], product['quantity'], existing_products)
+    
+    # DEBUG: Afficher quelques SKU du catalogue pour comparaison
+    if products:
+        sample_catalog = [p['sku'] for p in products[:5]]
+        log.debug('catalog.sku_sample', f"🔍 Échantillon SKU catalogue: {sample_catalog}", skus=sample_catalog)
+    
+    # Identifier les nouveaux SKU et gérer les stocks selon les règles métier
+    # Diff vectorisé sur tableaux triés (voir sku_state.compute_stock_diff)
+    with catalog_phase('diff', rows=len(products)):
+        catalog_skus = [product['sku'] for product in products]
+        catalog_quantities = [product['quantity'] for product in products]
+        diff = compute_stock_diff(existing_products, catalog_skus, catalog_quantities)
+        del catalog_skus, catalog_quantities
+    
+    # Variations de prix fournisseur et inversions de marge (rapport enregistré avec l'import)
+    with catalog_phase('price_check', rows=len(products)):
+        price_changes = compute_price_changes(existing_products, products)
+    report_price_changes(price_changes)
+    
+    # Règle métier: le stock du catalogue fait foi, un produit est actif s'il a du stock
+    # (nouveau ou restocké -> actif, retiré du catalogue fournisseur -> inactif)
+    for product in products:
+        product['is_active'] = product['quantity'] > 0
+    
+    # Empreinte de chaque ligne telle qu'écrite en base: les lignes identiques à
+    # l'import précédent (et non modifiées depuis, voir trigger sur products.row_hash)
+    # ne sont pas réécrites
+    with catalog_phase('row_hash', rows=len(products)):
+        hash_fields = sorted(field for field in products[0] if field != 'row_hash') if products else []
+        row_hashes = np.fromiter((row_hash(product, hash_fields) for product in products), dtype=np.int64, count=len(products))
+        changed = compute_changed_rows(existing_products, [product['sku'] for product in products], row_hashes)
         updated_products = []
-        exact_matches = 0  # Compteur pour diagnostiquer les correspondances
+        for product, product_hash, is_changed in zip(products, row_hashes.tolist(), changed.tolist()):
+            if is_changed:
+                product['row_hash'] = product_hash
+                updated_products.append(product)
+    unchanged_count = len(products) - len(updated_products)
+    CATALOG_UNCHANGED_ROWS.inc(unchanged_count)
+    if unchanged_count:
+        log.info('catalog.unchanged', f"⏭️ {unchanged_count} produits inchangés depuis le dernier import (non réécrits)",
+                 unchanged=unchanged_count)
+    
+    # Quelques exemples seulement pour éviter le spam de logs
+    for sku in decode_skus(diff['new'][:log.sample_limit]):
+        log.debug('catalog.sku_new', f"✨ {sku}: nouveau produit", sku=sku)
+    for sku in decode_skus(diff['restocked'][:log.sample_limit]):
+        log.debug('catalog.sku_restocked', f"🔄 {sku}: restocké (0 → en stock)", sku=sku)
+    for sku in decode_skus(diff['out_of_stock'][:log.sample_limit]):
+        log.debug('catalog.sku_out_of_stock', f"📦 {sku}: retiré du catalogue (→ 0)", sku=sku)
+    
+    return {
+        'updated_products': updated_products,
+        'new_skus': decode_skus(diff['new']),
+        'restocked_skus': decode_skus(diff['restocked']),  # SKU qui passent de 0 à en stock
+        'out_of_stock_skus': decode_skus(diff['out_of_stock']),  # SKU qui passent à 0 (retirés du catalogue)
+        'missing_skus': decode_skus(diff['missing']),  # En base mais absents du nouveau catalogue
+        'unchanged_count': unchanged_count,
+        'exact_matches': diff['exact_matches'],  # Compteur pour diagnostiquer les correspondances
+        'existing_count': len(existing_products),
+        # Garde-fous (statistiques accumulées pendant la récupération et le parsing)
+        'guardrail_report': guardrail.finalize(),
+        'price_changes': price_changes,
+    }
+
+def import_stats(total, delta, total_out_of_stock):
+    """Statistiques de l'import enregistrées dans import_summary (total: lignes du catalogue)"""
+    return {
+        'total': total,
+        'unchanged': delta['unchanged_count'],
+        'new_skus': len(delta['new_skus']),
+        'restocked_skus': len(delta['restocked_skus']),
+        'out_of_stock': total_out_of_stock,
+        'missing_skus': len(delta['missing_skus']),
+        'existing_in_db': delta['existing_count'],
+        'exact_matches': delta['exact_matches'],
+        'guardrails': delta['guardrail_report'],
+        'price_changes': delta['price_changes']
+    }
+
+# Lignes par upsert et SKU désactivés par tranche enregistrée dans le point de reprise
+UPSERT_BATCH_SIZE = 100
+DEACTIVATE_CHECKPOINT_SIZE = 100
+
+def import_to_supabase(products, facet_stats=None, supabase=None, existing_products=None, guardrail=None,
+                       content_hash=None, file_stats=None, checkpoint=None):
+    """
+    Importe les produits dans Supabase selon les règles métier DBC
+    
+    Seuls les produits nouveaux ou modifiés (empreinte row_hash) sont réécrits
+    (diff: voir compute_import_delta).
+    checkpoint: ImportCheckpoint (voir import_checkpoint.py). Le diff y est
+    enregistré avant toute écriture et chaque tranche terminée y est notée;
+    s'il contient déjà un diff, products est ignoré et seules les tranches
+    restantes sont envoyées.
+    """
+    from import_checkpoint import ImportCheckpoint
+    try:
+        if supabase is None:
+            supabase = init_supabase()
+        if checkpoint is None:
+            checkpoint = ImportCheckpoint()
         
-        for product in products:
-            sku = product['sku']
-            new_quantity = product['quantity']
-            
-            if sku in existing_products:
-                exact_matches += 1
-                # Produit existant : mettre à jour avec le nouveau stock du catalogue
-                old_quantity = existing_products[sku]
-                
-                if new_quantity == 0 and old_quantity > 0:
-                    # Produit retiré du catalogue fournisseur
-                    out_of_stock_skus.append(sku)
-                    product['is_active'] = False
-                    print(f"📦 {sku}: retiré du catalogue ({old_quantity} → 0)")
-                elif new_quantity > 0:
-                    # Produit avec stock
-                    product['is_active'] = True
-                    if old_quantity == 0:
-                        # SKU qui passe de 0 à en stock = restocké
-                        restocked_skus.append(sku)
-                        print(f"🔄 {sku}: restocké ({old_quantity} → {new_quantity})")
-                    elif old_quantity != new_quantity:
-                        if len(new_skus) < 3:  # Log seulement les premiers pour éviter le spam
-                            print(f"🔄 {sku}: stock mis à jour ({old_quantity} → {new_quantity})")
-                    # Si même quantité, pas de log (import identique)
-                # Note: On utilise TOUJOURS les nouvelles quantités du catalogue
-            else:
-                # Nouveau produit : SKU qui n'existait pas avant
-                if new_quantity > 0:
-                    new_skus.append(sku)
-                    product['is_active'] = True
-                    if len(new_skus) <= 10:  # Log seulement les 10 premiers
-                        print(f"✨ {sku}: nouveau produit avec stock {new_quantity}")
+        if checkpoint.resumed:
+            delta = checkpoint.delta
+        else:
+            delta = compute_import_delta(products, supabase, existing_products, guardrail)
+            with span('catalog.checkpoint_save', rows=len(delta['updated_products'])):
+                checkpoint.save_delta(delta, total=len(products), facet_stats=facet_stats, file_stats=file_stats)
+        updated_products = delta['updated_products']
+        new_skus = delta['new_skus']
+        restocked_skus = delta['restocked_skus']
+        
+        # Marquer comme en rupture les SKU qui étaient en base mais absents du nouveau catalogue
+        missing_skus = delta['missing_skus']
+        
+        # Une tranche n'est notée terminée que si toutes ses mises à jour ont réussi: sinon elle
+        # reste à faire et l'import échoue après les autres tranches (reprise via le checkpoint)
+        deactivate_failures = 0
+        with catalog_phase('deactivate', rows=len(missing_skus)):
+            for start, end in checkpoint.pending('deactivate', len(missing_skus), DEACTIVATE_CHECKPOINT_SIZE):
+                deactivated = 0
+                for existing_sku in missing_skus[start:end]:
+                    # Mettre à jour uniquement quantity et is_active
+                    try:
+                        with supabase_call('products', 'update'):
+                            supabase.table('products').update({
+                                'quantity': 0,
+                                'is_active': False,
+                                'row_hash': None
+                            }).eq('sku', existing_sku).execute()
+                        
+                        log.sample('catalog.sku_deactivated', f"🚫 {existing_sku}: marqué en rupture (absent du nouveau catalogue)", limit=5, sku=existing_sku)
+                        deactivated += 1
+                    except Exception as e:
+                        log.sample('catalog.deactivate_failed', f"⚠️ Erreur mise à jour rupture {existing_sku}: {e}", level='error', sku=existing_sku, error=str(e))
+                if deactivated == end - start:
+                    checkpoint.complete('deactivate', start, end, deactivated)
                 else:
-                    # Nouveau produit mais en rupture dans le catalogue
-                    product['is_active'] = False
-            
-            updated_products.append(product)
+                    deactivate_failures += end - start - deactivated
+        if deactivate_failures:
+            raise Exception(f"{deactivate_failures} SKU absents du catalogue non mis en rupture (relancer l'import pour reprendre)")
+        out_of_stock_count = len(delta['out_of_stock_skus']) + checkpoint.count('deactivate')
         
-        # DIAGNOSTIC IMPORTANT
-        print(f"\n🔍 DIAGNOSTIC D'IMPORT:")
-        print(f"  - Produits dans catalogue: {len(products)}")
-        print(f"  - Produits existants en base: {len(existing_products)}")
-        print(f"  - Correspondances exactes trouvées: {exact_matches}")
-        print(f"  - Nouveaux SKU détectés: {len(new_skus)}")
+        log.info('catalog.import_summary', (
+            f"\n📊 Résumé de l'import:\n"
+            f"  - Nouveaux SKU: {len(new_skus)}\n"
+            f"  - SKU restockés: {len(restocked_skus)}\n"
+            f"  - SKU mis en rupture: {out_of_stock_count}\n"
+            f"  - SKU manquants du catalogue: {len(missing_skus)}\n"
+            f"  - Inchangés (ignorés): {delta['unchanged_count']}\n"
+            f"  - Total à traiter: {len(updated_products)}"
+        ), new=len(new_skus), restocked=len(restocked_skus), out_of_stock=out_of_stock_count,
+            missing=len(missing_skus), unchanged=delta['unchanged_count'], total=len(updated_products))
         
-        # Calculer le pourcentage de nouveaux SKU
-        new_sku_percentage = (len(new_skus) / len(products)) * 100 if len(products) > 0 else 0
+        # Import par batch avec UPSERT (tranches déjà envoyées avant une interruption ignorées)
+        batch_size = UPSERT_BATCH_SIZE
+        total_imported = checkpoint.count('upsert')
+        if total_imported:
+            log.info('catalog.checkpoint_resume', f"⏩ Reprise: {total_imported}/{len(updated_products)} produits déjà importés",
+                     imported=total_imported, total=len(updated_products))
+        # Progression journalisée tous les ~10% plutôt qu'à chaque batch
+        progress_step = max(batch_size, (len(updated_products) // 10) // batch_size * batch_size)
         
-        if len(new_skus) > len(products) * 0.9:  # Plus de 90% considérés comme nouveaux
-            print(f"\n❌ ERREUR CRITIQUE: {len(new_skus)} nouveaux SKU sur {len(products)} total ({new_sku_percentage:.1f}%)")
-            print(f"❌ Cela indique un problème majeur :")
-            
-            if len(existing_products) == 0:
-                print(f"❌ La base de données products est VIDE !")
-                print(f"❌ Tous les produits sont considérés comme nouveaux")
-            else:
-                print(f"❌ Problème de correspondance des SKU")
-                
-                # Analyser les différences de format
-                existing_sample = list(existing_products.keys())[0]
-                catalog_sample = products[0]['sku']
-                print(f"❌ Exemple SKU base: '{existing_sample}' (type: {type(existing_sample)}, longueur: {len(str(existing_sample))})")
-                print(f"❌ Exemple SKU catalogue: '{catalog_sample}' (type: {type(catalog_sample)}, longueur: {len(str(catalog_sample))})")
+        with catalog_phase('upsert') as timer:
+            for i, end in checkpoint.pending('upsert', len(updated_products), batch_size):
+                batch = updated_products[i:end]
                 
-                # Vérifier si les SKU du catalogue sont présents en base avec des variantes
-                catalog_sample_variants = [
-                    str(catalog_sample).strip(),
-                    str(catalog_sample).strip().upper(),
-                    str(catalog_sample).strip().lower(),
-                    str(catalog_sample).replace(' ', ''),
-                    str(catalog_sample).replace('-', ''),
-                ]
+                # Upsert : insert ou update si SKU existe déjà
+                with supabase_call('products', 'upsert'):
+                    result = supabase.table('products').upsert(
+                        batch,
+                        on_conflict='sku',
+                        ignore_duplicates=False
+                    ).execute()
+                checkpoint.complete('upsert', i, end, len(batch))
                 
-                found_variants = []
-                for variant in catalog_sample_variants:
-                    if variant in existing_products:
-                        found_variants.append(variant)
-                
-                if found_variants:
-                    print(f"❌ Variantes trouvées en base: {found_variants}")
-                    print(f"❌ Problème de normalisation des SKU détecté !")
+                total_imported += len(batch)
+                timer.rows = total_imported
+                if total_imported % progress_step == 0 or total_imported == len(updated_products):
+                    log.info('catalog.upsert_progress', f"📤 Importé: {total_imported}/{len(updated_products)} produits...",
+                             imported=total_imported, total=len(updated_products))
                 else:
-                    print(f"❌ Aucune variante du SKU catalogue trouvée en base")
-            
-            print(f"\n❌ IMPORT ANNULÉ - INTERVENTION MANUELLE REQUISE")
-            print(f"❌ Veuillez vérifier :")
-            print(f"❌ 1. Que la base de données products contient bien des données")
-            print(f"❌ 2. Que le format des SKU est cohérent")
-            print(f"❌ 3. Que le fichier catalogue est correct")
-            
-            # Annuler l'import et retourner une erreur
-            raise Exception(f"Import annulé : {new_sku_percentage:.1f}% de nouveaux SKU détectés (seuil: 90%). Problème de correspondance des données.")
+                    log.debug('catalog.upsert_progress', f"📤 Importé: {total_imported}/{len(updated_products)} produits...",
+                              imported=total_imported, total=len(updated_products))
         
-        elif len(new_skus) > len(products) * 0.5:  # Plus de 50% considérés comme nouveaux
-            print(f"\n⚠️ AVERTISSEMENT: {len(new_skus)} nouveaux SKU sur {len(products)} total ({new_sku_percentage:.1f}%)")
-            print(f"⚠️ Pourcentage élevé de nouveaux produits. Vérifiez que c'est normal.")
-            
-            # Afficher quelques exemples pour diagnostic
-            if existing_products and products:
-                print(f"⚠️ Exemples de comparaison :")
-                sample_existing = list(existing_products.keys())[:3]
-                sample_catalog = [p['sku'] for p in products[:3]]
-                print(f"⚠️ SKU en base: {sample_existing}")
-                print(f"⚠️ SKU catalogue: {sample_catalog}")
-        else:
-            print(f"✅ Pourcentage de nouveaux SKU normal: {new_sku_percentage:.1f}%")
-        
-        # Marquer comme en rupture les SKU qui étaient en base mais absents du nouveau catalogue
-        catalog_skus = set(product['sku'] for product in products)
-        missing_skus = []
+        # Sauvegarder les données d'import en base de données
+        with catalog_phase('record_import'):
+            import_id = save_import_to_database(supabase, new_skus, restocked_skus, missing_skus, total_imported,
+                                                import_stats(checkpoint.context['total'], delta, out_of_stock_count),
+                                                facet_stats, content_hash=content_hash, file_stats=file_stats)
         
-        for existing_sku, old_quantity in existing_products.items():
-            if existing_sku not in catalog_skus and old_quantity > 0:
-                # Ce SKU n'est plus dans le nouveau catalogue mais était actif
-                missing_skus.append(existing_sku)
-                
-                # Mettre à jour uniquement quantity et is_active
-                try:
-                    supabase.table('products').update({
-                        'quantity': 0,
-                        'is_active': False
-                    }).eq('sku', existing_sku).execute()
-                    
-                    if len(missing_skus) <= 5:  # Log seulement les premiers
-                        print(f"🚫 {existing_sku}: marqué en rupture (absent du nouveau catalogue)")
-                    out_of_stock_skus.append(existing_sku)
-                except Exception as e:
-                    print(f"⚠️ Erreur mise à jour rupture {existing_sku}: {e}")
+        return total_imported, new_skus, restocked_skus, out_of_stock_count, import_id
         
-        print(f"\n📊 Résumé de l'import:")
-        print(f"  - Nouveaux SKU: {len(new_skus)}")
-        print(f"  - SKU restockés: {len(restocked_skus)}")
-        print(f"  - SKU mis en rupture: {len(out_of_stock_skus)}")
-        print(f"  - SKU manquants du catalogue: {len(missing_skus)}")
-        print(f"  - Total à traiter: {len(updated_products)}")
+    except ImportAborted:
+        raise
+    except Exception as e:
+        raise Exception(f"Erreur import Supabase: {str(e)}")
+
+# Lignes de produits envoyées par appel à stage_catalog_import_items
+IMPORT_STAGE_CHUNK = 1000
+# SQLSTATE des refus de commit_catalog_import_stage (aperçu périmé ou non applicable)
+STAGE_CONFLICT_CODE = 'DBC01'
+
+def stage_catalog_import(products, facet_stats=None, supabase=None, existing_products=None, guardrail=None,
+                         content_hash=None, file_stats=None):
+    """
+    Aperçu d'import: diff complet stocké dans catalog_import_stages / catalog_import_stage_items
+    
+    Rien n'est écrit dans products. L'aperçu se relit page par page
+    (get_catalog_import_stage_items) puis s'applique avec commit_catalog_import_stage.
+    
+    Returns:
+        (stage_id, comptes par type de changement)
+    """
+    try:
+        if supabase is None:
+            supabase = init_supabase()
         
-        # Import par batch avec UPSERT
-        batch_size = 100
-        total_imported = 0
+        delta = compute_import_delta(products, supabase, existing_products, guardrail)
+        missing_skus = delta['missing_skus']
+        total_out_of_stock = len(delta['out_of_stock_skus']) + len(missing_skus)
+        import_summary = build_import_summary(
+            delta['new_skus'], delta['restocked_skus'], missing_skus,
+            import_stats(len(products), delta, total_out_of_stock), file_stats
+        )
+        # SKU en double dans le catalogue: la dernière occurrence l'emporte, comme à l'upsert
+        staged_products = list({product['sku']: product for product in delta['updated_products']}.values())
         
-        for i in range(0, len(updated_products), batch_size):
-            batch = updated_products[i:i + batch_size]
+        with catalog_phase('stage', rows=len(staged_products) + len(missing_skus)) as timer:
+            with supabase_call('catalog_import_stages', 'insert'):
+                result = supabase.table('catalog_import_stages').insert({
+                    'content_hash': content_hash,
+                    'import_summary': import_summary,
+                    'facet_stats': facet_stats
+                }).execute()
+            stage_id = result.data[0]['id']
             
-            # Upsert : insert ou update si SKU existe déjà
-            result = supabase.table('products').upsert(
-                batch,
-                on_conflict='sku',
-                ignore_duplicates=False
-            ).execute()
+            staged = 0
+            for start in range(0, len(staged_products), IMPORT_STAGE_CHUNK):
+                with supabase_call('catalog_import_stage_items', 'rpc'):
+                    result = supabase.rpc('stage_catalog_import_items', {
+                        'p_stage_id': stage_id,
+                        'p_products': staged_products[start:start + IMPORT_STAGE_CHUNK]
+                    }).execute()
+                staged += result.data or 0
+                timer.rows = staged
+            for start in range(0, len(missing_skus), IMPORT_ITEMS_CHUNK):
+                with supabase_call('catalog_import_stage_items', 'rpc'):
+                    result = supabase.rpc('stage_catalog_import_items', {
+                        'p_stage_id': stage_id,
+                        'p_missing_skus': missing_skus[start:start + IMPORT_ITEMS_CHUNK]
+                    }).execute()
+                staged += result.data or 0
+                timer.rows = staged
             
-            total_imported += len(batch)
-            print(f"📤 Importé: {total_imported}/{len(updated_products)} produits...")
-        
-        # Calculer les vraies statistiques finales
-        total_out_of_stock = len(out_of_stock_skus)  # Inclut les SKU du catalogue + les SKU manquants
-        
-        # Sauvegarder les données d'import en base de données
-        import_id = save_import_to_database(supabase, new_skus, restocked_skus, missing_skus, total_imported, {
-            'total': len(updated_products),
-            'new_skus': len(new_skus),
-            'restocked_skus': len(restocked_skus),
-            'out_of_stock': total_out_of_stock,
-            'missing_skus': len(missing_skus),
-            'existing_in_db': len(existing_products),
-            'exact_matches': exact_matches
-        })
-        
-        return total_imported, new_skus, restocked_skus, total_out_of_stock
+            with supabase_call('catalog_import_stages', 'rpc'):
+                change_counts = supabase.rpc('seal_catalog_import_stage', {'p_stage_id': stage_id}).execute().data
         
+        log.info('catalog.staged', (
+            f"\n🔎 Aperçu d'import {stage_id} (rien n'est encore écrit dans products):\n"
+            f"  - Nouveaux: {change_counts['new']}\n"
+            f"  - Restockés: {change_counts['restocked']}\n"
+            f"  - Prix modifiés: {change_counts['price_changed']}\n"
+            f"  - Désactivés: {change_counts['deactivated']}\n"
+            f"  - Autres modifications: {change_counts['updated']}\n"
+            f"  - Inchangés: {delta['unchanged_count']}"
+        ), stage_id=stage_id, unchanged=delta['unchanged_count'], **change_counts)
+        return stage_id, change_counts
+    
+    except ImportAborted:
+        raise
     except Exception as e:
-        raise Exception(f"Erreur import Supabase: {str(e)}")
+        raise Exception(f"Erreur chargement de l'import (table d'étape): {str(e)}")
+
+def commit_catalog_import_stage(stage_id, supabase=None):
+    """
+    Applique un aperçu d'import en une transaction (fonction SQL commit_catalog_import_stage)
+    
+    Le diff n'est pas recalculé. Refusé (SQLSTATE STAGE_CONFLICT_CODE) si un
+    autre import a été appliqué depuis l'aperçu.
+    
+    Returns:
+        dict import_id / upserted / deactivated
+    """
+    if supabase is None:
+        supabase = init_supabase()
+    with catalog_phase('commit_stage'):
+        with supabase_call('catalog_import_stages', 'rpc'):
+            result = supabase.rpc('commit_catalog_import_stage', {'p_stage_id': stage_id}).execute()
+    committed = result.data[0]
+    log.info('catalog.stage_committed', f"✅ Aperçu {stage_id} appliqué: {committed['upserted']} produits écrits, "
+             f"{committed['deactivated']} désactivés (import {committed['import_id']})", stage_id=stage_id, **committed)
+    return committed
+
+def duplicate_import_result(duplicate):
+    """Résultat JSON d'un import précédent réutilisé (rien n'est réécrit)"""
+    summary = duplicate.get('import_summary') or {}
+    preview = summary.get('preview') or {}
+    return {
+        'success': True,
+        'import_id': duplicate['id'],
+        'duplicate_of': {'import_id': duplicate['id'], 'import_date': duplicate['import_date']},
+        'stats': summary.get('file_stats') or summary.get('stats') or {},
+        'imported_count': 0,
+        'new_skus_count': summary.get('new_skus_count', 0),
+        'new_skus': preview.get('new', []),
+        'restocked_skus_count': summary.get('restocked_skus_count', 0),
+        'restocked_skus': preview.get('restocked', [])
+    }
+
+def latest_import_id(supabase):
+    """Identifiant du dernier import enregistré (None si aucun), comme latest_catalog_import_id() en SQL"""
+    with supabase_call('catalog_imports', 'select'):
+        latest = supabase.table('catalog_imports').select('id') \
+            .order('import_date', desc=True).limit(1).execute().data
+    return latest[0]['id'] if latest else None
+
+def find_resumable_stage(supabase, content_hash):
+    """
+    Import atomique déjà chargé pour ce fichier mais pas appliqué (échec ou coupure au commit)
+    
+    Seul un chargement complet ('staged') calculé sur le dernier import est
+    repris: il s'applique tel quel, sans relire le fichier ni recalculer le diff.
+    """
+    try:
+        base_import_id = latest_import_id(supabase)
+        query = supabase.table('catalog_import_stages').select('id, created_at') \
+            .eq('status', 'staged').eq('content_hash', content_hash)
+        query = query.eq('base_import_id', base_import_id) if base_import_id else query.is_('base_import_id', 'null')
+        with supabase_call('catalog_import_stages', 'select'):
+            result = query.order('created_at', desc=True).limit(1).execute()
+    except Exception as e:
+        log.warning('catalog.resume_check_failed', f"⚠️ Recherche d'un import déjà chargé impossible: {e}", error=str(e))
+        return None
+    return result.data[0] if result.data else None
+
+def open_import_checkpoint(supabase, content_hash, fresh=False):
+    """
+    Point de reprise de l'import direct de ce fichier (voir import_checkpoint.py)
+    
+    fresh: point de reprise existant ignoré et supprimé (--force)
+    
+    Returns:
+        ImportCheckpoint (resumed: diff d'une tentative interrompue), None si
+        le dernier import n'a pas pu être lu (validité non vérifiable)
+    """
+    from import_checkpoint import ImportCheckpoint
+    try:
+        base_import_id = latest_import_id(supabase)
+    except Exception as e:
+        log.warning('catalog.checkpoint_unavailable', f"⚠️ Point de reprise désactivé, dernier import illisible: {e}", error=str(e))
+        return None
+    return ImportCheckpoint.open(content_hash, base_import_id, fresh)
+
+def staged_import_result(supabase, stage_id, committed):
+    """Résultat JSON (format run_catalog_import) d'un import appliqué depuis catalog_import_stages"""
+    with supabase_call('catalog_import_stages', 'select'):
+        stage = supabase.table('catalog_import_stages').select('import_summary') \
+            .eq('id', stage_id).limit(1).execute().data[0]
+    summary = stage['import_summary'] or {}
+    preview = summary.get('preview') or {}
+    stats = dict(summary.get('file_stats') or {})
+    stats['out_of_stock'] = (summary.get('stats') or {}).get('out_of_stock', stats.get('out_of_stock'))
+    return {
+        'success': True,
+        'stage_id': stage_id,
+        'stats': stats,
+        'import_id': committed['import_id'],
+        'imported_count': committed['upserted'],
+        'new_skus_count': summary.get('new_skus_count', 0),
+        'new_skus': preview.get('new', []),
+        'restocked_skus_count': summary.get('restocked_skus_count', 0),
+        'restocked_skus': preview.get('restocked', [])
+    }
+
+def resume_staged_import(supabase, content_hash):
+    """
+    Applique le chargement atomique déjà fait pour ce fichier (find_resumable_stage)
+    
+    Returns:
+        dict résultat (avec 'resumed': True), ou None s'il n'y a rien à reprendre
+        ou si un autre import l'a rendu périmé entre-temps (import complet à refaire)
+    """
+    resumable = find_resumable_stage(supabase, content_hash)
+    if resumable is None:
+        return None
+    stage_id = resumable['id']
+    log.info('catalog.stage_resumed', f"♻️ Import {stage_id} déjà chargé pour ce fichier ({resumable['created_at']}): "
+             f"application sans retraitement", stage_id=stage_id, content_hash=content_hash)
+    try:
+        committed = commit_catalog_import_stage(stage_id, supabase)
+    except Exception as e:
+        if getattr(e, 'code', None) != STAGE_CONFLICT_CODE:
+            raise
+        log.warning('catalog.stage_stale', f"⚠️ Import {stage_id} périmé, rechargement complet: {e}", stage_id=stage_id)
+        return None
+    return {**staged_import_result(supabase, stage_id, committed), 'resumed': True}
+
+def refresh_catalog_snapshot(supabase, import_id):
+    """
+    Réécrit l'instantané binaire du catalogue actif après un import appliqué
+    (catalog_snapshot.py); un échec n'annule pas l'import, il est seulement signalé
+    """
+    from catalog_snapshot import export_catalog_snapshot
+    try:
+        export_catalog_snapshot(supabase, import_id=import_id)
+    except Exception as e:
+        log.warning('catalog.snapshot_failed', f"⚠️ Instantané catalogue non mis à jour: {e}", import_id=import_id)
+
+def run_catalog_import(file_path, workers=None, on_conflict='last', force=False, preview=False, atomic=False,
+                       supabase=None):
+    """
+    Import complet d'un catalogue (fichier, dossier ou motif) dans Supabase
+    
+    Utilisé par main() et par l'API (exécuté dans un process du pool).
+    preview: diff stocké comme aperçu sans toucher à products (voir
+    stage_catalog_import), appliqué ensuite par commit_staged_import.
+    atomic: même chargement que l'aperçu, appliqué aussitôt en une transaction
+    (jamais de products à moitié écrit). Relancé avec le même fichier après un
+    échec au commit, le chargement existant est appliqué sans retraitement.
+    Import direct (ni l'un ni l'autre): point de reprise par fichier, une
+    relance après un échec reprend à la première tranche non envoyée.
+    supabase: client déjà initialisé (benchmarks), init_supabase() sinon.
+    
+    Returns:
+        dict résultat (celui imprimé en JSON par main); lève une exception en cas d'échec
+    """
+    started = time.perf_counter()
+    try:
+        with profile_run('catalog_import'):
+            # Récupérer l'état actuel de la base avant le parsing pour évaluer
+            # les garde-fous au fil de la lecture du fichier
+            if supabase is None:
+                supabase = init_supabase()
+            
+            # Même fichier (ou même lot) que le dernier import: résultat précédent, sans retraitement
+            batch_files = resolve_catalog_files(file_path) if is_batch_source(file_path) else None
+            with span('catalog.content_hash'):
+                if batch_files is None:
+                    content_hash = file_digest(file_path)
+                else:
+                    content_hash = combined_digest(*(file_digest(path) for path in batch_files), on_conflict)
+            duplicate = None if force else find_duplicate_import(supabase, content_hash)
+            if duplicate is not None:
+                log.info('catalog.duplicate', f"♻️ Fichier identique au dernier import ({duplicate['import_date']}): résultat précédent réutilisé",
+                         import_id=duplicate['id'], content_hash=content_hash)
+                CONTENT_DEDUP_HITS.labels(kind='catalog').inc()
+                CATALOG_IMPORT_DURATION.set(time.perf_counter() - started)
+                return duplicate_import_result(duplicate)
+            
+            if atomic and not force:
+                result = resume_staged_import(supabase, content_hash)
+                if result is not None:
+                    refresh_catalog_snapshot(supabase, result['import_id'])
+                    CATALOG_IMPORTS.inc()
+                    CATALOG_IMPORT_LAST_SUCCESS.set_to_current_time()
+                    CATALOG_IMPORT_DURATION.set(time.perf_counter() - started)
+                    return result
+            
+            # Import direct interrompu pour ce fichier: diff enregistré repris, fichier non relu
+            checkpoint = None if preview or atomic else open_import_checkpoint(supabase, content_hash, fresh=force)
+            if checkpoint is not None and checkpoint.resumed:
+                log.info('catalog.checkpoint_resume', "⏩ Reprise de l'import interrompu de ce fichier (diff enregistré, fichier non relu)",
+                         content_hash=content_hash, completed=checkpoint.progress['counts'])
+                products, existing_products, guardrail = None, None, None
+                stats = dict(checkpoint.context['file_stats'] or {})
+                facet_stats = checkpoint.context['facet_stats']
+            else:
+                guardrail = ImportGuardrail()
+                existing_products = fetch_existing_products(supabase, guardrail)
+                
+                # Traiter le catalogue (mode lot: garde-fous évalués sur le catalogue fusionné)
+                if batch_files is not None:
+                    files = batch_files
+                    with span('catalog.process_batch', files=len(files)):
+                        products, stats = process_catalog_batch(files, workers, on_conflict)
+                else:
+                    with span('catalog.process_file', file=file_path):
+                        products, stats = process_catalog_file(file_path, existing_products, guardrail)
+                facet_stats = stats.pop('facet_stats', None)
+                
+                log.info('catalog.processed', (
+                    f"\n=== TRAITEMENT TERMINÉ ===\n"
+                    f"Total produits: {stats['total']}\n"
+                    f"Marginaux (1%): {stats['marginal']}\n"
+                    f"Non marginaux (11%): {stats['non_marginal']}\n"
+                    f"Prix invalides: {stats['invalid_price']}\n"
+                    f"Cellules numériques rejetées: {stats.get('rejected_cells', 0)}\n"
+                    f"Produits actifs: {stats['active_products']}\n"
+                    f"En rupture: {stats['out_of_stock']}"
+                ), **stats)
+            
+            if preview or atomic:
+                log.info('catalog.import', "\n=== APERÇU D'IMPORT ===" if preview else "\n=== IMPORT SUPABASE (ATOMIQUE) ===")
+                with span('catalog.stage_import', products=len(products)):
+                    stage_id, change_counts = stage_catalog_import(
+                        products, facet_stats, supabase=supabase, existing_products=existing_products,
+                        guardrail=guardrail, content_hash=content_hash, file_stats=dict(stats)
+                    )
+                if preview:
+                    CATALOG_IMPORT_DURATION.set(time.perf_counter() - started)
+                    return {
+                        'success': True,
+                        'preview': True,
+                        'stage_id': stage_id,  # Lignes: get_catalog_import_stage_items / GET /api/catalog/imports/staged/{id}/items
+                        'stats': stats,
+                        'change_counts': change_counts
+                    }
+                with span('catalog.commit_stage', stage_id=stage_id):
+                    committed = commit_catalog_import_stage(stage_id, supabase)
+                result = staged_import_result(supabase, stage_id, committed)
+            else:
+                # Importer dans Supabase
+                log.info('catalog.import', f"\n=== IMPORT SUPABASE ===")
+                with span('catalog.import_to_supabase', products=stats.get('total')):
+                    imported_count, new_skus, restocked_skus, actual_out_of_stock, import_id = import_to_supabase(
+                        products, facet_stats, supabase=supabase, existing_products=existing_products, guardrail=guardrail,
+                        content_hash=content_hash, file_stats=dict(stats), checkpoint=checkpoint
+                    )
+                if checkpoint is not None:
+                    checkpoint.discard()
+                log.info('catalog.imported', (
+                    f"✅ {imported_count} produits importés/mis à jour dans Supabase\n"
+                    f"✅ {len(new_skus)} nouveaux SKU ajoutés\n"
+                    f"✅ {actual_out_of_stock} produits passés en rupture"
+                ), imported=imported_count, new=len(new_skus), out_of_stock=actual_out_of_stock)
+                
+                # Mettre à jour les stats avec les vraies valeurs calculées après import
+                stats['out_of_stock'] = actual_out_of_stock
+                result = {
+                    'success': True,
+                    'stats': stats,
+                    'import_id': import_id,  # Listes complètes: get_catalog_import_skus / GET /api/catalog/imports/{id}/skus
+                    'imported_count': imported_count,
+                    'new_skus_count': len(new_skus),  # Nombre total réel
+                    'new_skus': new_skus[:IMPORT_PREVIEW_SIZE],  # Aperçu seulement
+                    'restocked_skus_count': len(restocked_skus),
+                    'restocked_skus': restocked_skus[:IMPORT_PREVIEW_SIZE]
+                }
+    except Exception as e:
+        CATALOG_IMPORT_FAILURES.labels(reason='guardrail' if isinstance(e, ImportAborted) else 'error').inc()
+        CATALOG_IMPORT_DURATION.set(time.perf_counter() - started)
+        raise
+    
+    refresh_catalog_snapshot(supabase, result['import_id'])
+    CATALOG_IMPORTS.inc()
+    CATALOG_IMPORT_LAST_SUCCESS.set_to_current_time()
+    CATALOG_IMPORT_DURATION.set(time.perf_counter() - started)
+    return result
+
+def commit_staged_import(stage_id):
+    """
+    Applique un aperçu d'import (CLI --commit, API), sans relire le fichier ni recalculer le diff
+    
+    Returns:
+        dict résultat au format de run_catalog_import
+    """
+    started = time.perf_counter()
+    try:
+        with profile_run('catalog_commit_stage'):
+            supabase = init_supabase()
+            committed = commit_catalog_import_stage(stage_id, supabase)
+            result = staged_import_result(supabase, stage_id, committed)
+    except Exception:
+        CATALOG_IMPORT_FAILURES.labels(reason='error').inc()
+        CATALOG_IMPORT_DURATION.set(time.perf_counter() - started)
+        raise
+    
+    refresh_catalog_snapshot(supabase, result['import_id'])
+    CATALOG_IMPORTS.inc()
+    CATALOG_IMPORT_LAST_SUCCESS.set_to_current_time()
+    CATALOG_IMPORT_DURATION.set(time.perf_counter() - started)
+    return result
 
 def main():
     """Fonction principale pour usage en ligne de commande"""
+    load_env()
     if len(sys.argv) < 2:
-        print("Usage: python catalog_processor.py <fichier_catalogue.xlsx>")
+        print("Usage: python catalog_processor.py <fichier_catalogue.xlsx | dossier | 'motif*.xlsx'> [--workers=N] [--on-conflict=last|first] [--force] [--preview | --atomic]")
+        print("       python catalog_processor.py --commit=<stage_id>")
+        print("\nAvec un dossier ou un motif, les fichiers sont traités en parallèle puis fusionnés")
+        print("(un SKU présent dans plusieurs fichiers: le dernier fichier dans l'ordre trié l'emporte par défaut).")
+        print("Un fichier identique au dernier import n'est pas retraité (--force pour l'importer quand même).")
+        print("--preview: diff stocké comme aperçu sans modifier products, appliqué ensuite avec --commit=<stage_id>.")
+        print("--atomic: chargement en table d'étape puis application en une transaction (relance sans retraitement).")
         sys.exit(1)
     
+    if sys.argv[1].startswith('--commit='):
+        try:
+            result = commit_staged_import(sys.argv[1].split('=', 1)[1])
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        push_metrics('dbc-catalog-import')
+        print("\n" + json.dumps(result))
+        sys.exit(0 if result['success'] else 1)
+    
     file_path = sys.argv[1]
+    workers = None
+    on_conflict = 'last'
+    force = False
+    preview = False
+    atomic = False
+    for arg in sys.argv[2:]:
+        if arg == '--force':
+            force = True
+        elif arg == '--preview':
+            preview = True
+        elif arg == '--atomic':
+            atomic = True
+        elif arg.startswith('--workers='):
+            workers = int(arg.split('=', 1)[1])
+        elif arg.startswith('--on-conflict='):
+            on_conflict = arg.split('=', 1)[1]
+            if on_conflict not in CONFLICT_POLICIES:
+                print(f"Erreur: Politique de conflit invalide '{on_conflict}'. Utilisez {' ou '.join(CONFLICT_POLICIES)}.")
+                sys.exit(1)
     
     try:
-        # Traiter le catalogue
-        products, stats = process_catalog_file(file_path)
-        
-        print(f"\n=== TRAITEMENT TERMINÉ ===")
-        print(f"Total produits: {stats['total']}")
-        print(f"Marginaux (1%): {stats['marginal']}")
-        print(f"Non marginaux (11%): {stats['non_marginal']}")
-        print(f"Prix invalides: {stats['invalid_price']}")
-        print(f"Produits actifs: {stats['active_products']}")
-        print(f"En rupture: {stats['out_of_stock']}")
-        
-        # Importer dans Supabase
-        print(f"\n=== IMPORT SUPABASE ===")
-        imported_count, new_skus, restocked_skus, actual_out_of_stock = import_to_supabase(products)
-        print(f"✅ {imported_count} produits importés/mis à jour dans Supabase")
-        print(f"✅ {len(new_skus)} nouveaux SKU ajoutés")
-        print(f"✅ {actual_out_of_stock} produits passés en rupture")
-        
-        # Mettre à jour les stats avec les vraies valeurs calculées après import
-        stats['out_of_stock'] = actual_out_of_stock
-        
-        # Retourner le résultat en JSON pour l'API
-        result = {
-            'success': True,
-            'stats': stats,
-            'imported_count': imported_count,
-            'new_skus_count': len(new_skus),  # Nombre total réel
-            'new_skus': new_skus[:50],  # Liste limitée pour l'aperçu seulement
-            'all_new_skus': new_skus,  # Liste complète pour le filtre
-            'restocked_skus': restocked_skus
-        }
-        print("\n" + json.dumps(result))
-        
+        result = run_catalog_import(file_path, workers, on_conflict, force, preview, atomic)
     except Exception as e:
         result = {
             'success': False,
             'error': str(e)
         }
-        print("\n" + json.dumps(result))
+    
+    # Retourner le résultat en JSON pour l'API
+    # Métriques poussées avant la ligne JSON: elle doit rester la dernière ligne de stdout
+    push_metrics('dbc-catalog-import')
+    print("\n" + json.dumps(result))
+    if not result['success']:
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Schéma typé du fichier catalogue fournisseur
+
+Les colonnes à faible cardinalité (groupe, grade, fonctionnement, boîte,
+couleur, verrouillage, type de TVA: quelques dizaines de valeurs au plus)
+sont chargées en catégories pandas: un code entier par ligne (int8 / int16)
+et un dictionnaire des valeurs distinctes, au lieu d'une chaîne par cellule.
+- read_catalog: lecture Excel (SKU en texte, zéros de tête conservés) puis
+  conversion en catégories
+- categorize: même conversion sur un DataFrame déjà chargé
+- column_values: colonne en liste Python pour les dicts produits; la
+  conversion (str) est faite une fois par valeur distincte, et toutes les
+  lignes d'une même valeur partagent le même objet (dicts produits, pickle
+  entre les workers du mode lot, pool de chaînes de catalog_snapshot.py)
+
+Les groupby / value_counts / filtres (compute_facet_stats) travaillent sur
+les codes.
+"""
+
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ('Item Group', 'Appearance', 'Functionality', 'Boxed', 'Color', 'Cloud Lock', 'VAT Type')
+
+# SKU en texte: préserve les zéros de tête
+CATALOG_DTYPES = {'SKU': str}
+
+
+def categorize(df, columns=CATEGORICAL_COLUMNS):
+    """Convertit en catégories les colonnes présentes (en place, df renvoyé)"""
+    for column in columns:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            # astype et non read_excel(dtype='category'): ce dernier échoue sur une colonne
+            # aux types mélangés (tri des catégories texte / nombres)
+            df[column] = df[column].astype('category')
+    return df
+
+
+def read_catalog(file_path, **kwargs):
+    """Lit un fichier catalogue fournisseur selon le schéma (arguments passés à pd.read_excel)"""
+    return categorize(pd.read_excel(file_path, dtype=CATALOG_DTYPES, **kwargs))
+
+
+def column_values(df, column, convert=str, missing=None, absent=None):
+    """
+    Valeurs d'une colonne en liste Python, une par ligne
+
+    Args:
+        convert: conversion de chaque valeur présente (une fois par catégorie)
+        missing: valeur des cellules vides
+        absent: valeur de chaque ligne si la colonne n'existe pas
+    """
+    if column not in df.columns:
+        return [absent] * len(df)
+    series = df[column]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Code -1 (cellule vide): dernier élément du dictionnaire
+        labels = np.empty(len(series.cat.categories) + 1, dtype=object)
+        labels[:-1] = [convert(value) for value in series.cat.categories]
+        labels[-1] = missing
+        return labels[series.cat.codes.to_numpy()].tolist()
+    return [missing if pd.isna(value) else convert(value) for value in series.tolist()]
+
+
+def codes_and_labels(series, missing):
+    """
+    Codes entiers (np.intp) et libellés texte d'une colonne, pour bincount / filtres
+
+    Cellule vide: libellé missing. Les libellés sont str(valeur), convertis une
+    fois par catégorie (deux catégories de même texte, 1 et '1', sont fusionnées).
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype('category')
+    categories = series.cat.categories
+    codes = series.cat.codes.to_numpy().astype(np.intp)
+    codes[codes < 0] = len(categories)
+    remap, labels = pd.factorize(np.array([str(value) for value in categories] + [missing], dtype=object))
+    return remap[codes], [str(label) for label in labels]
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Instantané binaire du catalogue actif, lu par mmap sans parsing
+
+Écrit après chaque import réussi (catalog_processor.py, voir
+refresh_catalog_snapshot): les produits actifs de la table products, triés
+par SKU, dans un seul fichier (CATALOG_SNAPSHOT_PATH, défaut
+catalog_snapshot.bin, vide = désactivé):
+
+    b'DBCSNAP\\x01' | longueur de l'en-tête (uint64) | en-tête JSON | colonnes
+
+- colonnes numériques à largeur fixe (quantity / storage_gb int32, -1 si
+  inconnu; price / campaign_price / price_dbc float64, NaN si absent)
+- sku en octets à largeur fixe (recherche par dichotomie, comme SkuStateTable)
+- autres colonnes texte: identifiants uint32 dans un pool de chaînes commun
+  (pool_offsets + pool_data UTF-8, chaque valeur distincte stockée une fois)
+
+Chaque colonne est alignée sur 64 octets et lue par np.frombuffer sur le
+mmap: ouvrir l'instantané ne lit rien, et plusieurs process (workers de
+l'API, scripts de commande) partagent la même copie dans le cache de pages.
+Le fichier est remplacé atomiquement: un lecteur ouvert garde l'ancienne
+version jusqu'à ce qu'il rouvre (is_current()).
+
+Usage:
+    python catalog_snapshot.py export            # depuis Supabase
+    python catalog_snapshot.py info
+    python catalog_snapshot.py get <sku> [<sku>...]
+"""
+
+import json
+import mmap
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from pipeline_metrics import catalog_phase, supabase_call
+from pipeline_trace import log
+from sku_state import encode_skus
+
+MAGIC = b'DBCSNAP\x01'
+ALIGNMENT = 64
+NULL_ID = np.uint32(0xFFFFFFFF)
+NULL_INT = -1
+
+NUMERIC_COLUMNS = {
+    'quantity': '<i4',
+    'storage_gb': '<i4',
+    'price': '<f8',
+    'campaign_price': '<f8',
+    'price_dbc': '<f8',
+}
+STRING_COLUMNS = ('product_name', 'item_group', 'appearance', 'functionality', 'boxed', 'color',
+                  'cloud_lock', 'additional_info', 'vat_type', 'brand', 'model')
+SNAPSHOT_COLUMNS = ('sku',) + tuple(NUMERIC_COLUMNS) + STRING_COLUMNS
+
+
+def snapshot_path():
+    """Chemin de l'instantané, None si désactivé (CATALOG_SNAPSHOT_PATH vide)"""
+    return os.getenv('CATALOG_SNAPSHOT_PATH', 'catalog_snapshot.bin') or None
+
+
+# ----------------------------------------------------------------------
+# Écriture
+# ----------------------------------------------------------------------
+
+def _numeric(values, dtype):
+    if dtype == '<f8':
+        return np.array([np.nan if value is None else float(value) for value in values], dtype=dtype)
+    return np.array([NULL_INT if value is None else int(value) for value in values], dtype=dtype)
+
+
+def build_snapshot(products, import_id=None):
+    """
+    Contenu binaire de l'instantané
+
+    Args:
+        products: dicts avec les colonnes SNAPSHOT_COLUMNS (ordre quelconque)
+
+    Returns:
+        bytes prêts à écrire
+    """
+    products = sorted(products, key=lambda product: str(product['sku']))
+    arrays = {'sku': encode_skus([str(product['sku']) for product in products])}
+    for name, dtype in NUMERIC_COLUMNS.items():
+        arrays[name] = _numeric([product.get(name) for product in products], dtype)
+
+    # Pool commun: grades, couleurs, marques... très répétés d'un produit à l'autre
+    pool = {}
+    for name in STRING_COLUMNS:
+        arrays[f"{name}.ids"] = np.fromiter(
+            (NULL_ID if value is None else pool.setdefault(str(value), len(pool))
+             for value in (product.get(name) for product in products)),
+            dtype='<u4', count=len(products)
+        )
+    encoded = [value.encode('utf-8') for value in pool]
+    arrays['pool_offsets'] = np.zeros(len(encoded) + 1, dtype='<u8')
+    np.cumsum([len(value) for value in encoded], out=arrays['pool_offsets'][1:])
+    arrays['pool_data'] = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+    # Positions relatives au début des données
+    relative, offset = {}, 0
+    for name, array in arrays.items():
+        relative[name] = offset
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+    header = {
+        'version': 1,
+        'rows': len(products),
+        'import_id': import_id,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+    }
+
+    # Les positions absolues allongent l'en-tête JSON, qui peut alors déborder sur
+    # la première colonne: on resérialise jusqu'à ce que le début des données soit stable
+    data_start = 0
+    while True:
+        header['columns'] = {
+            name: {'dtype': array.dtype.str, 'count': len(array), 'offset': data_start + relative[name]}
+            for name, array in arrays.items()
+        }
+        header_bytes = json.dumps(header).encode('utf-8')
+        needed = -(-(len(MAGIC) + 8 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+        if needed <= data_start:
+            break
+        data_start = needed
+    assert len(MAGIC) + 8 + len(header_bytes) <= data_start
+    header_bytes += b' ' * (data_start - len(MAGIC) - 8 - len(header_bytes))
+
+    chunks = [MAGIC, np.uint64(len(header_bytes)).tobytes(), header_bytes]
+    for name, array in arrays.items():
+        chunks.append(array.tobytes())
+        chunks.append(b'\0' * (-array.nbytes % ALIGNMENT))
+    return b''.join(chunks)
+
+
+def write_snapshot(products, path, import_id=None):
+    """Écrit l'instantané (remplacement atomique: les lecteurs ouverts gardent l'ancien)"""
+    data = build_snapshot(products, import_id)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}"
+    with open(temporary, 'wb') as snapshot_file:
+        snapshot_file.write(data)
+    os.replace(temporary, path)
+    return len(data)
+
+
+def fetch_active_products(supabase, page_size=1000):
+    """Produits actifs de la table products (pagination Supabase, ordre stable par SKU)"""
+    products, offset = [], 0
+    while True:
+        with supabase_call('products', 'select'):
+            result = supabase.table('products').select(', '.join(SNAPSHOT_COLUMNS)).eq('is_active', True) \
+                .order('sku').range(offset, offset + page_size - 1).execute()
+        products.extend(result.data or [])
+        if len(result.data or []) < page_size:
+            return products
+        offset += page_size
+
+
+def export_catalog_snapshot(supabase, path=None, import_id=None):
+    """
+    Réécrit l'instantané à partir de la table products
+
+    Returns:
+        dict path / rows / bytes, None si l'instantané est désactivé
+    """
+    path = path or snapshot_path()
+    if path is None:
+        return None
+    with catalog_phase('snapshot') as timer:
+        products = fetch_active_products(supabase)
+        timer.rows = len(products)
+        size = write_snapshot(products, path, import_id)
+    log.info('catalog.snapshot', f"🗂️ Instantané catalogue écrit: {len(products)} produits actifs, {size / 1024 / 1024:.1f} Mo ({path})",
+             path=path, rows=len(products), bytes=size)
+    return {'path': path, 'rows': len(products), 'bytes': size}
+
+
+# ----------------------------------------------------------------------
+# Lecture
+# ----------------------------------------------------------------------
+
+class CatalogSnapshot:
+    """
+    Lecteur de l'instantané: colonnes NumPy sans copie sur le mmap
+
+    Numériques: snapshot['price_dbc'] (ndarray). Texte: snapshot.strings('brand')
+    (liste décodée) ou snapshot.ids('brand') + snapshot.string(id).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as snapshot_file:
+            self._stat = os.fstat(snapshot_file.fileno())
+            self._mmap = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"Instantané catalogue invalide: {path}")
+        header_length = int(np.frombuffer(self._mmap, dtype='<u8', count=1, offset=len(MAGIC))[0])
+        self.header = json.loads(bytes(self._mmap[len(MAGIC) + 8:len(MAGIC) + 8 + header_length]))
+        self._arrays = {
+            name: np.frombuffer(self._mmap, dtype=column['dtype'], count=column['count'], offset=column['offset'])
+            for name, column in self.header['columns'].items()
+        }
+        self._pool_offsets = self._arrays['pool_offsets']
+        self._pool_data = self._arrays['pool_data']
+
+    @property
+    def import_id(self):
+        return self.header['import_id']
+
+    @property
+    def created_at(self):
+        return self.header['created_at']
+
+    def __len__(self):
+        return self.header['rows']
+
+    def __getitem__(self, name):
+        """Colonne numérique (ou 'sku', octets à largeur fixe), sans copie"""
+        if name in STRING_COLUMNS:
+            raise KeyError(f"{name}: colonne texte, utiliser strings() ou ids()")
+        return self._arrays[name]
+
+    def ids(self, name):
+        """Identifiants dans le pool de chaînes (NULL_ID: valeur absente), sans copie"""
+        return self._arrays[f"{name}.ids"]
+
+    def string(self, string_id):
+        if string_id == NULL_ID:
+            return None
+        start, end = self._pool_offsets[string_id], self._pool_offsets[string_id + 1]
+        return self._pool_data[start:end].tobytes().decode('utf-8')
+
+    def strings(self, name, rows=None):
+        """Valeurs décodées d'une colonne texte (toutes, ou les positions `rows`)"""
+        ids = self.ids(name) if rows is None else self.ids(name)[rows]
+        unique, inverse = np.unique(ids, return_inverse=True)
+        decoded = [self.string(string_id) for string_id in unique.tolist()]
+        return [decoded[position] for position in inverse.tolist()]
+
+    def lookup(self, skus):
+        """
+        Positions des SKU dans l'instantané (vectorisé)
+
+        Returns:
+            (positions, found)
+        """
+        encoded = encode_skus(skus)
+        sku_column = self._arrays['sku']
+        if not len(sku_column):
+            return np.zeros(len(encoded), dtype=np.intp), np.zeros(len(encoded), dtype=bool)
+        positions = np.minimum(np.searchsorted(sku_column, encoded), len(sku_column) - 1)
+        return positions, sku_column[positions] == encoded
+
+    def record(self, position):
+        """Produit à une position, en dict (colonnes SNAPSHOT_COLUMNS)"""
+        row = {'sku': self._arrays['sku'][position].decode('utf-8')}
+        for name in NUMERIC_COLUMNS:
+            value = self._arrays[name][position].item()
+            row[name] = None if value == NULL_INT or value != value else value
+        for name in STRING_COLUMNS:
+            row[name] = self.string(self._arrays[f"{name}.ids"][position])
+        return row
+
+    def get(self, sku):
+        positions, found = self.lookup([sku])
+        return self.record(int(positions[0])) if found[0] else None
+
+    def records(self):
+        """Tous les produits en dicts (chaque colonne texte décodée une fois par valeur distincte)"""
+        columns = {'sku': [sku.decode('utf-8') for sku in self._arrays['sku'].tolist()]}
+        for name in NUMERIC_COLUMNS:
+            values = self._arrays[name]
+            null = np.isnan(values) if values.dtype.kind == 'f' else values == NULL_INT
+            columns[name] = np.where(null, None, values.astype(object)).tolist()
+        for name in STRING_COLUMNS:
+            columns[name] = self.strings(name)
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+    def is_current(self):
+        """False si l'instantané a été réécrit depuis l'ouverture (rouvrir pour le relire)"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return (stat.st_ino, stat.st_mtime_ns) == (self._stat.st_ino, self._stat.st_mtime_ns)
+
+    def close(self):
+        # Les tableaux doivent être libérés avant le mmap (BufferError sinon)
+        self._arrays = self._pool_offsets = self._pool_data = None
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_snapshot(path=None):
+    """Instantané courant, None s'il est désactivé ou pas encore écrit"""
+    path = path or snapshot_path()
+    if path is None or not os.path.exists(path):
+        return None
+    return CatalogSnapshot(path)
+
+
+def main():
+    from env_loader import load_env
+    if len(sys.argv) < 2 or sys.argv[1] not in ('export', 'info', 'get'):
+        print("Usage: python catalog_snapshot.py export | info | get <sku> [<sku>...]")
+        sys.exit(1)
+
+    if sys.argv[1] == 'export':
+        load_env()
+        from catalog_processor import init_supabase
+        result = export_catalog_snapshot(init_supabase())
+        print(json.dumps(result))
+        sys.exit(0 if result else 1)
+
+    started = time.perf_counter()
+    snapshot = open_snapshot()
+    if snapshot is None:
+        print(f"❌ Aucun instantané ({snapshot_path()})")
+        sys.exit(1)
+    opened_ms = (time.perf_counter() - started) * 1000
+    with snapshot:
+        if sys.argv[1] == 'info':
+            print(json.dumps({
+                'path': snapshot.path,
+                'rows': len(snapshot),
+                'import_id': snapshot.import_id,
+                'created_at': snapshot.created_at,
+                'bytes': os.path.getsize(snapshot.path),
+                'pool_strings': snapshot.header['columns']['pool_offsets']['count'] - 1,
+                'open_ms': round(opened_ms, 2),
+            }, indent=2))
+        else:
+            for sku in sys.argv[2:]:
+                print(json.dumps(snapshot.get(sku), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
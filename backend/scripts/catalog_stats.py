@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Statistiques de facettes précalculées pendant l'import catalogue
+
+Toutes les statistiques (comptes par facette, marques, histogramme de prix,
+stats par type de TVA) sont dérivées des codes entiers de chaque dimension
+(catégories du schéma, catalog_schema.py): un bincount par facette au lieu
+d'un filtre booléen par valeur distincte.
+Le résultat est sauvegardé avec l'import dans catalog_imports.facet_stats.
+"""
+
+import numpy as np
+import pandas as pd
+from catalog_schema import codes_and_labels
+from numeric_coercion import coerce_numeric
+from product_name_parser import parse_product_names
+
+# Colonnes du fichier fournisseur -> clé de facette
+FACET_COLUMNS = {
+    'Appearance': 'appearance',
+    'Functionality': 'functionality',
+    'Color': 'color',
+    'Boxed': 'boxed',
+    'Additional Info': 'additional_info',
+    'VAT Type': 'vat_type',
+    'Item Group': 'item_group',
+}
+
+# Bornes de l'histogramme des prix DBC (en euros)
+PRICE_BUCKETS = [0, 50, 100, 200, 300, 400, 500, 750, 1000, 1500, 2000, np.inf]
+
+MISSING_VALUE = '(vide)'
+
+
+def _price_bucket_labels():
+    labels = []
+    for low, high in zip(PRICE_BUCKETS[:-1], PRICE_BUCKETS[1:]):
+        labels.append(f"{int(low)}+" if np.isinf(high) else f"{int(low)}-{int(high)}")
+    return labels
+
+
+def compute_facet_stats(df, parsed_names=None, numeric=None):
+    """
+    Calcule toutes les statistiques de facettes (un bincount par dimension)
+
+    Args:
+        df: DataFrame brut du fichier fournisseur (colonnes Foxway)
+        parsed_names: résultat de parse_product_names (recalculé si absent)
+        numeric: colonnes Price / Quantity déjà converties par
+            coerce_supplier_columns (mêmes prix que les produits importés);
+            converties ici de la même façon si absent
+
+    Returns:
+        Dict sérialisable en JSON avec les comptes par facette (tous produits
+        et produits en stock), les marques, l'histogramme des prix DBC et
+        les statistiques par type de TVA.
+    """
+    numeric = dict(numeric or {})
+    for column in ('Price', 'Quantity'):
+        if column not in numeric and column in df.columns:
+            numeric[column], _, _ = coerce_numeric(df[column], integer=column == 'Quantity')
+    price = pd.Series(numeric['Price'], index=df.index) if 'Price' in numeric else pd.Series(np.nan, index=df.index)
+    quantity = pd.Series(numeric['Quantity'], index=df.index).fillna(0) if 'Quantity' in numeric else pd.Series(0, index=df.index)
+    vat_type = df['VAT Type'] if 'VAT Type' in df.columns else pd.Series(np.nan, index=df.index)
+    vat_codes, vat_labels = codes_and_labels(vat_type, 'Non marginal')
+    is_marginal = (np.array(vat_labels, dtype=object) == 'Marginal')[vat_codes]
+    price_dbc = (price * np.where(is_marginal, 1.01, 1.11)).round(2)
+
+    # Chaque dimension en codes entiers (catégories du schéma réutilisées, voir catalog_schema.py)
+    dimensions = {}
+    for column, facet in FACET_COLUMNS.items():
+        if column in df.columns:
+            dimensions[facet] = codes_and_labels(df[column], MISSING_VALUE)
+    if parsed_names is None and 'Product Name' in df.columns:
+        parsed_names = parse_product_names(df['Product Name'])
+    if parsed_names is not None:
+        dimensions['brand'] = codes_and_labels(parsed_names['brand'], MISSING_VALUE)
+        dimensions['storage_gb'] = codes_and_labels(parsed_names['storage_gb'], MISSING_VALUE)
+    bucket_codes, bucket_labels = codes_and_labels(
+        pd.cut(price_dbc, bins=PRICE_BUCKETS, labels=_price_bucket_labels(), right=False), MISSING_VALUE
+    )
+    in_stock = (quantity > 0).to_numpy()
+
+    def marginal(codes, labels, mask=None):
+        # Un bincount par dimension; ex aequo dans l'ordre des libellés
+        counts = np.bincount(codes if mask is None else codes[mask], minlength=len(labels))
+        order = sorted(range(len(labels)), key=labels.__getitem__)
+        order.sort(key=lambda index: -counts[index])
+        return {labels[index]: int(counts[index]) for index in order if counts[index]}
+
+    bucket_counts = dict(zip(bucket_labels, np.bincount(bucket_codes, minlength=len(bucket_labels)).tolist()))
+
+    stats = {
+        'total_rows': int(len(df)),
+        'in_stock_rows': int(in_stock.sum()),
+        'facets': {facet: marginal(codes, labels) for facet, (codes, labels) in dimensions.items()},
+        'facets_in_stock': {facet: marginal(codes, labels, in_stock) for facet, (codes, labels) in dimensions.items()}
+        if in_stock.any() else {},
+        'price_histogram': {
+            'buckets': _price_bucket_labels(),
+            'counts': [int(bucket_counts.get(label, 0)) for label in _price_bucket_labels()],
+        },
+        'vat_types': {},
+    }
+
+    # Statistiques de prix par type de TVA (une agrégation groupée)
+    vat_frame = pd.DataFrame({
+        'vat_type': pd.Categorical.from_codes(vat_codes, categories=vat_labels),
+        'price': price,
+        'price_dbc': price_dbc,
+        'quantity': quantity,
+    })
+    grouped = vat_frame.groupby('vat_type', observed=True).agg(
+        count=('price', 'size'),
+        priced=('price', 'count'),
+        price_min=('price', 'min'),
+        price_max=('price', 'max'),
+        price_mean=('price', 'mean'),
+        price_dbc_mean=('price_dbc', 'mean'),
+        price_dbc_sum=('price_dbc', 'sum'),
+        units=('quantity', 'sum'),
+    )
+    for vat, row in grouped.sort_index(key=lambda index: index.astype(str)).iterrows():
+        stats['vat_types'][str(vat)] = {
+            key: (None if pd.isna(value) else (int(value) if key in ('count', 'priced', 'units') else round(float(value), 2)))
+            for key, value in row.items()
+        }
+
+    return stats
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Empreintes de contenu pour dédupliquer les fichiers reçus (catalogues, commandes)
+
+- file_digest: SHA-256 d'un fichier, lu par blocs. Un catalogue identique au
+  dernier import, ou une commande déjà tarifée avec le même catalogue,
+  réutilise le résultat précédent sans être retraité.
+- row_hash: empreinte 64 bits d'une ligne produit telle qu'écrite en base
+  (colonne products.row_hash). Un catalogue qui ne diffère que de quelques
+  lignes ne réécrit que ces lignes.
+"""
+
+import hashlib
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+    """SHA-256 (hexadécimal) du contenu d'un fichier"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        while chunk := source.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def combined_digest(*parts):
+    """Empreinte d'une suite d'empreintes / paramètres (lot de fichiers, clé de cache)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def row_hash(row, fields):
+    """
+    Empreinte signée 64 bits (BIGINT Postgres) des champs d'une ligne
+
+    Jamais 0: 0 représente une empreinte inconnue (NULL en base).
+    """
+    value = repr(tuple(row.get(field) for field in fields)).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), 'big', signed=True) or 1
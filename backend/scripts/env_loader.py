@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Chargement unique des variables d'environnement
+
+En local: .env.local du dossier courant (partagé avec Next.js), puis le
+premier .env trouvé en remontant depuis backend/scripts.
+En production: l'environnement système, jamais écrasé par les fichiers.
+Appelé par les points d'entrée (CLI, API) et init_supabase plutôt qu'à
+l'import des modules.
+"""
+
+import functools
+
+
+@functools.lru_cache(maxsize=None)
+def load_env():
+    """Charge les fichiers d'environnement une seule fois par process"""
+    from dotenv import load_dotenv
+
+    load_dotenv('.env.local')  # Ignore l'erreur si le fichier n'existe pas
+    load_dotenv()
+
+    # DBC_LOG_* relus si un message a déjà été émis avant le chargement
+    from pipeline_trace import log
+    log.configure()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Persistance groupée d'une commande IMEI tarifée dans order_items / order_item_imei
+
+Les lignes tarifées par process_imei_order.py (un appareil par ligne) sont
+envoyées en un seul appel à la fonction SQL persist_imei_order
+(docs/supabase-functions.sql), colonne par colonne:
+- articles manquants créés par SKU (quantité = nombre d'IMEI)
+- appareils insérés en une instruction, dans la même transaction
+- rejouable: un IMEI déjà enregistré sur l'article est mis à jour s'il a
+  changé (prix, nom, état), jamais dupliqué
+
+Usage (depuis process_imei_order.py):
+    python process_imei_order.py commande.xlsx --mode=dbc --persist=<order_id>
+"""
+
+import time
+
+from pipeline_trace import span
+
+# Colonne du fichier fournisseur -> paramètre de persist_imei_order (colonnes facultatives)
+OPTIONAL_COLUMNS = {
+    'appearance': 'p_appearances',
+    'functionality': 'p_functionalities',
+    'boxed': 'p_boxed',
+    'color': 'p_colors',
+    'cloud lock': 'p_cloud_locks',
+    'additional info': 'p_additional_infos',
+}
+
+
+def _text(series):
+    """Colonne texte sans NaN (None pour JSON), valeurs nettoyées"""
+    values = series.astype(object).where(series.notna(), None)
+    return [None if value is None else str(value).strip() for value in values]
+
+
+def _prices(series):
+    """Colonne de prix arrondie à 2 décimales, None si absente ou non numérique"""
+    import pandas as pd
+    prices = pd.to_numeric(series, errors='coerce').round(2)
+    return prices.astype(object).where(prices.notna(), None).tolist()
+
+
+def device_arrays(df_priced):
+    """
+    Paramètres de persist_imei_order à partir des lignes tarifées
+
+    Args:
+        df_priced: DataFrame de process_imei_order avant réorganisation des
+            colonnes ('Prix Fournisseur' = prix fournisseur, 'Price' = prix DBC)
+
+    Returns:
+        Dict {paramètre: liste}, une entrée par appareil
+    """
+    supplier_column = 'Prix Fournisseur' if 'Prix Fournisseur' in df_priced.columns else 'Price'
+    params = {
+        'p_skus': _text(df_priced['SKU']),
+        'p_imeis': _text(df_priced['Item Identifier']),
+        'p_product_names': _text(df_priced['Product Name']),
+        'p_supplier_prices': _prices(df_priced[supplier_column]),
+        'p_dbc_prices': _prices(df_priced['Price']),
+    }
+    columns = {column.strip().lower(): column for column in df_priced.columns}
+    for name, param in OPTIONAL_COLUMNS.items():
+        if name in columns:
+            params[param] = _text(df_priced[columns[name]])
+    return params
+
+
+def persist_imei_order(supabase, order_id, df_priced):
+    """
+    Enregistre les appareils d'une commande tarifée (une transaction côté base)
+
+    Returns:
+        Dict created_items / inserted_devices / updated_devices /
+        skipped_devices / quantity_mismatches / seconds
+    """
+    started = time.perf_counter()
+    params = device_arrays(df_priced)
+    with span('order.persist', rows=len(df_priced)):
+        result = supabase.rpc('persist_imei_order', {'p_order_id': order_id, **params}).execute()
+    counts = dict((result.data or [{}])[0])
+    counts['seconds'] = round(time.perf_counter() - started, 2)
+
+    print(f"✅ Commande {order_id}: {counts.get('inserted_devices', 0)} IMEI ajoutés, "
+          f"{counts.get('updated_devices', 0)} mis à jour, {counts.get('skipped_devices', 0)} inchangés ou ignorés "
+          f"({counts.get('created_items', 0)} articles créés) en {counts['seconds']:.2f}s")
+    if counts.get('quantity_mismatches'):
+        print(f"⚠️ {counts['quantity_mismatches']} article(s) dont la quantité commandée "
+              f"diffère du nombre d'IMEI enregistrés")
+    return counts
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Registre persistant des IMEI / numéros de série vus dans les commandes
+
+Chaque commande IMEI traitée y inscrit ses identifiants (insertion en masse,
+idempotente: retraiter une commande ne crée pas de doublon). Avant
+l'inscription, les identifiants de la commande sont recherchés en une seule
+requête pour signaler ceux déjà présents dans une commande précédente
+(retour, double facturation) ou en double dans la commande elle-même.
+
+Stockage: base SQLite locale (IMEI_REGISTRY_PATH, défaut imei_registry.sqlite3,
+vide = registre désactivé). La clé primaire (identifiant, commande) d'une
+table WITHOUT ROWID sert d'index: une recherche par identifiant est un seul
+parcours d'arbre, sans table séparée à relire.
+
+Usage: python imei_registry.py check <commande_imei.xlsx>     (recherche sans inscrire)
+       python imei_registry.py register <commande_imei.xlsx>  (inscription d'une commande existante)
+       python imei_registry.py stats
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+from pipeline_trace import log, span
+
+DEFAULT_REGISTRY_PATH = 'imei_registry.sqlite3'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS imei_registry (
+    identifier TEXT NOT NULL,
+    order_ref TEXT NOT NULL,
+    sku TEXT,
+    order_date TEXT,
+    registered_at TEXT NOT NULL,
+    PRIMARY KEY (identifier, order_ref)
+) WITHOUT ROWID
+"""
+
+# Commandes précédentes citées dans la colonne 'Doublon IMEI'
+MAX_LISTED_ORDERS = 3
+
+
+def registry_path():
+    """Chemin du registre, None si désactivé (IMEI_REGISTRY_PATH vide)"""
+    return os.getenv('IMEI_REGISTRY_PATH', DEFAULT_REGISTRY_PATH) or None
+
+
+def normalize_identifier(value):
+    """
+    IMEI / numéro de série en texte, None si vide
+
+    Excel stocke souvent les IMEI comme nombres: pandas les lit en int, ou en
+    float si la colonne contient des cellules vides (356...678.0).
+    """
+    import pandas as pd
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return text or None
+
+
+class ImeiRegistry:
+    """Registre SQLite identifiant -> commandes où il apparaît"""
+
+    def __init__(self, path):
+        self.path = path
+        # Plusieurs workers (order_batch) peuvent écrire en même temps: WAL + attente du verrou
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def find_previous(self, identifiers, exclude_order=None):
+        """
+        Occurrences des identifiants dans les autres commandes
+
+        Une seule requête quelle que soit la taille de la commande: la liste
+        est passée en un paramètre JSON et jointe à la clé primaire.
+
+        Returns:
+            dict {identifiant: [(commande, date commande), ...]} (ordre d'inscription)
+        """
+        identifiers = list(dict.fromkeys(identifiers))
+        if not identifiers:
+            return {}
+        rows = self.connection.execute(
+            """
+            SELECT r.identifier, r.order_ref, r.order_date
+            FROM json_each(?) AS j
+            JOIN imei_registry AS r ON r.identifier = j.value
+            WHERE r.order_ref != ?
+            ORDER BY r.registered_at, r.order_ref
+            """,
+            (json.dumps(identifiers), exclude_order or '')
+        ).fetchall()
+        previous = {}
+        for identifier, order_ref, order_date in rows:
+            previous.setdefault(identifier, []).append((order_ref, order_date))
+        return previous
+
+    def register(self, order_ref, identifiers, skus=None, order_date=None):
+        """Insertion en masse; les couples (identifiant, commande) déjà présents sont ignorés"""
+        registered_at = datetime.now().isoformat(timespec='seconds')
+        skus = skus if skus is not None else [None] * len(identifiers)
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO imei_registry VALUES (?, ?, ?, ?, ?)",
+            [
+                (identifier, order_ref, None if sku is None else str(sku), order_date, registered_at)
+                for identifier, sku in zip(identifiers, skus)
+                if identifier is not None
+            ]
+        )
+
+    def check_and_register(self, order_ref, identifiers, skus=None, order_date=None):
+        """
+        Recherche puis inscription dans une même transaction
+
+        Le verrou d'écriture est pris avant la recherche: deux commandes
+        traitées en parallèle qui partagent un IMEI se voient l'une l'autre.
+        """
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            previous = self.find_previous(identifiers, exclude_order=order_ref)
+            self.register(order_ref, identifiers, skus, order_date)
+        except Exception:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+        return previous
+
+    def stats(self):
+        identifiers, orders, rows = self.connection.execute(
+            "SELECT COUNT(DISTINCT identifier), COUNT(DISTINCT order_ref), COUNT(*) FROM imei_registry"
+        ).fetchone()
+        return {'identifiers': identifiers, 'orders': orders, 'rows': rows}
+
+
+def duplicate_labels(identifiers, previous):
+    """Libellé 'Doublon IMEI' par ligne ('' si l'identifiant n'est vu nulle part ailleurs)"""
+    import pandas as pd
+    in_order = pd.Series(identifiers).duplicated(keep=False)
+    labels = []
+    for identifier, repeated in zip(identifiers, in_order):
+        parts = []
+        if identifier is not None and identifier in previous:
+            orders = [
+                f"{order_ref} ({order_date})" if order_date else order_ref
+                for order_ref, order_date in previous[identifier]
+            ]
+            extra = len(orders) - MAX_LISTED_ORDERS
+            parts.append("Déjà vu: " + ", ".join(orders[:MAX_LISTED_ORDERS]) + (f" +{extra}" if extra > 0 else ""))
+        if identifier is not None and repeated:
+            parts.append("En double dans la commande")
+        labels.append(" ; ".join(parts))
+    return labels
+
+
+def flag_order_duplicates(df_order, order_file, order_date=None, register=True, path=None):
+    """
+    Signale les IMEI d'une commande déjà vus et inscrit la commande au registre
+
+    Args:
+        df_order: commande détaillée (colonnes 'Item Identifier', 'SKU')
+        order_file: fichier de la commande (son nom identifie la commande)
+        register: False pour une simple vérification
+        path: registre à utiliser (défaut: registry_path())
+
+    Returns:
+        liste des libellés 'Doublon IMEI' alignée sur les lignes, None si le
+        registre est désactivé ou inaccessible
+    """
+    path = path or registry_path()
+    if path is None:
+        return None
+
+    order_ref = os.path.basename(order_file)
+    identifiers = [normalize_identifier(value) for value in df_order['Item Identifier']]
+    skus = df_order['SKU'].tolist() if 'SKU' in df_order.columns else None
+    try:
+        with span('order.imei_registry', rows=len(identifiers)), ImeiRegistry(path) as registry:
+            if register:
+                previous = registry.check_and_register(order_ref, identifiers, skus,
+                                                       str(order_date) if order_date else None)
+            else:
+                previous = registry.find_previous(identifiers, exclude_order=order_ref)
+    except sqlite3.Error as e:
+        # Le registre ne doit jamais bloquer la tarification
+        log.warning('imei_registry.unavailable', f"⚠️ Registre IMEI indisponible ({path}): {e}",
+                    path=path, error=str(e))
+        return None
+    return duplicate_labels(identifiers, previous)
+
+
+def main():
+    """Fonction principale pour usage en ligne de commande"""
+    commands = ('check', 'register', 'stats')
+    if len(sys.argv) < 2 or sys.argv[1] not in commands or (sys.argv[1] != 'stats' and len(sys.argv) < 3):
+        print("Usage: python imei_registry.py check <commande_imei.xlsx>")
+        print("       python imei_registry.py register <commande_imei.xlsx>")
+        print("       python imei_registry.py stats")
+        print(f"\nRegistre: IMEI_REGISTRY_PATH (défaut: {DEFAULT_REGISTRY_PATH})")
+        sys.exit(1)
+
+    path = registry_path()
+    if path is None:
+        print("Erreur: Registre IMEI désactivé (IMEI_REGISTRY_PATH vide)")
+        sys.exit(1)
+
+    command = sys.argv[1]
+    if command == 'stats':
+        with ImeiRegistry(path) as registry:
+            stats = registry.stats()
+        print(f"📇 {path}: {stats['identifiers']} identifiants, {stats['orders']} commandes")
+        return
+
+    order_file = sys.argv[2]
+    if not os.path.exists(order_file):
+        print(f"Erreur: Le fichier '{order_file}' n'existe pas.")
+        sys.exit(1)
+    import pandas as pd
+    df_order = pd.read_excel(order_file)
+    if 'Item Identifier' not in df_order.columns:
+        print("Erreur: Colonne 'Item Identifier' absente: ce n'est pas une commande IMEI.")
+        sys.exit(1)
+
+    from apply_dbc_prices_to_order import extract_order_date
+    labels = flag_order_duplicates(df_order, order_file, extract_order_date(order_file),
+                                   register=command == 'register', path=path)
+    if labels is None:
+        sys.exit(1)
+
+    flagged = [(index, label) for index, label in enumerate(labels) if label]
+    print(f"📇 {len(df_order)} identifiants vérifiés, {len(flagged)} signalés")
+    for index, label in flagged[:log.sample_limit]:
+        print(f"  - {df_order['Item Identifier'].iloc[index]}: {label}")
+    if len(flagged) > log.sample_limit:
+        print(f"  ... et {len(flagged) - log.sample_limit} autres")
+    if command == 'register':
+        print(f"✅ Commande inscrite au registre: {os.path.basename(order_file)}")
+
+
+if __name__ == "__main__":
+    main()
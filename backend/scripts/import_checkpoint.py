@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Points de reprise de l'import catalogue direct (catalog_processor.py)
+
+Un import interrompu (erreur réseau pendant les upserts...) reprend là où il
+s'est arrêté au lieu de tout recommencer:
+- après le diff, les lignes à écrire et le diff (nouveaux, restockés,
+  manquants...) sont enregistrés dans CATALOG_CHECKPOINT_DIR/<empreinte du fichier>/
+- chaque tranche terminée (désactivations, upserts) est ajoutée à progress.json
+- relancé avec le même fichier, l'import relit ce diff (ni parsing ni
+  récupération des produits existants) et n'envoie que les tranches restantes
+
+Le diff doit être celui d'avant l'échec: recalculé sur une base à moitié
+écrite, les SKU déjà insérés ne seraient plus comptés comme nouveaux.
+Un point de reprise n'est valable que si aucun autre import n'a été
+enregistré depuis (base_import_id); il est supprimé après un import réussi.
+
+CATALOG_CHECKPOINT_DIR: défaut catalog_checkpoints, vide = désactivé.
+"""
+
+import json
+import os
+import shutil
+import time
+
+from pipeline_trace import log
+
+# Points de reprise abandonnés (fichier jamais relancé) supprimés au-delà de cet âge
+MAX_AGE_SECONDS = 7 * 24 * 3600
+
+
+def checkpoint_dir():
+    """Dossier des points de reprise, None si désactivé (CATALOG_CHECKPOINT_DIR vide)"""
+    return os.getenv('CATALOG_CHECKPOINT_DIR', 'catalog_checkpoints') or None
+
+
+def _write_json(path, data):
+    """Écriture atomique: un arrêt brutal laisse l'ancienne version ou la nouvelle"""
+    temporary = f"{path}.{os.getpid()}"
+    with open(temporary, 'w', encoding='utf-8') as json_file:
+        json.dump(data, json_file, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temporary, path)
+
+
+def _prune(root, keep):
+    try:
+        entries = os.listdir(root)
+    except OSError:
+        return
+    limit = time.time() - MAX_AGE_SECONDS
+    for name in entries:
+        path = os.path.join(root, name)
+        if name != keep and os.path.isdir(path) and os.path.getmtime(path) < limit:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class ImportCheckpoint:
+    """
+    Diff enregistré + tranches terminées par étape
+
+    Sans dossier (path None: points de reprise désactivés, appel direct de
+    import_to_supabase), seul le suivi en mémoire est tenu.
+    """
+
+    def __init__(self, path=None, base_import_id=None):
+        self.path = path
+        self.delta = None
+        self.context = {}
+        self.progress = {'base_import_id': base_import_id, 'ranges': {}, 'counts': {}}
+
+    @classmethod
+    def open(cls, content_hash, base_import_id, fresh=False):
+        """
+        Point de reprise d'un fichier: repris s'il est complet et encore valable,
+        vide sinon (un point de reprise périmé, ou écarté par fresh, est supprimé)
+        """
+        root = checkpoint_dir()
+        if root is None or not content_hash:
+            return cls(base_import_id=base_import_id)
+        _prune(root, content_hash)
+        checkpoint = cls(os.path.join(root, content_hash), base_import_id)
+        if fresh:
+            checkpoint.discard()
+            return checkpoint
+        try:
+            # progress.json est écrit après delta.json: sa présence garantit un diff complet
+            with open(os.path.join(checkpoint.path, 'progress.json'), encoding='utf-8') as progress_file:
+                progress = json.load(progress_file)
+            with open(os.path.join(checkpoint.path, 'delta.json'), encoding='utf-8') as delta_file:
+                saved = json.load(delta_file)
+        except (OSError, ValueError):
+            checkpoint.discard()
+            return checkpoint
+        if progress.get('base_import_id') != base_import_id:
+            log.warning('catalog.checkpoint_stale', "⚠️ Point de reprise périmé (un autre import a eu lieu depuis): import complet",
+                        content_hash=content_hash)
+            checkpoint.discard()
+            return checkpoint
+        checkpoint.progress = progress
+        checkpoint.delta = saved['delta']
+        checkpoint.context = saved['context']
+        return checkpoint
+
+    @property
+    def resumed(self):
+        return self.delta is not None
+
+    def save_delta(self, delta, **context):
+        """Enregistre le diff (et le contexte nécessaire au résultat) avant toute écriture en base"""
+        self.delta, self.context = delta, context
+        if self.path is None:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        _write_json(os.path.join(self.path, 'delta.json'), {'delta': delta, 'context': context})
+        _write_json(os.path.join(self.path, 'progress.json'), self.progress)
+
+    def pending(self, step, total, size):
+        """Tranches [start, end) de l'étape pas encore terminées"""
+        done = self.progress['ranges'].get(step, [])
+        for start in range(0, total, size):
+            end = min(start + size, total)
+            if not any(first <= start and end <= last for first, last in done):
+                yield start, end
+
+    def complete(self, step, start, end, count=0):
+        """Tranche terminée (count: lignes réellement écrites), enregistrée aussitôt"""
+        ranges = self.progress['ranges'].setdefault(step, [])
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+        self.progress['counts'][step] = self.progress['counts'].get(step, 0) + count
+        if self.path is not None:
+            _write_json(os.path.join(self.path, 'progress.json'), self.progress)
+
+    def count(self, step):
+        return self.progress['counts'].get(step, 0)
+
+    def discard(self):
+        if self.path is not None:
+            shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Garde-fous d'import calculés au fil de l'eau
+
+Les statistiques (taux de correspondance, taux de nouveaux SKU, taux de
+retrait, incohérences de format) sont mises à jour pendant la récupération
+des produits existants puis pendant le parsing du catalogue, avec de simples
+compteurs. Un fichier manifestement incorrect est rejeté dès les premiers
+milliers de lignes au lieu d'attendre la fin du traitement.
+"""
+
+from collections import Counter
+from pipeline_trace import log
+
+# Seuils historiques de import_to_supabase
+ABORT_NEW_RATIO = 0.9
+WARN_NEW_RATIO = 0.5
+WARN_REMOVAL_RATIO = 0.5
+
+# Nombre de lignes catalogue à partir duquel le taux de nouveaux SKU est jugé fiable
+DEFAULT_MIN_ROWS = 2000
+
+MAX_EXAMPLES = 5
+
+
+class ImportAborted(Exception):
+    """Import annulé par un garde-fou (fichier ou base incohérents)"""
+
+
+def sku_variants(sku, target_length=None):
+    """Variantes de normalisation d'un SKU utilisées pour détecter un problème de format"""
+    sku = str(sku)
+    variants = {
+        sku.strip(),
+        sku.strip().upper(),
+        sku.strip().lower(),
+        sku.replace(' ', ''),
+        sku.replace('-', ''),
+        sku.strip().lstrip('0'),
+    }
+    if target_length and sku.strip().isdigit():
+        variants.add(sku.strip().zfill(target_length))
+    variants.discard(sku)
+    variants.discard('')
+    return variants
+
+
+class ImportGuardrail:
+    """Compteurs de garde-fous alimentés ligne par ligne"""
+
+    def __init__(self, min_rows=DEFAULT_MIN_ROWS, abort_ratio=ABORT_NEW_RATIO,
+                 warn_ratio=WARN_NEW_RATIO, removal_warn_ratio=WARN_REMOVAL_RATIO):
+        self.min_rows = min_rows
+        self.abort_ratio = abort_ratio
+        self.warn_ratio = warn_ratio
+        self.removal_warn_ratio = removal_warn_ratio
+
+        # Produits existants (récupération Supabase)
+        self.existing_total = 0
+        self.existing_active = 0
+        self.existing_lengths = Counter()
+        self.existing_examples = []
+
+        # Catalogue (parsing)
+        self.catalog_rows = 0
+        self.matched = 0
+        self.matched_active = 0
+        self.new_in_stock = 0
+        self.variant_matches = 0
+        self.catalog_lengths = Counter()
+        self.catalog_examples = []
+        self.variant_examples = []
+
+    # ------------------------------------------------------------------
+    # Alimentation
+    # ------------------------------------------------------------------
+
+    def observe_existing(self, sku, quantity):
+        """Enregistre un produit existant lu depuis la base"""
+        self.existing_total += 1
+        if quantity and quantity > 0:
+            self.existing_active += 1
+        self.existing_lengths[len(str(sku))] += 1
+        if len(self.existing_examples) < MAX_EXAMPLES:
+            self.existing_examples.append(sku)
+
+    def observe_catalog(self, sku, quantity, existing_products):
+        """Enregistre une ligne du catalogue et la compare aux produits existants"""
+        self.catalog_rows += 1
+        self.catalog_lengths[len(sku)] += 1
+        if len(self.catalog_examples) < MAX_EXAMPLES:
+            self.catalog_examples.append(sku)
+
+        old_quantity = existing_products.get(sku)
+        if old_quantity is not None:
+            self.matched += 1
+            if old_quantity > 0:
+                self.matched_active += 1
+            return
+
+        if quantity > 0:
+            self.new_in_stock += 1
+
+        # SKU inconnu: une variante normalisée existe-t-elle en base ? (tous les SKU, pas un échantillon)
+        if self.existing_total:
+            for variant in sku_variants(sku, self._dominant_length(self.existing_lengths)):
+                if variant in existing_products:
+                    self.variant_matches += 1
+                    if len(self.variant_examples) < MAX_EXAMPLES:
+                        self.variant_examples.append((sku, variant))
+                    break
+
+    # ------------------------------------------------------------------
+    # Statistiques
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _dominant_length(lengths):
+        return lengths.most_common(1)[0][0] if lengths else None
+
+    @property
+    def new_ratio(self):
+        return self.new_in_stock / self.catalog_rows if self.catalog_rows else 0.0
+
+    @property
+    def match_ratio(self):
+        return self.matched / self.catalog_rows if self.catalog_rows else 0.0
+
+    @property
+    def removal_ratio(self):
+        if not self.existing_active:
+            return 0.0
+        return (self.existing_active - self.matched_active) / self.existing_active
+
+    @property
+    def format_mismatch(self):
+        """Vrai si les SKU non trouvés correspondent massivement à des variantes de format"""
+        unmatched = self.catalog_rows - self.matched
+        if unmatched and self.variant_matches > unmatched * 0.5:
+            return True
+        existing_length = self._dominant_length(self.existing_lengths)
+        catalog_length = self._dominant_length(self.catalog_lengths)
+        return bool(
+            existing_length and catalog_length and existing_length != catalog_length
+            and self.match_ratio < 1 - self.abort_ratio
+        )
+
+    def report(self):
+        """Résumé sérialisable des garde-fous"""
+        return {
+            'catalog_rows': self.catalog_rows,
+            'existing_in_db': self.existing_total,
+            'existing_active': self.existing_active,
+            'exact_matches': self.matched,
+            'new_in_stock': self.new_in_stock,
+            'match_rate': round(self.match_ratio * 100, 1),
+            'new_rate': round(self.new_ratio * 100, 1),
+            'removal_rate': round(self.removal_ratio * 100, 1),
+            'variant_matches': self.variant_matches,
+            'format_mismatch': self.format_mismatch,
+            'existing_sku_length': self._dominant_length(self.existing_lengths),
+            'catalog_sku_length': self._dominant_length(self.catalog_lengths),
+        }
+
+    # ------------------------------------------------------------------
+    # Décisions
+    # ------------------------------------------------------------------
+
+    def _abort(self):
+        new_percentage = self.new_ratio * 100
+        lines = [
+            f"\n❌ ERREUR CRITIQUE: {self.new_in_stock} nouveaux SKU sur {self.catalog_rows} lignes analysées ({new_percentage:.1f}%)",
+            f"❌ Cela indique un problème majeur :",
+        ]
+
+        if self.existing_total == 0:
+            lines.append(f"❌ La base de données products est VIDE !")
+            lines.append(f"❌ Tous les produits sont considérés comme nouveaux")
+        else:
+            lines.append(f"❌ Problème de correspondance des SKU")
+            lines.append(f"❌ Exemples SKU base: {self.existing_examples[:3]} (longueur dominante: {self._dominant_length(self.existing_lengths)})")
+            lines.append(f"❌ Exemples SKU catalogue: {self.catalog_examples[:3]} (longueur dominante: {self._dominant_length(self.catalog_lengths)})")
+            if self.variant_matches:
+                lines.append(f"❌ {self.variant_matches} SKU trouvés en base sous une autre forme, ex: {self.variant_examples}")
+                lines.append(f"❌ Problème de normalisation des SKU détecté !")
+            else:
+                lines.append(f"❌ Aucune variante des SKU catalogue trouvée en base")
+
+        lines += [
+            f"\n❌ IMPORT ANNULÉ - INTERVENTION MANUELLE REQUISE",
+            f"❌ Veuillez vérifier :",
+            f"❌ 1. Que la base de données products contient bien des données",
+            f"❌ 2. Que le format des SKU est cohérent",
+            f"❌ 3. Que le fichier catalogue est correct",
+        ]
+        log.error('guardrail.aborted', '\n'.join(lines), **self.report())
+
+        raise ImportAborted(
+            f"Import annulé : {new_percentage:.1f}% de nouveaux SKU détectés sur les {self.catalog_rows} "
+            f"premières lignes (seuil: {self.abort_ratio * 100:.0f}%). Problème de correspondance des données."
+        )
+
+    def check(self):
+        """Vérification intermédiaire: annule dès que l'échantillon est suffisant"""
+        if self.catalog_rows >= self.min_rows and self.new_ratio > self.abort_ratio:
+            self._abort()
+
+    def finalize(self):
+        """Vérification finale après le parsing complet (avertissements inclus)"""
+        new_percentage = self.new_ratio * 100
+
+        log.info('guardrail.diagnostic', (
+            f"\n🔍 DIAGNOSTIC D'IMPORT:\n"
+            f"  - Produits dans catalogue: {self.catalog_rows}\n"
+            f"  - Produits existants en base: {self.existing_total}\n"
+            f"  - Correspondances exactes trouvées: {self.matched} ({self.match_ratio * 100:.1f}%)\n"
+            f"  - Nouveaux SKU détectés: {self.new_in_stock}\n"
+            f"  - Produits actifs absents du catalogue: {self.existing_active - self.matched_active} ({self.removal_ratio * 100:.1f}%)"
+        ), **self.report())
+
+        if self.new_ratio > self.abort_ratio:
+            self._abort()
+
+        if self.new_ratio > self.warn_ratio:
+            log.warning('guardrail.new_skus', (
+                f"\n⚠️ AVERTISSEMENT: {self.new_in_stock} nouveaux SKU sur {self.catalog_rows} total ({new_percentage:.1f}%)\n"
+                f"⚠️ Pourcentage élevé de nouveaux produits. Vérifiez que c'est normal.\n"
+                f"⚠️ SKU en base: {self.existing_examples[:3]}\n"
+                f"⚠️ SKU catalogue: {self.catalog_examples[:3]}"
+            ), new_rate=round(new_percentage, 1))
+        else:
+            log.info('guardrail.new_skus', f"✅ Pourcentage de nouveaux SKU normal: {new_percentage:.1f}%", new_rate=round(new_percentage, 1))
+
+        if self.removal_ratio > self.removal_warn_ratio:
+            log.warning('guardrail.removals', f"⚠️ AVERTISSEMENT: {self.removal_ratio * 100:.1f}% des produits actifs vont passer en rupture",
+                        removal_rate=round(self.removal_ratio * 100, 1))
+
+        if self.format_mismatch:
+            log.warning('guardrail.format_mismatch', f"⚠️ Incohérence de format des SKU détectée: {self.variant_matches} variantes trouvées, ex: {self.variant_examples}",
+                        variant_matches=self.variant_matches)
+
+        return self.report()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Conversion des colonnes numériques du fichier fournisseur (Price, Campaign
+Price, Quantity) en une passe vectorisée par colonne
+
+1. pd.to_numeric sur toute la colonne: nombres Excel, "199.99", "-5",
+   "1.5e3" (boucle C, cas courant)
+2. seules les cellules texte restées invalides repassent par la
+   normalisation des formats régionaux:
+   - espaces, espaces insécables, apostrophes et symboles monétaires retirés
+   - "199,99", "1.299,99", "1 299,99 €" -> virgule décimale
+   - "1,299.99", "1,299" -> virgule des milliers (une virgule suivie de
+     exactement 3 chiffres, sans point, est un séparateur de milliers: les prix
+     n'ont jamais 3 décimales)
+3. cellules rejetées (texte non numérique, valeur négative, quantité non
+   entière, infini): valeur absente, signalées en bloc avec leur numéro de
+   ligne Excel au lieu d'être converties silencieusement en 0
+
+Une cellule vide n'est pas rejetée (Campaign Price est souvent absent).
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from pipeline_trace import log
+
+# Colonnes converties par coerce_supplier_columns (integer: quantité entière)
+SUPPLIER_NUMERIC_COLUMNS = {
+    'Price': {'integer': False},
+    'Campaign Price': {'integer': False},
+    'Quantity': {'integer': True},
+}
+# Ligne Excel de la première ligne de données (ligne 1: en-têtes)
+FIRST_DATA_ROW = 2
+# Cellules rejetées détaillées par colonne dans le rapport (lignes et valeurs)
+REPORT_SIZE = 20
+
+# Séparateurs d'espacement et symboles monétaires retirés avant conversion
+_STRIPPED = str.maketrans('', '', " \t\u00a0\u202f'’€$£")
+_CURRENCY_CODE = re.compile(r'eur|usd|gbp|chf', re.IGNORECASE)
+_THOUSANDS_COMMA = re.compile(r'[+-]?\d{1,3}(?:,\d{3})+(?:\.\d+)?')
+_COMMA_DECIMAL = re.compile(r'[+-]?(?:\d{1,3}(?:\.\d{3})+|\d*),\d+')
+
+
+def normalize_locale(text):
+    """
+    Texte numérique régional -> format décimal à point
+
+    Virgule décimale ("199,99", "1.299,99") ou virgule des milliers
+    ("1,299", "1,299.99"), groupes de 3 chiffres exigés; tout autre texte
+    est renvoyé tel quel (rejeté par pd.to_numeric).
+    """
+    text = _CURRENCY_CODE.sub('', text.translate(_STRIPPED))
+    if _THOUSANDS_COMMA.fullmatch(text):
+        return text.replace(',', '')
+    if _COMMA_DECIMAL.fullmatch(text):
+        return text.replace('.', '').replace(',', '.')
+    return text
+
+
+def coerce_numeric(values, integer=False, minimum=0):
+    """
+    Convertit une colonne fournisseur en float64
+
+    Args:
+        values: Series (object, nombres ou texte)
+        integer: rejette les valeurs non entières
+        minimum: rejette les valeurs inférieures (None: pas de borne)
+
+    Returns:
+        (valeurs float64 avec NaN si absente ou rejetée,
+         masque des cellules rejetées, nombre de cellules au format régional)
+    """
+    values = pd.Series(values).reset_index(drop=True)
+    if values.dtype.kind in 'iufb':
+        numbers = values.to_numpy(dtype=np.float64, copy=True)
+        missing = np.isnan(numbers)
+        locale_parsed = 0
+    else:
+        numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64, copy=True)
+        missing = values.isna().to_numpy(copy=True)
+        pending = np.flatnonzero(np.isnan(numbers) & ~missing)
+        locale_parsed = 0
+        if len(pending):
+            # Une passe sur les seules cellules texte non converties
+            normalized = [normalize_locale(str(value).strip()) for value in values.to_numpy()[pending]]
+            blank = np.array([not text for text in normalized], dtype=bool)
+            missing[pending[blank]] = True
+            parsed = pd.to_numeric(pd.Series(normalized, dtype=object)[~blank], errors='coerce').to_numpy(dtype=np.float64)
+            numbers[pending[~blank]] = parsed
+            locale_parsed = int((~np.isnan(parsed)).sum())
+
+    with np.errstate(invalid='ignore'):
+        rejected = ~missing & ~np.isfinite(numbers)
+        if minimum is not None:
+            rejected |= numbers < minimum
+        if integer:
+            rejected |= np.isfinite(numbers) & (numbers != np.floor(numbers))
+    numbers[rejected] = np.nan
+    return numbers, rejected, locale_parsed
+
+
+def coerce_supplier_columns(df, first_row=FIRST_DATA_ROW):
+    """
+    Convertit les colonnes SUPPLIER_NUMERIC_COLUMNS présentes dans df
+
+    Returns:
+        (valeurs par colonne (float64, NaN si absente / rejetée), rapport)
+        rapport: {colonne: {'rejected', 'locale_parsed', 'rows', 'values'}}
+        pour les colonnes avec des cellules rejetées ou régionales
+    """
+    columns, report = {}, {}
+    for name, options in SUPPLIER_NUMERIC_COLUMNS.items():
+        if name not in df.columns:
+            continue
+        numbers, rejected, locale_parsed = coerce_numeric(df[name], integer=options['integer'])
+        columns[name] = numbers
+        if rejected.any() or locale_parsed:
+            positions = np.flatnonzero(rejected)[:REPORT_SIZE]
+            report[name] = {
+                'rejected': int(rejected.sum()),
+                'locale_parsed': locale_parsed,
+                'rows': (positions + first_row).tolist(),
+                'values': [str(value) for value in df[name].iloc[positions].tolist()],
+            }
+    return columns, report
+
+
+def supplier_quantities(values):
+    """Quantités entières (0 si absente ou rejetée)"""
+    numbers, _, _ = coerce_numeric(values, integer=True)
+    return np.nan_to_num(numbers, nan=0).astype(np.int64)
+
+
+def report_rejected_cells(report, file=None):
+    """Un avertissement par colonne avec les lignes rejetées (et le nombre de formats régionaux convertis)"""
+    for name, column in report.items():
+        if column['locale_parsed']:
+            log.info('catalog.numeric_locale', f"🔢 {name}: {column['locale_parsed']} cellules au format régional converties",
+                     column=name, locale_parsed=column['locale_parsed'], file=file)
+        if column['rejected']:
+            rows = ', '.join(str(row) for row in column['rows'])
+            more = '…' if column['rejected'] > len(column['rows']) else ''
+            log.warning('catalog.numeric_rejected', (
+                f"⚠️ {name}: {column['rejected']} cellules non numériques ou invalides ignorées (lignes {rows}{more})"
+            ), column=name, rejected=column['rejected'], rows=column['rows'], values=column['values'], file=file)
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Tarification par lot de commandes fournisseur (groupées et IMEI)
+
+Les commandes sont regroupées par catalogue DBC (find_matching_catalog sur
+la date extraite du nom de fichier): chaque catalogue n'est lu et indexé
+qu'une fois, dans le process principal. Les index sont transmis une seule
+fois à chaque worker (initializer du pool; hérités sans copie avec fork),
+puis chaque commande est tarifée par apply_dbc_prices ou process_imei_order.
+
+Produit un fichier tarifé par commande (comme les scripts unitaires) et un
+récapitulatif consolidé (Excel + JSON).
+
+Une commande déjà tarifée avec le même contenu, le même catalogue et le même
+mode n'est pas retraitée: son fichier tarifé est repris du cache
+(ORDER_CACHE_DIR, défaut order_cache, vide = désactivé).
+
+Usage: python order_batch.py <dossier | 'motif*.xlsx' | fichiers...> --mode=dbc|client
+                             [--catalog=catalogue_dbc.xlsx] [--catalog-dir=DIR]
+                             [--output-dir=DIR] [--workers=N] [--no-cache]
+"""
+
+import contextlib
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from apply_dbc_prices_to_order import apply_dbc_prices, extract_order_date, find_matching_catalog, load_catalog_lookups
+from catalog_batch import default_workers, is_batch_source, resolve_catalog_files
+from content_hash import combined_digest, file_digest
+from imei_registry import registry_path
+from pipeline_metrics import CONTENT_DEDUP_HITS, push_metrics, record_order_pricing
+from pipeline_trace import log, profile_run, span
+
+# Index des catalogues dans chaque worker: {chemin catalogue: (sku_lookup, characteristics_lookup)}
+_worker_lookups = {}
+
+
+def detect_order_kind(order_file):
+    """'imei' si la commande est détaillée (Id + Item Identifier), 'grouped' sinon"""
+    import pandas as pd
+    columns = pd.read_excel(order_file, nrows=0).columns
+    return 'imei' if 'Item Identifier' in columns and 'Id' in columns else 'grouped'
+
+
+def output_path(order_file, kind, mode, output_dir):
+    """Même convention de nommage que les scripts unitaires"""
+    base_name = os.path.splitext(os.path.basename(order_file))[0]
+    suffix = '_client' if mode == 'client' else '_avec_prix_dbc'
+    extension = '.csv' if kind == 'imei' else '.xlsx'
+    return os.path.join(output_dir, f"{base_name}{suffix}{extension}")
+
+
+def order_cache_dir():
+    """Dossier du cache des commandes tarifées, None si désactivé (ORDER_CACHE_DIR vide)"""
+    return os.getenv('ORDER_CACHE_DIR', 'order_cache') or None
+
+
+def plan_order_batch(order_files, mode, output_dir, catalog_file=None, catalog_dir=None):
+    """
+    Regroupe les commandes par catalogue DBC
+
+    Chaque tâche porte une clé de cache (contenu de la commande + contenu du
+    catalogue + mode), sauf les commandes IMEI en mode dbc quand le registre
+    IMEI est actif: leur colonne 'Doublon IMEI' dépend des commandes reçues depuis.
+
+    Returns:
+        dict {catalogue: [tâche, ...]} (ordre des fichiers conservé dans chaque groupe)
+    """
+    groups = {}
+    catalog_digests = {}
+    for order_file in order_files:
+        kind = detect_order_kind(order_file)
+        order_date = extract_order_date(order_file)
+        catalog = catalog_file or find_matching_catalog(order_date, catalog_dir=catalog_dir)
+        if catalog not in catalog_digests:
+            catalog_digests[catalog] = file_digest(catalog)
+        depends_on_registry = kind == 'imei' and mode == 'dbc' and registry_path() is not None
+        groups.setdefault(catalog, []).append({
+            'order_file': order_file,
+            'kind': kind,
+            'order_date': order_date,
+            'catalog_file': catalog,
+            'output_file': output_path(order_file, kind, mode, output_dir),
+            'mode': mode,
+            'cache_key': None if depends_on_registry else combined_digest(
+                file_digest(order_file), catalog_digests[catalog], mode, kind
+            ),
+        })
+    return groups
+
+
+def load_cached_result(task, cache_dir):
+    """Résultat d'une commande identique déjà tarifée (fichier tarifé recopié), None sinon"""
+    entry = os.path.join(cache_dir, task['cache_key'])
+    try:
+        with open(os.path.join(entry, 'summary.json'), encoding='utf-8') as summary_file:
+            summary = json.load(summary_file)
+        shutil.copyfile(os.path.join(entry, 'output'), task['output_file'])
+    except (OSError, ValueError):
+        return None
+    summary.update(order_file=task['order_file'], catalog_file=task['catalog_file'],
+                   output_file=task['output_file'], cached=True, seconds=0.0)
+    return summary
+
+
+def store_cached_result(task, result, cache_dir):
+    """Conserve le fichier tarifé et le résumé d'une commande (écriture atomique)"""
+    entry = os.path.join(cache_dir, task['cache_key'])
+    os.makedirs(entry, exist_ok=True)
+    shutil.copyfile(result['output_file'], os.path.join(entry, 'output'))
+    temporary = os.path.join(entry, f"summary.json.{os.getpid()}")
+    with open(temporary, 'w', encoding='utf-8') as summary_file:
+        json.dump(result, summary_file, ensure_ascii=False, default=str)
+    os.replace(temporary, os.path.join(entry, 'summary.json'))
+
+
+def _init_worker(lookups_by_catalog):
+    global _worker_lookups
+    _worker_lookups = lookups_by_catalog
+
+
+def _price_order(task):
+    """Worker: tarifie une commande avec l'index partagé de son catalogue"""
+    from process_imei_order import process_imei_order
+    process = process_imei_order if task['kind'] == 'imei' else apply_dbc_prices
+    started = time.perf_counter()
+    # Sortie console détaillée des scripts unitaires masquée (le récapitulatif la remplace)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            df_result = process(
+                task['order_file'], task['catalog_file'], task['output_file'],
+                order_date=task['order_date'], mode=task['mode'],
+                lookups=_worker_lookups[task['catalog_file']]
+            )
+            error = None if df_result is not None else 'Traitement impossible (format de fichier ou lecture)'
+        except Exception as e:
+            df_result, error = None, str(e)
+
+    summary = dict(df_result.attrs['summary']) if df_result is not None else {
+        'order_file': task['order_file'],
+        'catalog_file': task['catalog_file'],
+        'output_file': None,
+        'mode': task['mode'],
+    }
+    summary['kind'] = task['kind']
+    summary['cached'] = False
+    summary['success'] = error is None
+    summary['error'] = error
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def _pool_context(start_method=None):
+    # fork: les index du process principal sont partagés (copie à l'écriture);
+    # spawn depuis un serveur multi-threadé (API), index copiés une fois par worker
+    if start_method is None:
+        start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(start_method)
+
+
+def consolidate(results):
+    """Totaux du lot (commandes réussies) et détail par catalogue"""
+    succeeded = [result for result in results if result['success']]
+    totals = {
+        'orders': len(results),
+        'succeeded': len(succeeded),
+        'failed': len(results) - len(succeeded),
+    }
+    for key in ('rows', 'sku_exact', 'characteristics', 'not_found', 'total_supplier', 'total_dbc'):
+        totals[key] = round(sum(result[key] for result in succeeded), 2)
+    # IMEI déjà vus dans une commande précédente ou en double (commandes IMEI uniquement)
+    totals['imei_duplicates'] = sum(result.get('imei_duplicates', 0) for result in succeeded)
+    totals['difference'] = round(totals['total_dbc'] - totals['total_supplier'], 2)
+
+    catalogs = {}
+    for result in results:
+        catalog = catalogs.setdefault(result['catalog_file'], {'orders': 0, 'rows': 0})
+        catalog['orders'] += 1
+        catalog['rows'] += result.get('rows', 0)
+    return totals, catalogs
+
+
+def write_summary(results, totals, output_dir, batch_started):
+    """Récapitulatif Excel (une ligne par commande) et JSON complet"""
+    import pandas as pd
+    stamp = batch_started.strftime("%Y%m%d_%H%M%S")
+    columns = ['order_file', 'kind', 'catalog_file', 'output_file', 'rows', 'sku_exact', 'characteristics',
+               'not_found', 'imei_duplicates', 'total_supplier', 'total_dbc', 'cached', 'success', 'error', 'seconds']
+    df_summary = pd.DataFrame(results).reindex(columns=columns)
+    df_summary['order_file'] = df_summary['order_file'].map(os.path.basename)
+    excel_path = os.path.join(output_dir, f"recapitulatif_lot_{stamp}.xlsx")
+    df_summary.to_excel(excel_path, index=False)
+
+    json_path = os.path.join(output_dir, f"recapitulatif_lot_{stamp}.json")
+    with open(json_path, 'w', encoding='utf-8') as summary_file:
+        json.dump({'totals': totals, 'orders': results}, summary_file, ensure_ascii=False, indent=2, default=str)
+    return excel_path, json_path
+
+
+def read_priced_lines(path, page=1, page_size=100):
+    """Page de lignes d'un fichier tarifé (.xlsx ou .csv IMEI), valeurs prêtes pour JSON"""
+    import pandas as pd
+    df = pd.read_csv(path) if path.endswith('.csv') else pd.read_excel(path)
+    offset = (page - 1) * page_size
+    lines = df.iloc[offset:offset + page_size].astype(object)
+    return {
+        'columns': [str(column) for column in df.columns],
+        'items': lines.where(lines.notna(), None).to_dict('records'),
+        'total': len(df),
+        'page': page,
+        'page_size': page_size,
+    }
+
+
+def process_order_batch(order_files, mode, output_dir='.', catalog_file=None, catalog_dir=None, workers=None,
+                        start_method=None, use_cache=True):
+    """
+    Tarifie un lot de commandes
+
+    Args:
+        order_files: fichiers de commande (groupées et/ou IMEI, détection automatique)
+        mode: 'dbc' ou 'client' (pas de saisie interactive en lot)
+        output_dir: dossier des fichiers tarifés et du récapitulatif
+        catalog_file: catalogue imposé pour toutes les commandes (sinon par date)
+        catalog_dir: dossier où chercher les catalogues catalogue_dbc_*.xlsx
+        workers: taille du pool (défaut: nombre de cœurs, borné au nombre de commandes)
+        start_method: 'fork' / 'spawn' pour le pool (défaut: fork si disponible)
+        use_cache: reprendre les commandes identiques déjà tarifées (voir order_cache_dir)
+
+    Returns:
+        dict {'orders': [...], 'totals': {...}, 'catalogs': {...}, 'summary_files': [...]}
+    """
+    if mode not in ('dbc', 'client'):
+        raise ValueError(f"Mode invalide '{mode}'. Utilisez 'dbc' ou 'client'.")
+    batch_started = datetime.now()
+    os.makedirs(output_dir, exist_ok=True)
+
+    with span('order_batch.plan', orders=len(order_files)):
+        groups = plan_order_batch(order_files, mode, output_dir, catalog_file, catalog_dir)
+    log.info('order_batch.plan', f"📦 {len(order_files)} commandes, {len(groups)} catalogue(s)",
+             orders=len(order_files), catalogs=len(groups))
+
+    # Commandes identiques déjà tarifées: reprises du cache, sans charger leur catalogue
+    cache_dir = order_cache_dir() if use_cache else None
+    results = []
+    tasks = []
+    for task in (task for catalog_tasks in groups.values() for task in catalog_tasks):
+        cached = load_cached_result(task, cache_dir) if cache_dir and task['cache_key'] else None
+        if cached is not None:
+            CONTENT_DEDUP_HITS.labels(kind='order').inc()
+            results.append(cached)
+        else:
+            tasks.append(task)
+    if results:
+        log.info('order_batch.cached', f"♻️ {len(results)} commande(s) déjà tarifée(s), reprise(s) du cache",
+                 cached=len(results))
+
+    # Chaque catalogue est lu et indexé une seule fois
+    pending = {}
+    for task in tasks:
+        pending[task['catalog_file']] = pending.get(task['catalog_file'], 0) + 1
+    lookups_by_catalog = {}
+    for catalog, count in pending.items():
+        lookups_by_catalog[catalog] = load_catalog_lookups(catalog)
+        log.info('order_batch.catalog', f"📖 Catalogue chargé: {catalog} ({count} commandes)",
+                 catalog=catalog, orders=count)
+
+    workers = workers or default_workers(len(tasks))
+    with span('order_batch.price', orders=len(tasks), workers=workers):
+        if workers <= 1 or len(tasks) <= 1:
+            _init_worker(lookups_by_catalog)
+            priced = [_price_order(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context(start_method),
+                                     initializer=_init_worker, initargs=(lookups_by_catalog,)) as executor:
+                priced = list(executor.map(_price_order, tasks))
+            # Les métriques enregistrées dans les workers sont perdues avec eux
+            for result in priced:
+                if result['success']:
+                    script = 'process_imei_order' if result['kind'] == 'imei' else 'apply_dbc_prices'
+                    record_order_pricing(script, result['mode'], result['seconds'], {
+                        key: result[key] for key in ('sku_exact', 'characteristics', 'not_found')
+                    })
+
+    for task, result in zip(tasks, priced):
+        if cache_dir and task['cache_key'] and result['success']:
+            store_cached_result(task, result, cache_dir)
+    results.extend(priced)
+
+    # Récapitulatif dans l'ordre des fichiers reçus
+    position = {order_file: index for index, order_file in enumerate(order_files)}
+    results.sort(key=lambda result: position[result['order_file']])
+    for result in results:
+        if not result['success']:
+            log.error('order_batch.failed', f"❌ {os.path.basename(result['order_file'])}: {result['error']}",
+                      order_file=result['order_file'], error=result['error'])
+
+    totals, catalogs = consolidate(results)
+    summary_files = write_summary(results, totals, output_dir, batch_started)
+    return {'orders': results, 'totals': totals, 'catalogs': catalogs, 'summary_files': list(summary_files)}
+
+
+def main():
+    """Fonction principale pour usage en ligne de commande"""
+    sources = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    options = dict(arg[2:].split('=', 1) for arg in sys.argv[1:] if arg.startswith('--') and '=' in arg)
+
+    if not sources or options.get('mode') not in ('dbc', 'client'):
+        print("Usage: python order_batch.py <dossier | 'motif*.xlsx' | fichiers...> --mode=dbc|client "
+              "[--catalog=catalogue_dbc.xlsx] [--catalog-dir=DIR] [--output-dir=DIR] [--workers=N] [--no-cache]")
+        print("\nLes commandes groupées et IMEI sont détectées automatiquement et tarifiées en parallèle;")
+        print("chaque catalogue DBC (choisi par la date du nom de fichier) n'est chargé qu'une fois.")
+        sys.exit(1)
+
+    order_files = []
+    for source in sources:
+        order_files.extend(resolve_catalog_files(source) if is_batch_source(source) else [source])
+    missing = [order_file for order_file in order_files if not os.path.exists(order_file)]
+    if missing:
+        print(f"Erreur: Fichiers introuvables: {missing}")
+        sys.exit(1)
+
+    with profile_run('order_batch'):
+        batch = process_order_batch(
+            order_files,
+            mode=options['mode'],
+            output_dir=options.get('output-dir', '.'),
+            catalog_file=options.get('catalog'),
+            catalog_dir=options.get('catalog-dir'),
+            workers=int(options['workers']) if 'workers' in options else None,
+            use_cache='--no-cache' not in sys.argv,
+        )
+    push_metrics('dbc-order-batch')
+
+    totals = batch['totals']
+    print("\n=== RÉCAPITULATIF DU LOT ===")
+    for result in batch['orders']:
+        status = ('♻️' if result.get('cached') else '✅') if result['success'] else '❌'
+        details = (f"{result['rows']} lignes, {result['not_found']} non trouvés, {result['total_dbc']:.2f}€"
+                   if result['success'] else result['error'])
+        print(f"{status} {os.path.basename(result['order_file'])} ({result['kind']}): {details}")
+    print(f"\nCommandes traitées: {totals['succeeded']}/{totals['orders']}")
+    print(f"Lignes: {totals['rows']} (non trouvées: {totals['not_found']})")
+    if totals['imei_duplicates']:
+        print(f"⚠️ IMEI déjà vus ou en double: {totals['imei_duplicates']} (colonne 'Doublon IMEI' en mode dbc)")
+    print(f"Total prix fournisseur: {totals['total_supplier']:.2f}€")
+    print(f"Total prix DBC: {totals['total_dbc']:.2f}€")
+    print(f"Différence: {totals['difference']:.2f}€")
+    print(f"Récapitulatif: {', '.join(batch['summary_files'])}")
+
+    if totals['failed']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Métriques Prometheus du pipeline catalogue et des scripts de commande
+
+Les métriques sont enregistrées dans le registre par défaut de
+prometheus_client: l'API FastAPI les expose sur /metrics (appels Supabase
+des routes, rafraîchissement de l'index...). L'import catalogue déclenché
+par l'API s'exécute dans le pool de process (api/workers.py), dont le
+registre n'est jamais exposé: il y est lancé par call_with_metrics, qui
+renvoie les métriques enregistrées pendant l'import, et l'API les rejoue
+dans son propre registre (replay_metrics). Les scripts lancés en ligne de
+commande (catalog_processor.py depuis Next.js, scripts de commande) sont de
+courte durée: ils poussent leurs métriques vers une Pushgateway en fin
+d'exécution si PROMETHEUS_PUSHGATEWAY_URL est définie.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram, push_to_gateway
+from pipeline_trace import log, span
+
+# Phases de l'import catalogue (ordre d'exécution; coerce: conversion des colonnes numériques
+# du fournisseur, merge: fusion des fichiers en mode lot,
+# price_check: variations de prix fournisseur, row_hash: sélection des lignes modifiées
+# depuis le dernier import, stage / commit_stage: aperçu d'import puis son application,
+# snapshot: instantané binaire du catalogue actif)
+CATALOG_PHASES = ('fetch_existing', 'parse', 'coerce', 'margin', 'merge', 'diff', 'price_check', 'row_hash', 'upsert', 'deactivate', 'record_import',
+                  'stage', 'commit_stage', 'snapshot')
+
+# Un import complet se compte en secondes / minutes, pas en millisecondes
+PHASE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+SUPABASE_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+CATALOG_PHASE_DURATION = Histogram(
+    'dbc_catalog_phase_duration_seconds',
+    "Durée de chaque phase de l'import catalogue",
+    ['phase'], buckets=PHASE_BUCKETS
+)
+CATALOG_PHASE_ROWS_PER_SECOND = Gauge(
+    'dbc_catalog_phase_rows_per_second',
+    'Débit (lignes / seconde) de la dernière exécution de chaque phase',
+    ['phase']
+)
+CATALOG_PHASE_ROWS = Gauge(
+    'dbc_catalog_phase_rows',
+    'Nombre de lignes traitées par la dernière exécution de chaque phase',
+    ['phase']
+)
+CATALOG_IMPORT_DURATION = Gauge(
+    'dbc_catalog_import_duration_seconds',
+    'Durée totale du dernier import catalogue'
+)
+CATALOG_IMPORT_LAST_SUCCESS = Gauge(
+    'dbc_catalog_import_last_success_timestamp_seconds',
+    'Horodatage du dernier import catalogue réussi'
+)
+CATALOG_IMPORTS = Counter(
+    'dbc_catalog_imports_total',
+    'Imports catalogue terminés avec succès'
+)
+CATALOG_IMPORT_FAILURES = Counter(
+    'dbc_catalog_import_failures_total',
+    'Imports catalogue en échec (y compris annulés par un garde-fou)',
+    ['reason']
+)
+CATALOG_UNCHANGED_ROWS = Counter(
+    'dbc_catalog_unchanged_rows_total',
+    "Produits identiques à l'import précédent, non réécrits en base"
+)
+CATALOG_PRICE_ALERTS = Counter(
+    'dbc_catalog_price_alerts_total',
+    "Alertes de prix à l'import catalogue (jumps, brand_outliers, margin_inversions)",
+    ['kind']
+)
+CONTENT_DEDUP_HITS = Counter(
+    'dbc_content_dedup_hits_total',
+    'Fichiers reçus identiques à un traitement précédent (résultat réutilisé)',
+    ['kind']
+)
+
+SUPABASE_REQUEST_DURATION = Histogram(
+    'dbc_supabase_request_duration_seconds',
+    'Latence des appels Supabase',
+    ['table', 'operation'], buckets=SUPABASE_BUCKETS
+)
+SUPABASE_REQUEST_ERRORS = Counter(
+    'dbc_supabase_request_errors_total',
+    'Appels Supabase en erreur',
+    ['table', 'operation']
+)
+DATABASE_CONNECTION_ERRORS = Counter(
+    'dbc_database_connection_errors_total',
+    "Échecs d'initialisation du client Supabase"
+)
+
+ORDER_PRICING_DURATION = Histogram(
+    'dbc_order_pricing_duration_seconds',
+    "Durée de l'application des prix DBC à une commande (lecture catalogue incluse)",
+    ['script', 'mode'], buckets=PHASE_BUCKETS
+)
+ORDER_PRICING_ROWS = Counter(
+    'dbc_order_pricing_rows_total',
+    'Lignes de commande tarifées, par résultat de recherche',
+    ['script', 'result']
+)
+ORDER_PRICING_ROWS_PER_SECOND = Gauge(
+    'dbc_order_pricing_rows_per_second',
+    'Débit de la dernière tarification de commande',
+    ['script']
+)
+
+# Métriques rejouées par replay_metrics, par type (voir call_with_metrics)
+_COUNTERS = (CATALOG_IMPORTS, CATALOG_IMPORT_FAILURES, CATALOG_UNCHANGED_ROWS, CATALOG_PRICE_ALERTS,
+             CONTENT_DEDUP_HITS, SUPABASE_REQUEST_ERRORS, DATABASE_CONNECTION_ERRORS, ORDER_PRICING_ROWS)
+_LABELLED_GAUGES = (CATALOG_PHASE_ROWS_PER_SECOND, CATALOG_PHASE_ROWS, ORDER_PRICING_ROWS_PER_SECOND)
+_GAUGES = (CATALOG_IMPORT_DURATION, CATALOG_IMPORT_LAST_SUCCESS)
+_HISTOGRAMS = (CATALOG_PHASE_DURATION, SUPABASE_REQUEST_DURATION, ORDER_PRICING_DURATION)
+_METRICS = {metric.describe()[0].name: metric for metric in _COUNTERS + _LABELLED_GAUGES + _GAUGES + _HISTOGRAMS}
+_NAMES = {metric: name for name, metric in _METRICS.items()}
+
+# Observations des histogrammes pendant call_with_metrics (None hors capture)
+_histogram_journal = None
+
+
+def _observe(histogram, value, **labels):
+    histogram.labels(**labels).observe(value)
+    if _histogram_journal is not None:
+        _histogram_journal.append((_NAMES[histogram], labels, value))
+
+
+class PhaseTimer:
+    """Mesure d'une phase: renseigner `rows` pour obtenir le débit"""
+
+    def __init__(self, phase):
+        self.phase = phase
+        self.rows = None
+        self.started = None
+        self.elapsed = None
+
+
+@contextmanager
+def catalog_phase(phase, rows=None):
+    """
+    Chronomètre une phase de l'import catalogue (métriques + span catalog.<phase>)
+
+    Exemple:
+        with catalog_phase('upsert') as timer:
+            ...
+            timer.rows = total_imported
+    """
+    timer = PhaseTimer(phase)
+    timer.rows = rows
+    with span(f"catalog.{phase}") as current:
+        timer.started = time.perf_counter()
+        try:
+            yield timer
+        finally:
+            timer.elapsed = time.perf_counter() - timer.started
+            _observe(CATALOG_PHASE_DURATION, timer.elapsed, phase=phase)
+            if timer.rows is not None:
+                current.set(rows=timer.rows)
+                CATALOG_PHASE_ROWS.labels(phase=phase).set(timer.rows)
+                if timer.elapsed > 0:
+                    CATALOG_PHASE_ROWS_PER_SECOND.labels(phase=phase).set(timer.rows / timer.elapsed)
+
+
+@contextmanager
+def supabase_call(table, operation):
+    """Chronomètre un appel Supabase et compte les erreurs (l'exception est propagée)"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        SUPABASE_REQUEST_ERRORS.labels(table=table, operation=operation).inc()
+        raise
+    finally:
+        _observe(SUPABASE_REQUEST_DURATION, time.perf_counter() - started, table=table, operation=operation)
+
+
+def record_order_pricing(script, mode, elapsed, results):
+    """
+    Enregistre le débit d'une tarification de commande
+
+    Args:
+        results: dict {résultat: nombre de lignes} (sku_exact, characteristics, not_found)
+    """
+    mode = mode or 'unknown'
+    _observe(ORDER_PRICING_DURATION, elapsed, script=script, mode=mode)
+    total_rows = 0
+    for result, count in results.items():
+        ORDER_PRICING_ROWS.labels(script=script, result=result).inc(count)
+        total_rows += count
+    if elapsed > 0:
+        ORDER_PRICING_ROWS_PER_SECOND.labels(script=script).set(total_rows / elapsed)
+
+
+def _samples(metric):
+    """{(nom de l'échantillon, étiquettes): valeur}, sans les horodatages _created"""
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in metric.collect() for sample in family.samples if not sample.name.endswith('_created')
+    }
+
+
+def call_with_metrics(func, *args, **kwargs):
+    """
+    Exécute func dans un worker du pool de process de l'API et renvoie les
+    métriques enregistrées pendant l'appel, à rejouer par replay_metrics
+
+    Compteurs: différence avant / après. Jauges: remises à zéro (NaN) avant
+    l'appel, seules celles renseignées sont renvoyées. Histogrammes: chaque
+    observation est journalisée.
+
+    Returns:
+        dict result, error (message si func a levé une exception, sinon None), metrics
+    """
+    global _histogram_journal
+    before = {_NAMES[metric]: _samples(metric) for metric in _COUNTERS}
+    for gauge in _LABELLED_GAUGES:
+        gauge.clear()
+    for gauge in _GAUGES:
+        gauge.set(float('nan'))
+    _histogram_journal = []
+    result = error = None
+    try:
+        result = func(*args, **kwargs)
+    except Exception as e:
+        error = str(e)
+    finally:
+        observations, _histogram_journal = _histogram_journal, None
+
+    counters = []
+    for metric in _COUNTERS:
+        name = _NAMES[metric]
+        for key, value in _samples(metric).items():
+            delta = value - before[name].get(key, 0)
+            if delta:
+                counters.append((name, dict(key[1]), delta))
+    gauges = [
+        (_NAMES[metric], dict(key[1]), value)
+        for metric in _LABELLED_GAUGES + _GAUGES for key, value in _samples(metric).items() if value == value
+    ]
+    return {
+        'result': result,
+        'error': error,
+        'metrics': {'counters': counters, 'gauges': gauges, 'histograms': observations},
+    }
+
+
+def replay_metrics(metrics):
+    """Enregistre dans le registre du process les métriques renvoyées par call_with_metrics"""
+    for name, labels, delta in metrics['counters']:
+        (_METRICS[name].labels(**labels) if labels else _METRICS[name]).inc(delta)
+    for name, labels, value in metrics['gauges']:
+        (_METRICS[name].labels(**labels) if labels else _METRICS[name]).set(value)
+    for name, labels, value in metrics['histograms']:
+        _METRICS[name].labels(**labels).observe(value)
+
+
+def catalog_phase_summary():
+    """
+    Durée cumulée, lignes et débit par phase depuis le démarrage du process
+
+    Utilisé par les benchmarks (un process par scénario).
+    """
+    summary = {}
+    for metric in REGISTRY.collect():
+        if metric.name == 'dbc_catalog_phase_duration_seconds':
+            for sample in metric.samples:
+                if sample.name.endswith('_sum'):
+                    summary.setdefault(sample.labels['phase'], {})['seconds'] = round(sample.value, 4)
+        elif metric.name == 'dbc_catalog_phase_rows':
+            for sample in metric.samples:
+                summary.setdefault(sample.labels['phase'], {})['rows'] = int(sample.value)
+    for phase in summary.values():
+        if phase.get('rows') is not None and phase.get('seconds'):
+            phase['rows_per_second'] = round(phase['rows'] / phase['seconds'], 1)
+    # Ordre d'exécution du pipeline
+    return {phase: summary[phase] for phase in CATALOG_PHASES if phase in summary}
+
+
+def push_metrics(job):
+    """
+    Pousse le registre vers la Pushgateway (scripts en ligne de commande)
+
+    Sans PROMETHEUS_PUSHGATEWAY_URL, ne fait rien. Une Pushgateway
+    indisponible ne doit jamais faire échouer un import.
+    """
+    gateway = os.getenv('PROMETHEUS_PUSHGATEWAY_URL')
+    if not gateway:
+        return False
+    try:
+        push_to_gateway(gateway, job=job, registry=REGISTRY, timeout=5)
+        return True
+    except Exception as e:
+        log.warning('metrics.push_failed', f"⚠️ Impossible de pousser les métriques vers {gateway}: {e}", gateway=gateway)
+        return False
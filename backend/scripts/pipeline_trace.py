@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Traces, logs structurés et profilage des scripts Python
+
+- span(name, **attrs): mesure imbriquée d'une étape (parse, diff, upsert...)
+- log: logs en texte (emoji, stdout, comportement historique) ou en JSON
+  (une ligne par événement sur stderr) avec un niveau minimal et un nombre
+  borné de messages par événement répétitif (log.sample)
+- profile_run(name): profilage optionnel d'une exécution complète
+
+Variables d'environnement:
+    DBC_LOG_FORMAT=text|json        (défaut: text)
+    DBC_LOG_LEVEL=debug|info|warning|error (défaut: info)
+    DBC_LOG_SAMPLE_LIMIT=10         messages max par événement échantillonné
+    DBC_PROFILE=cprofile|sample     profilage de l'exécution (défaut: désactivé)
+    DBC_PROFILE_INTERVAL_MS=5       période d'échantillonnage (mode sample)
+    DBC_TRACE=1                     export des spans au format Chrome trace
+    DBC_PROFILE_DIR=profiles        dossier des fichiers produits
+
+Fichiers produits dans DBC_PROFILE_DIR:
+    <nom>-<horodatage>.prof         cProfile (pstats, snakeviz, flameprof)
+    <nom>-<horodatage>.folded       piles repliées (flamegraph.pl, speedscope)
+    <nom>-<horodatage>.trace.json   spans (chrome://tracing, Perfetto, speedscope)
+
+En mode json, stdout ne contient plus que le résultat final des scripts
+(la ligne JSON lue par la route Next.js).
+"""
+
+import cProfile
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+
+# Spans conservés pour l'export (un import complet en produit une dizaine)
+MAX_SPANS = 10000
+
+
+class PipelineLogger:
+    """
+    Logs texte ou JSON avec niveau minimal et échantillonnage par événement
+
+    Les variables DBC_LOG_* sont lues au premier message (ou au premier accès
+    à format / level / sample_limit), pas à l'import du module: les points
+    d'entrée chargent .env.local / .env (load_env) après leurs imports.
+    """
+
+    def __init__(self):
+        self._settings = None
+        self._sampled = Counter()
+        self._sample_limits = {}
+
+    def configure(self, log_format=None, level=None, sample_limit=None):
+        """(Re)lit la configuration; les arguments l'emportent sur l'environnement"""
+        self._settings = {
+            'format': (log_format or os.getenv('DBC_LOG_FORMAT', 'text')).lower(),
+            'level': LEVELS.get((level or os.getenv('DBC_LOG_LEVEL', 'info')).lower(), LEVELS['info']),
+            'sample_limit': sample_limit if sample_limit is not None else int(os.getenv('DBC_LOG_SAMPLE_LIMIT', '10')),
+        }
+
+    def _setting(self, name):
+        if self._settings is None:
+            self.configure()
+        return self._settings[name]
+
+    @property
+    def format(self):
+        return self._setting('format')
+
+    @property
+    def level(self):
+        return self._setting('level')
+
+    @property
+    def sample_limit(self):
+        return self._setting('sample_limit')
+
+    @property
+    def json_mode(self):
+        return self.format == 'json'
+
+    def _emit(self, level, event, message, fields):
+        if LEVELS[level] < self.level:
+            return
+        if not self.json_mode:
+            print(message)
+            return
+        record = {
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'level': level,
+            'event': event,
+            'msg': message,
+        }
+        current = _current_span.get()
+        if current is not None:
+            record['span'] = current.name
+        record.update(fields)
+        sys.stderr.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    def debug(self, event, message, **fields):
+        self._emit('debug', event, message, fields)
+
+    def info(self, event, message, **fields):
+        self._emit('info', event, message, fields)
+
+    def warning(self, event, message, **fields):
+        self._emit('warning', event, message, fields)
+
+    def error(self, event, message, **fields):
+        self._emit('error', event, message, fields)
+
+    def sample(self, event, message, level='info', limit=None, **fields):
+        """
+        Message répétitif (un par SKU, par ligne...): seuls les `limit` premiers
+        sont émis, le nombre de messages omis est résumé par flush_samples()
+        """
+        if LEVELS[level] < self.level:
+            return
+        limit = self.sample_limit if limit is None else limit
+        self._sampled[event] += 1
+        self._sample_limits[event] = limit
+        if self._sampled[event] <= limit:
+            self._emit(level, event, message, fields)
+
+    def flush_samples(self):
+        """Résumé des messages omis par log.sample"""
+        for event, count in self._sampled.items():
+            omitted = count - self._sample_limits[event]
+            if omitted > 0:
+                self.info('log.sampled', f"   ... {omitted} autres messages '{event}' omis", sampled_event=event, omitted=omitted, total=count)
+        self._sampled.clear()
+        self._sample_limits.clear()
+
+
+log = PipelineLogger()
+
+
+# ----------------------------------------------------------------------
+# Spans
+# ----------------------------------------------------------------------
+
+class Span:
+    """Étape mesurée; les attributs peuvent être complétés pendant l'exécution"""
+
+    def __init__(self, name, parent, attrs):
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+        self.thread_id = threading.get_ident()
+        self.start_wall = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    @property
+    def depth(self):
+        return 0 if self.parent is None else self.parent.depth + 1
+
+
+_current_span = contextvars.ContextVar('dbc_current_span', default=None)
+_finished_spans = []
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Mesure une étape et la journalise à sa fin
+
+    Exemple:
+        with span('catalog.parse', file=file_path) as current:
+            ...
+            current.set(rows=len(df))
+    """
+    current = Span(name, _current_span.get(), dict(attrs))
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.set(error=str(e))
+        raise
+    finally:
+        current.duration = time.perf_counter() - current.start
+        _current_span.reset(token)
+        if len(_finished_spans) < MAX_SPANS:
+            _finished_spans.append(current)
+        indent = '  ' * current.depth
+        log.debug('span', f"{indent}⏱️ {name}: {current.duration:.3f}s",
+                  span_name=name, duration_ms=round(current.duration * 1000, 2), **current.attrs)
+
+
+def finished_spans():
+    return list(_finished_spans)
+
+
+def export_chrome_trace(path):
+    """Écrit les spans au format Chrome trace event (événements 'X' complets)"""
+    pid = os.getpid()
+    events = [
+        {
+            'name': item.name,
+            'ph': 'X',
+            'ts': round(item.start_wall * 1e6),
+            'dur': round(item.duration * 1e6),
+            'pid': pid,
+            'tid': item.thread_id,
+            'args': item.attrs,
+        }
+        for item in _finished_spans if item.duration is not None
+    ]
+    with open(path, 'w') as trace_file:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace_file, default=str)
+    return path
+
+
+# ----------------------------------------------------------------------
+# Profilage
+# ----------------------------------------------------------------------
+
+class SamplingProfiler:
+    """
+    Échantillonneur de piles du thread principal (sans dépendance externe)
+
+    Un thread relève la pile du thread cible toutes les `interval` secondes
+    et compte les piles repliées "module:fonction;module:fonction".
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.main_thread().ident
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='dbc-sampling-profiler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                module = os.path.splitext(os.path.basename(code.co_filename))[0]
+                stack.append(f"{module}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write_folded(self, path):
+        with open(path, 'w') as folded_file:
+            for stack, count in self.stacks.most_common():
+                folded_file.write(f"{stack} {count}\n")
+        return path
+
+
+@contextmanager
+def profile_run(name):
+    """
+    Profilage / export de traces d'une exécution complète selon l'environnement
+
+    Sans DBC_PROFILE ni DBC_TRACE, ne fait que journaliser les messages omis.
+    """
+    mode = os.getenv('DBC_PROFILE', '').lower()
+    trace = os.getenv('DBC_TRACE', '').lower() in ('1', 'true', 'yes')
+    output_dir = os.getenv('DBC_PROFILE_DIR', 'profiles')
+    prefix = os.path.join(output_dir, f"{name}-{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+
+    profiler = sampler = None
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+    elif mode == 'sample':
+        sampler = SamplingProfiler(interval=float(os.getenv('DBC_PROFILE_INTERVAL_MS', '5')) / 1000)
+        sampler.start()
+
+    try:
+        with span(name):
+            yield
+    finally:
+        log.flush_samples()
+        written = []
+        if profiler is not None or sampler is not None or trace:
+            os.makedirs(output_dir, exist_ok=True)
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(f"{prefix}.prof")
+            written.append(f"{prefix}.prof")
+        if sampler is not None:
+            sampler.stop()
+            written.append(sampler.write_folded(f"{prefix}.folded"))
+        if trace:
+            written.append(export_chrome_trace(f"{prefix}.trace.json"))
+        for path in written:
+            log.info('profile.written', f"🔬 Profil écrit: {path}", path=path)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Variations de prix fournisseur détectées pendant l'import catalogue
+
+Les prix précédents (products.price) sont chargés avec les stocks dans la
+SkuStateTable (fetch_existing_products). La comparaison avec le catalogue
+se fait sur tableaux NumPy, sans boucle par SKU:
+- variation en % de chaque SKU déjà en base avec un prix connu
+- saut de prix: |variation| au-delà de CATALOG_PRICE_JUMP_PCT (défaut 25%)
+- écart par marque: z-score de la variation parmi les SKU de la même marque
+  au-delà de CATALOG_PRICE_ZSCORE (défaut 3)
+- inversion de marge: price_dbc inférieur au prix fournisseur (Price, ou
+  Campaign Price s'il est plus élevé)
+
+Le rapport (comptes, quantiles, pires écarts) est enregistré avec l'import
+(import_summary.stats.price_changes).
+"""
+
+import os
+
+import numpy as np
+
+from pipeline_metrics import CATALOG_PRICE_ALERTS
+from pipeline_trace import log
+from sku_state import encode_skus
+
+DEFAULT_JUMP_PCT = 25.0
+DEFAULT_ZSCORE = 3.0
+# z-score calculé seulement pour les marques assez représentées
+MIN_BRAND_ROWS = 20
+# Une marque aux prix stables a un écart-type quasi nul: petite variation, z-score énorme
+MIN_OUTLIER_CHANGE_PCT = 2.0
+# Lignes détaillées conservées dans le rapport (pires écarts, inversions)
+REPORT_SIZE = 20
+NO_BRAND = '-'
+
+
+def price_thresholds(jump_pct=None, zscore=None):
+    """Seuils d'alerte: arguments, sinon variables d'environnement, sinon défauts"""
+    return {
+        'jump_pct': float(jump_pct if jump_pct is not None else os.getenv('CATALOG_PRICE_JUMP_PCT', DEFAULT_JUMP_PCT)),
+        'zscore': float(zscore if zscore is not None else os.getenv('CATALOG_PRICE_ZSCORE', DEFAULT_ZSCORE)),
+        'min_brand_rows': MIN_BRAND_ROWS,
+    }
+
+
+def _prices(products, field):
+    # Prix absent ou nul: NaN (non comparable)
+    return np.fromiter((product.get(field) or np.nan for product in products), dtype=np.float64, count=len(products))
+
+
+def _round(value):
+    return None if value is None or np.isnan(value) else round(float(value), 2)
+
+
+def brand_zscores(brands, changes, min_rows=MIN_BRAND_ROWS):
+    """
+    z-score de chaque variation au sein de sa marque (moyenne / écart-type par bincount)
+
+    Returns:
+        (zscores (0 si la marque est trop peu représentée ou sans dispersion),
+         marques, comptes, moyennes, écarts-types par marque)
+    """
+    labels, inverse = np.unique(brands, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(labels))
+    safe_counts = np.maximum(counts, 1)
+    means = np.bincount(inverse, weights=changes, minlength=len(labels)) / safe_counts
+    variances = np.bincount(inverse, weights=changes ** 2, minlength=len(labels)) / safe_counts - means ** 2
+    stds = np.sqrt(np.maximum(variances, 0))
+
+    zscores = np.zeros(len(changes))
+    usable = (counts[inverse] >= min_rows) & (stds[inverse] > 0)
+    zscores[usable] = (changes[usable] - means[inverse][usable]) / stds[inverse][usable]
+    return zscores, labels, counts, means, stds
+
+
+def compute_price_changes(existing, products, jump_pct=None, zscore=None):
+    """
+    Compare les prix du catalogue aux prix en base
+
+    Args:
+        existing: SkuStateTable (prix fournisseur en base dans existing.prices)
+        products: produits traités (sku, price, campaign_price, price_dbc, brand)
+
+    Returns:
+        Rapport compact (JSON) des variations et alertes
+    """
+    thresholds = price_thresholds(jump_pct, zscore)
+    new_prices = _prices(products, 'price')
+    positions, found = existing.lookup(encode_skus([product['sku'] for product in products]))
+    old_prices = np.where(found, existing.prices[positions], np.nan) if len(existing) else np.full(len(products), np.nan)
+
+    # Comparaisons avec NaN fausses: SKU nouveaux ou prix inconnus exclus
+    compared = np.flatnonzero(found & (old_prices > 0) & (new_prices > 0))
+    changes = (new_prices[compared] - old_prices[compared]) / old_prices[compared] * 100
+    brands = np.array([products[index].get('brand') or NO_BRAND for index in compared.tolist()], dtype=object)
+    zscores, labels, counts, means, stds = brand_zscores(brands, changes)
+
+    jumps = np.abs(changes) >= thresholds['jump_pct']
+    outliers = (np.abs(zscores) >= thresholds['zscore']) & (np.abs(changes) >= MIN_OUTLIER_CHANGE_PCT)
+
+    price_dbc = _prices(products, 'price_dbc')
+    supplier_cost = np.fmax(new_prices, _prices(products, 'campaign_price'))
+    inversions = np.flatnonzero((price_dbc > 0) & (price_dbc < supplier_cost))
+
+    changed = changes[changes != 0]
+    flagged = np.flatnonzero(jumps | outliers)
+    flagged = flagged[np.argsort(-np.abs(changes[flagged]), kind='stable')][:REPORT_SIZE]
+    outliers_per_brand = np.bincount(np.searchsorted(labels, brands[outliers]), minlength=len(labels)) \
+        if len(labels) else np.zeros(0, dtype=np.int64)
+
+    return {
+        'compared': len(compared),
+        'changed': len(changed),
+        'increased': int((changed > 0).sum()),
+        'decreased': int((changed < 0).sum()),
+        'median_change_pct': _round(np.median(changed)) if len(changed) else None,
+        'p95_abs_change_pct': _round(np.percentile(np.abs(changed), 95)) if len(changed) else None,
+        'jumps': int(jumps.sum()),
+        'brand_outliers': int(outliers.sum()),
+        'margin_inversions': len(inversions),
+        'thresholds': thresholds,
+        'brands': {
+            label: {'compared': int(count), 'mean_change_pct': _round(mean), 'std_change_pct': _round(std),
+                    'outliers': int(outlier_count)}
+            for label, count, mean, std, outlier_count in zip(labels.tolist(), counts, means, stds, outliers_per_brand)
+        },
+        'top_changes': [
+            {
+                'sku': products[compared[index]]['sku'],
+                'brand': brands[index],
+                'old_price': _round(old_prices[compared[index]]),
+                'new_price': _round(new_prices[compared[index]]),
+                'change_pct': _round(changes[index]),
+                'zscore': _round(zscores[index]),
+                'jump': bool(jumps[index]),
+                'brand_outlier': bool(outliers[index]),
+            }
+            for index in flagged.tolist()
+        ],
+        'margin_inversion_skus': [
+            {
+                'sku': products[index]['sku'],
+                'price': _round(new_prices[index]),
+                'campaign_price': products[index].get('campaign_price'),
+                'price_dbc': _round(price_dbc[index]),
+            }
+            for index in inversions[:REPORT_SIZE].tolist()
+        ],
+    }
+
+
+def report_price_changes(report):
+    """Alertes (logs + compteur Prometheus) à partir du rapport de compute_price_changes"""
+    thresholds = report['thresholds']
+    if report['changed']:
+        log.info('catalog.price_changes', (
+            f"💶 Prix fournisseur: {report['changed']} modifiés sur {report['compared']} comparés "
+            f"(hausses: {report['increased']}, baisses: {report['decreased']}, médiane: {report['median_change_pct']:+.2f}%)"
+        ), compared=report['compared'], changed=report['changed'], median_change_pct=report['median_change_pct'])
+    else:
+        log.info('catalog.price_changes', f"💶 Prix fournisseur: aucune variation sur {report['compared']} SKU comparés",
+                 compared=report['compared'], changed=0)
+
+    for kind in ('jumps', 'brand_outliers', 'margin_inversions'):
+        if report[kind]:
+            CATALOG_PRICE_ALERTS.labels(kind=kind).inc(report[kind])
+    if report['jumps'] or report['brand_outliers']:
+        log.warning('catalog.price_jumps', (
+            f"⚠️ {report['jumps']} variations de prix ≥ {thresholds['jump_pct']:g}% et "
+            f"{report['brand_outliers']} écarts anormaux pour leur marque (|z| ≥ {thresholds['zscore']:g})"
+        ), jumps=report['jumps'], brand_outliers=report['brand_outliers'])
+        for change in report['top_changes']:
+            log.sample('catalog.price_jump', (
+                f"⚠️ {change['sku']} ({change['brand']}): {change['old_price']} → {change['new_price']} "
+                f"({change['change_pct']:+.1f}%, z={change['zscore']:.1f})"
+            ), level='warning', **change)
+    if report['margin_inversions']:
+        log.warning('catalog.margin_inversions', (
+            f"🚨 {report['margin_inversions']} produits avec un prix DBC inférieur au prix fournisseur"
+        ), margin_inversions=report['margin_inversions'])
+        for inversion in report['margin_inversion_skus']:
+            log.sample('catalog.margin_inversion', (
+                f"🚨 {inversion['sku']}: prix DBC {inversion['price_dbc']} < prix fournisseur "
+                f"{inversion['price']} (campagne: {inversion['campaign_price']})"
+            ), level='warning', **inversion)
@@ -4,18 +4,25 @@ Script pour traiter les commandes détaillées avec IMEI/numéros de série
 Applique les prix DBC et exporte en CSV UTF-8 pour import dans le logiciel
 """
 
-import pandas as pd
 import sys
 from datetime import datetime
 import os
 import glob
 import re
+import time
 from apply_dbc_prices_to_order import (
     find_matching_catalog, 
     build_product_lookup, 
     find_product_price,
-    extract_date_from_filename
+    extract_date_from_filename,
+    extract_order_date,
+    load_catalog_lookups
 )
+from imei_order_persistence import persist_imei_order
+from imei_registry import flag_order_duplicates
+from env_loader import load_env
+from pipeline_metrics import push_metrics, record_order_pricing
+from pipeline_trace import log, profile_run, span
 
 def validate_imei_order_format(df):
     """
@@ -58,7 +65,8 @@ def ask_mode_if_needed(mode):
             else:
                 print("Choix invalide. Veuillez entrer 1 ou 2.")
 
-def process_imei_order(order_file, catalog_file=None, output_file=None, order_date=None, mode=None):
+def process_imei_order(order_file, catalog_file=None, output_file=None, order_date=None, mode=None, lookups=None,
+                       persist_order_id=None, supabase=None):
     """
     Traite une commande avec IMEI et applique les prix DBC
     
@@ -68,66 +76,75 @@ def process_imei_order(order_file, catalog_file=None, output_file=None, order_da
         output_file: Fichier de sortie CSV (optionnel)
         order_date: Date de la commande pour trouver le bon catalogue (optionnel)
         mode: 'dbc' pour usage interne, 'client' pour version client, None pour demander
+        lookups: (sku_lookup, characteristics_lookup) déjà construits pour catalog_file
+        persist_order_id: commande Supabase dans laquelle enregistrer les appareils tarifés
+            (order_items / order_item_imei), None pour ne rien enregistrer
+        supabase: client Supabase pour persist_order_id (créé si None)
+    
+    Returns:
+        DataFrame de la commande tarifée (résumé dans df.attrs['summary']), None en cas d'erreur
     """
+    import pandas as pd
     try:
         # Lire la commande
-        print(f"\nLecture de la commande avec IMEI: {order_file}")
+        log.info('order.read', f"\nLecture de la commande avec IMEI: {order_file}", file=order_file)
         
         try:
             df_order = pd.read_excel(order_file)
         except Exception as e:
-            print(f"\nERREUR: Impossible de lire le fichier Excel.")
-            print(f"Détails: {str(e)}")
+            log.error('order.read_failed', f"\nERREUR: Impossible de lire le fichier Excel.\nDétails: {e}",
+                      file=order_file, error=str(e))
             return None
         
         # Valider le format du fichier
         is_valid, message = validate_imei_order_format(df_order)
         if not is_valid:
-            print(f"\nERREUR: Format de fichier incorrect.")
-            print(f"Détails: {message}")
-            print("\nCe script est conçu pour traiter les fichiers avec numéros de série/IMEI.")
-            print("Structure attendue: SKU, Id, Product Name, Item Identifier, Price, etc.")
+            log.error('order.invalid_format', (
+                f"\nERREUR: Format de fichier incorrect.\nDétails: {message}\n"
+                "\nCe script est conçu pour traiter les fichiers avec numéros de série/IMEI.\n"
+                "Structure attendue: SKU, Id, Product Name, Item Identifier, Price, etc."
+            ), file=order_file, error=message)
             return None
         
-        print("✓ Format du fichier validé")
-        print(f"✓ Nombre de lignes à traiter: {len(df_order)}")
+        log.info('order.validated', f"✓ Format du fichier validé\n✓ Nombre de lignes à traiter: {len(df_order)}",
+                 rows=len(df_order))
         
         # Demander le mode si nécessaire
         if mode is None:
             mode = ask_mode_if_needed(mode)
-        print(f"Mode sélectionné: {mode.upper()}")
+        log.info('order.mode', f"Mode sélectionné: {mode.upper()}", mode=mode)
         
         # Essayer d'extraire la date du nom du fichier si pas fournie
         if order_date is None and 'order-' in order_file.lower():
-            date_match = re.search(r'(\w+, \w+ \d+, \d{4})', order_file)
-            if date_match:
-                try:
-                    order_date = datetime.strptime(date_match.group(1), '%A, %B %d, %Y').date()
-                    print(f"✓ Date extraite du nom de fichier: {order_date}")
-                except:
-                    print("⚠ Impossible d'extraire la date du nom de fichier")
+            order_date = extract_order_date(order_file)
+            if order_date:
+                log.info('order.date', f"✓ Date extraite du nom de fichier: {order_date}", order_date=order_date)
+            elif re.search(r'(\w+, \w+ \d+, \d{4})', order_file):
+                log.warning('order.date_unparsed', "⚠ Impossible d'extraire la date du nom de fichier", file=order_file)
         
         # Trouver ou utiliser le catalogue DBC
         if catalog_file is None:
             try:
                 catalog_file = find_matching_catalog(order_date)
-                print(f"✓ Catalogue DBC trouvé: {catalog_file}")
+                log.info('order.catalog', f"✓ Catalogue DBC trouvé: {catalog_file}", catalog=catalog_file)
             except FileNotFoundError:
-                print("\nERREUR: Aucun catalogue DBC trouvé.")
-                print("Assurez-vous d'avoir généré un catalogue avec transform_catalog.py")
+                log.error('order.catalog_missing', (
+                    "\nERREUR: Aucun catalogue DBC trouvé.\n"
+                    "Assurez-vous d'avoir généré un catalogue avec transform_catalog.py"
+                ))
                 return None
         
-        # Lire le catalogue DBC
+        # Débit mesuré à partir du chargement du catalogue (hors saisie du mode)
+        started = time.perf_counter()
+        
+        # Lire le catalogue DBC et construire les dictionnaires de recherche
         try:
-            df_catalog = pd.read_excel(catalog_file)
+            sku_lookup, characteristics_lookup = lookups or load_catalog_lookups(catalog_file)
         except Exception as e:
-            print(f"\nERREUR: Impossible de lire le catalogue DBC.")
-            print(f"Détails: {str(e)}")
+            log.error('order.catalog_read_failed', f"\nERREUR: Impossible de lire le catalogue DBC.\nDétails: {e}",
+                      catalog=catalog_file, error=str(e))
             return None
-        
-        # Construire les dictionnaires de recherche
-        sku_lookup, characteristics_lookup = build_product_lookup(df_catalog)
-        print(f"✓ Catalogue chargé: {len(sku_lookup)} SKUs")
+        log.info('order.catalog_loaded', f"✓ Catalogue chargé: {len(sku_lookup)} SKUs", skus=len(sku_lookup))
         
         # Créer une copie de la commande pour modification
         df_result = df_order.copy()
@@ -151,60 +168,91 @@ def process_imei_order(order_file, catalog_file=None, output_file=None, order_da
         count_not_found = 0
         not_found_details = []
         
-        print("\nTraitement des produits...")
+        log.info('order.pricing', "\nTraitement des produits...", rows=len(df_result))
         
         # Appliquer les prix DBC
-        for index, row in df_result.iterrows():
-            sku = row['SKU']
-            prix_fournisseur = row['Prix Fournisseur']
-            
-            # Extraire les caractéristiques
-            product_name = row.get('Product Name', '')
-            appearance = row.get('Appearance', '')
-            functionality = row.get('Functionality', '')
-            vat_type_order = row.get('VAT Type', '')
-            
-            # Rechercher le produit
-            product_info, search_method = find_product_price(
-                sku, product_name, appearance, functionality, vat_type_order,
-                sku_lookup, characteristics_lookup
-            )
-            
-            if product_info:
-                prix_dbc = product_info['Prix DBC']
-                prix_catalogue = product_info['Prix original']
-                vat_type = product_info['VAT Type']
+        with span('order.price_rows', rows=len(df_result)):
+            for index, row in df_result.iterrows():
+                sku = row['SKU']
+                prix_fournisseur = row['Prix Fournisseur']
                 
-                if mode == 'dbc':
-                    df_result.at[index, 'Prix Catalogue'] = prix_catalogue
-                    df_result.at[index, 'Prix DBC'] = prix_dbc
-                    df_result.at[index, 'VAT Type DBC'] = vat_type if pd.notna(vat_type) else 'Non marginal'
-                    df_result.at[index, 'Méthode recherche'] = search_method
-                    df_result.at[index, 'Statut'] = f'OK - {search_method}'
+                # Extraire les caractéristiques
+                product_name = row.get('Product Name', '')
+                appearance = row.get('Appearance', '')
+                functionality = row.get('Functionality', '')
+                vat_type_order = row.get('VAT Type', '')
                 
-                df_result.at[index, 'Price'] = prix_dbc
+                # Rechercher le produit
+                product_info, search_method = find_product_price(
+                    sku, product_name, appearance, functionality, vat_type_order,
+                    sku_lookup, characteristics_lookup
+                )
                 
-                if search_method == 'SKU exact':
-                    count_sku_exact += 1
+                if product_info:
+                    prix_dbc = product_info['Prix DBC']
+                    prix_catalogue = product_info['Prix original']
+                    vat_type = product_info['VAT Type']
+                    
+                    if mode == 'dbc':
+                        df_result.at[index, 'Prix Catalogue'] = prix_catalogue
+                        df_result.at[index, 'Prix DBC'] = prix_dbc
+                        df_result.at[index, 'VAT Type DBC'] = vat_type if pd.notna(vat_type) else 'Non marginal'
+                        df_result.at[index, 'Méthode recherche'] = search_method
+                        df_result.at[index, 'Statut'] = f'OK - {search_method}'
+                    
+                    df_result.at[index, 'Price'] = prix_dbc
+                    
+                    if search_method == 'SKU exact':
+                        count_sku_exact += 1
+                    else:
+                        count_characteristics += 1
                 else:
-                    count_characteristics += 1
-            else:
-                # Produit non trouvé
-                not_found_details.append({
-                    'SKU': sku,
-                    'Product': product_name,
-                    'Appearance': appearance,
-                    'Functionality': functionality,
-                    'IMEI': row.get('Item Identifier', 'N/A')
-                })
-                
-                if mode == 'dbc':
-                    df_result.at[index, 'Statut'] = 'ATTENTION - Produit non trouvé'
-                    df_result.at[index, 'Prix DBC'] = prix_fournisseur
-                    df_result.at[index, 'Méthode recherche'] = 'Non trouvé'
-                
-                df_result.at[index, 'Price'] = float(prix_fournisseur) if pd.notna(prix_fournisseur) else 0
-                count_not_found += 1
+                    # Produit non trouvé
+                    not_found_details.append({
+                        'SKU': sku,
+                        'Product': product_name,
+                        'Appearance': appearance,
+                        'Functionality': functionality,
+                        'IMEI': row.get('Item Identifier', 'N/A')
+                    })
+                    
+                    if mode == 'dbc':
+                        df_result.at[index, 'Statut'] = 'ATTENTION - Produit non trouvé'
+                        df_result.at[index, 'Prix DBC'] = prix_fournisseur
+                        df_result.at[index, 'Méthode recherche'] = 'Non trouvé'
+                    
+                    df_result.at[index, 'Price'] = float(prix_fournisseur) if pd.notna(prix_fournisseur) else 0
+                    count_not_found += 1
+        
+        record_order_pricing('process_imei_order', mode, time.perf_counter() - started, {
+            'sku_exact': count_sku_exact,
+            'characteristics': count_characteristics,
+            'not_found': count_not_found
+        })
+        
+        # Enregistrement groupé des appareils dans la commande (une transaction, rejouable)
+        persisted = None
+        if persist_order_id:
+            try:
+                if supabase is None:
+                    from catalog_processor import init_supabase
+                    supabase = init_supabase()
+                persisted = persist_imei_order(supabase, persist_order_id, df_result)
+            except Exception as e:
+                log.error('order.persist_failed', (
+                    f"\nERREUR: Impossible d'enregistrer les appareils dans la commande {persist_order_id}.\nDétails: {e}"
+                ), order_id=persist_order_id, error=str(e))
+                return None
+        
+        # Registre IMEI: numéros déjà vus dans une commande précédente ou en double ici
+        # (la commande est inscrite quel que soit le mode, signalée en mode DBC)
+        imei_flags = flag_order_duplicates(df_order, order_file, order_date)
+        imei_duplicates = [
+            (identifier, sku, flag)
+            for identifier, sku, flag in zip(df_order['Item Identifier'], df_order['SKU'], imei_flags or []) if flag
+        ]
+        if mode == 'dbc' and imei_flags is not None:
+            df_result['Doublon IMEI'] = imei_flags
         
         # Calculer les totaux
         total_fournisseur = df_result['Prix Fournisseur'].sum()
@@ -215,7 +263,7 @@ def process_imei_order(order_file, catalog_file=None, output_file=None, order_da
             # Garder l'ordre original et ajouter les nouvelles colonnes à la fin
             original_cols = list(df_order.columns)
             new_cols = ['Prix Fournisseur', 'Prix Catalogue', 'Prix DBC', 'VAT Type DBC', 
-                       'Méthode recherche', 'Statut']
+                       'Méthode recherche', 'Statut', 'Doublon IMEI']
             
             all_cols = original_cols + new_cols
             # Garder seulement les colonnes qui existent
@@ -237,67 +285,93 @@ def process_imei_order(order_file, catalog_file=None, output_file=None, order_da
             output_file = f"{base_name}{suffix}_{timestamp}.csv"
         
         # Sauvegarder en CSV UTF-8
-        df_result.to_csv(output_file, index=False, encoding='utf-8')
-        print(f"\n✓ Fichier CSV sauvegardé: {output_file}")
-        print(f"✓ Encodage: UTF-8")
+        with span('order.write_output', file=output_file):
+            df_result.to_csv(output_file, index=False, encoding='utf-8')
+        log.info('order.output', f"\n✓ Fichier CSV sauvegardé: {output_file}\n✓ Encodage: UTF-8", file=output_file)
         
         # Afficher le résumé
-        print("\n" + "="*60)
-        print("RÉSUMÉ DE LA TRANSFORMATION")
-        print("="*60)
-        print(f"Catalogue DBC utilisé: {catalog_file}")
-        print(f"Nombre total de lignes: {len(df_result)}")
-        print(f"✓ Produits trouvés par SKU exact: {count_sku_exact}")
-        print(f"✓ Produits trouvés par caractéristiques: {count_characteristics}")
-        if count_not_found > 0:
-            print(f"⚠ Produits non trouvés: {count_not_found}")
-        print(f"\nTotal prix fournisseur: {total_fournisseur:.2f}€")
-        print(f"Total prix DBC: {total_dbc:.2f}€")
-        print(f"Différence: {total_dbc - total_fournisseur:.2f}€")
-        print(f"Marge totale: {((total_dbc - total_fournisseur) / total_fournisseur * 100):.1f}%")
+        margin_line = (f"\nMarge totale: {((total_dbc - total_fournisseur) / total_fournisseur * 100):.1f}%"
+                       if total_fournisseur else '')
+        log.info('order.summary', (
+            "\n" + "="*60 + "\nRÉSUMÉ DE LA TRANSFORMATION\n" + "="*60 + "\n"
+            f"Catalogue DBC utilisé: {catalog_file}\n"
+            f"Nombre total de lignes: {len(df_result)}\n"
+            f"✓ Produits trouvés par SKU exact: {count_sku_exact}\n"
+            f"✓ Produits trouvés par caractéristiques: {count_characteristics}"
+            + (f"\n⚠ Produits non trouvés: {count_not_found}" if count_not_found > 0 else '') +
+            f"\n\nTotal prix fournisseur: {total_fournisseur:.2f}€\n"
+            f"Total prix DBC: {total_dbc:.2f}€\n"
+            f"Différence: {total_dbc - total_fournisseur:.2f}€"
+            + margin_line
+        ), catalog=catalog_file, rows=len(df_result), sku_exact=count_sku_exact,
+            characteristics=count_characteristics, not_found=count_not_found,
+            total_supplier=round(float(total_fournisseur), 2), total_dbc=round(float(total_dbc), 2))
         
-        # Afficher les produits non trouvés avec plus de détails
+        # Afficher les produits non trouvés avec plus de détails (échantillonnés)
         if count_not_found > 0:
-            print("\n" + "="*60)
-            print("⚠ ATTENTION: PRODUITS NON TROUVÉS DANS LE CATALOGUE")
-            print("="*60)
-            print("Ces produits gardent leur prix fournisseur par défaut.")
-            print("\nDétails:")
-            
-            for item in not_found_details[:10]:  # Limiter à 10 pour ne pas surcharger
-                print(f"\n- SKU: {item['SKU']}")
-                print(f"  Produit: {item['Product']}")
-                print(f"  État: {item['Appearance']} / {item['Functionality']}")
-                print(f"  IMEI: {item['IMEI']}")
-            
-            if len(not_found_details) > 10:
-                print(f"\n... et {len(not_found_details) - 10} autres produits non trouvés")
-            
-            print("\nRECOMMANDATIONS:")
-            print("1. Vérifiez que le catalogue est à jour")
-            print("2. Ces produits peuvent être des nouveaux modèles")
-            print("3. Contactez le fournisseur pour clarification")
+            log.warning('order.not_found_header', (
+                "\n" + "="*60 + "\n⚠ ATTENTION: PRODUITS NON TROUVÉS DANS LE CATALOGUE\n" + "="*60 + "\n"
+                "Ces produits gardent leur prix fournisseur par défaut.\n\nDétails:"
+            ), not_found=count_not_found)
+            for item in not_found_details:
+                log.sample('order.product_not_found', (
+                    f"\n- SKU: {item['SKU']}\n  Produit: {item['Product']}\n"
+                    f"  État: {item['Appearance']} / {item['Functionality']}\n  IMEI: {item['IMEI']}"
+                ), level='warning', sku=item['SKU'], product=item['Product'], appearance=item['Appearance'],
+                    functionality=item['Functionality'], imei=item['IMEI'])
+            log.info('order.not_found_advice', (
+                "\nRECOMMANDATIONS:\n"
+                "1. Vérifiez que le catalogue est à jour\n"
+                "2. Ces produits peuvent être des nouveaux modèles\n"
+                "3. Contactez le fournisseur pour clarification"
+            ))
         
+        if imei_duplicates:
+            log.warning('order.imei_duplicates', (
+                "\n" + "="*60 + f"\n⚠ ATTENTION: {len(imei_duplicates)} IMEI DÉJÀ VUS OU EN DOUBLE\n" + "="*60 + "\n"
+                "Retour ou double facturation possible, à vérifier avant validation."
+            ), duplicates=len(imei_duplicates))
+            for identifier, sku, flag in imei_duplicates:
+                log.sample('order.imei_duplicate', f"- IMEI {identifier} (SKU {sku}): {flag}", level='warning',
+                           imei=identifier, sku=sku, flag=flag)
+        
+        df_result.attrs['summary'] = {
+            'order_file': order_file,
+            'catalog_file': catalog_file,
+            'output_file': output_file,
+            'mode': mode,
+            'rows': len(df_result),
+            'sku_exact': count_sku_exact,
+            'characteristics': count_characteristics,
+            'not_found': count_not_found,
+            'imei_duplicates': len(imei_duplicates),
+            'total_supplier': round(float(total_fournisseur), 2),
+            'total_dbc': round(float(total_dbc), 2),
+            'persisted': persisted,
+        }
         return df_result
         
     except Exception as e:
-        print(f"\nERREUR INATTENDUE: {str(e)}")
         import traceback
-        traceback.print_exc()
+        log.error('order.unexpected_error', f"\nERREUR INATTENDUE: {e}\n{traceback.format_exc()}", error=str(e))
         return None
 
 def main():
     """Fonction principale"""
+    # .env.local / .env avant le premier message (DBC_LOG_*, Pushgateway)
+    load_env()
     if len(sys.argv) < 2:
-        print("Usage: python process_imei_order.py <fichier_commande_imei.xlsx> [--mode=dbc|client] [catalogue_dbc.xlsx] [fichier_sortie.csv]")
+        print("Usage: python process_imei_order.py <fichier_commande_imei.xlsx> [--mode=dbc|client] [--persist=<order_id>] [catalogue_dbc.xlsx] [fichier_sortie.csv]")
         print("\nExemples:")
         print("  python process_imei_order.py 'order-1446435-Wednesday.xlsx'")
         print("  python process_imei_order.py 'order-1446435-Wednesday.xlsx' --mode=client")
         print("  python process_imei_order.py 'order-1446435-Wednesday.xlsx' --mode=dbc 'catalogue_dbc.xlsx'")
+        print("  python process_imei_order.py 'order-1446435-Wednesday.xlsx' --mode=dbc --persist=<order_id>")
         print("\nModes:")
         print("  --mode=dbc    : Version interne avec toutes les informations")
         print("  --mode=client : Version client sans informations sensibles")
         print("  (sans --mode)  : Le script vous demandera de choisir")
+        print("\n--persist=<order_id> : enregistre les appareils tarifés dans order_items / order_item_imei")
         print("\nCe script traite UNIQUEMENT les fichiers avec numéros de série/IMEI.")
         print("Pour les commandes groupées, utilisez apply_dbc_prices_to_order.py")
         sys.exit(1)
@@ -307,6 +381,7 @@ def main():
     mode = None
     catalog_file = None
     output_file = None
+    persist_order_id = None
     
     # Chercher le mode dans les arguments
     args_remaining = []
@@ -314,7 +389,12 @@ def main():
         if arg.startswith('--mode='):
             mode = arg.split('=')[1].lower()
             if mode not in ['dbc', 'client']:
-                print(f"Erreur: Mode invalide '{mode}'. Utilisez 'dbc' ou 'client'.")
+                log.error('order.invalid_mode', f"Erreur: Mode invalide '{mode}'. Utilisez 'dbc' ou 'client'.", mode=mode)
+                sys.exit(1)
+        elif arg.startswith('--persist='):
+            persist_order_id = arg.split('=', 1)[1].strip()
+            if not persist_order_id:
+                log.error('order.invalid_persist', "Erreur: --persist attend l'identifiant de la commande.")
                 sys.exit(1)
         else:
             args_remaining.append(arg)
@@ -326,21 +406,24 @@ def main():
         output_file = args_remaining[1]
     
     if not os.path.exists(order_file):
-        print(f"Erreur: Le fichier '{order_file}' n'existe pas.")
+        log.error('order.file_missing', f"Erreur: Le fichier '{order_file}' n'existe pas.", file=order_file)
         sys.exit(1)
     
     if catalog_file and not os.path.exists(catalog_file):
-        print(f"Erreur: Le fichier catalogue '{catalog_file}' n'existe pas.")
+        log.error('order.catalog_missing', f"Erreur: Le fichier catalogue '{catalog_file}' n'existe pas.", catalog=catalog_file)
         sys.exit(1)
     
     # Traiter la commande
-    result = process_imei_order(order_file, catalog_file, output_file, mode=mode)
+    with profile_run('imei_order_pricing'):
+        result = process_imei_order(order_file, catalog_file, output_file, mode=mode,
+                                    persist_order_id=persist_order_id)
+    push_metrics('dbc-imei-order')
     
     if result is None:
-        print("\n❌ Le traitement a échoué. Veuillez corriger les erreurs ci-dessus.")
+        log.error('order.failed', "\n❌ Le traitement a échoué. Veuillez corriger les erreurs ci-dessus.")
         sys.exit(1)
     else:
-        print("\n✅ Traitement terminé avec succès!")
+        log.info('order.succeeded', "\n✅ Traitement terminé avec succès!", **result.attrs['summary'])
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
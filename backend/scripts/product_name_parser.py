@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Extraction structurée des informations contenues dans Product Name
+
+Une seule regex compilée (alternance de marques, capacités et couleurs)
+parcourt chaque nom une fois avec finditer. Le modèle correspond au texte
+situé entre la marque et le premier attribut reconnu (capacité ou couleur).
+Exemple: "Apple iPhone 13 Pro 256GB Sierra Blue"
+    -> brand=Apple, model=iPhone 13 Pro, storage_gb=256, color=Sierra Blue
+"""
+
+import re
+import sys
+
+BRANDS = ['Apple', 'Samsung', 'Xiaomi', 'Google', 'Huawei', 'OnePlus',
+          'Motorola', 'Honor', 'Oppo', 'Realme', 'Sony', 'LG', 'TCL',
+          'Nokia', 'Vivo', 'Asus', 'ZTE', 'Nothing', 'Gigaset', 'HTC']
+
+COLORS = ['Black', 'White', 'Silver', 'Gold', 'Rose Gold', 'Space Gray', 'Space Grey',
+          'Graphite', 'Gray', 'Grey', 'Blue', 'Pacific Blue', 'Sierra Blue', 'Alpine Green',
+          'Midnight Green', 'Midnight', 'Starlight', 'Red', 'Green', 'Purple', 'Deep Purple',
+          'Pink', 'Yellow', 'Coral', 'Orange', 'Bronze', 'Violet', 'Lavender', 'Cream',
+          'Mint', 'Titanium', 'Natural Titanium', 'Black Titanium', 'White Titanium',
+          'Blue Titanium', 'Desert Titanium', 'Phantom Black', 'Phantom Silver',
+          'Phantom Gray', 'Phantom White', 'Phantom Violet', 'Awesome Black',
+          'Awesome White', 'Awesome Blue', 'Obsidian', 'Porcelain', 'Hazel', 'Snow',
+          'Charcoal', 'Sage', 'Aurora', 'Product Red', '(PRODUCT)RED']
+
+STORAGE_UNITS_GB = {'GB': 1, 'TB': 1024}
+
+
+def _alternation(values):
+    # Plus longues d'abord pour que "Midnight Green" l'emporte sur "Midnight"
+    return '|'.join(re.escape(value) for value in sorted(values, key=len, reverse=True))
+
+
+# Regex unique: chaque correspondance est typée par son groupe nommé
+_NAME_PATTERN = re.compile(
+    r'(?P<brand>\b(?:' + _alternation(BRANDS) + r')\b)'
+    r'|(?P<storage>\b(?P<size>\d+(?:[.,]\d+)?)\s?(?P<unit>GB|TB)\b)'
+    r'|(?P<color>(?<![\w(])(?:' + _alternation(COLORS) + r')(?!\w))',
+    re.IGNORECASE
+)
+
+_BRAND_BY_LOWER = {brand.lower(): brand for brand in BRANDS}
+_COLOR_BY_LOWER = {color.lower(): color for color in COLORS}
+_MODEL_TRIM = ' -/,|'
+
+PARSED_COLUMNS = ['brand', 'model', 'storage_gb', 'name_color']
+
+
+def parse_product_name(product_name):
+    """
+    Extrait marque, modèle, capacité (Go) et couleur d'un nom de produit
+
+    Returns:
+        Dict {brand, model, storage_gb, name_color} (valeurs None si absentes)
+    """
+    parsed = {'brand': None, 'model': None, 'storage_gb': None, 'name_color': None}
+    if not isinstance(product_name, str) or not product_name.strip():
+        return parsed
+
+    model_start = 0
+    model_end = None
+    for match in _NAME_PATTERN.finditer(product_name):
+        kind = match.lastgroup if match.lastgroup in ('brand', 'color') else 'storage'
+        if kind == 'brand':
+            if parsed['brand'] is None and model_end is None:
+                parsed['brand'] = _BRAND_BY_LOWER[match.group('brand').lower()]
+                model_start = match.end()
+            continue
+
+        if model_end is None and match.start() > model_start:
+            model_end = match.start()
+
+        if kind == 'storage':
+            size = float(match.group('size').replace(',', '.'))
+            storage_gb = int(size * STORAGE_UNITS_GB[match.group('unit').upper()])
+            # "8GB/256GB": on garde la plus grande valeur (stockage plutôt que RAM)
+            if parsed['storage_gb'] is None or storage_gb > parsed['storage_gb']:
+                parsed['storage_gb'] = storage_gb
+        elif parsed['name_color'] is None:
+            parsed['name_color'] = _COLOR_BY_LOWER[match.group('color').lower()]
+
+    # Parenthèses ouvertes juste avant un attribut ("iPhone 12 (PRODUCT)RED") retirées, "Phone (1)" conservé
+    model = product_name[model_start:model_end].strip(_MODEL_TRIM).rstrip('(' + _MODEL_TRIM).lstrip(')' + _MODEL_TRIM)
+    parsed['model'] = re.sub(r'\s+', ' ', model) or None
+    return parsed
+
+
+def parse_product_names(product_names):
+    """
+    Applique parse_product_name à une colonne Product Name
+
+    Les noms sont très répétés (un SKU par grade / couleur / TVA): seuls les
+    noms uniques sont analysés, puis le résultat est redistribué par index.
+
+    Returns:
+        DataFrame aligné sur product_names avec les colonnes PARSED_COLUMNS
+    """
+    import pandas as pd
+    unique_names = pd.unique(product_names.dropna())
+    parsed = pd.DataFrame(
+        [parse_product_name(name) for name in unique_names],
+        index=unique_names,
+        columns=PARSED_COLUMNS
+    )
+    result = parsed.reindex(product_names.to_numpy())
+    result.index = product_names.index
+    result['storage_gb'] = result['storage_gb'].astype('Int64')
+    return result
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python product_name_parser.py '<Product Name>'")
+        sys.exit(1)
+
+    print(parse_product_name(' '.join(sys.argv[1:])))
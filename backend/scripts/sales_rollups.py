@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Maintenance des agrégats de ventes du dashboard admin
+
+Les tables sales_rollup_daily / sales_rollup_by_model / sales_rollup_by_client
+(docs/supabase-functions.sql) sont tenues à jour par triggers. Ce script:
+- rebuild: les recalcule entièrement depuis order_item_imei (migration,
+  correction après une dérive)
+- verify: compare les agrégats à un recalcul complet, code de sortie 1 en
+  cas d'écart
+
+Usage:
+    python backend/scripts/sales_rollups.py rebuild
+    python backend/scripts/sales_rollups.py verify [--limit 20]
+"""
+
+import argparse
+import sys
+import time
+
+from catalog_processor import init_supabase
+
+
+def rebuild(supabase):
+    started = time.perf_counter()
+    result = supabase.rpc('rebuild_sales_rollups').execute()
+    counts = (result.data or [{}])[0]
+    print(f"✅ Agrégats reconstruits en {time.perf_counter() - started:.1f}s: "
+          f"{counts.get('days', 0)} jours, {counts.get('models', 0)} modèles, {counts.get('clients', 0)} clients")
+    return 0
+
+
+def verify(supabase, limit):
+    mismatches = supabase.rpc('check_sales_rollups').execute().data or []
+    if not mismatches:
+        print("✅ Agrégats cohérents avec order_item_imei")
+        return 0
+    print(f"❌ {len(mismatches)} écart(s) entre les agrégats et order_item_imei:")
+    for row in mismatches[:limit]:
+        print(f"   {row['rollup']} {row['rollup_key']}: appareils {row['actual_devices']} "
+              f"(attendu {row['expected_devices']}), marge {row['actual_margin']} (attendu {row['expected_margin']})")
+    print("💡 Corriger avec: python backend/scripts/sales_rollups.py rebuild")
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintenance des agrégats de ventes du dashboard")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('rebuild', help="Recalcule les agrégats depuis order_item_imei")
+    verify_parser = subparsers.add_parser('verify', help="Compare les agrégats à un recalcul complet")
+    verify_parser.add_argument('--limit', type=int, default=20, help="Nombre d'écarts affichés")
+    args = parser.parse_args()
+
+    try:
+        supabase = init_supabase()
+        if args.command == 'rebuild':
+            return rebuild(supabase)
+        return verify(supabase, args.limit)
+    except Exception as e:
+        print(f"❌ Erreur: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
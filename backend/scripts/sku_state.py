@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Table compacte SKU -> état (stock, prix, flags) pour les imports catalogue
+
+Les SKU sont stockés dans un tableau NumPy trié à largeur fixe (octets UTF-8)
+avec des tableaux parallèles pour la quantité, le prix et des flags. Cela
+remplace le dict Python {sku: quantité} et les listes / sets de SKU de
+import_to_supabase, et permet de calculer le diff (nouveaux, restockés,
+en rupture, manquants) avec des opérations vectorisées sur tableaux triés.
+"""
+
+import numpy as np
+
+FLAG_ACTIVE = 1
+
+
+def encode_skus(skus):
+    """Convertit une séquence de SKU (str) en tableau d'octets à largeur fixe"""
+    if isinstance(skus, np.ndarray) and skus.dtype.kind == 'S':
+        return skus
+    if not len(skus):
+        return np.array([], dtype='S1')
+    try:
+        # Cas courant: SKU ASCII, conversion directe en C
+        return np.array(skus, dtype='S')
+    except UnicodeEncodeError:
+        return np.array([str(sku).encode('utf-8') for sku in skus], dtype='S')
+
+
+def decode_skus(skus):
+    """Convertit un tableau de SKU encodés en liste de str (frontière JSON / Supabase)"""
+    return [sku.decode('utf-8') for sku in skus.tolist()]
+
+
+class SkuStateTable:
+    """
+    SKU triés + tableaux parallèles quantity (int32), price (float64, prix fournisseur
+    en base, NaN si inconnu), flags (uint8) et row_hash (int64, empreinte de la ligne en base, 0 si inconnue)
+
+    Compatible avec l'usage dict existant pour les lectures ponctuelles
+    (`sku in table`, `table.get(sku)`, `table[sku]`, `len(table)`).
+    """
+
+    def __init__(self, skus, quantities, prices=None, flags=None, row_hashes=None):
+        self.skus = skus
+        self.quantities = quantities
+        self.prices = prices if prices is not None else np.full(len(skus), np.nan)
+        self.flags = flags if flags is not None else (quantities > 0).astype(np.uint8) * FLAG_ACTIVE
+        self.row_hashes = row_hashes if row_hashes is not None else np.zeros(len(skus), dtype=np.int64)
+
+    @classmethod
+    def from_columns(cls, skus, quantities, prices=None, row_hashes=None):
+        """Construit la table à partir de colonnes non triées (le dernier doublon l'emporte)"""
+        encoded = encode_skus(skus)
+        quantities = np.asarray(quantities, dtype=np.int32)
+        prices = np.asarray(prices, dtype=np.float64) if prices is not None else np.full(len(encoded), np.nan)
+        row_hashes = np.asarray(row_hashes, dtype=np.int64) if row_hashes is not None else np.zeros(len(encoded), dtype=np.int64)
+
+        # Tri stable puis déduplication en gardant la dernière occurrence
+        order = np.argsort(encoded, kind='stable')
+        sorted_skus = encoded[order]
+        if len(sorted_skus):
+            last = np.append(sorted_skus[1:] != sorted_skus[:-1], True)
+            order = order[last]
+            sorted_skus = sorted_skus[last]
+        return cls(sorted_skus, quantities[order], prices[order], row_hashes=row_hashes[order])
+
+    @classmethod
+    def from_pages(cls, pages):
+        """
+        Construit la table à partir de pages [(skus, quantities), ...],
+        [(skus, quantities, row_hashes), ...] ou [(skus, quantities, row_hashes, prices), ...]
+
+        Chaque page est convertie en tableaux dès sa réception, pour ne jamais
+        garder l'ensemble des SKU sous forme d'objets Python.
+        """
+        sku_chunks, quantity_chunks, hash_chunks, price_chunks = [], [], [], []
+        for skus, quantities, *extra in pages:
+            sku_chunks.append(encode_skus(skus))
+            quantity_chunks.append(np.asarray(quantities, dtype=np.int32))
+            hash_chunks.append(np.asarray(extra[0], dtype=np.int64) if extra else np.zeros(len(skus), dtype=np.int64))
+            price_chunks.append(np.asarray(extra[1], dtype=np.float64) if len(extra) > 1 else np.full(len(skus), np.nan))
+        if not sku_chunks:
+            return cls.empty()
+        return cls.from_columns(np.concatenate(sku_chunks), np.concatenate(quantity_chunks),
+                                prices=np.concatenate(price_chunks), row_hashes=np.concatenate(hash_chunks))
+
+    @classmethod
+    def empty(cls):
+        return cls(np.array([], dtype='S1'), np.array([], dtype=np.int32))
+
+    # ------------------------------------------------------------------
+    # Recherche
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self.skus)
+
+    def lookup(self, skus):
+        """
+        Positions des SKU dans la table (vectorisé)
+
+        Returns:
+            (positions, found): positions dans la table et masque des SKU présents
+        """
+        encoded = encode_skus(skus)
+        if not len(self.skus):
+            return np.zeros(len(encoded), dtype=np.intp), np.zeros(len(encoded), dtype=bool)
+        positions = np.searchsorted(self.skus, encoded)
+        positions = np.minimum(positions, len(self.skus) - 1)
+        found = self.skus[positions] == encoded
+        return positions, found
+
+    def _position(self, sku):
+        if not len(self.skus):
+            return None
+        key = sku.encode('utf-8') if isinstance(sku, str) else sku
+        position = int(np.searchsorted(self.skus, key))
+        if position < len(self.skus) and self.skus[position] == key:
+            return position
+        return None
+
+    def __contains__(self, sku):
+        return self._position(sku) is not None
+
+    def get(self, sku, default=None):
+        position = self._position(sku)
+        return int(self.quantities[position]) if position is not None else default
+
+    def __getitem__(self, sku):
+        position = self._position(sku)
+        if position is None:
+            raise KeyError(sku)
+        return int(self.quantities[position])
+
+    def keys(self):
+        return decode_skus(self.skus)
+
+    def items(self):
+        return zip(self.keys(), self.quantities.tolist())
+
+    @property
+    def nbytes(self):
+        return self.skus.nbytes + self.quantities.nbytes + self.prices.nbytes + self.flags.nbytes + self.row_hashes.nbytes
+
+
+def compute_stock_diff(existing, catalog_skus, catalog_quantities):
+    """
+    Diff vectorisé entre l'état en base et le nouveau catalogue
+
+    Args:
+        existing: SkuStateTable des produits en base
+        catalog_skus / catalog_quantities: colonnes du catalogue, dans l'ordre du fichier
+
+    Returns:
+        Dict de tableaux de SKU encodés (ordre du catalogue, ou ordre trié pour missing):
+        new, restocked, out_of_stock (retirés du catalogue fournisseur), missing
+        (actifs en base mais absents du catalogue), plus exact_matches.
+    """
+    catalog_skus = encode_skus(catalog_skus)
+    new_quantities = np.asarray(catalog_quantities, dtype=np.int32)
+
+    positions, found = existing.lookup(catalog_skus)
+    # Base vide (premier import): aucune position valide à lire
+    old_quantities = np.where(found, existing.quantities[positions], 0) if len(existing) else np.zeros(len(found), dtype=np.int32)
+
+    new = catalog_skus[~found & (new_quantities > 0)]
+    restocked = catalog_skus[found & (old_quantities == 0) & (new_quantities > 0)]
+    out_of_stock = catalog_skus[found & (old_quantities > 0) & (new_quantities == 0)]
+
+    # SKU actifs en base absents du catalogue: appartenance sur tableau trié
+    # (tri stable: quasi linéaire sur un fichier fournisseur déjà trié par SKU)
+    catalog_sorted = catalog_skus[np.argsort(catalog_skus, kind='stable')]
+    if len(catalog_sorted):
+        probe = np.minimum(np.searchsorted(catalog_sorted, existing.skus), len(catalog_sorted) - 1)
+        in_catalog = catalog_sorted[probe] == existing.skus
+    else:
+        in_catalog = np.zeros(len(existing.skus), dtype=bool)
+    missing = existing.skus[~in_catalog & (existing.quantities > 0)]
+
+    return {
+        'new': new,
+        'restocked': restocked,
+        'out_of_stock': out_of_stock,
+        'missing': missing,
+        'exact_matches': int(found.sum()),
+    }
+
+
+def compute_changed_rows(existing, catalog_skus, catalog_row_hashes):
+    """
+    Lignes du catalogue à réécrire en base
+
+    Une ligne est réécrite si le SKU est nouveau, si son empreinte diffère de
+    celle en base (0 en base: inconnue, produit modifié hors import) ou si
+    le SKU apparaît plusieurs fois dans le catalogue (la dernière occurrence
+    doit rester celle écrite en dernier).
+
+    Returns:
+        masque booléen aligné sur le catalogue
+    """
+    catalog_skus = encode_skus(catalog_skus)
+    catalog_row_hashes = np.asarray(catalog_row_hashes, dtype=np.int64)
+    positions, found = existing.lookup(catalog_skus)
+    if not len(existing):
+        return np.ones(len(catalog_skus), dtype=bool)
+    changed = ~found | (existing.row_hashes[positions] != catalog_row_hashes)
+
+    order = np.argsort(catalog_skus, kind='stable')
+    sorted_skus = catalog_skus[order]
+    repeated_sorted = np.zeros(len(sorted_skus), dtype=bool)
+    if len(sorted_skus) > 1:
+        same_as_next = sorted_skus[1:] == sorted_skus[:-1]
+        repeated_sorted[1:] |= same_as_next
+        repeated_sorted[:-1] |= same_as_next
+    repeated = np.empty_like(repeated_sorted)
+    repeated[order] = repeated_sorted
+    return changed | repeated
@@ -7,10 +7,11 @@ avec application des marges selon les règles définies:
 - Campaign Price ignoré (réductions qui profitent à DBC)
 """
 
-import pandas as pd
 import sys
 from datetime import datetime
 import os
+from pipeline_trace import profile_run, span
+from catalog_batch import is_batch_source, resolve_catalog_files, transform_catalog_batch
 
 def transform_catalog(input_file, output_file=None):
     """
@@ -20,10 +21,15 @@ def transform_catalog(input_file, output_file=None):
         input_file: Chemin vers le fichier Excel du fournisseur
         output_file: Chemin vers le fichier de sortie (optionnel)
     """
+    import pandas as pd
+    from catalog_schema import categorize
+    from numeric_coercion import coerce_supplier_columns, report_rejected_cells
     try:
         # Lire le fichier Excel
         print(f"Lecture du fichier: {input_file}")
-        df = pd.read_excel(input_file)
+        with span('transform.read', file=input_file):
+            # Colonnes à faible cardinalité en catégories (catalog_schema.py)
+            df = categorize(pd.read_excel(input_file))
         
         # Afficher les colonnes disponibles
         print("\nColonnes trouvées dans le fichier:")
@@ -45,8 +51,12 @@ def transform_catalog(input_file, output_file=None):
         # Créer une copie du dataframe pour les modifications
         df_dbc = df.copy()
         
-        # Convertir la colonne Price en numérique (elle semble être de type object)
-        df_dbc['Price'] = pd.to_numeric(df_dbc['Price'], errors='coerce')
+        # Convertir Price / Campaign Price en numérique (formats régionaux "199,99" acceptés,
+        # cellules invalides signalées avec leur ligne, voir numeric_coercion.py)
+        numeric, rejects = coerce_supplier_columns(df_dbc)
+        report_rejected_cells(rejects, file=input_file)
+        df_dbc['Price'] = numeric['Price']
+        df_dbc['Campaign Price'] = numeric['Campaign Price']
         
         # Ajouter des colonnes pour le prix DBC et les informations de marge
         df_dbc['Prix DBC'] = 0.0
@@ -60,34 +70,35 @@ def transform_catalog(input_file, output_file=None):
         count_campaign = 0
         
         # Appliquer les règles de marge
-        for index, row in df_dbc.iterrows():
-            price = row['Price']
-            vat_type = row['VAT Type']
-            campaign_price = row['Campaign Price']
-            
-            # Vérifier si le prix est valide
-            if pd.isna(price) or price == 0:
-                df_dbc.at[index, 'Prix DBC'] = price
-                df_dbc.at[index, 'Marge appliquée'] = 'Prix invalide'
-                count_invalid += 1
-                continue
-            
-            # Vérifier si c'est un produit marginal
-            if pd.notna(vat_type) and vat_type == 'Marginal':
-                # Produit marginal: multiplier par 1.01
-                df_dbc.at[index, 'Prix DBC'] = round(price * 1.01, 2)
-                df_dbc.at[index, 'Marge appliquée'] = '1% (marginal)'
-                count_marginal += 1
-            else:
-                # Produit non marginal: multiplier par 1.11
-                df_dbc.at[index, 'Prix DBC'] = round(price * 1.11, 2)
-                df_dbc.at[index, 'Marge appliquée'] = '11% (non marginal)'
-                count_non_marginal += 1
-            
-            # Note sur campaign price (ignoré mais signalé)
-            if pd.notna(campaign_price) and campaign_price > 0:
-                df_dbc.at[index, 'Marge appliquée'] += f' - Campaign Price ignoré: {campaign_price}'
-                count_campaign += 1
+        with span('transform.margin', rows=len(df_dbc)):
+            for index, row in df_dbc.iterrows():
+                price = row['Price']
+                vat_type = row['VAT Type']
+                campaign_price = row['Campaign Price']
+                
+                # Vérifier si le prix est valide
+                if pd.isna(price) or price == 0:
+                    df_dbc.at[index, 'Prix DBC'] = price
+                    df_dbc.at[index, 'Marge appliquée'] = 'Prix invalide'
+                    count_invalid += 1
+                    continue
+                
+                # Vérifier si c'est un produit marginal
+                if pd.notna(vat_type) and vat_type == 'Marginal':
+                    # Produit marginal: multiplier par 1.01
+                    df_dbc.at[index, 'Prix DBC'] = round(price * 1.01, 2)
+                    df_dbc.at[index, 'Marge appliquée'] = '1% (marginal)'
+                    count_marginal += 1
+                else:
+                    # Produit non marginal: multiplier par 1.11
+                    df_dbc.at[index, 'Prix DBC'] = round(price * 1.11, 2)
+                    df_dbc.at[index, 'Marge appliquée'] = '11% (non marginal)'
+                    count_non_marginal += 1
+                
+                # Note sur campaign price (ignoré mais signalé)
+                if pd.notna(campaign_price) and campaign_price > 0:
+                    df_dbc.at[index, 'Marge appliquée'] += f' - Campaign Price ignoré: {campaign_price}'
+                    count_campaign += 1
         
         # Réorganiser les colonnes pour mettre les nouvelles colonnes à la fin
         cols = list(df_dbc.columns)
@@ -105,7 +116,8 @@ def transform_catalog(input_file, output_file=None):
             output_file = f"catalogue_dbc_{timestamp}.xlsx"
         
         # Sauvegarder le fichier transformé
-        df_dbc.to_excel(output_file, index=False)
+        with span('transform.write', file=output_file):
+            df_dbc.to_excel(output_file, index=False)
         print(f"\nFichier transformé sauvegardé: {output_file}")
         
         # Afficher un résumé détaillé
@@ -151,19 +163,40 @@ def transform_catalog(input_file, output_file=None):
 
 def main():
     """Fonction principale"""
-    if len(sys.argv) < 2:
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    workers = None
+    for arg in sys.argv[1:]:
+        if arg.startswith('--workers='):
+            workers = int(arg.split('=', 1)[1])
+    
+    if len(args) < 1:
         print("Usage: python transform_catalog.py <fichier_catalogue.xlsx> [fichier_sortie.xlsx]")
+        print("       python transform_catalog.py <dossier | 'motif*.xlsx'> [dossier_sortie] [--workers=N]")
         print("\nExemple: python transform_catalog.py 'Mobile devices-pricelist-Tuesday, May 27, 2025.xlsx'")
+        print("Exemple: python transform_catalog.py 'pricelists/*.xlsx' catalogues_dbc --workers=4")
         sys.exit(1)
     
-    input_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else None
+    input_file = args[0]
+    output_file = args[1] if len(args) > 1 else None
+    
+    # Mode lot: un catalogue DBC par fichier, fichiers répartis sur les cœurs
+    if is_batch_source(input_file):
+        files = resolve_catalog_files(input_file)
+        print(f"Transformation de {len(files)} fichiers...")
+        with profile_run('transform_catalog_batch'):
+            results = transform_catalog_batch(files, output_file, workers)
+        print("\n=== RÉSUMÉ DU LOT ===")
+        for result in results:
+            print(f"{os.path.basename(result['input'])} -> {result['output']}: {result['rows']} produits "
+                  f"({result['marginal']} marginaux, {result['non_marginal']} non marginaux, {result['invalid_price']} prix invalides)")
+        return
     
     if not os.path.exists(input_file):
         print(f"Erreur: Le fichier '{input_file}' n'existe pas.")
         sys.exit(1)
     
-    transform_catalog(input_file, output_file)
+    with profile_run('transform_catalog'):
+        transform_catalog(input_file, output_file)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,7 +1,13 @@
+import re
 import pandas as pd
 
 # Lire le catalogue
 df = pd.read_excel('Mobile devices-pricelist-Tuesday, May 27, 2025.xlsx')
+# Colonnes à faible cardinalité en catégories (comme backend/scripts/catalog_schema.py):
+# value_counts compte les codes entiers au lieu de hacher chaque chaîne
+for column in ['Item Group', 'Appearance', 'Functionality', 'Boxed', 'Color', 'Cloud Lock', 'VAT Type']:
+    if column in df.columns:
+        df[column] = df[column].astype('category')
 
 print("=== STRUCTURE DU CATALOGUE ===")
 print(f"Colonnes: {list(df.columns)}")
@@ -11,39 +17,37 @@ print("\n=== VALEURS POUR LES FILTRES ===")
 
 # Appearance
 print("\nAPPEARANCE:")
-appearances = df['Appearance'].dropna().unique()
-for app in sorted(appearances):
-    count = df[df['Appearance'] == app].shape[0]
+# value_counts: un seul passage par colonne au lieu d'un filtre par valeur
+appearance_counts = df['Appearance'].value_counts()
+for app, count in sorted(appearance_counts.items()):
     print(f"  {app}: {count} produits")
 
 # Functionality
 print("\nFUNCTIONALITY:")
-functionalities = df['Functionality'].dropna().unique()
-for func in sorted(functionalities):
-    count = df[df['Functionality'] == func].shape[0]
+functionality_counts = df['Functionality'].value_counts()
+for func, count in sorted(functionality_counts.items()):
     print(f"  {func}: {count} produits")
 
 # Color
 print("\nCOLOR:")
-colors = df['Color'].dropna().unique()
-for color in sorted(colors)[:20]:  # Top 20 colors
-    count = df[df['Color'] == color].shape[0]
+color_counts = df['Color'].value_counts()
+colors = color_counts.index
+for color, count in sorted(color_counts.items())[:20]:  # Top 20 colors
     print(f"  {color}: {count} produits")
 if len(colors) > 20:
     print(f"  ... et {len(colors) - 20} autres couleurs")
 
 # Boxed
 print("\nBOXED:")
-boxed_values = df['Boxed'].dropna().unique()
-for boxed in sorted(boxed_values):
-    count = df[df['Boxed'] == boxed].shape[0]
+boxed_counts = df['Boxed'].value_counts()
+for boxed, count in sorted(boxed_counts.items()):
     print(f"  {boxed}: {count} produits")
 
 # Additional Info
 print("\nADDITIONAL INFO:")
-additional_info = df['Additional Info'].dropna().unique()
-for info in sorted(additional_info)[:10]:  # Top 10
-    count = df[df['Additional Info'] == info].shape[0]
+additional_info_counts = df['Additional Info'].value_counts()
+additional_info = additional_info_counts.index
+for info, count in sorted(additional_info_counts.items())[:10]:  # Top 10
     print(f"  {info}: {count} produits")
 if len(additional_info) > 10:
     print(f"  ... et {len(additional_info) - 10} autres infos")
@@ -54,8 +58,12 @@ brands = ['Apple', 'Samsung', 'Xiaomi', 'Google', 'Huawei', 'OnePlus',
           'Motorola', 'Honor', 'Oppo', 'Realme', 'Sony', 'LG', 'TCL', 
           'Nokia', 'Vivo', 'Asus', 'ZTE', 'Nothing', 'Gigaset', 'HTC']
 
+# Une seule regex alternée (première marque trouvée) au lieu d'un str.contains par marque
+brand_pattern = re.compile(r'\b(' + '|'.join(brands) + r')\b', re.IGNORECASE)
+canonical_brands = {brand.lower(): brand for brand in brands}
+brand_counts = df['Product Name'].str.extract(brand_pattern, expand=False).str.lower().map(canonical_brands).value_counts()
 for brand in brands:
-    count = df[df['Product Name'].str.contains(brand, case=False, na=False)].shape[0]
+    count = brand_counts.get(brand, 0)
     if count > 0:
         print(f"  {brand}: {count} produits")
 
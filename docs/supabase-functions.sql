@@ -6,9 +6,9 @@ CREATE TABLE IF NOT EXISTS catalog_imports (
   import_date TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
   total_imported INTEGER DEFAULT 0,
   total_updated INTEGER DEFAULT 0,
-  new_skus TEXT[] DEFAULT '{}', -- Liste des nouveaux SKU
-  restocked_skus TEXT[] DEFAULT '{}', -- Liste des SKU remis en stock
-  missing_skus TEXT[] DEFAULT '{}', -- Liste des SKU en rupture (absents du nouveau catalogue)
+  new_skus TEXT[] DEFAULT '{}', -- Obsolète: voir catalog_import_items
+  restocked_skus TEXT[] DEFAULT '{}', -- Obsolète: voir catalog_import_items
+  missing_skus TEXT[] DEFAULT '{}', -- Obsolète: voir catalog_import_items
   import_summary JSONB, -- Résumé complet de l'import
   created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
@@ -16,49 +16,1004 @@ CREATE TABLE IF NOT EXISTS catalog_imports (
 -- Index pour optimiser les requêtes
 CREATE INDEX IF NOT EXISTS idx_catalog_imports_date ON catalog_imports(import_date DESC);
 
--- Fonction pour récupérer le dernier import
+-- Statistiques de facettes précalculées pendant l'import (backend/scripts/catalog_stats.py)
+-- Évite de rescanner products pour les comptes par facette / marque / prix
+ALTER TABLE catalog_imports ADD COLUMN IF NOT EXISTS facet_stats JSONB;
+
+-- Empreinte SHA-256 du fichier importé (backend/scripts/content_hash.py)
+-- Un fichier identique au dernier import renvoie le résultat précédent sans retraitement
+ALTER TABLE catalog_imports ADD COLUMN IF NOT EXISTS content_hash TEXT;
+CREATE INDEX IF NOT EXISTS idx_catalog_imports_content_hash ON catalog_imports(content_hash);
+
+-- Fonction pour récupérer les agrégats du dernier import
+CREATE OR REPLACE FUNCTION get_latest_catalog_facet_stats()
+RETURNS JSONB
+LANGUAGE SQL
+STABLE
+AS $$
+  SELECT ci.facet_stats
+  FROM catalog_imports ci
+  WHERE ci.facet_stats IS NOT NULL
+  ORDER BY ci.import_date DESC
+  LIMIT 1;
+$$;
+
+-- SKU concernés par chaque import (nouveaux, restockés, manquants), une ligne
+-- par SKU avec son identifiant entier plutôt que des listes TEXT[] dans
+-- catalog_imports: l'écriture ne réécrit pas de gros tableaux, la lecture est paginée
+ALTER TABLE products ADD COLUMN IF NOT EXISTS sku_id INTEGER GENERATED BY DEFAULT AS IDENTITY;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_products_sku_id ON products(sku_id);
+
+-- kind: 1 = nouveau, 2 = restocké (0 -> en stock), 3 = manquant (absent du catalogue)
+-- Un SKU n'appartient qu'à une catégorie par import. Pas de clé étrangère vers
+-- products: la suppression d'un produit ne doit pas être bloquée par l'historique.
+-- RLS (lecture admin): voir docs/supabase-setup.md, section 9.
+CREATE TABLE IF NOT EXISTS catalog_import_items (
+  import_id UUID NOT NULL REFERENCES catalog_imports(id) ON DELETE CASCADE,
+  sku_id INTEGER NOT NULL,
+  kind SMALLINT NOT NULL CHECK (kind IN (1, 2, 3)),
+  PRIMARY KEY (import_id, sku_id)
+);
+
+CREATE OR REPLACE FUNCTION catalog_import_kind(kind_name TEXT)
+RETURNS SMALLINT
+LANGUAGE SQL
+IMMUTABLE
+AS $$
+  SELECT CASE kind_name WHEN 'new' THEN 1 WHEN 'restocked' THEN 2 WHEN 'missing' THEN 3 END::SMALLINT;
+$$;
+
+-- Enregistre une tranche de SKU d'un import (appelée par lots depuis l'import catalogue)
+CREATE OR REPLACE FUNCTION record_catalog_import_items(p_import_id UUID, p_kind TEXT, p_skus TEXT[])
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  kind_code SMALLINT := catalog_import_kind(p_kind);
+  inserted INTEGER;
+BEGIN
+  IF kind_code IS NULL THEN
+    RAISE EXCEPTION 'Type de SKU d''import invalide: %', p_kind;
+  END IF;
+  INSERT INTO catalog_import_items (import_id, sku_id, kind)
+  SELECT p_import_id, p.sku_id, kind_code
+  FROM products p
+  WHERE p.sku = ANY(p_skus)
+  ON CONFLICT (import_id, sku_id) DO NOTHING;
+  GET DIAGNOSTICS inserted = ROW_COUNT;
+  RETURN inserted;
+END;
+$$;
+
+-- SKU d'un import par page (pagination par clé: p_after_sku_id = dernier sku_id reçu)
+CREATE OR REPLACE FUNCTION get_catalog_import_skus(
+  p_import_id UUID,
+  p_kinds TEXT[] DEFAULT NULL,
+  p_after_sku_id INTEGER DEFAULT 0,
+  p_limit INTEGER DEFAULT 1000
+)
+RETURNS TABLE (sku_id INTEGER, sku TEXT, kind TEXT)
+LANGUAGE SQL
+STABLE
+AS $$
+  SELECT cii.sku_id, p.sku::text, CASE cii.kind WHEN 1 THEN 'new' WHEN 2 THEN 'restocked' ELSE 'missing' END
+  FROM catalog_import_items cii
+  INNER JOIN products p ON p.sku_id = cii.sku_id
+  WHERE cii.import_id = p_import_id
+    AND cii.sku_id > COALESCE(p_after_sku_id, 0)
+    AND (p_kinds IS NULL OR cii.kind = ANY(ARRAY(SELECT catalog_import_kind(k) FROM unnest(p_kinds) k)))
+  ORDER BY cii.sku_id
+  LIMIT LEAST(GREATEST(p_limit, 1), 5000);
+$$;
+
+-- Reprise des anciennes listes TEXT[] puis vidage (seuls les SKU encore en base sont repris)
+INSERT INTO catalog_import_items (import_id, sku_id, kind)
+SELECT ci.id, p.sku_id, k.kind
+FROM catalog_imports ci
+CROSS JOIN LATERAL (
+  SELECT unnest(ci.new_skus) AS sku, 1::SMALLINT AS kind
+  UNION ALL SELECT unnest(ci.restocked_skus), 2::SMALLINT
+  UNION ALL SELECT unnest(ci.missing_skus), 3::SMALLINT
+) k
+INNER JOIN products p ON p.sku = k.sku
+ON CONFLICT (import_id, sku_id) DO NOTHING;
+
+UPDATE catalog_imports SET new_skus = '{}', restocked_skus = '{}', missing_skus = '{}'
+WHERE cardinality(new_skus) > 0 OR cardinality(restocked_skus) > 0 OR cardinality(missing_skus) > 0;
+
+-- Fonction pour récupérer le dernier import (comptes; SKU via get_catalog_import_skus)
+DROP FUNCTION IF EXISTS get_latest_import_info();
 CREATE OR REPLACE FUNCTION get_latest_import_info()
 RETURNS TABLE (
+  import_id UUID,
   import_date TIMESTAMP WITH TIME ZONE,
   total_new_products INTEGER,
-  new_skus TEXT[],
-  restocked_skus TEXT[]
+  new_skus_count INTEGER,
+  restocked_skus_count INTEGER,
+  missing_skus_count INTEGER
 )
 LANGUAGE SQL
 STABLE
 AS $$
   SELECT 
+    ci.id,
     ci.import_date,
-    (array_length(ci.new_skus, 1) + array_length(ci.restocked_skus, 1)) as total_new_products,
-    ci.new_skus,
-    ci.restocked_skus
+    COALESCE((ci.import_summary->>'total_new_products')::int, 0),
+    COALESCE((ci.import_summary->>'new_skus_count')::int, 0),
+    COALESCE((ci.import_summary->>'restocked_skus_count')::int, 0),
+    COALESCE((ci.import_summary->>'missing_skus_count')::int, 0)
   FROM catalog_imports ci
   ORDER BY ci.import_date DESC
   LIMIT 1;
 $$;
 
--- 1. Fonction pour calculer la marge totale des commandes completed avec debug
+-- Colonnes structurées extraites de product_name (backend/scripts/product_name_parser.py)
+-- Les filtres marque / modèle / capacité utilisent ces index au lieu de LIKE sur product_name
+ALTER TABLE products ADD COLUMN IF NOT EXISTS brand TEXT;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS model TEXT;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS storage_gb INTEGER;
+
+CREATE INDEX IF NOT EXISTS idx_products_brand_model_storage ON products(brand, model, storage_gb);
+CREATE INDEX IF NOT EXISTS idx_products_active_brand ON products(brand) WHERE is_active = true;
+
+-- Empreinte de la ligne écrite par l'import catalogue: seules les lignes dont
+-- l'empreinte change sont réécrites aux imports suivants
+ALTER TABLE products ADD COLUMN IF NOT EXISTS row_hash BIGINT;
+
+-- Toute autre modification d'un produit (validation de commande, admin, import
+-- TypeScript) invalide l'empreinte: la ligne sera réécrite au prochain import
+CREATE OR REPLACE FUNCTION invalidate_product_row_hash()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF NEW.row_hash IS NOT DISTINCT FROM OLD.row_hash THEN
+    NEW.row_hash := NULL;
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_products_invalidate_row_hash ON products;
+CREATE TRIGGER trg_products_invalidate_row_hash
+  BEFORE UPDATE ON products
+  FOR EACH ROW EXECUTE FUNCTION invalidate_product_row_hash();
+
+-- Imports catalogue en aperçu (catalog_processor.py --preview, POST /api/catalog/import
+-- avec preview=true): le diff complet est calculé une fois, stocké ici, relu page
+-- par page et trié sans recalcul, puis appliqué par commit_catalog_import_stage().
+-- RLS (lecture admin): voir docs/supabase-setup.md, section 9.
+CREATE OR REPLACE FUNCTION latest_catalog_import_id()
+RETURNS UUID
+LANGUAGE SQL
+STABLE
+AS $$
+  SELECT id FROM catalog_imports ORDER BY import_date DESC LIMIT 1;
+$$;
+
+-- status: loading (lignes en cours d'envoi) -> staged -> committed | discarded
+-- base_import_id: dernier import quand le diff a été calculé; un autre import
+-- appliqué depuis rend l'aperçu périmé (refusé au commit)
+CREATE TABLE IF NOT EXISTS catalog_import_stages (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  status TEXT NOT NULL DEFAULT 'loading' CHECK (status IN ('loading', 'staged', 'committed', 'discarded')),
+  base_import_id UUID DEFAULT latest_catalog_import_id(),
+  content_hash TEXT,
+  import_summary JSONB,  -- Résumé enregistré dans catalog_imports au commit
+  facet_stats JSONB,
+  change_counts JSONB,   -- Lignes par type de changement (calculé une fois, à la fin du chargement)
+  import_id UUID REFERENCES catalog_imports(id) ON DELETE SET NULL,
+  upserted_count INTEGER,
+  deactivated_count INTEGER,
+  committed_at TIMESTAMP WITH TIME ZONE
+);
+
+-- change: 1 = nouveau, 2 = restocké, 3 = prix modifié, 4 = désactivé (stock à 0 ou
+-- absent du catalogue), 5 = autre modification (stock, description)
+-- product: ligne écrite dans products au commit (NULL: absent du catalogue, désactivé)
+CREATE TABLE IF NOT EXISTS catalog_import_stage_items (
+  stage_id UUID NOT NULL REFERENCES catalog_import_stages(id) ON DELETE CASCADE,
+  sku TEXT NOT NULL,
+  change SMALLINT NOT NULL CHECK (change BETWEEN 1 AND 5),
+  product_name TEXT,
+  old_quantity INTEGER,
+  new_quantity INTEGER,
+  old_price_dbc NUMERIC(10,2),
+  new_price_dbc NUMERIC(10,2),
+  price_delta NUMERIC(10,2) GENERATED ALWAYS AS (new_price_dbc - old_price_dbc) STORED,
+  price_delta_pct NUMERIC(10,2) GENERATED ALWAYS AS (
+    ROUND((new_price_dbc - old_price_dbc) * 100 / NULLIF(old_price_dbc, 0), 2)
+  ) STORED,
+  product JSONB,
+  PRIMARY KEY (stage_id, sku)
+);
+
+-- Tris proposés par get_catalog_import_stage_items (revue des fortes variations de prix)
+CREATE INDEX IF NOT EXISTS idx_catalog_import_stage_items_change ON catalog_import_stage_items(stage_id, change, sku);
+CREATE INDEX IF NOT EXISTS idx_catalog_import_stage_items_delta ON catalog_import_stage_items(stage_id, price_delta);
+CREATE INDEX IF NOT EXISTS idx_catalog_import_stage_items_delta_pct ON catalog_import_stage_items(stage_id, price_delta_pct);
+CREATE INDEX IF NOT EXISTS idx_catalog_import_stage_items_abs_delta_pct
+  ON catalog_import_stage_items(stage_id, (abs(price_delta_pct)));
+
+CREATE OR REPLACE FUNCTION catalog_import_change(change_name TEXT)
+RETURNS SMALLINT
+LANGUAGE SQL
+IMMUTABLE
+AS $$
+  SELECT CASE change_name
+    WHEN 'new' THEN 1 WHEN 'restocked' THEN 2 WHEN 'price_changed' THEN 3
+    WHEN 'deactivated' THEN 4 WHEN 'updated' THEN 5
+  END::SMALLINT;
+$$;
+
+CREATE OR REPLACE FUNCTION catalog_import_change_name(change SMALLINT)
+RETURNS TEXT
+LANGUAGE SQL
+IMMUTABLE
+AS $$
+  SELECT (ARRAY['new', 'restocked', 'price_changed', 'deactivated', 'updated'])[change];
+$$;
+
+-- Charge une tranche du diff: lignes du catalogue à écrire (p_products) et SKU
+-- absents du catalogue à désactiver. Valeurs avant import lues dans products,
+-- type de changement déterminé une fois ici. Rejouable (tranche renvoyée après erreur).
+CREATE OR REPLACE FUNCTION stage_catalog_import_items(
+  p_stage_id UUID,
+  p_products JSONB DEFAULT '[]',
+  p_missing_skus TEXT[] DEFAULT '{}'
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  staged INTEGER;
+  missing INTEGER;
+BEGIN
+  PERFORM 1 FROM catalog_import_stages WHERE id = p_stage_id AND status = 'loading';
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Aperçu d''import % introuvable ou déjà chargé', p_stage_id;
+  END IF;
+
+  INSERT INTO catalog_import_stage_items (
+    stage_id, sku, change, product_name, old_quantity, new_quantity, old_price_dbc, new_price_dbc, product
+  )
+  SELECT p_stage_id, r.sku,
+    CASE
+      WHEN p.sku IS NULL AND r.quantity > 0 THEN 1
+      WHEN p.sku IS NOT NULL AND COALESCE(p.quantity, 0) = 0 AND r.quantity > 0 THEN 2
+      WHEN p.sku IS NOT NULL AND COALESCE(p.quantity, 0) > 0 AND r.quantity = 0 THEN 4
+      WHEN p.sku IS NOT NULL AND p.price_dbc IS DISTINCT FROM r.price_dbc THEN 3
+      ELSE 5
+    END,
+    r.product->>'product_name', p.quantity, r.quantity, p.price_dbc, r.price_dbc, r.product
+  FROM (
+    SELECT e.product->>'sku' AS sku,
+           COALESCE((e.product->>'quantity')::INTEGER, 0) AS quantity,
+           ROUND((e.product->>'price_dbc')::NUMERIC, 2) AS price_dbc,
+           e.product
+    FROM jsonb_array_elements(COALESCE(p_products, '[]')) AS e(product)
+  ) r
+  LEFT JOIN products p ON p.sku = r.sku
+  ON CONFLICT (stage_id, sku) DO UPDATE SET
+    change = EXCLUDED.change,
+    product_name = EXCLUDED.product_name,
+    old_quantity = EXCLUDED.old_quantity,
+    new_quantity = EXCLUDED.new_quantity,
+    old_price_dbc = EXCLUDED.old_price_dbc,
+    new_price_dbc = EXCLUDED.new_price_dbc,
+    product = EXCLUDED.product;
+  GET DIAGNOSTICS staged = ROW_COUNT;
+
+  INSERT INTO catalog_import_stage_items (
+    stage_id, sku, change, product_name, old_quantity, new_quantity, old_price_dbc, new_price_dbc, product
+  )
+  SELECT p_stage_id, p.sku, 4, p.product_name, p.quantity, 0, p.price_dbc, p.price_dbc, NULL
+  FROM products p
+  WHERE p.sku = ANY(COALESCE(p_missing_skus, '{}'))
+  ON CONFLICT (stage_id, sku) DO NOTHING;
+  GET DIAGNOSTICS missing = ROW_COUNT;
+
+  RETURN staged + missing;
+END;
+$$;
+
+-- Fin du chargement: comptes par type de changement (relus tels quels par l'aperçu)
+CREATE OR REPLACE FUNCTION seal_catalog_import_stage(p_stage_id UUID)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  counts JSONB;
+BEGIN
+  SELECT jsonb_build_object(
+    'new', COUNT(*) FILTER (WHERE change = 1),
+    'restocked', COUNT(*) FILTER (WHERE change = 2),
+    'price_changed', COUNT(*) FILTER (WHERE change = 3),
+    'deactivated', COUNT(*) FILTER (WHERE change = 4),
+    'updated', COUNT(*) FILTER (WHERE change = 5),
+    'total', COUNT(*)
+  ) INTO counts
+  FROM catalog_import_stage_items
+  WHERE stage_id = p_stage_id;
+
+  UPDATE catalog_import_stages SET status = 'staged', change_counts = counts
+  WHERE id = p_stage_id AND status = 'loading';
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Aperçu d''import % introuvable ou déjà chargé', p_stage_id;
+  END IF;
+  RETURN counts;
+END;
+$$;
+
+-- Page de l'aperçu: filtre par types de changement, tri sur une colonne indexée
+-- (sku, new_price_dbc, price_delta, price_delta_pct, abs_price_delta_pct)
+CREATE OR REPLACE FUNCTION get_catalog_import_stage_items(
+  p_stage_id UUID,
+  p_changes TEXT[] DEFAULT NULL,
+  p_sort TEXT DEFAULT 'sku',
+  p_descending BOOLEAN DEFAULT false,
+  p_offset INTEGER DEFAULT 0,
+  p_limit INTEGER DEFAULT 100
+)
+RETURNS TABLE (
+  sku TEXT,
+  change TEXT,
+  product_name TEXT,
+  old_quantity INTEGER,
+  new_quantity INTEGER,
+  old_price_dbc NUMERIC,
+  new_price_dbc NUMERIC,
+  price_delta NUMERIC,
+  price_delta_pct NUMERIC
+)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+  sort_expression TEXT := CASE p_sort
+    WHEN 'sku' THEN 'si.sku'
+    WHEN 'new_price_dbc' THEN 'si.new_price_dbc'
+    WHEN 'price_delta' THEN 'si.price_delta'
+    WHEN 'price_delta_pct' THEN 'si.price_delta_pct'
+    WHEN 'abs_price_delta_pct' THEN 'abs(si.price_delta_pct)'
+  END;
+BEGIN
+  IF sort_expression IS NULL THEN
+    RAISE EXCEPTION 'Tri invalide: %', p_sort;
+  END IF;
+  RETURN QUERY EXECUTE format($q$
+    SELECT si.sku, catalog_import_change_name(si.change), si.product_name, si.old_quantity, si.new_quantity,
+           si.old_price_dbc, si.new_price_dbc, si.price_delta, si.price_delta_pct
+    FROM catalog_import_stage_items si
+    WHERE si.stage_id = $1
+      AND ($2 IS NULL OR si.change = ANY(ARRAY(SELECT catalog_import_change(c) FROM unnest($2) c)))
+    ORDER BY %1$s %2$s NULLS LAST, si.sku
+    OFFSET GREATEST($3, 0) LIMIT LEAST(GREATEST($4, 1), 1000)
+  $q$, sort_expression, CASE WHEN p_descending THEN 'DESC' ELSE 'ASC' END)
+  USING p_stage_id, p_changes, p_offset, p_limit;
+END;
+$$;
+
+-- Applique un aperçu en une transaction: écriture des produits, désactivation
+-- des absents, enregistrement de l'import et de ses SKU. Rejouable: un aperçu
+-- déjà appliqué renvoie l'import créé la première fois.
+CREATE OR REPLACE FUNCTION commit_catalog_import_stage(p_stage_id UUID)
+RETURNS TABLE (import_id UUID, upserted INTEGER, deactivated INTEGER)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  stage catalog_import_stages%ROWTYPE;
+BEGIN
+  SELECT * INTO stage FROM catalog_import_stages WHERE id = p_stage_id FOR UPDATE;
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Aperçu d''import introuvable: %', p_stage_id;
+  END IF;
+  IF stage.status = 'committed' THEN
+    RETURN QUERY SELECT stage.import_id, stage.upserted_count, stage.deactivated_count;
+    RETURN;
+  END IF;
+  IF stage.status <> 'staged' THEN
+    RAISE EXCEPTION 'Aperçu d''import % non applicable (statut %)', p_stage_id, stage.status
+      USING ERRCODE = 'DBC01';
+  END IF;
+  -- Import concurrent sérialisé, diff périmé refusé (SQLSTATE DBC01: conflit, voir
+  -- STAGE_CONFLICT_CODE dans catalog_processor.py)
+  LOCK TABLE catalog_imports IN SHARE ROW EXCLUSIVE MODE;
+  IF latest_catalog_import_id() IS DISTINCT FROM stage.base_import_id THEN
+    RAISE EXCEPTION 'Aperçu d''import % périmé: un autre import a été appliqué depuis', p_stage_id
+      USING ERRCODE = 'DBC01';
+  END IF;
+
+  -- Colonnes écrites par l'import catalogue (voir process_catalog_file)
+  INSERT INTO products (
+    sku, item_group, product_name, appearance, functionality, boxed, color, cloud_lock,
+    additional_info, quantity, price, campaign_price, vat_type, price_dbc, brand, model,
+    storage_gb, is_active, row_hash
+  )
+  SELECT r.sku, r.item_group, r.product_name, r.appearance, r.functionality, r.boxed, r.color, r.cloud_lock,
+         r.additional_info, r.quantity, r.price, r.campaign_price, r.vat_type, r.price_dbc, r.brand, r.model,
+         r.storage_gb, r.is_active, r.row_hash
+  FROM catalog_import_stage_items si
+  CROSS JOIN LATERAL jsonb_populate_record(NULL::products, si.product) r
+  WHERE si.stage_id = p_stage_id AND si.product IS NOT NULL
+  ON CONFLICT (sku) DO UPDATE SET
+    item_group = EXCLUDED.item_group,
+    product_name = EXCLUDED.product_name,
+    appearance = EXCLUDED.appearance,
+    functionality = EXCLUDED.functionality,
+    boxed = EXCLUDED.boxed,
+    color = EXCLUDED.color,
+    cloud_lock = EXCLUDED.cloud_lock,
+    additional_info = EXCLUDED.additional_info,
+    quantity = EXCLUDED.quantity,
+    price = EXCLUDED.price,
+    campaign_price = EXCLUDED.campaign_price,
+    vat_type = EXCLUDED.vat_type,
+    price_dbc = EXCLUDED.price_dbc,
+    brand = EXCLUDED.brand,
+    model = EXCLUDED.model,
+    storage_gb = EXCLUDED.storage_gb,
+    is_active = EXCLUDED.is_active,
+    row_hash = EXCLUDED.row_hash;
+  GET DIAGNOSTICS upserted = ROW_COUNT;
+
+  UPDATE products p SET quantity = 0, is_active = false, row_hash = NULL
+  FROM catalog_import_stage_items si
+  WHERE si.stage_id = p_stage_id AND si.product IS NULL AND p.sku = si.sku;
+  GET DIAGNOSTICS deactivated = ROW_COUNT;
+
+  INSERT INTO catalog_imports (import_date, total_imported, total_updated, import_summary, facet_stats, content_hash)
+  VALUES (
+    NOW(), upserted,
+    (stage.import_summary->>'new_skus_count')::INTEGER + (stage.import_summary->>'restocked_skus_count')::INTEGER,
+    stage.import_summary, stage.facet_stats, stage.content_hash
+  )
+  RETURNING id INTO import_id;
+
+  -- SKU de l'import: nouveaux / restockés, et absents du catalogue (désactivés)
+  INSERT INTO catalog_import_items (import_id, sku_id, kind)
+  SELECT import_id, p.sku_id, CASE si.change WHEN 1 THEN 1 WHEN 2 THEN 2 ELSE 3 END::SMALLINT
+  FROM catalog_import_stage_items si
+  INNER JOIN products p ON p.sku = si.sku
+  WHERE si.stage_id = p_stage_id AND (si.change IN (1, 2) OR si.product IS NULL)
+  ON CONFLICT DO NOTHING;
+
+  UPDATE catalog_import_stages
+  SET status = 'committed', import_id = commit_catalog_import_stage.import_id,
+      upserted_count = upserted, deactivated_count = deactivated, committed_at = NOW()
+  WHERE id = p_stage_id;
+
+  -- Les autres aperçus sont désormais périmés: seules les lignes du dernier appliqué sont gardées
+  UPDATE catalog_import_stages SET status = 'discarded'
+  WHERE id <> p_stage_id AND status IN ('loading', 'staged');
+  DELETE FROM catalog_import_stage_items WHERE stage_id <> p_stage_id;
+
+  RETURN NEXT;
+END;
+$$;
+
+-- Recherche d'un IMEI / numéro de série dans toutes les commandes (retours, double facturation)
+-- Index hash: recherche par égalité uniquement, plus compact qu'un B-tree sur des identifiants longs
+CREATE INDEX IF NOT EXISTS idx_order_item_imei_imei_hash ON order_item_imei USING hash (imei);
+
+-- Persistance groupée d'une commande IMEI tarifée (backend/scripts/imei_order_persistence.py)
+-- Un appel = une transaction: articles manquants créés par SKU, puis tous les
+-- appareils écrits en une instruction (une seule mise à jour des agrégats de ventes).
+-- Rejouable: un IMEI déjà présent sur l'article est mis à jour s'il a changé, jamais dupliqué.
+DO $$
+BEGIN
+  -- Doublons exacts (même article, même IMEI) retirés avant la création de l'index unique
+  IF to_regclass('idx_order_item_imei_item_imei') IS NULL THEN
+    DELETE FROM order_item_imei a
+    USING order_item_imei b
+    WHERE a.order_item_id = b.order_item_id AND a.imei = b.imei AND a.ctid > b.ctid;
+  END IF;
+END;
+$$;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_order_item_imei_item_imei ON order_item_imei(order_item_id, imei);
+
+-- Appareils passés colonne par colonne (tableaux de même longueur, un élément par appareil):
+-- charge utile compacte et une seule lecture par unnest. Colonnes descriptives facultatives.
+CREATE OR REPLACE FUNCTION persist_imei_order(
+  p_order_id UUID,
+  p_skus TEXT[],
+  p_imeis TEXT[],
+  p_product_names TEXT[],
+  p_supplier_prices NUMERIC[],
+  p_dbc_prices NUMERIC[],
+  p_appearances TEXT[] DEFAULT NULL,
+  p_functionalities TEXT[] DEFAULT NULL,
+  p_boxed TEXT[] DEFAULT NULL,
+  p_colors TEXT[] DEFAULT NULL,
+  p_cloud_locks TEXT[] DEFAULT NULL,
+  p_additional_infos TEXT[] DEFAULT NULL
+)
+RETURNS TABLE (
+  created_items INTEGER,
+  inserted_devices INTEGER,
+  updated_devices INTEGER,
+  skipped_devices INTEGER,
+  quantity_mismatches INTEGER
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  device_count INTEGER := COALESCE(cardinality(p_imeis), 0);
+BEGIN
+  IF COALESCE(cardinality(p_skus), 0) <> device_count
+     OR COALESCE(cardinality(p_product_names), 0) <> device_count
+     OR COALESCE(cardinality(p_supplier_prices), 0) <> device_count
+     OR COALESCE(cardinality(p_dbc_prices), 0) <> device_count THEN
+    RAISE EXCEPTION 'Tableaux d''appareils de longueurs différentes (% IMEI)', device_count;
+  END IF;
+
+  -- Verrou sur la commande: deux persistances de la même commande s'exécutent l'une après l'autre
+  PERFORM 1 FROM orders WHERE id = p_order_id FOR UPDATE;
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Commande introuvable: %', p_order_id;
+  END IF;
+
+  CREATE TEMP TABLE persist_imei_devices ON COMMIT DROP AS
+  SELECT DISTINCT ON (d.sku, d.imei)
+    d.sku, d.imei, COALESCE(d.product_name, '') AS product_name,
+    ROUND(d.supplier_price, 2) AS supplier_price, ROUND(d.dbc_price, 2) AS dbc_price,
+    d.appearance, d.functionality, d.boxed, d.color, d.cloud_lock, d.additional_info
+  FROM unnest(
+    p_skus, p_imeis, p_product_names, p_supplier_prices, p_dbc_prices,
+    p_appearances, p_functionalities, p_boxed, p_colors, p_cloud_locks, p_additional_infos
+  ) WITH ORDINALITY AS d(
+    sku, imei, product_name, supplier_price, dbc_price,
+    appearance, functionality, boxed, color, cloud_lock, additional_info, n
+  )
+  WHERE COALESCE(d.sku, '') <> '' AND COALESCE(d.imei, '') <> ''
+  ORDER BY d.sku, d.imei, d.n DESC;  -- IMEI répété dans le fichier: la dernière ligne l'emporte
+
+  -- Un article par SKU absent de la commande (prix unitaire: moyenne des prix DBC)
+  INSERT INTO order_items (order_id, sku, product_name, quantity, unit_price, total_price)
+  SELECT p_order_id, d.sku, MIN(d.product_name), COUNT(*),
+         ROUND(AVG(COALESCE(d.dbc_price, 0)), 2), SUM(COALESCE(d.dbc_price, 0))
+  FROM persist_imei_devices d
+  WHERE NOT EXISTS (SELECT 1 FROM order_items oi WHERE oi.order_id = p_order_id AND oi.sku = d.sku)
+  GROUP BY d.sku;
+  GET DIAGNOSTICS created_items = ROW_COUNT;
+
+  WITH items AS (
+    SELECT DISTINCT ON (oi.sku) oi.sku, oi.id
+    FROM order_items oi
+    WHERE oi.order_id = p_order_id
+    ORDER BY oi.sku, oi.id
+  ), written AS (
+    INSERT INTO order_item_imei (
+      order_item_id, sku, imei, product_name, appearance, functionality,
+      boxed, color, cloud_lock, additional_info, supplier_price, dbc_price
+    )
+    SELECT i.id, d.sku, d.imei, d.product_name, d.appearance, d.functionality,
+           d.boxed, d.color, d.cloud_lock, d.additional_info, d.supplier_price, d.dbc_price
+    FROM persist_imei_devices d
+    INNER JOIN items i ON i.sku = d.sku
+    ON CONFLICT (order_item_id, imei) DO UPDATE SET
+      product_name = EXCLUDED.product_name,
+      appearance = EXCLUDED.appearance,
+      functionality = EXCLUDED.functionality,
+      boxed = EXCLUDED.boxed,
+      color = EXCLUDED.color,
+      cloud_lock = EXCLUDED.cloud_lock,
+      additional_info = EXCLUDED.additional_info,
+      supplier_price = EXCLUDED.supplier_price,
+      dbc_price = EXCLUDED.dbc_price
+    WHERE (order_item_imei.product_name, order_item_imei.appearance, order_item_imei.functionality,
+           order_item_imei.boxed, order_item_imei.color, order_item_imei.cloud_lock,
+           order_item_imei.additional_info, order_item_imei.supplier_price, order_item_imei.dbc_price)
+      IS DISTINCT FROM
+          (EXCLUDED.product_name, EXCLUDED.appearance, EXCLUDED.functionality,
+           EXCLUDED.boxed, EXCLUDED.color, EXCLUDED.cloud_lock,
+           EXCLUDED.additional_info, EXCLUDED.supplier_price, EXCLUDED.dbc_price)
+    RETURNING (xmax = 0) AS is_insert
+  )
+  SELECT COUNT(*) FILTER (WHERE is_insert), COUNT(*) FILTER (WHERE NOT is_insert)
+  INTO inserted_devices, updated_devices
+  FROM written;
+
+  skipped_devices := device_count - inserted_devices - updated_devices;
+
+  -- Articles dont la quantité commandée diffère du nombre d'IMEI enregistrés
+  SELECT COUNT(*) INTO quantity_mismatches
+  FROM order_items oi
+  WHERE oi.order_id = p_order_id
+    AND oi.quantity <> (SELECT COUNT(*) FROM order_item_imei oimei WHERE oimei.order_item_id = oi.id);
+
+  DROP TABLE persist_imei_devices;
+  RETURN NEXT;
+END;
+$$;
+
+-- Agrégats des ventes (commandes completed) maintenus de façon incrémentale
+-- order_item_imei gagne une ligne par appareil vendu : le dashboard lit ces
+-- agrégats (par jour, par modèle, par client) au lieu de joindre
+-- order_item_imei / order_items / orders à chaque appel.
+-- Mis à jour par triggers : passage d'une commande en / hors 'completed',
+-- écriture des IMEI et de leurs prix (import IMEI), suppressions.
+-- Reconstruction complète : SELECT * FROM rebuild_sales_rollups();
+-- (ou python backend/scripts/sales_rollups.py rebuild)
+
+-- Date de passage en 'completed' (clé des agrégats par jour)
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS completed_at TIMESTAMP WITH TIME ZONE;
+UPDATE orders SET completed_at = COALESCE(updated_at, created_at)
+WHERE status = 'completed' AND completed_at IS NULL;
+
+CREATE TABLE IF NOT EXISTS sales_rollup_daily (
+  day DATE PRIMARY KEY,
+  devices BIGINT NOT NULL DEFAULT 0,         -- Appareils vendus (lignes order_item_imei)
+  priced_devices BIGINT NOT NULL DEFAULT 0,  -- Dont prix DBC et fournisseur renseignés
+  revenue NUMERIC NOT NULL DEFAULT 0,        -- Somme des prix DBC
+  supplier_cost NUMERIC NOT NULL DEFAULT 0,  -- Somme des prix fournisseur (appareils avec les deux prix)
+  margin NUMERIC NOT NULL DEFAULT 0          -- Prix DBC - prix fournisseur (appareils avec les deux prix)
+);
+
+CREATE TABLE IF NOT EXISTS sales_rollup_by_model (
+  model_name TEXT PRIMARY KEY,  -- order_item_imei.product_name
+  devices BIGINT NOT NULL DEFAULT 0,
+  priced_devices BIGINT NOT NULL DEFAULT 0,
+  revenue NUMERIC NOT NULL DEFAULT 0,
+  supplier_cost NUMERIC NOT NULL DEFAULT 0,
+  margin NUMERIC NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sales_rollup_by_model_devices ON sales_rollup_by_model(devices DESC);
+
+-- Commandes sans client (user_id NULL) : comptées par jour et par modèle uniquement
+CREATE TABLE IF NOT EXISTS sales_rollup_by_client (
+  user_id UUID PRIMARY KEY,
+  devices BIGINT NOT NULL DEFAULT 0,
+  priced_devices BIGINT NOT NULL DEFAULT 0,
+  revenue NUMERIC NOT NULL DEFAULT 0,
+  supplier_cost NUMERIC NOT NULL DEFAULT 0,
+  margin NUMERIC NOT NULL DEFAULT 0
+);
+
+-- Variation d'agrégat pour un couple (jour, modèle, client), négative pour un retrait
+DO $$
+BEGIN
+  CREATE TYPE sales_rollup_delta AS (
+    day DATE,
+    model_name TEXT,
+    user_id UUID,
+    devices BIGINT,
+    priced_devices BIGINT,
+    revenue NUMERIC,
+    supplier_cost NUMERIC,
+    margin NUMERIC
+  );
+EXCEPTION WHEN duplicate_object THEN NULL;
+END;
+$$;
+
+-- Applique des variations aux trois agrégats (une requête par table, quel que soit le nombre d'appareils)
+CREATE OR REPLACE FUNCTION apply_sales_rollup_deltas(deltas sales_rollup_delta[])
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF deltas IS NULL OR cardinality(deltas) = 0 THEN
+    RETURN;
+  END IF;
+
+  INSERT INTO sales_rollup_daily AS r (day, devices, priced_devices, revenue, supplier_cost, margin)
+  SELECT d.day, SUM(d.devices), SUM(d.priced_devices), SUM(d.revenue), SUM(d.supplier_cost), SUM(d.margin)
+  FROM unnest(deltas) d
+  GROUP BY d.day
+  ON CONFLICT (day) DO UPDATE SET
+    devices = r.devices + EXCLUDED.devices,
+    priced_devices = r.priced_devices + EXCLUDED.priced_devices,
+    revenue = r.revenue + EXCLUDED.revenue,
+    supplier_cost = r.supplier_cost + EXCLUDED.supplier_cost,
+    margin = r.margin + EXCLUDED.margin;
+
+  INSERT INTO sales_rollup_by_model AS r (model_name, devices, priced_devices, revenue, supplier_cost, margin)
+  SELECT d.model_name, SUM(d.devices), SUM(d.priced_devices), SUM(d.revenue), SUM(d.supplier_cost), SUM(d.margin)
+  FROM unnest(deltas) d
+  WHERE d.model_name IS NOT NULL
+  GROUP BY d.model_name
+  ON CONFLICT (model_name) DO UPDATE SET
+    devices = r.devices + EXCLUDED.devices,
+    priced_devices = r.priced_devices + EXCLUDED.priced_devices,
+    revenue = r.revenue + EXCLUDED.revenue,
+    supplier_cost = r.supplier_cost + EXCLUDED.supplier_cost,
+    margin = r.margin + EXCLUDED.margin;
+
+  INSERT INTO sales_rollup_by_client AS r (user_id, devices, priced_devices, revenue, supplier_cost, margin)
+  SELECT d.user_id, SUM(d.devices), SUM(d.priced_devices), SUM(d.revenue), SUM(d.supplier_cost), SUM(d.margin)
+  FROM unnest(deltas) d
+  WHERE d.user_id IS NOT NULL
+  GROUP BY d.user_id
+  ON CONFLICT (user_id) DO UPDATE SET
+    devices = r.devices + EXCLUDED.devices,
+    priced_devices = r.priced_devices + EXCLUDED.priced_devices,
+    revenue = r.revenue + EXCLUDED.revenue,
+    supplier_cost = r.supplier_cost + EXCLUDED.supplier_cost,
+    margin = r.margin + EXCLUDED.margin;
+
+  -- Plus aucun appareil vendu : la ligne disparaît (comme dans une agrégation directe)
+  DELETE FROM sales_rollup_daily WHERE devices = 0 AND day IN (SELECT d.day FROM unnest(deltas) d);
+  DELETE FROM sales_rollup_by_model WHERE devices = 0 AND model_name IN (SELECT d.model_name FROM unnest(deltas) d);
+  DELETE FROM sales_rollup_by_client WHERE devices = 0 AND user_id IN (SELECT d.user_id FROM unnest(deltas) d);
+END;
+$$;
+
+-- Variations apportées par les appareils d'articles de commande (commande completed)
+CREATE OR REPLACE FUNCTION sales_rollup_item_deltas(item_ids UUID[], p_day DATE, p_user_id UUID, p_sign INTEGER)
+RETURNS sales_rollup_delta[]
+LANGUAGE SQL
+STABLE
+AS $$
+  SELECT array_agg(ROW(
+    p_day, g.model_name, p_user_id,
+    p_sign * g.devices, p_sign * g.priced_devices, p_sign * g.revenue, p_sign * g.supplier_cost, p_sign * g.margin
+  )::sales_rollup_delta)
+  FROM (
+    SELECT
+      oimei.product_name AS model_name,
+      COUNT(*) AS devices,
+      COUNT(*) FILTER (WHERE oimei.dbc_price IS NOT NULL AND oimei.supplier_price IS NOT NULL) AS priced_devices,
+      SUM(COALESCE(oimei.dbc_price, 0)) AS revenue,
+      COALESCE(SUM(oimei.supplier_price) FILTER (WHERE oimei.dbc_price IS NOT NULL), 0) AS supplier_cost,
+      COALESCE(SUM(oimei.dbc_price - oimei.supplier_price), 0) AS margin
+    FROM order_item_imei oimei
+    WHERE oimei.order_item_id = ANY(item_ids)
+    GROUP BY oimei.product_name
+  ) g;
+$$;
+
+-- Date de passage en 'completed' tenue à jour sur la commande
+CREATE OR REPLACE FUNCTION set_order_completed_at()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF NEW.status = 'completed' THEN
+    IF TG_OP = 'INSERT' OR OLD.status IS DISTINCT FROM 'completed' THEN
+      NEW.completed_at := COALESCE(NEW.completed_at, NOW());
+    END IF;
+  ELSE
+    NEW.completed_at := NULL;
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_orders_completed_at ON orders;
+CREATE TRIGGER trg_orders_completed_at
+  BEFORE INSERT OR UPDATE OF status ON orders
+  FOR EACH ROW EXECUTE FUNCTION set_order_completed_at();
+
+-- Commande qui passe en / hors 'completed' (ou change de client) : tous ses appareils.
+-- Suppression : en BEFORE DELETE, tant que les articles et IMEI existent encore
+-- (la cascade qui suit ne retrouve plus la commande et n'applique rien).
+CREATE OR REPLACE FUNCTION sync_sales_rollups_on_order()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'completed' THEN
+    PERFORM apply_sales_rollup_deltas(sales_rollup_item_deltas(
+      ARRAY(SELECT oi.id FROM order_items oi WHERE oi.order_id = OLD.id),
+      COALESCE(OLD.completed_at, OLD.created_at)::date, OLD.user_id, -1
+    ));
+  END IF;
+  IF TG_OP = 'UPDATE' AND NEW.status = 'completed' THEN
+    PERFORM apply_sales_rollup_deltas(sales_rollup_item_deltas(
+      ARRAY(SELECT oi.id FROM order_items oi WHERE oi.order_id = NEW.id),
+      COALESCE(NEW.completed_at, NEW.created_at)::date, NEW.user_id, 1
+    ));
+  END IF;
+  IF TG_OP = 'DELETE' THEN
+    RETURN OLD;
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_orders_sales_rollups ON orders;
+CREATE TRIGGER trg_orders_sales_rollups
+  AFTER UPDATE OF status, user_id, completed_at ON orders
+  FOR EACH ROW
+  WHEN ((OLD.status = 'completed' OR NEW.status = 'completed')
+        AND (OLD.status IS DISTINCT FROM NEW.status
+             OR OLD.user_id IS DISTINCT FROM NEW.user_id
+             OR OLD.completed_at IS DISTINCT FROM NEW.completed_at))
+  EXECUTE FUNCTION sync_sales_rollups_on_order();
+
+DROP TRIGGER IF EXISTS trg_orders_sales_rollups_delete ON orders;
+CREATE TRIGGER trg_orders_sales_rollups_delete
+  BEFORE DELETE ON orders
+  FOR EACH ROW
+  WHEN (OLD.status = 'completed')
+  EXECUTE FUNCTION sync_sales_rollups_on_order();
+
+-- Article supprimé d'une commande completed (BEFORE DELETE, même raison que ci-dessus)
+CREATE OR REPLACE FUNCTION sync_sales_rollups_on_order_item()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  o orders%ROWTYPE;
+BEGIN
+  SELECT * INTO o FROM orders WHERE id = OLD.order_id AND status = 'completed';
+  IF FOUND THEN
+    PERFORM apply_sales_rollup_deltas(sales_rollup_item_deltas(
+      ARRAY[OLD.id], COALESCE(o.completed_at, o.created_at)::date, o.user_id, -1
+    ));
+  END IF;
+  RETURN OLD;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_order_items_sales_rollups_delete ON order_items;
+CREATE TRIGGER trg_order_items_sales_rollups_delete
+  BEFORE DELETE ON order_items
+  FOR EACH ROW EXECUTE FUNCTION sync_sales_rollups_on_order_item();
+
+-- IMEI insérés / repricés / supprimés : une variation par instruction (tables de
+-- transition), l'import IMEI d'une commande entière ne met à jour les agrégats qu'une fois
+CREATE OR REPLACE FUNCTION sync_sales_rollups_on_imei()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  source TEXT;
+  deltas sales_rollup_delta[];
+BEGIN
+  FOREACH source IN ARRAY CASE TG_OP
+    WHEN 'INSERT' THEN ARRAY['new_rows']
+    WHEN 'DELETE' THEN ARRAY['old_rows']
+    ELSE ARRAY['old_rows', 'new_rows']
+  END LOOP
+    EXECUTE format($q$
+      SELECT array_agg(ROW(
+        g.day, g.model_name, g.user_id,
+        %2$s * g.devices, %2$s * g.priced_devices, %2$s * g.revenue, %2$s * g.supplier_cost, %2$s * g.margin
+      )::sales_rollup_delta)
+      FROM (
+        SELECT
+          COALESCE(o.completed_at, o.created_at)::date AS day,
+          oimei.product_name AS model_name,
+          o.user_id,
+          COUNT(*) AS devices,
+          COUNT(*) FILTER (WHERE oimei.dbc_price IS NOT NULL AND oimei.supplier_price IS NOT NULL) AS priced_devices,
+          SUM(COALESCE(oimei.dbc_price, 0)) AS revenue,
+          COALESCE(SUM(oimei.supplier_price) FILTER (WHERE oimei.dbc_price IS NOT NULL), 0) AS supplier_cost,
+          COALESCE(SUM(oimei.dbc_price - oimei.supplier_price), 0) AS margin
+        FROM %1$I oimei
+        INNER JOIN order_items oi ON oimei.order_item_id = oi.id
+        INNER JOIN orders o ON oi.order_id = o.id
+        WHERE o.status = 'completed'
+        GROUP BY 1, 2, 3
+      ) g
+    $q$, source, CASE WHEN source = 'old_rows' THEN -1 ELSE 1 END) INTO deltas;
+    PERFORM apply_sales_rollup_deltas(deltas);
+  END LOOP;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_order_item_imei_sales_rollups_insert ON order_item_imei;
+CREATE TRIGGER trg_order_item_imei_sales_rollups_insert
+  AFTER INSERT ON order_item_imei
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION sync_sales_rollups_on_imei();
+
+DROP TRIGGER IF EXISTS trg_order_item_imei_sales_rollups_update ON order_item_imei;
+CREATE TRIGGER trg_order_item_imei_sales_rollups_update
+  AFTER UPDATE ON order_item_imei
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION sync_sales_rollups_on_imei();
+
+DROP TRIGGER IF EXISTS trg_order_item_imei_sales_rollups_delete ON order_item_imei;
+CREATE TRIGGER trg_order_item_imei_sales_rollups_delete
+  AFTER DELETE ON order_item_imei
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION sync_sales_rollups_on_imei();
+
+-- Agrégats recalculés depuis order_item_imei (un seul parcours de la jointure)
+CREATE OR REPLACE FUNCTION sales_rollup_full_deltas()
+RETURNS sales_rollup_delta[]
+LANGUAGE SQL
+STABLE
+AS $$
+  SELECT array_agg(ROW(
+    g.day, g.model_name, g.user_id, g.devices, g.priced_devices, g.revenue, g.supplier_cost, g.margin
+  )::sales_rollup_delta)
+  FROM (
+    SELECT
+      COALESCE(o.completed_at, o.created_at)::date AS day,
+      oimei.product_name AS model_name,
+      o.user_id,
+      COUNT(*) AS devices,
+      COUNT(*) FILTER (WHERE oimei.dbc_price IS NOT NULL AND oimei.supplier_price IS NOT NULL) AS priced_devices,
+      SUM(COALESCE(oimei.dbc_price, 0)) AS revenue,
+      COALESCE(SUM(oimei.supplier_price) FILTER (WHERE oimei.dbc_price IS NOT NULL), 0) AS supplier_cost,
+      COALESCE(SUM(oimei.dbc_price - oimei.supplier_price), 0) AS margin
+    FROM order_item_imei oimei
+    INNER JOIN order_items oi ON oimei.order_item_id = oi.id
+    INNER JOIN orders o ON oi.order_id = o.id
+    WHERE o.status = 'completed'
+    GROUP BY 1, 2, 3
+  ) g;
+$$;
+
+-- Reconstruction complète (migration, dérive constatée par check_sales_rollups)
+-- Les écritures concurrentes attendent la fin de la reconstruction (verrou EXCLUSIVE)
+CREATE OR REPLACE FUNCTION rebuild_sales_rollups()
+RETURNS TABLE (days BIGINT, models BIGINT, clients BIGINT)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  LOCK TABLE sales_rollup_daily, sales_rollup_by_model, sales_rollup_by_client IN EXCLUSIVE MODE;
+  DELETE FROM sales_rollup_daily;
+  DELETE FROM sales_rollup_by_model;
+  DELETE FROM sales_rollup_by_client;
+  PERFORM apply_sales_rollup_deltas(sales_rollup_full_deltas());
+  RETURN QUERY SELECT
+    (SELECT COUNT(*) FROM sales_rollup_daily),
+    (SELECT COUNT(*) FROM sales_rollup_by_model),
+    (SELECT COUNT(*) FROM sales_rollup_by_client);
+END;
+$$;
+
+-- Écarts entre les agrégats et un recalcul complet (0 ligne : agrégats exacts)
+CREATE OR REPLACE FUNCTION check_sales_rollups()
+RETURNS TABLE (rollup TEXT, rollup_key TEXT, expected_devices BIGINT, actual_devices BIGINT,
+               expected_margin NUMERIC, actual_margin NUMERIC)
+LANGUAGE SQL
+STABLE
+AS $$
+  WITH expected AS (
+    SELECT * FROM unnest(sales_rollup_full_deltas())
+  ),
+  expected_by AS (
+    SELECT 'daily' AS rollup, day::text AS rollup_key, SUM(devices) AS devices, SUM(priced_devices) AS priced_devices,
+           SUM(revenue) AS revenue, SUM(supplier_cost) AS supplier_cost, SUM(margin) AS margin
+    FROM expected GROUP BY day
+    UNION ALL
+    SELECT 'model', model_name, SUM(devices), SUM(priced_devices), SUM(revenue), SUM(supplier_cost), SUM(margin)
+    FROM expected WHERE model_name IS NOT NULL GROUP BY model_name
+    UNION ALL
+    SELECT 'client', user_id::text, SUM(devices), SUM(priced_devices), SUM(revenue), SUM(supplier_cost), SUM(margin)
+    FROM expected WHERE user_id IS NOT NULL GROUP BY user_id
+  ),
+  actual_by AS (
+    SELECT 'daily' AS rollup, day::text AS rollup_key, devices, priced_devices, revenue, supplier_cost, margin
+    FROM sales_rollup_daily
+    UNION ALL
+    SELECT 'model', model_name, devices, priced_devices, revenue, supplier_cost, margin FROM sales_rollup_by_model
+    UNION ALL
+    SELECT 'client', user_id::text, devices, priced_devices, revenue, supplier_cost, margin FROM sales_rollup_by_client
+  )
+  SELECT COALESCE(e.rollup, a.rollup), COALESCE(e.rollup_key, a.rollup_key),
+         e.devices::bigint, a.devices, e.margin, a.margin
+  FROM expected_by e
+  FULL OUTER JOIN actual_by a ON a.rollup = e.rollup AND a.rollup_key = e.rollup_key
+  WHERE e.devices IS DISTINCT FROM a.devices
+     OR e.priced_devices IS DISTINCT FROM a.priced_devices
+     OR e.revenue IS DISTINCT FROM a.revenue
+     OR e.supplier_cost IS DISTINCT FROM a.supplier_cost
+     OR e.margin IS DISTINCT FROM a.margin;
+$$;
+
+-- Remplissage initial (et resynchronisation à chaque application de ce fichier)
+SELECT * FROM rebuild_sales_rollups();
+
+-- 1. Marge totale des commandes completed (agrégat par jour)
 CREATE OR REPLACE FUNCTION get_total_margin_completed_orders()
 RETURNS NUMERIC
 LANGUAGE SQL
 STABLE
 AS $$
-  SELECT COALESCE(SUM(
-    CASE 
-      WHEN oimei.dbc_price IS NOT NULL AND oimei.supplier_price IS NOT NULL 
-      THEN oimei.dbc_price - oimei.supplier_price 
-      ELSE 0 
-    END
-  ), 0) as total_margin
-  FROM order_item_imei oimei
-  INNER JOIN order_items oi ON oimei.order_item_id = oi.id
-  INNER JOIN orders o ON oi.order_id = o.id
-  WHERE o.status = 'completed'
-    AND oimei.dbc_price IS NOT NULL 
-    AND oimei.supplier_price IS NOT NULL;
+  SELECT COALESCE(SUM(margin), 0) as total_margin
+  FROM sales_rollup_daily;
 $$;
 
--- 2. Fonction pour obtenir les modèles les plus vendus avec leurs statistiques (version debug)
+-- 2. Modèles les plus vendus avec leurs statistiques (agrégat par modèle)
 CREATE OR REPLACE FUNCTION get_top_selling_models_completed_orders(limit_count INTEGER DEFAULT 5)
 RETURNS TABLE (
   modelName TEXT,
@@ -69,24 +1024,50 @@ RETURNS TABLE (
 LANGUAGE SQL
 STABLE
 AS $$
-  SELECT 
-    oimei.product_name as modelName,
-    COUNT(*) as totalQuantity,  -- Chaque ligne = 1 produit vendu
-    SUM(COALESCE(oimei.dbc_price, 0)) as totalRevenue,
-    SUM(
-      CASE 
-        WHEN oimei.dbc_price IS NOT NULL AND oimei.supplier_price IS NOT NULL 
-        THEN oimei.dbc_price - oimei.supplier_price 
-        ELSE 0 
-      END
-    ) as totalMargin
-  FROM order_item_imei oimei
-  INNER JOIN order_items oi ON oimei.order_item_id = oi.id
-  INNER JOIN orders o ON oi.order_id = o.id
-  WHERE o.status = 'completed'
-    AND oimei.product_name IS NOT NULL
-  GROUP BY oimei.product_name
-  ORDER BY COUNT(*) DESC  -- Trier par nombre de produits vendus
+  SELECT
+    r.model_name as modelName,
+    r.devices as totalQuantity,  -- Chaque appareil = 1 produit vendu
+    r.revenue as totalRevenue,
+    r.margin as totalMargin
+  FROM sales_rollup_by_model r
+  ORDER BY r.devices DESC, r.model_name
+  LIMIT limit_count;
+$$;
+
+-- Ventes et marge par jour sur une période (bornes incluses, NULL = sans borne)
+CREATE OR REPLACE FUNCTION get_sales_by_day_completed_orders(start_date DATE DEFAULT NULL, end_date DATE DEFAULT NULL)
+RETURNS TABLE (
+  day DATE,
+  totalQuantity BIGINT,
+  totalRevenue NUMERIC,
+  totalMargin NUMERIC
+)
+LANGUAGE SQL
+STABLE
+AS $$
+  SELECT r.day, r.devices, r.revenue, r.margin
+  FROM sales_rollup_daily r
+  WHERE (start_date IS NULL OR r.day >= start_date)
+    AND (end_date IS NULL OR r.day <= end_date)
+  ORDER BY r.day;
+$$;
+
+-- Clients avec la plus forte marge
+CREATE OR REPLACE FUNCTION get_top_clients_completed_orders(limit_count INTEGER DEFAULT 10)
+RETURNS TABLE (
+  userId UUID,
+  companyName TEXT,
+  totalQuantity BIGINT,
+  totalRevenue NUMERIC,
+  totalMargin NUMERIC
+)
+LANGUAGE SQL
+STABLE
+AS $$
+  SELECT r.user_id, u.company_name::text, r.devices, r.revenue, r.margin
+  FROM sales_rollup_by_client r
+  LEFT JOIN users u ON u.id = r.user_id
+  ORDER BY r.margin DESC, r.user_id
   LIMIT limit_count;
 $$;
 
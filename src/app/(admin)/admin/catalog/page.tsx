@@ -8,6 +8,7 @@ import AppHeader from '@/components/AppHeader';
 import BackToTopButton from '@/components/BackToTopButton';
 import { supabase, Product } from '../../../../lib/supabase';
 import { OrdersUtils } from '../../../../lib/orders-utils';
+import { fetchImportSkus } from '../../../../lib/import-skus';
 import { translateCatalogTerm, translateInterfaceLabel, MANUFACTURERS, APPEARANCES_EN, APPEARANCES_FR, BOXED_OPTIONS_EN, BOXED_OPTIONS_FR, frenchToEnglishValue } from '../../../../lib/catalog-translations';
 import { 
   Search, 
@@ -38,14 +39,13 @@ const ImportSummaryModal = ({ isOpen, onClose, summary }: {
 }) => {
   if (!isOpen) return null;
 
-  const reallyNewSkus = summary?.all_new_skus ? 
-    summary.all_new_skus.filter((sku: string) => {
-      const existingNewSkus = JSON.parse(localStorage.getItem('newProductsSKUs') || '[]');
-      return !existingNewSkus.includes(sku);
-    }) : [];
-
-  const restockedSkus = summary?.restocked_skus || [];
-  const missingSkus = summary?.missing_skus || [];
+  // Aperçus (50 premiers SKU) et comptes réels ; listes complètes via /api/catalog/import-info/skus
+  const reallyNewSkus: string[] = summary?.new_skus_preview || [];
+  const restockedSkus: string[] = summary?.restocked_skus || [];
+  const missingSkus: string[] = summary?.missing_skus || [];
+  const newSkusCount: number = summary?.newSkus ?? reallyNewSkus.length;
+  const restockedSkusCount: number = summary?.restockedSkusCount ?? restockedSkus.length;
+  const missingSkusCount: number = summary?.missingSkusCount ?? missingSkus.length;
 
   // Gestion de la fermeture avec l'overlay
   const handleOverlayClick = (e: React.MouseEvent) => {
@@ -121,15 +121,15 @@ const ImportSummaryModal = ({ isOpen, onClose, summary }: {
               <div className="text-sm text-blue-700">Produits traités</div>
             </div>
             <div className="bg-green-50 rounded-lg p-4 text-center">
-              <div className="text-2xl font-bold text-green-600">{reallyNewSkus.length}</div>
+              <div className="text-2xl font-bold text-green-600">{newSkusCount}</div>
               <div className="text-sm text-green-700">Nouveaux SKU</div>
             </div>
             <div className="bg-orange-50 rounded-lg p-4 text-center">
-              <div className="text-2xl font-bold text-orange-600">{restockedSkus.length}</div>
+              <div className="text-2xl font-bold text-orange-600">{restockedSkusCount}</div>
               <div className="text-sm text-orange-700">Remis en stock</div>
             </div>
             <div className="bg-red-50 rounded-lg p-4 text-center">
-              <div className="text-2xl font-bold text-red-600">{missingSkus.length}</div>
+              <div className="text-2xl font-bold text-red-600">{missingSkusCount}</div>
               <div className="text-sm text-red-700">SKUs manquants</div>
               <div className="text-xs text-red-600 mt-1">du nouvel import</div>
             </div>
@@ -186,23 +186,23 @@ const ImportSummaryModal = ({ isOpen, onClose, summary }: {
                              <div className="space-y-2 text-sm">
                  <div className="flex justify-between">
                    <span className="text-gray-800">✅ SKU correspondants:</span>
-                   <span className="font-semibold text-gray-800">{(summary?.importedProducts || 0) - reallyNewSkus.length - restockedSkus.length}</span>
+                   <span className="font-semibold text-gray-800">{(summary?.importedProducts || 0) - newSkusCount - restockedSkusCount}</span>
                  </div>
                  <div className="flex justify-between">
                    <span className="text-gray-800">🆕 Nouveaux ajouts:</span>
-                   <span className="font-semibold text-green-700">{reallyNewSkus.length}</span>
+                   <span className="font-semibold text-green-700">{newSkusCount}</span>
                  </div>
                  <div className="flex justify-between">
                    <span className="text-gray-800">📦 Remis en stock:</span>
-                   <span className="font-semibold text-orange-700">{restockedSkus.length}</span>
+                   <span className="font-semibold text-orange-700">{restockedSkusCount}</span>
                  </div>
                  <div className="flex justify-between">
                    <span className="text-gray-800">❌ Ruptures détectées:</span>
-                   <span className="font-semibold text-red-700">{missingSkus.length}</span>
+                   <span className="font-semibold text-red-700">{missingSkusCount}</span>
                  </div>
                  <div className="flex justify-between pt-2 border-t">
                    <span className="text-gray-800">📈 Taux de nouveauté:</span>
-                   <span className="font-semibold text-gray-800">{summary?.importedProducts ? ((reallyNewSkus.length / summary.importedProducts) * 100).toFixed(1) : 0}%</span>
+                   <span className="font-semibold text-gray-800">{summary?.importedProducts ? ((newSkusCount / summary.importedProducts) * 100).toFixed(1) : 0}%</span>
                  </div>
                </div>
             </div>
@@ -210,38 +210,38 @@ const ImportSummaryModal = ({ isOpen, onClose, summary }: {
 
           {/* Exemples de SKU pour vérification */}
           <div className="space-y-4">
-            {reallyNewSkus.length > 0 && (
+            {newSkusCount > 0 && (
               <div className="bg-green-50 rounded-lg p-4">
                 <h4 className="font-semibold text-green-800 mb-2 flex items-center gap-2">
-                  🆕 Exemples de nouveaux SKU ({reallyNewSkus.length} total)
+                  🆕 Exemples de nouveaux SKU ({newSkusCount} total)
                 </h4>
                                  <div className="text-sm text-green-800 font-mono bg-white rounded p-3 max-h-20 overflow-y-auto border">
                    {reallyNewSkus.slice(0, 10).join(', ')}
-                   {reallyNewSkus.length > 10 && `, ... et ${reallyNewSkus.length - 10} autres`}
+                   {newSkusCount > 10 && `, ... et ${newSkusCount - 10} autres`}
                  </div>
               </div>
             )}
 
-            {restockedSkus.length > 0 && (
+            {restockedSkusCount > 0 && (
               <div className="bg-orange-50 rounded-lg p-4">
                 <h4 className="font-semibold text-orange-800 mb-2 flex items-center gap-2">
-                  📦 Exemples de remises en stock ({restockedSkus.length} total)
+                  📦 Exemples de remises en stock ({restockedSkusCount} total)
                 </h4>
                                  <div className="text-sm text-orange-800 font-mono bg-white rounded p-3 max-h-20 overflow-y-auto border">
                    {restockedSkus.slice(0, 10).join(', ')}
-                   {restockedSkus.length > 10 && `, ... et ${restockedSkus.length - 10} autres`}
+                   {restockedSkusCount > 10 && `, ... et ${restockedSkusCount - 10} autres`}
                  </div>
               </div>
             )}
 
-            {missingSkus.length > 0 && (
+            {missingSkusCount > 0 && (
               <div className="bg-red-50 rounded-lg p-4">
                 <h4 className="font-semibold text-red-800 mb-2 flex items-center gap-2">
-                  ❌ Exemples de ruptures de stock ({missingSkus.length} total)
+                  ❌ Exemples de ruptures de stock ({missingSkusCount} total)
                 </h4>
                                  <div className="text-sm text-red-800 font-mono bg-white rounded p-3 max-h-20 overflow-y-auto border">
                    {missingSkus.slice(0, 10).join(', ')}
-                   {missingSkus.length > 10 && `, ... et ${missingSkus.length - 10} autres`}
+                   {missingSkusCount > 10 && `, ... et ${missingSkusCount - 10} autres`}
                  </div>
               </div>
             )}
@@ -261,17 +261,17 @@ const ImportSummaryModal = ({ isOpen, onClose, summary }: {
           </div>
 
           {/* Avertissements et recommandations */}
-          {(reallyNewSkus.length > summary?.importedProducts * 0.1 || missingSkus.length > summary?.importedProducts * 0.1) && (
+          {(newSkusCount > summary?.importedProducts * 0.1 || missingSkusCount > summary?.importedProducts * 0.1) && (
             <div className="mt-4 bg-yellow-50 border border-yellow-200 rounded-lg p-4">
               <h4 className="font-semibold text-yellow-800 mb-2 flex items-center gap-2">
                 ⚠️ Points d'attention
               </h4>
               <ul className="text-sm text-yellow-800 space-y-1">
-                {reallyNewSkus.length > summary?.importedProducts * 0.1 && (
-                  <li className="font-medium">• Taux élevé de nouveaux SKU ({((reallyNewSkus.length / summary.importedProducts) * 100).toFixed(1)}%) - Vérifiez la cohérence</li>
+                {newSkusCount > summary?.importedProducts * 0.1 && (
+                  <li className="font-medium">• Taux élevé de nouveaux SKU ({((newSkusCount / summary.importedProducts) * 100).toFixed(1)}%) - Vérifiez la cohérence</li>
                 )}
-                {missingSkus.length > summary?.importedProducts * 0.1 && (
-                  <li className="font-medium">• Nombreuses ruptures détectées ({((missingSkus.length / summary.importedProducts) * 100).toFixed(1)}%) - Vérifiez le fichier source</li>
+                {missingSkusCount > summary?.importedProducts * 0.1 && (
+                  <li className="font-medium">• Nombreuses ruptures détectées ({((missingSkusCount / summary.importedProducts) * 100).toFixed(1)}%) - Vérifiez le fichier source</li>
                 )}
                 <li className="font-medium">• Consultez les exemples de SKU ci-dessus pour vérifier la cohérence des données</li>
               </ul>
@@ -303,9 +303,9 @@ const ImportSummaryModal = ({ isOpen, onClose, summary }: {
                   // Copier les statistiques dans le presse-papiers
                   const stats = `Import réussi - ${new Date().toLocaleString('fr-FR')}
 Produits traités: ${summary?.importedProducts || 0}
-Nouveaux SKU: ${reallyNewSkus.length}
-Remis en stock: ${restockedSkus.length}
-SKUs manquants: ${missingSkus.length}
+Nouveaux SKU: ${newSkusCount}
+Remis en stock: ${restockedSkusCount}
+SKUs manquants: ${missingSkusCount}
 Actifs: ${summary?.stats?.active_products || 0}
 Stock zéro: ${summary?.stats?.out_of_stock || 0}`;
                   navigator.clipboard.writeText(stats);
@@ -515,7 +515,9 @@ function AdminCatalogPage() {
   const [includeZeroStock, setIncludeZeroStock] = useState(false);
   const [showStandardCapacityOnly, setShowStandardCapacityOnly] = useState(false);
   const [showMinorFaultOnly, setShowMinorFaultOnly] = useState(false);
-  const [importInfo, setImportInfo] = useState<{ importDate: string; totalNewProducts: number; newSkus: string[]; restockedSkus: string[]; missingSkus: string[]; totalMissingProducts: number } | null>(null);
+  const [importInfo, setImportInfo] = useState<{ importId: string; importDate: string; totalNewProducts: number; totalMissingProducts: number } | null>(null);
+  // SKU nouveaux / restockés du dernier import, chargés à la première activation du filtre
+  const [newImportSkus, setNewImportSkus] = useState<{ importId: string; skus: Set<string> } | null>(null);
   
   // États de tri et pagination
   const [sortField, setSortField] = useState<SortField>('product_name');
@@ -557,7 +559,6 @@ function AdminCatalogPage() {
   const [error, setError] = useState<string | null>(null);
   const [totalProductsCount, setTotalProductsCount] = useState<number | null>(null);
   const [creatingOrder, setCreatingOrder] = useState(false);
-  const [newProductsSKUs, setNewProductsSKUs] = useState<string[]>([]);
   const [lastImportDate, setLastImportDate] = useState<Date | null>(null);
 
   const [totalNewProducts, setTotalNewProducts] = useState<number>(0);
@@ -1211,11 +1212,20 @@ function AdminCatalogPage() {
     return productName;
   };
 
+  // Chargement paginé des SKU de l'import quand le filtre "nouveaux produits" est activé
+  useEffect(() => {
+    const importId = importInfo?.importId;
+    if (!showNewProductsOnly || !importId || newImportSkus?.importId === importId) return;
+    fetchImportSkus(importId, ['new', 'restocked'])
+      .then(skus => setNewImportSkus({ importId, skus }))
+      .catch(error => console.error('Erreur chargement des SKU de l\'import:', error));
+  }, [showNewProductsOnly, importInfo?.importId]);
+
   // Fonction pour vérifier si un produit est "nouveau"
   const isNewProduct = (product: Product) => {
-    if (importInfo && importInfo.newSkus && importInfo.restockedSkus) {
-      // Utiliser les vraies données d'import si disponibles
-      return importInfo.newSkus.includes(product.sku) || importInfo.restockedSkus.includes(product.sku);
+    if (importInfo) {
+      // SKU de l'import chargés à l'activation du filtre (vide pendant le chargement)
+      return newImportSkus?.importId === importInfo.importId && newImportSkus.skus.has(product.sku);
     } else {
       // Heuristique temporaire plus restrictive
       // Seulement les produits avec stock élevé et certaines caractéristiques
@@ -1347,6 +1357,7 @@ function AdminCatalogPage() {
     includeZeroStock, 
     showNewProductsOnly, 
     importInfo,
+    newImportSkus,
     debouncedSearchTerm,
     selectedManufacturers,
     selectedAppearances,
@@ -1803,7 +1814,6 @@ function AdminCatalogPage() {
       if (!response.ok) {
         console.error('Erreur récupération import:', result.error);
         setTotalNewProducts(0);
-        setNewProductsSKUs([]);
         setLastImportDate(null);
         return;
       }
@@ -1811,32 +1821,24 @@ function AdminCatalogPage() {
       if (!result.data) {
         // Aucun import trouvé
         setTotalNewProducts(0);
-        setNewProductsSKUs([]);
         setLastImportDate(null);
         return;
       }
 
-      // Combiner les nouveaux SKU et les restockés
-      const allNewSKUs = [...(result.data.newSkus || []), ...(result.data.restockedSkus || [])];
-      
-      setNewProductsSKUs(allNewSKUs);
       setTotalNewProducts(result.data.totalNewProducts);
       setLastImportDate(result.data.importDate ? new Date(result.data.importDate) : null);
       
       // Stocker toutes les informations d'import dans importInfo
       setImportInfo({
+        importId: result.data.importId,
         importDate: result.data.importDate,
         totalNewProducts: result.data.totalNewProducts,
-        newSkus: result.data.newSkus || [],
-        restockedSkus: result.data.restockedSkus || [],
-        missingSkus: result.data.missingSkus || [],
         totalMissingProducts: result.data.totalMissingProducts || 0
       });
       
       console.log('📊 Informations d\'import récupérées depuis l\'API:', {
-        newSKUs: result.data.newSkus?.length || 0,
-        restockedSKUs: result.data.restockedSkus?.length || 0,
-        missingSKUs: result.data.missingSkus?.length || 0,
+        newSKUs: result.data.newSkusCount || 0,
+        restockedSKUs: result.data.restockedSkusCount || 0,
         totalNew: result.data.totalNewProducts,
         totalMissing: result.data.totalMissingProducts,
         date: result.data.importDate
@@ -1845,7 +1847,6 @@ function AdminCatalogPage() {
     } catch (error) {
       console.error('Erreur calcul nouveaux produits:', error);
       setTotalNewProducts(0);
-      setNewProductsSKUs([]);
       setLastImportDate(null);
     }
   };
@@ -2711,12 +2712,8 @@ function AdminCatalogPage() {
 
   // Calculer le total des produits nouveaux - TOTAL ABSOLU sans filtres
   const totalNewProductsCount = useMemo(() => {
-    if (importInfo && importInfo.newSkus && importInfo.restockedSkus) {
-      // Utiliser les vraies données d'import si disponibles
-      const allNewSkus = [...importInfo.newSkus, ...importInfo.restockedSkus];
-      return allNewSkus.filter((sku, index, self) => self.indexOf(sku) === index).length; // Déduplication
-    }
-    return 0; // Si pas d'info d'import, retourner 0
+    // Compte enregistré avec l'import (nouveaux + restockés, catégories disjointes)
+    return importInfo?.totalNewProducts || 0;
   }, [importInfo]);
 
   // Calculer les statistiques des produits avec stockage de base
@@ -6,6 +6,7 @@ import { useAuth, withAuth } from '@/lib/auth-context';
 import AppHeader from '@/components/AppHeader';
 import { supabase, Product } from '@/lib/supabase';
 import { OrdersUtils } from '@/lib/orders-utils';
+import { fetchImportSkus } from '@/lib/import-skus';
 import { 
   translateCatalogTerm, 
   translateInterfaceLabel,
@@ -57,7 +58,9 @@ function ClientCatalogPage() {
   const [includeZeroStock, setIncludeZeroStock] = useState(false);
   const [showStandardCapacityOnly, setShowStandardCapacityOnly] = useState(false);
   const [showMinorFaultOnly, setShowMinorFaultOnly] = useState(false);
-  const [importInfo, setImportInfo] = useState<{ importDate: string; totalNewProducts: number; newSkus: string[]; restockedSkus: string[]; missingSkus: string[]; totalMissingProducts: number } | null>(null);
+  const [importInfo, setImportInfo] = useState<{ importId: string; importDate: string; totalNewProducts: number; totalMissingProducts: number } | null>(null);
+  // SKU nouveaux / restockés du dernier import, chargés à la première activation du filtre
+  const [newImportSkus, setNewImportSkus] = useState<{ importId: string; skus: Set<string> } | null>(null);
   
   // États de tri et pagination
   const [sortField, setSortField] = useState<SortField>('product_name');
@@ -99,7 +102,6 @@ function ClientCatalogPage() {
   const [error, setError] = useState<string | null>(null);
   const [totalProductsCount, setTotalProductsCount] = useState<number | null>(null);
   const [creatingOrder, setCreatingOrder] = useState(false);
-  const [newProductsSKUs, setNewProductsSKUs] = useState<string[]>([]);
   const [lastImportDate, setLastImportDate] = useState<Date | null>(null);
   const [totalNewProducts, setTotalNewProducts] = useState<number>(0);
 
@@ -174,10 +176,20 @@ function ClientCatalogPage() {
     return Math.min(Math.floor(activeProducts * 0.05), 50);
   };
 
+  // Chargement paginé des SKU de l'import quand le filtre "nouveaux produits" est activé
+  useEffect(() => {
+    const importId = importInfo?.importId;
+    if (!showNewProductsOnly || !importId || newImportSkus?.importId === importId) return;
+    fetchImportSkus(importId, ['new', 'restocked'])
+      .then(skus => setNewImportSkus({ importId, skus }))
+      .catch(error => console.error('Erreur chargement des SKU de l\'import:', error));
+  }, [showNewProductsOnly, importInfo?.importId]);
+
   // Fonction pour vérifier si un produit est "nouveau"
   const isNewProduct = (product: Product) => {
-    if (importInfo && importInfo.newSkus && importInfo.restockedSkus) {
-      return importInfo.newSkus.includes(product.sku) || importInfo.restockedSkus.includes(product.sku);
+    if (importInfo) {
+      // SKU de l'import chargés à l'activation du filtre (vide pendant le chargement)
+      return newImportSkus?.importId === importInfo.importId && newImportSkus.skus.has(product.sku);
     } else {
       // Heuristique temporaire plus restrictive
       if (product.quantity === 0) return false;
@@ -231,7 +243,6 @@ function ClientCatalogPage() {
       if (!response.ok) {
         console.error('Erreur récupération import (client):', result.error);
         setTotalNewProducts(0);
-        setNewProductsSKUs([]);
         setLastImportDate(null);
         return;
       }
@@ -239,32 +250,24 @@ function ClientCatalogPage() {
       if (!result.data) {
         // Aucun import trouvé
         setTotalNewProducts(0);
-        setNewProductsSKUs([]);
         setLastImportDate(null);
         return;
       }
 
-      // Combiner les nouveaux SKU et les restockés
-      const allNewSKUs = [...(result.data.newSkus || []), ...(result.data.restockedSkus || [])];
-      
-      setNewProductsSKUs(allNewSKUs);
       setTotalNewProducts(result.data.totalNewProducts);
       setLastImportDate(result.data.importDate ? new Date(result.data.importDate) : null);
       
       // Stocker toutes les informations d'import dans importInfo
       setImportInfo({
+        importId: result.data.importId,
         importDate: result.data.importDate,
         totalNewProducts: result.data.totalNewProducts,
-        newSkus: result.data.newSkus || [],
-        restockedSkus: result.data.restockedSkus || [],
-        missingSkus: result.data.missingSkus || [],
         totalMissingProducts: result.data.totalMissingProducts || 0
       });
       
       console.log('📊 Informations d\'import récupérées depuis l\'API (client):', {
-        newSKUs: result.data.newSkus?.length || 0,
-        restockedSKUs: result.data.restockedSkus?.length || 0,
-        missingSKUs: result.data.missingSkus?.length || 0,
+        newSKUs: result.data.newSkusCount || 0,
+        restockedSKUs: result.data.restockedSkusCount || 0,
         totalNew: result.data.totalNewProducts,
         totalMissing: result.data.totalMissingProducts,
         date: result.data.importDate
@@ -273,7 +276,6 @@ function ClientCatalogPage() {
     } catch (error) {
       console.error('Erreur calcul nouveaux produits:', error);
       setTotalNewProducts(0);
-      setNewProductsSKUs([]);
       setLastImportDate(null);
     }
   };
@@ -937,6 +939,7 @@ function ClientCatalogPage() {
     includeZeroStock, 
     showNewProductsOnly, 
     importInfo,
+    newImportSkus,
     debouncedSearchTerm,
     selectedManufacturers,
     selectedAppearances,
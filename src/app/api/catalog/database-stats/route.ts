@@ -66,7 +66,7 @@ export async function GET() {
     // 6. Vérifier la table catalog_imports
     const { data: imports, error: importsError } = await supabaseAdmin
       .from('catalog_imports')
-      .select('import_date, total_imported, new_skus, missing_skus')
+      .select('id, import_date, total_imported, import_summary')
       .order('import_date', { ascending: false })
       .limit(5);
 
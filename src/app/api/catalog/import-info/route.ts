@@ -21,7 +21,7 @@ export async function GET() {
     // Récupérer le dernier import directement
     const { data: latestImport, error } = await supabaseAdmin
       .from('catalog_imports')
-      .select('*')
+      .select('id, import_date, import_summary, facet_stats')
       .order('import_date', { ascending: false })
       .limit(1)
       .single();
@@ -39,19 +39,21 @@ export async function GET() {
       return NextResponse.json({ data: null });
     }
 
-    const newSkus = latestImport.new_skus || [];
-    const restockedSkus = latestImport.restocked_skus || [];
-    const missingSkus = latestImport.missing_skus || [];
-    const totalNewProducts = newSkus.length + restockedSkus.length;
+    // Comptes seulement : les SKU se lisent page par page via /api/catalog/import-info/skus
+    const summary = latestImport.import_summary || {};
+    const newSkusCount = summary.new_skus_count || 0;
+    const restockedSkusCount = summary.restocked_skus_count || 0;
 
     return NextResponse.json({
       data: {
+        importId: latestImport.id,
         importDate: latestImport.import_date,
-        totalNewProducts,
-        newSkus,
-        restockedSkus,
-        missingSkus,
-        totalMissingProducts: missingSkus.length
+        totalNewProducts: newSkusCount + restockedSkusCount,
+        newSkusCount,
+        restockedSkusCount,
+        totalMissingProducts: summary.missing_skus_count || 0,
+        // Agrégats précalculés à l'import (comptes par facette, marques, prix)
+        facetStats: latestImport.facet_stats || null
       }
     });
     
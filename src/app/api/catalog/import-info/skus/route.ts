@@ -0,0 +1,53 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { supabaseAdmin } from '../../../../../lib/supabase';
+
+const KINDS = ['new', 'restocked', 'missing'];
+const MAX_PAGE_SIZE = 5000;
+
+// SKU d'un import (nouveaux / restockés / manquants), pagination par clé sur sku_id
+export async function GET(request: NextRequest) {
+  try {
+    if (!supabaseAdmin) {
+      return NextResponse.json({ error: 'Configuration Supabase admin manquante' }, { status: 500 });
+    }
+
+    const { searchParams } = new URL(request.url);
+    const importId = searchParams.get('importId');
+    if (!importId) {
+      return NextResponse.json({ error: 'importId requis' }, { status: 400 });
+    }
+
+    const kinds = (searchParams.get('kinds') || '').split(',').filter(Boolean);
+    const invalidKinds = kinds.filter(kind => !KINDS.includes(kind));
+    if (invalidKinds.length > 0) {
+      return NextResponse.json({ error: `Type de SKU invalide: ${invalidKinds.join(', ')}` }, { status: 400 });
+    }
+
+    const after = Math.max(0, parseInt(searchParams.get('after') || '0', 10) || 0);
+    const limit = Math.min(MAX_PAGE_SIZE, Math.max(1, parseInt(searchParams.get('limit') || '1000', 10) || 1000));
+
+    const { data, error } = await supabaseAdmin.rpc('get_catalog_import_skus', {
+      p_import_id: importId,
+      p_kinds: kinds.length > 0 ? kinds : null,
+      p_after_sku_id: after,
+      p_limit: limit
+    });
+
+    if (error) {
+      console.error('Erreur récupération SKU import:', error);
+      return NextResponse.json({ error: error.message }, { status: 500 });
+    }
+
+    const items = data || [];
+    return NextResponse.json({
+      items,
+      nextAfter: items.length === limit ? items[items.length - 1].sku_id : null
+    });
+
+  } catch (error) {
+    console.error('Erreur API import-info/skus:', error);
+    return NextResponse.json({
+      error: error instanceof Error ? error.message : 'Erreur inconnue'
+    }, { status: 500 });
+  }
+}
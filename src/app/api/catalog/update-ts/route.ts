@@ -81,9 +81,12 @@ export async function POST(request: NextRequest) {
       stats: resultData.stats,
       processedAt: new Date().toISOString(),
       newProducts: newProducts,
-      all_new_skus: resultData.all_new_skus || [],
-      missing_skus: resultData.missing_skus || [],
+      importId: resultData.import_id || null,
+      new_skus_preview: resultData.new_skus || [],
       restocked_skus: resultData.restocked_skus || [],
+      restockedSkusCount: resultData.restocked_skus_count || 0,
+      missing_skus: resultData.missing_skus || [],
+      missingSkusCount: resultData.missing_skus_count || 0,
       processingMethod: 'TypeScript (natif)'
     };
 
@@ -52,10 +52,13 @@ export async function POST(request: NextRequest) {
     await writeFile(tempPath, buffer);
 
     // Exécuter le script Python
+    // Logs JSON bornés sur stderr : stdout ne contient que le résultat final
     const pythonProcess = spawn('python3', [
       join(process.cwd(), 'backend/scripts/catalog_processor.py'),
       tempPath
-    ]);
+    ], {
+      env: { ...process.env, DBC_LOG_FORMAT: process.env.DBC_LOG_FORMAT || 'json' }
+    });
 
     let output = '';
     let errorOutput = '';
@@ -121,7 +124,12 @@ export async function POST(request: NextRequest) {
           stats: resultData.stats,
           processedAt: new Date().toISOString(),
           newProducts: newProducts,
-          all_new_skus: resultData.all_new_skus || [],
+          importId: resultData.import_id || null,
+          new_skus_preview: resultData.new_skus || [],
+          restocked_skus: resultData.restocked_skus || [],
+          restockedSkusCount: resultData.restocked_skus_count || 0,
+          missing_skus: resultData.missing_skus || [],
+          missingSkusCount: resultData.missing_skus_count || 0,
           processingMethod: 'TypeScript (fallback)'
         };
 
@@ -196,12 +204,22 @@ export async function POST(request: NextRequest) {
       stats: resultData.stats,
       processedAt: new Date().toISOString(),
       newProducts: newProducts,
-      all_new_skus: resultData.all_new_skus || []  // Liste complète pour le filtre
+      // Aperçus seulement : listes complètes via /api/catalog/import-info/skus?importId=
+      importId: resultData.import_id || null,
+      new_skus_preview: resultData.new_skus || [],
+      restocked_skus: resultData.restocked_skus || [],
+      restockedSkusCount: resultData.restocked_skus_count || 0,
+      duplicateOf: resultData.duplicate_of || null
     };
 
+    // Fichier identique au dernier import : résultat précédent, rien n'a été réécrit
+    const message = resultData.duplicate_of
+      ? `Catalogue identique au dernier import (${resultData.duplicate_of.import_date}) : aucune modification`
+      : `Catalogue mis à jour avec succès: ${resultData.imported_count} produits traités`;
+
     return NextResponse.json({ 
       success: true, 
-      message: `Catalogue mis à jour avec succès: ${resultData.imported_count} produits traités`,
+      message,
       summary,
       filename: file.name,
       size: file.size
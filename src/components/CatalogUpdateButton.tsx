@@ -81,12 +81,9 @@ export default function CatalogUpdateButton({ onUpdateComplete }: { onUpdateComp
           summary: result.summary
         });
         
-        // Sauvegarder les nouveaux SKU pour le filtre
-        if (result.summary?.all_new_skus && result.summary.all_new_skus.length > 0) {
-          localStorage.setItem('lastImportNewSKUs', JSON.stringify(result.summary.all_new_skus));
-          localStorage.setItem('lastImportDate', new Date().toISOString());
-          console.log('🔄 Sauvegarde des nouveaux SKU:', result.summary.all_new_skus.length);
-        }
+        // Les nouveaux SKU ne sont plus copiés localement : le filtre les charge
+        // page par page depuis l'import (summary.importId)
+        localStorage.setItem('lastImportDate', new Date().toISOString());
         
         // Appeler la fonction de callback pour rafraîchir les données
         if (onUpdateComplete) {
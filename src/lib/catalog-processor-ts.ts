@@ -19,6 +19,10 @@ interface Product {
   is_active: boolean;
 }
 
+// SKU par appel à record_catalog_import_items, aperçu gardé dans import_summary
+const IMPORT_ITEMS_CHUNK = 5000;
+const IMPORT_PREVIEW_SIZE = 50;
+
 interface ProcessingStats {
   total: number;
   marginal: number;
@@ -152,6 +156,7 @@ export class CatalogProcessorTS {
   }
 
   async importToSupabase(products: Product[]): Promise<{ 
+    import_id: string | null,
     imported_count: number, 
     new_skus: string[], 
     restocked_skus: string[],
@@ -317,7 +322,7 @@ export class CatalogProcessorTS {
     console.log(`📊 Total products with quantity 0: ${totalZeroQuantityProducts}`);
     
     // Sauvegarder les données d'import en base de données avec missing_skus
-    await this.saveImportToDatabase(newSkus, restockedSkus, missingSkus, totalImported, {
+    const importId = await this.saveImportToDatabase(newSkus, restockedSkus, missingSkus, totalImported, {
       total: products.length,
       new_skus: newSkus.length,
       restocked_skus: restockedSkus.length,
@@ -328,6 +333,7 @@ export class CatalogProcessorTS {
     });
 
     return {
+      import_id: importId,
       imported_count: totalImported,
       new_skus: newSkus,
       restocked_skus: restockedSkus,
@@ -342,35 +348,58 @@ export class CatalogProcessorTS {
     missingSkus: string[],
     totalImported: number, 
     stats: any
-  ): Promise<void> {
+  ): Promise<string | null> {
     try {
+      // Comptes et aperçu seulement : les SKU vont dans catalog_import_items
       const importData = {
         import_date: new Date().toISOString(),
         total_imported: totalImported,
         total_updated: newSkus.length + restockedSkus.length,
-        new_skus: newSkus,
-        restocked_skus: restockedSkus,
-        missing_skus: missingSkus,
         import_summary: {
           stats,
           new_skus_count: newSkus.length,
           restocked_skus_count: restockedSkus.length,
           missing_skus_count: missingSkus.length,
-          total_new_products: newSkus.length + restockedSkus.length
+          total_new_products: newSkus.length + restockedSkus.length,
+          preview: {
+            new: newSkus.slice(0, IMPORT_PREVIEW_SIZE),
+            restocked: restockedSkus.slice(0, IMPORT_PREVIEW_SIZE),
+            missing: missingSkus.slice(0, IMPORT_PREVIEW_SIZE)
+          }
         }
       };
       
       const { data, error } = await this.supabase
         .from('catalog_imports')
-        .insert(importData);
+        .insert(importData)
+        .select('id')
+        .single();
       
-      if (error) {
+      if (error || !data) {
         console.error('⚠️ Erreur sauvegarde import en base:', error);
-      } else {
-        console.log('✅ Données d\'import sauvegardées en base');
+        return null;
+      }
+      console.log('✅ Données d\'import sauvegardées en base');
+
+      // SKU par tranches (identifiants entiers côté base, voir record_catalog_import_items)
+      const kinds: Array<[string, string[]]> = [['new', newSkus], ['restocked', restockedSkus], ['missing', missingSkus]];
+      for (const [kind, skus] of kinds) {
+        for (let i = 0; i < skus.length; i += IMPORT_ITEMS_CHUNK) {
+          const { error: itemsError } = await this.supabase.rpc('record_catalog_import_items', {
+            p_import_id: data.id,
+            p_kind: kind,
+            p_skus: skus.slice(i, i + IMPORT_ITEMS_CHUNK)
+          });
+          if (itemsError) {
+            console.error(`⚠️ Erreur sauvegarde des SKU de l'import (${kind}):`, itemsError);
+            return data.id;
+          }
+        }
       }
+      return data.id;
     } catch (error) {
       console.error('⚠️ Erreur fonction saveImportToDatabase:', error);
+      return null;
     }
   }
 
@@ -382,7 +411,7 @@ export class CatalogProcessorTS {
       const { products, stats } = await this.processCatalogBuffer(buffer);
       
       // 2. Importer dans Supabase
-      const { imported_count, new_skus, restocked_skus, out_of_stock_count, missing_skus } = await this.importToSupabase(products);
+      const { import_id, imported_count, new_skus, restocked_skus, out_of_stock_count, missing_skus } = await this.importToSupabase(products);
       
       console.log('✅ Catalog processing completed successfully');
       console.log(`📊 Final stats:`, {
@@ -397,12 +426,14 @@ export class CatalogProcessorTS {
       
       return {
         success: true,
+        import_id, // Listes complètes : /api/catalog/import-info/skus
         imported_count,
         new_skus_count: new_skus.length,
-        new_skus: new_skus.slice(0, 50), // Aperçu limité
-        all_new_skus: new_skus, // Liste complète pour filtres
-        restocked_skus: restocked_skus, // Liste des produits restockés
-        missing_skus: missing_skus, // Liste des SKU en rupture
+        new_skus: new_skus.slice(0, IMPORT_PREVIEW_SIZE), // Aperçu limité
+        restocked_skus_count: restocked_skus.length,
+        restocked_skus: restocked_skus.slice(0, IMPORT_PREVIEW_SIZE),
+        missing_skus_count: missing_skus.length,
+        missing_skus: missing_skus.slice(0, IMPORT_PREVIEW_SIZE),
         out_of_stock_count,
         stats: {
           ...stats,
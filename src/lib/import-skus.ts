@@ -0,0 +1,46 @@
+// SKU d'un import catalogue (table catalog_import_items), lus page par page
+// uniquement quand le filtre "nouveaux produits" en a besoin
+
+export type ImportSkuKind = 'new' | 'restocked' | 'missing';
+
+export interface ImportSku {
+  sku_id: number;
+  sku: string;
+  kind: ImportSkuKind;
+}
+
+export interface ImportSkusPage {
+  items: ImportSku[];
+  nextAfter: number | null;
+}
+
+export const IMPORT_SKUS_PAGE_SIZE = 5000;
+
+/**
+ * Charge tous les SKU d'un import pour les catégories demandées
+ * (pagination par clé via /api/catalog/import-info/skus)
+ */
+export async function fetchImportSkus(importId: string, kinds: ImportSkuKind[]): Promise<Set<string>> {
+  const skus = new Set<string>();
+  let after: number | null = 0;
+
+  while (after !== null) {
+    const params = new URLSearchParams({
+      importId,
+      kinds: kinds.join(','),
+      after: String(after),
+      limit: String(IMPORT_SKUS_PAGE_SIZE)
+    });
+    const response = await fetch(`/api/catalog/import-info/skus?${params}`);
+    const result = await response.json();
+    if (!response.ok) {
+      throw new Error(result.error || 'Erreur récupération des SKU de l\'import');
+    }
+
+    const page = result as ImportSkusPage;
+    page.items.forEach(item => skus.add(item.sku));
+    after = page.nextAfter;
+  }
+
+  return skus;
+}